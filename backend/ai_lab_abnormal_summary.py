@@ -3,6 +3,11 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
+try:
+    from backend.lab_reference_ranges import ABNORMAL_FLAGS, flag_batch
+except ModuleNotFoundError:
+    from lab_reference_ranges import ABNORMAL_FLAGS, flag_batch
+
 AI_LAB_ABNORMAL_SUMMARY_MODE = "ai_lab_abnormal_summary_v1"
 
 
@@ -109,7 +114,17 @@ def _value_text(item: Dict[str, Any]) -> str:
     return f"{value} {unit}".strip() if value is not None else "not_provided"
 
 
-def _collect_abnormal_observations(parsed_lab_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _species(parsed_lab_result: Dict[str, Any], case_context: Optional[Dict[str, Any]]) -> Optional[str]:
+    if isinstance(case_context, dict) and _text(case_context.get("species")):
+        return _text(case_context.get("species"))
+    report = parsed_lab_result.get("report_preview")
+    metadata = report.get("metadata") if isinstance(report, dict) else None
+    if isinstance(metadata, dict):
+        return _text(metadata.get("species")) or None
+    return None
+
+
+def _collect_abnormal_observations(parsed_lab_result: Dict[str, Any], species: Optional[str] = None) -> List[Dict[str, Any]]:
     abnormal = parsed_lab_result.get("abnormal_observations")
     if isinstance(abnormal, list) and abnormal:
         return [item for item in abnormal if isinstance(item, dict)]
@@ -117,10 +132,31 @@ def _collect_abnormal_observations(parsed_lab_result: Dict[str, Any]) -> List[Di
     observations = parsed_lab_result.get("observations_preview") or []
     if not isinstance(observations, list):
         return []
-    return [
-        item for item in observations
-        if isinstance(item, dict) and _text(item.get("abnormal_flag")).lower() in {"high", "low", "critical_high", "critical_low"}
-    ]
+    observations = [item for item in observations if isinstance(item, dict)]
+
+    # Re-flag the whole panel in one pass; a stored flag still wins over the ranges.
+    flagged = flag_batch(
+        [_num(item.get("value_numeric")) for item in observations],
+        codes=[item.get("code") for item in observations],
+        units=[item.get("unit") for item in observations],
+        species=species,
+        lows=[_num(item.get("reference_low")) for item in observations],
+        highs=[_num(item.get("reference_high")) for item in observations],
+        explicit_flags=[item.get("abnormal_flag") for item in observations],
+    )
+    collected: List[Dict[str, Any]] = []
+    for position, item in enumerate(observations):
+        stored = _text(item.get("abnormal_flag")).lower()
+        flag = stored if stored in ABNORMAL_FLAGS else flagged["abnormal_flag"][position]
+        if flag not in ABNORMAL_FLAGS:
+            continue
+        collected.append({
+            **item,
+            "abnormal_flag": flag,
+            "reference_low": flagged["reference_low"][position],
+            "reference_high": flagged["reference_high"][position],
+        })
+    return collected
 
 
 def build_ai_lab_abnormal_summary(
@@ -139,7 +175,7 @@ def build_ai_lab_abnormal_summary(
     if not isinstance(parsed_lab_result, dict):
         raise ValueError("parsed_lab_result must be a JSON object")
 
-    abnormal_items = _collect_abnormal_observations(parsed_lab_result)
+    abnormal_items = _collect_abnormal_observations(parsed_lab_result, _species(parsed_lab_result, case_context))
     findings: List[Dict[str, Any]] = []
 
     for item in abnormal_items:
@@ -2,19 +2,44 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field
 from sqlalchemy.orm import Session
 
 try:
+    from backend.audit_log_query import (
+        AUDIT_LOG_QUERY_DEFAULT_LIMIT,
+        AUDIT_LOG_QUERY_MAX_LIMIT,
+        AUDIT_LOG_QUERY_MODE,
+        AuditLogFilters,
+        build_audit_log_filters,
+        is_audit_log_reviewer,
+        iter_audit_log_ndjson,
+        iter_audit_log_rows,
+        query_audit_log_page,
+    )
+    from backend.audit_writer import append_audit_logs, flush_audit_writer, get_audit_writer
     from backend.auth_jwt import get_current_user
-    from backend.db import get_db
+    from backend.db import SessionLocal, get_db
     from backend.models import AuditLog, Case, DiagnosticReport
 except ModuleNotFoundError:
+    from audit_log_query import (
+        AUDIT_LOG_QUERY_DEFAULT_LIMIT,
+        AUDIT_LOG_QUERY_MAX_LIMIT,
+        AUDIT_LOG_QUERY_MODE,
+        AuditLogFilters,
+        build_audit_log_filters,
+        is_audit_log_reviewer,
+        iter_audit_log_ndjson,
+        iter_audit_log_rows,
+        query_audit_log_page,
+    )
+    from audit_writer import append_audit_logs, flush_audit_writer, get_audit_writer
     from auth_jwt import get_current_user
-    from db import get_db
+    from db import SessionLocal, get_db
     from models import AuditLog, Case, DiagnosticReport
 
 
@@ -47,6 +72,17 @@ class AuditLogCreateIn(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+AUDIT_LOG_BULK_MAX_EVENTS = 500
+
+
+class AuditLogBulkCreateIn(BaseModel):
+    """Several append-only audit events written in one group commit."""
+
+    events: List[AuditLogCreateIn] = Field(..., min_length=1, max_length=AUDIT_LOG_BULK_MAX_EVENTS)
+
+    model_config = ConfigDict(extra="forbid")
+
+
 def _clean(value: Optional[str]) -> str:
     return str(value or "").strip()
 
@@ -60,21 +96,23 @@ def _assert_owned_case_if_present(db: Session, user: Any, case_id: Optional[int]
         raise HTTPException(status_code=404, detail="Case not found")
 
 
-@router.post("/audit-log", response_model=dict, status_code=201)
-def create_audit_log(
-    data: AuditLogCreateIn,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
-):
+def _persist_audit_log(db: Session, obj: AuditLog) -> str:
     """
-    Append one audit event.
+    Append one audit row.
 
-    Important:
-    - This endpoint only creates audit log rows.
-    - No update/delete endpoint is exposed.
-    - Use a new audit row for any correction or supplemental note.
+    With AUDIT_LOG_GROUP_COMMIT on, the row is journaled and committed by the
+    background writer (see audit_writer.py); log_id and created_at are assigned
+    up front so the response is unchanged. Otherwise it is written inline.
     """
+    if get_audit_writer() is None:
+        db.add(obj)
+        db.commit()
+        db.refresh(obj)
+        return "synchronous"
+    return append_audit_logs(db, [obj])
+
 
+def _audit_log_from_input(data: AuditLogCreateIn) -> AuditLog:
     request_id = _clean(data.request_id)
     clinician_id = _clean(data.clinician_id)
     action_taken = _clean(data.action_taken)
@@ -88,9 +126,7 @@ def create_audit_log(
     if not action_taken:
         raise HTTPException(status_code=422, detail="action_taken is required")
 
-    _assert_owned_case_if_present(db, user, data.case_id)
-
-    obj = AuditLog(
+    return AuditLog(
         request_id=request_id,
         patient_token=_clean(data.patient_token) or None,
         clinician_id=clinician_id,
@@ -107,13 +143,30 @@ def create_audit_log(
         extra_data=data.metadata or None,
     )
 
-    db.add(obj)
-    db.commit()
-    db.refresh(obj)
+
+@router.post("/audit-log", response_model=dict, status_code=201)
+def create_audit_log(
+    data: AuditLogCreateIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Append one audit event.
+
+    Important:
+    - This endpoint only creates audit log rows.
+    - No update/delete endpoint is exposed.
+    - Use a new audit row for any correction or supplemental note.
+    """
+
+    obj = _audit_log_from_input(data)
+    _assert_owned_case_if_present(db, user, data.case_id)
+    write_mode = _persist_audit_log(db, obj)
 
     return {
         "message": "created",
         "mode": "append_only",
+        "write_mode": write_mode,
         "log_id": obj.log_id,
         "request_id": obj.request_id,
         "case_id": obj.case_id,
@@ -126,6 +179,158 @@ def create_audit_log(
         "can_delete": False,
     }
 
+
+@router.post("/audit-log/bulk", response_model=dict, status_code=201)
+def create_audit_logs_bulk(
+    data: AuditLogBulkCreateIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Append up to AUDIT_LOG_BULK_MAX_EVENTS audit events at once.
+
+    All events are validated (and their cases checked) before any is written;
+    the rows then go to the database in a single insert.
+    """
+
+    objs = [_audit_log_from_input(event) for event in data.events]
+
+    case_ids = {obj.case_id for obj in objs if obj.case_id is not None}
+    if case_ids:
+        owned = {
+            row[0]
+            for row in db.query(Case.id)
+            .filter(Case.id.in_(case_ids), Case.owner_id == getattr(user, "id", None))
+            .all()
+        }
+        if case_ids - owned:
+            raise HTTPException(status_code=404, detail="Case not found")
+
+    write_mode = append_audit_logs(db, objs)
+
+    return {
+        "message": "created",
+        "mode": "append_only",
+        "write_mode": write_mode,
+        "count": len(objs),
+        "items": [
+            {
+                "log_id": obj.log_id,
+                "request_id": obj.request_id,
+                "case_id": obj.case_id,
+                "event_type": obj.event_type,
+                "created_at": obj.created_at.isoformat() if isinstance(obj.created_at, datetime) else None,
+            }
+            for obj in objs
+        ],
+        "append_only": True,
+        "can_update": False,
+        "can_delete": False,
+    }
+
+
+# --- Audit Log Query V1 endpoints: start ---
+def _audit_log_query_scope(
+    case_id: Optional[int],
+    session_uid: Optional[str],
+    clinician_id: Optional[str],
+    request_id: Optional[str],
+    event_type: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    db: Session,
+    user: Any,
+) -> Tuple[AuditLogFilters, Optional[int]]:
+    try:
+        filters = build_audit_log_filters(
+            case_id=case_id,
+            session_uid=session_uid,
+            clinician_id=clinician_id,
+            request_id=request_id,
+            event_type=event_type,
+            since=since,
+            until=until,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+    # Clinicians see audit rows of their own cases; reviewers see every row.
+    owner_id = None if is_audit_log_reviewer(user) else getattr(user, "id", None)
+    if owner_id is not None:
+        _assert_owned_case_if_present(db, user, case_id)
+    # Rows may still be waiting in the group-commit buffer.
+    flush_audit_writer()
+    return filters, owner_id
+
+
+@router.get("/audit-log", response_model=dict)
+def list_audit_logs(
+    case_id: Optional[int] = None,
+    session_uid: Optional[str] = Query(default=None, max_length=64),
+    clinician_id: Optional[str] = Query(default=None, max_length=100),
+    request_id: Optional[str] = Query(default=None, max_length=100),
+    event_type: Optional[str] = Query(default=None, max_length=100),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = Query(default=None, max_length=512),
+    limit: int = Query(default=AUDIT_LOG_QUERY_DEFAULT_LIMIT, ge=1, le=AUDIT_LOG_QUERY_MAX_LIMIT),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Read audit rows newest first.
+
+    Pass ``next_cursor`` back as ``cursor`` for the next page. Without ``since``
+    the window starts AUDIT_LOG_QUERY_DEFAULT_WINDOW_DAYS before ``until``/now.
+    """
+
+    filters, owner_id = _audit_log_query_scope(
+        case_id, session_uid, clinician_id, request_id, event_type, since, until, db, user,
+    )
+    try:
+        page = query_audit_log_page(db, filters, owner_id=owner_id, cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+    return {
+        "mode": AUDIT_LOG_QUERY_MODE,
+        "filters": filters.as_dict(),
+        "scope": "all_cases" if owner_id is None else "owned_cases",
+        **page,
+        "append_only": True,
+        "read_only": True,
+    }
+
+
+@router.get("/audit-log/export", response_class=StreamingResponse)
+def export_audit_logs(
+    case_id: Optional[int] = None,
+    session_uid: Optional[str] = Query(default=None, max_length=64),
+    clinician_id: Optional[str] = Query(default=None, max_length=100),
+    request_id: Optional[str] = Query(default=None, max_length=100),
+    event_type: Optional[str] = Query(default=None, max_length=100),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Stream every matching row as NDJSON, newest first, in keyset pages."""
+
+    filters, owner_id = _audit_log_query_scope(
+        case_id, session_uid, clinician_id, request_id, event_type, since, until, db, user,
+    )
+    # The request session closes before the body is streamed; pages open their own.
+    rows = iter_audit_log_rows(SessionLocal, filters, owner_id=owner_id)
+    return StreamingResponse(
+        iter_audit_log_ndjson(rows),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": 'attachment; filename="audit_log_export.ndjson"',
+            "X-PMAI-Audit-Log-Mode": AUDIT_LOG_QUERY_MODE,
+        },
+    )
+# --- Audit Log Query V1 endpoints: end ---
+
 # --- Diagnostic Summary Audit Log V1 endpoint: start ---
 @router.post("/diagnostic-data/diagnostic-summary/audit-log/append", response_model=dict)
 def append_diagnostic_summary_audit_log(
@@ -239,9 +444,7 @@ def append_diagnostic_summary_audit_log(
             source=event.get("source") or DIAGNOSTIC_SUMMARY_AUDIT_LOG_MODE,
             extra_data=metadata,
         )
-        db.add(obj)
-        db.commit()
-        db.refresh(obj)
+        _persist_audit_log(db, obj)
         persisted = True
         log_id = obj.log_id
         created_at = obj.created_at.isoformat() if isinstance(obj.created_at, datetime) else None
@@ -357,9 +560,7 @@ def append_treatment_framework_audit_log_endpoint(
             source=event.get("source") or TREATMENT_FRAMEWORK_AUDIT_LOG_MODE,
             extra_data=metadata,
         )
-        db.add(obj)
-        db.commit()
-        db.refresh(obj)
+        _persist_audit_log(db, obj)
         persisted = True
         log_id = obj.log_id
         created_at = obj.created_at.isoformat() if isinstance(obj.created_at, datetime) else None
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Optional monthly range partitioning of ``audit_log`` on Postgres.
+
+Rows are only ever appended and are read by time window, so partitioning by
+``created_at`` month keeps the indexes each query touches small and lets old
+months be detached and archived as whole tables. SQLite deployments keep the
+plain table; nothing here runs there.
+
+The alembic chain is frozen under docs/ops/ALEMBIC_RELEASE_GUARDRAILS.md, so
+the conversion is an operator step (scripts/audit_log_partitions.py) rather
+than a migration. It leaves the ORM model untouched: ``log_id`` stays the
+mapped primary key, the database key becomes ``(log_id, created_at)``.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+try:
+    from backend.models import AuditLog
+except ModuleNotFoundError:
+    from models import AuditLog
+
+
+AUDIT_LOG_PARTITION_MODE = "audit_log_monthly_partitions_v1"
+AUDIT_LOG_PARTITION_CONFIRMATION = "I_UNDERSTAND_THIS_REPARTITIONS_AUDIT_LOG"
+AUDIT_LOG_TABLE = "audit_log"
+AUDIT_LOG_UNPARTITIONED_TABLE = "audit_log_unpartitioned"
+AUDIT_LOG_DEFAULT_PARTITION = "audit_log_default"
+AUDIT_LOG_PARTITION_MONTHS_AHEAD = 3
+
+# A foreign key needs a unique key on log_id alone, which a partitioned table
+# cannot have. The conversion drops it (the operator must acknowledge that by
+# name) and installs a constraint trigger doing the same existence check;
+# audit_log_partition_status reports orphaned references either way.
+AUDIT_LOG_APPROVAL_TABLE = "emr_import_execution_runs"
+AUDIT_LOG_APPROVAL_COLUMN = "approval_audit_log_id"
+AUDIT_LOG_APPROVAL_FOREIGN_KEY = "emr_import_execution_runs_approval_audit_log_id_fkey"
+AUDIT_LOG_APPROVAL_TRIGGER = "emr_import_execution_runs_approval_audit_log_check"
+_INBOUND_FOREIGN_KEYS = (
+    (AUDIT_LOG_APPROVAL_TABLE, AUDIT_LOG_APPROVAL_FOREIGN_KEY),
+)
+
+_ORPHANED_APPROVALS_SQL = (
+    f"SELECT count(*) FROM {AUDIT_LOG_APPROVAL_TABLE} r "
+    f"WHERE r.{AUDIT_LOG_APPROVAL_COLUMN} IS NOT NULL "
+    f"AND NOT EXISTS (SELECT 1 FROM {AUDIT_LOG_TABLE} a WHERE a.log_id = r.{AUDIT_LOG_APPROVAL_COLUMN})"
+)
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{AUDIT_LOG_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def partition_ddl(month: date) -> str:
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {AUDIT_LOG_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def _month_range(first: date, last: date) -> List[date]:
+    months, month = [], month_start(first)
+    while month <= month_start(last):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def plan_audit_log_partitioning(
+    first_month: date,
+    *,
+    months_ahead: int = AUDIT_LOG_PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """DDL that swaps ``audit_log`` for a partitioned copy; run in one transaction."""
+    last_month = add_months(month_start(today or datetime.utcnow().date()), months_ahead)
+    statements = [f"LOCK TABLE {AUDIT_LOG_TABLE} IN ACCESS EXCLUSIVE MODE"]
+    statements += [f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}" for table, name in _INBOUND_FOREIGN_KEYS]
+    statements += [
+        f"ALTER TABLE {AUDIT_LOG_TABLE} RENAME TO {AUDIT_LOG_UNPARTITIONED_TABLE}",
+        f"ALTER TABLE {AUDIT_LOG_UNPARTITIONED_TABLE} RENAME CONSTRAINT {AUDIT_LOG_TABLE}_pkey TO {AUDIT_LOG_UNPARTITIONED_TABLE}_pkey",
+    ]
+    # Index names are schema-wide; free them for the new table.
+    index_names = sorted(index.name for index in AuditLog.__table__.indexes)
+    statements += [
+        f"ALTER INDEX {name} RENAME TO {name.replace(AUDIT_LOG_TABLE, AUDIT_LOG_UNPARTITIONED_TABLE, 1)}"
+        for name in index_names
+    ]
+    statements += [
+        (
+            f"CREATE TABLE {AUDIT_LOG_TABLE} (LIKE {AUDIT_LOG_UNPARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (created_at)"
+        ),
+        f"ALTER TABLE {AUDIT_LOG_TABLE} ADD CONSTRAINT {AUDIT_LOG_TABLE}_pkey PRIMARY KEY (log_id, created_at)",
+        (
+            f"ALTER TABLE {AUDIT_LOG_TABLE} ADD CONSTRAINT {AUDIT_LOG_TABLE}_case_id_fkey "
+            "FOREIGN KEY (case_id) REFERENCES cases (id) ON DELETE SET NULL"
+        ),
+    ]
+    dialect = postgresql.dialect()
+    indexes = sorted(AuditLog.__table__.indexes, key=lambda index: index.name)
+    statements += [str(CreateIndex(index).compile(dialect=dialect)).strip() for index in indexes]
+    statements.append(f"CREATE TABLE {AUDIT_LOG_DEFAULT_PARTITION} PARTITION OF {AUDIT_LOG_TABLE} DEFAULT")
+    statements += [partition_ddl(month) for month in _month_range(first_month, last_month)]
+    statements.append(f"INSERT INTO {AUDIT_LOG_TABLE} SELECT * FROM {AUDIT_LOG_UNPARTITIONED_TABLE}")
+    statements += approval_reference_ddl()
+    return statements
+
+
+def approval_reference_ddl() -> List[str]:
+    """Stand-in for the dropped foreign key: refuse approval ids missing from audit_log."""
+    table, column, trigger = AUDIT_LOG_APPROVAL_TABLE, AUDIT_LOG_APPROVAL_COLUMN, AUDIT_LOG_APPROVAL_TRIGGER
+    return [
+        # Existing rows were covered by the foreign key; check once more before trusting the trigger.
+        (
+            f"DO $$ BEGIN IF ({_ORPHANED_APPROVALS_SQL}) > 0 THEN "
+            f"RAISE EXCEPTION '{table}.{column} references rows missing from {AUDIT_LOG_TABLE}'; "
+            "END IF; END $$"
+        ),
+        (
+            f"CREATE OR REPLACE FUNCTION {trigger}() RETURNS trigger LANGUAGE plpgsql AS $$ "
+            f"BEGIN IF NEW.{column} IS NOT NULL AND NOT EXISTS "
+            f"(SELECT 1 FROM {AUDIT_LOG_TABLE} WHERE log_id = NEW.{column}) THEN "
+            f"RAISE EXCEPTION USING ERRCODE = 'foreign_key_violation', "
+            f"MESSAGE = '{column} ' || NEW.{column} || ' is not present in {AUDIT_LOG_TABLE}'; "
+            "END IF; RETURN NULL; END $$"
+        ),
+        f"DROP TRIGGER IF EXISTS {trigger} ON {table}",
+        (
+            f"CREATE CONSTRAINT TRIGGER {trigger} AFTER INSERT OR UPDATE OF {column} ON {table} "
+            f"DEFERRABLE INITIALLY IMMEDIATE FOR EACH ROW EXECUTE FUNCTION {trigger}()"
+        ),
+    ]
+
+
+def _approval_reference_status(conn) -> Dict[str, Any]:
+    if not conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": AUDIT_LOG_APPROVAL_TABLE}).scalar():
+        return {"enforced_by": "none", "orphaned_rows": 0, "table_present": False}
+    foreign_key = bool(conn.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = :name AND contype = 'f'"
+    ), {"name": AUDIT_LOG_APPROVAL_FOREIGN_KEY}).scalar())
+    trigger = bool(conn.execute(text(
+        "SELECT 1 FROM pg_trigger WHERE tgname = :name AND NOT tgisinternal"
+    ), {"name": AUDIT_LOG_APPROVAL_TRIGGER}).scalar())
+    orphaned = int(conn.execute(text(_ORPHANED_APPROVALS_SQL)).scalar() or 0)
+    return {
+        "enforced_by": "foreign_key" if foreign_key else ("trigger" if trigger else "none"),
+        "orphaned_rows": orphaned,
+        "table_present": True,
+    }
+
+
+def audit_log_partition_status(conn) -> Dict[str, Any]:
+    dialect = conn.dialect.name
+    status: Dict[str, Any] = {"mode": AUDIT_LOG_PARTITION_MODE, "dialect": dialect, "supported": dialect == "postgresql"}
+    if dialect != "postgresql":
+        status.update({"partitioned": False, "partitions": []})
+        return status
+
+    partitioned = bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": AUDIT_LOG_TABLE}).scalar())
+    partitions = []
+    if partitioned:
+        partitions = [
+            {"name": row[0], "bounds": row[1], "rows_estimate": int(row[2] or 0)}
+            for row in conn.execute(text(
+                "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples::bigint "
+                "FROM pg_inherits i JOIN pg_class parent ON parent.oid = i.inhparent "
+                "JOIN pg_class child ON child.oid = i.inhrelid "
+                "WHERE parent.relname = :name AND pg_table_is_visible(parent.oid) ORDER BY child.relname"
+            ), {"name": AUDIT_LOG_TABLE})
+        ]
+    bounds = conn.execute(text(f"SELECT min(created_at), max(created_at), count(*) FROM {AUDIT_LOG_TABLE}")).one()
+    unpartitioned_copy = bool(conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": AUDIT_LOG_UNPARTITIONED_TABLE}).scalar())
+    status.update({
+        "partitioned": partitioned,
+        "partitions": partitions,
+        "oldest_created_at": bounds[0].isoformat() if bounds[0] else None,
+        "newest_created_at": bounds[1].isoformat() if bounds[1] else None,
+        "row_count": int(bounds[2] or 0),
+        "unpartitioned_copy_present": unpartitioned_copy,
+        "approval_audit_log_reference": _approval_reference_status(conn),
+    })
+    return status
+
+
+def plan_future_partitions(
+    status: Dict[str, Any],
+    *,
+    months_ahead: int = AUDIT_LOG_PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Monthly partitions missing between this month and ``months_ahead``."""
+    if not status.get("partitioned"):
+        return []
+    existing = {item["name"] for item in status.get("partitions") or []}
+    this_month = month_start(today or datetime.utcnow().date())
+    return [
+        partition_ddl(month)
+        for month in _month_range(this_month, add_months(this_month, months_ahead))
+        if partition_name(month) not in existing
+    ]
+
+
+def plan_partition_detach(status: Dict[str, Any], before_month: date) -> List[str]:
+    """Detach monthly partitions that end on or before ``before_month`` (for archiving)."""
+    if not status.get("partitioned"):
+        return []
+    cutoff = partition_name(month_start(before_month))
+    prefix = f"{AUDIT_LOG_TABLE}_p"
+    return [
+        f"ALTER TABLE {AUDIT_LOG_TABLE} DETACH PARTITION {item['name']}"
+        for item in status.get("partitions") or []
+        if item["name"].startswith(prefix) and item["name"] < cutoff
+    ]
+
+
+def apply_statements(conn, statements: List[str]) -> int:
+    for statement in statements:
+        conn.execute(text(statement))
+    return len(statements)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Read path over the append-only ``audit_log`` table.
+
+Rows are returned newest first, ordered by ``(created_at, log_id)``, and paged
+with an opaque keyset cursor instead of OFFSET, so page N costs the same as
+page 1. Every query is bounded by a ``created_at`` window: that is what the
+``ix_audit_log_*_created_at`` composite indexes serve, and on a table
+partitioned by ``audit_log_partitions.py`` it lets Postgres skip the months
+outside the window.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+try:
+    from backend.models import AuditLog, Case
+except ModuleNotFoundError:
+    from models import AuditLog, Case
+
+
+AUDIT_LOG_QUERY_MODE = "audit_log_query_v1"
+AUDIT_LOG_QUERY_DEFAULT_LIMIT = 100
+AUDIT_LOG_QUERY_MAX_LIMIT = 1000
+AUDIT_LOG_QUERY_DEFAULT_WINDOW_DAYS = int(os.getenv("AUDIT_LOG_QUERY_DEFAULT_WINDOW_DAYS", "90"))
+AUDIT_LOG_EXPORT_PAGE_SIZE = int(os.getenv("AUDIT_LOG_EXPORT_PAGE_SIZE", "1000"))
+# Comma separated emails allowed to read audit rows of every case (and rows without a case).
+AUDIT_LOG_REVIEWER_EMAILS = frozenset(
+    item.strip().lower()
+    for item in os.getenv("AUDIT_LOG_REVIEWER_EMAILS", "").split(",")
+    if item.strip()
+)
+
+
+@dataclass(frozen=True)
+class AuditLogFilters:
+    case_id: Optional[int] = None
+    session_uid: Optional[str] = None
+    clinician_id: Optional[str] = None
+    request_id: Optional[str] = None
+    event_type: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "case_id": self.case_id,
+            "session_uid": self.session_uid,
+            "clinician_id": self.clinician_id,
+            "request_id": self.request_id,
+            "event_type": self.event_type,
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+        }
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # created_at is stored as naive UTC (datetime.utcnow).
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def build_audit_log_filters(
+    *,
+    case_id: Optional[int] = None,
+    session_uid: Optional[str] = None,
+    clinician_id: Optional[str] = None,
+    request_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    default_window_days: int = AUDIT_LOG_QUERY_DEFAULT_WINDOW_DAYS,
+) -> AuditLogFilters:
+    """Normalize filters; ``since`` defaults to ``default_window_days`` before ``until``/now."""
+    since, until = _utc_naive(since), _utc_naive(until)
+    if since is None and default_window_days > 0:
+        since = (until or datetime.utcnow()) - timedelta(days=default_window_days)
+    if since is not None and until is not None and since >= until:
+        raise ValueError("since must be earlier than until")
+    return AuditLogFilters(
+        case_id=case_id,
+        session_uid=(session_uid or "").strip() or None,
+        clinician_id=(clinician_id or "").strip() or None,
+        request_id=(request_id or "").strip() or None,
+        event_type=(event_type or "").strip() or None,
+        since=since,
+        until=until,
+    )
+
+
+def encode_audit_log_cursor(created_at: datetime, log_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), log_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_audit_log_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, log_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(log_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def is_audit_log_reviewer(user: Any) -> bool:
+    return str(getattr(user, "email", "") or "").strip().lower() in AUDIT_LOG_REVIEWER_EMAILS
+
+
+def audit_log_statement(
+    filters: AuditLogFilters,
+    *,
+    owner_id: Optional[int],
+    after: Optional[Tuple[datetime, str]] = None,
+    limit: int = AUDIT_LOG_QUERY_DEFAULT_LIMIT,
+):
+    """SELECT for one page. ``owner_id=None`` means no case-ownership scope (reviewers)."""
+    stmt = select(AuditLog)
+    if owner_id is not None:
+        stmt = stmt.where(AuditLog.case_id.in_(select(Case.id).where(Case.owner_id == owner_id)))
+    if filters.case_id is not None:
+        stmt = stmt.where(AuditLog.case_id == filters.case_id)
+    if filters.session_uid:
+        stmt = stmt.where(AuditLog.session_uid == filters.session_uid)
+    if filters.clinician_id:
+        stmt = stmt.where(AuditLog.clinician_id == filters.clinician_id)
+    if filters.request_id:
+        stmt = stmt.where(AuditLog.request_id == filters.request_id)
+    if filters.event_type:
+        stmt = stmt.where(AuditLog.event_type == filters.event_type)
+    if filters.since is not None:
+        stmt = stmt.where(AuditLog.created_at >= filters.since)
+    if filters.until is not None:
+        stmt = stmt.where(AuditLog.created_at < filters.until)
+    if after is not None:
+        created_at, log_id = after
+        # The plain upper bound keeps the predicate index- and partition-friendly;
+        # the OR only breaks ties between rows with the same created_at.
+        stmt = stmt.where(
+            AuditLog.created_at <= created_at,
+            or_(AuditLog.created_at < created_at, and_(AuditLog.created_at == created_at, AuditLog.log_id < log_id)),
+        )
+    return stmt.order_by(AuditLog.created_at.desc(), AuditLog.log_id.desc()).limit(limit)
+
+
+def audit_log_row(obj: AuditLog) -> Dict[str, Any]:
+    return {
+        "log_id": obj.log_id,
+        "request_id": obj.request_id,
+        "patient_token": obj.patient_token,
+        "clinician_id": obj.clinician_id,
+        "model_version": obj.model_version,
+        "confidence": obj.confidence,
+        "suggested_action": obj.suggested_action,
+        "action_taken": obj.action_taken,
+        "override_reason": obj.override_reason,
+        "note": obj.note,
+        "case_id": obj.case_id,
+        "session_uid": obj.session_uid,
+        "event_type": obj.event_type,
+        "source": obj.source,
+        "metadata": obj.extra_data,
+        "created_at": obj.created_at.isoformat() if isinstance(obj.created_at, datetime) else None,
+    }
+
+
+def query_audit_log_page(
+    db: Session,
+    filters: AuditLogFilters,
+    *,
+    owner_id: Optional[int],
+    cursor: Optional[str] = None,
+    limit: int = AUDIT_LOG_QUERY_DEFAULT_LIMIT,
+) -> Dict[str, Any]:
+    limit = max(1, min(int(limit), AUDIT_LOG_QUERY_MAX_LIMIT))
+    after = decode_audit_log_cursor(cursor) if cursor else None
+    # One extra row tells whether another page exists without a COUNT(*).
+    rows: Sequence[AuditLog] = db.execute(
+        audit_log_statement(filters, owner_id=owner_id, after=after, limit=limit + 1)
+    ).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_audit_log_cursor(rows[-1].created_at, rows[-1].log_id) if has_more else None
+    return {
+        "items": [audit_log_row(obj) for obj in rows],
+        "count": len(rows),
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    }
+
+
+def iter_audit_log_rows(
+    session_factory,
+    filters: AuditLogFilters,
+    *,
+    owner_id: Optional[int],
+    page_size: int = AUDIT_LOG_EXPORT_PAGE_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Walk the whole filter window page by page; each page uses a short-lived session."""
+    after: Optional[Tuple[datetime, str]] = None
+    page_size = max(1, int(page_size))
+    while True:
+        db = session_factory()
+        try:
+            rows: List[AuditLog] = db.execute(
+                audit_log_statement(filters, owner_id=owner_id, after=after, limit=page_size)
+            ).scalars().all()
+            items = [audit_log_row(obj) for obj in rows]
+        finally:
+            db.close()
+        yield from items
+        if len(rows) < page_size:
+            return
+        after = (rows[-1].created_at, rows[-1].log_id)
+
+
+def iter_audit_log_ndjson(rows: Iterator[Dict[str, Any]], chunk_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    # Coalesce lines into ~64 KiB chunks; one send per row dominates large exports.
+    buffer: List[bytes] = []
+    size = 0
+    for row in rows:
+        line = (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
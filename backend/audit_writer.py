@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+Group-commit writer for append-only audit_log rows.
+
+Request handlers hand finished rows to ``AuditLogWriter.submit``: the row is
+appended to a local journal file, queued in memory and acknowledged with its
+pre-assigned ``log_id`` / ``created_at``. A background thread inserts queued
+rows in one transaction when ``AUDIT_LOG_GROUP_COMMIT_MAX_BATCH`` rows are
+waiting or ``AUDIT_LOG_GROUP_COMMIT_MAX_DELAY_MS`` has passed.
+
+Each flush first rotates the journal into a segment file that is deleted only
+after its rows are committed. Segments left by a crash or a database outage
+are replayed on startup and on later flushes; ``log_id`` is the primary key,
+so replay inserts only rows that are missing. Rows the database rejects even
+one at a time go to ``audit_journal.rejected.ndjson`` instead of being dropped.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import insert, select
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+try:
+    from backend.db import SessionLocal
+    from backend.models import AuditLog
+except ModuleNotFoundError:
+    from db import SessionLocal
+    from models import AuditLog
+
+
+logger = logging.getLogger("pmai.audit_writer")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+# Durability trade-off: with group commit on, an acknowledged audit row lives only in the
+# journal file until the next flush. If the journal directory does not survive a restart
+# (Render and other ephemeral container disks), a crash or redeploy in that window loses the
+# row. Off by default, and it stays off unless AUDIT_LOG_JOURNAL_DIR is set explicitly to a
+# persistent disk; inline writes commit each row before the response, as before.
+AUDIT_JOURNAL_DIR_CONFIGURED = bool(os.getenv("AUDIT_LOG_JOURNAL_DIR", "").strip())
+AUDIT_GROUP_COMMIT_REQUESTED = _env_flag("AUDIT_LOG_GROUP_COMMIT", False)
+AUDIT_GROUP_COMMIT_ENABLED = AUDIT_GROUP_COMMIT_REQUESTED and AUDIT_JOURNAL_DIR_CONFIGURED
+AUDIT_GROUP_COMMIT_MAX_BATCH = int(os.getenv("AUDIT_LOG_GROUP_COMMIT_MAX_BATCH", "200"))
+AUDIT_GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("AUDIT_LOG_GROUP_COMMIT_MAX_DELAY_MS", "50"))
+# fsync per submit survives power loss, not just a process crash; it costs a disk sync per event.
+AUDIT_JOURNAL_FSYNC = _env_flag("AUDIT_LOG_JOURNAL_FSYNC", False)
+AUDIT_JOURNAL_DIR = Path(
+    os.getenv("AUDIT_LOG_JOURNAL_DIR", "").strip()
+    or str(Path(__file__).resolve().parents[1] / "var" / "audit_journal")
+)
+
+if AUDIT_GROUP_COMMIT_REQUESTED and not AUDIT_JOURNAL_DIR_CONFIGURED:
+    logger.warning(
+        "AUDIT_LOG_GROUP_COMMIT ignored: set AUDIT_LOG_JOURNAL_DIR to a persistent disk to enable it; "
+        "audit rows are written inline"
+    )
+
+AUDIT_ROW_FIELDS = (
+    "log_id",
+    "request_id",
+    "patient_token",
+    "clinician_id",
+    "model_version",
+    "confidence",
+    "suggested_action",
+    "action_taken",
+    "override_reason",
+    "note",
+    "case_id",
+    "session_uid",
+    "event_type",
+    "source",
+    "extra_data",
+    "created_at",
+)
+
+_ACTIVE_SUFFIX = ".active.ndjson"
+_SEGMENT_SUFFIX = ".segment.ndjson"
+_REJECTED_NAME = "audit_journal.rejected.ndjson"
+_REPLAY_CHUNK = 500
+_RETRY_SECONDS = 5.0
+
+
+def audit_row(obj: AuditLog) -> Dict[str, Any]:
+    """Column values of an unsaved AuditLog, with log_id and created_at filled in."""
+    row = {field: getattr(obj, field, None) for field in AUDIT_ROW_FIELDS}
+    row["log_id"] = row["log_id"] or uuid4().hex
+    row["created_at"] = row["created_at"] or datetime.utcnow()
+    obj.log_id = row["log_id"]
+    obj.created_at = row["created_at"]
+    return row
+
+
+def _encode(row: Dict[str, Any]) -> str:
+    data = dict(row)
+    data["created_at"] = data["created_at"].isoformat()
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _decode(line: str) -> Dict[str, Any]:
+    data = json.loads(line)
+    data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return {field: data.get(field) for field in AUDIT_ROW_FIELDS}
+
+
+def _try_lock(handle) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class AuditLogWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], Any] = SessionLocal,
+        *,
+        journal_dir: Path | str = AUDIT_JOURNAL_DIR,
+        max_batch: int = AUDIT_GROUP_COMMIT_MAX_BATCH,
+        max_delay_ms: float = AUDIT_GROUP_COMMIT_MAX_DELAY_MS,
+        fsync: bool = AUDIT_JOURNAL_FSYNC,
+    ):
+        self.session_factory = session_factory
+        self.journal_dir = Path(journal_dir)
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+        self._buffer: List[Dict[str, Any]] = []
+        self._in_flight = 0
+        self._active = None
+        self._active_path: Optional[Path] = None
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flush_requested = False
+        self._pending_segments = False
+        self.stats = {"submitted": 0, "committed": 0, "flushes": 0, "replayed": 0, "rejected": 0, "failed_flushes": 0}
+
+    # --- Journal: start ---
+    def _open_active(self) -> None:
+        self._seq += 1
+        path = self.journal_dir / f"audit_journal.{os.getpid()}.{int(time.time() * 1000)}.{self._seq}{_ACTIVE_SUFFIX}"
+        handle = path.open("a", encoding="utf-8")
+        _try_lock(handle)
+        self._active, self._active_path = handle, path
+
+    def _rotate(self) -> Optional[Tuple[Path, Any]]:
+        """Turn the active journal into a segment holding exactly the rows being flushed."""
+        if self._active is None:
+            return None
+        handle, path = self._active, self._active_path
+        segment = path.with_name(path.name[: -len(_ACTIVE_SUFFIX)] + _SEGMENT_SUFFIX)
+        handle.flush()
+        os.replace(path, segment)
+        self._open_active()
+        # The segment stays open (and locked) until its rows are committed.
+        return segment, handle
+
+    def _claim_orphans(self) -> List[Tuple[Path, Any]]:
+        claimed = []
+        for path in sorted(self.journal_dir.glob("audit_journal.*.ndjson")):
+            if path.name == _REJECTED_NAME or path == self._active_path:
+                continue
+            try:
+                handle = path.open("a", encoding="utf-8")
+            except OSError:
+                continue
+            if _try_lock(handle):
+                claimed.append((path, handle))
+            else:
+                handle.close()
+        return claimed
+    # --- Journal: end ---
+
+    def start(self) -> "AuditLogWriter":
+        with self._start_lock:
+            if self._thread is not None:
+                return self
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                self._open_active()
+                self._stopping = False
+            self.replay()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def submit(self, rows: Iterable[Dict[str, Any]]) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        if not self.started:
+            self.start()
+        lines = "".join(_encode(row) + "\n" for row in rows)
+        with self._lock:
+            # Journal first: once submit returns, a crash can no longer lose these rows.
+            self._active.write(lines)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            was_empty = not self._buffer
+            self._buffer.extend(rows)
+            self.stats["submitted"] += len(rows)
+            # Wake the flusher to open a batch window, and again to cut it short when full.
+            if was_empty or len(self._buffer) >= self.max_batch:
+                self._wake.notify()
+        return len(rows)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything submitted so far is committed (or timeout)."""
+        if not self.started:
+            return True
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._flush_requested = True
+            self._wake.notify()
+            while self._buffer or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            self._wake.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._start_lock, self._lock:
+            self._thread = None
+            if self._active is not None:
+                empty = self._active.tell() == 0
+                self._active.close()
+                if empty:
+                    self._active_path.unlink(missing_ok=True)
+                self._active = self._active_path = None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._buffer and not self._stopping:
+                    self._wake.wait(_RETRY_SECONDS if self._pending_segments else None)
+                if self._buffer and len(self._buffer) < self.max_batch and not (self._stopping or self._flush_requested):
+                    # Group commit: give concurrent requests a moment to join this batch.
+                    self._wake.wait(self.max_delay)
+                if self._stopping and not self._buffer:
+                    return
+                self._flush_requested = False
+                batch, self._buffer = self._buffer, []
+                segment = self._rotate() if batch else None
+                self._in_flight = len(batch)
+            try:
+                if batch:
+                    self._commit_segment(segment, batch)
+                if self._pending_segments:
+                    self.replay()
+            except Exception:  # pragma: no cover - keep the writer alive
+                logger.exception("audit log writer flush failed")
+            finally:
+                with self._lock:
+                    self._in_flight = 0
+                    self._drained.notify_all()
+
+    def _commit_segment(self, segment: Tuple[Path, Any], rows: List[Dict[str, Any]]) -> None:
+        path, handle = segment
+        try:
+            self._insert(rows)
+        except Exception:
+            # Database unavailable: the segment stays on disk and is retried by replay.
+            self.stats["failed_flushes"] += 1
+            self._pending_segments = True
+            handle.close()
+            logger.warning("audit log group commit failed; %d rows kept in %s", len(rows), path.name, exc_info=True)
+            return
+        self.stats["flushes"] += 1
+        self.stats["committed"] += len(rows)
+        handle.close()
+        path.unlink(missing_ok=True)
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(insert(AuditLog), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def replay(self) -> int:
+        """Insert rows from unclaimed journal files that are not in the database yet."""
+        replayed = 0
+        failed = False
+        for path, handle in self._claim_orphans():
+            try:
+                with path.open("r", encoding="utf-8") as source:
+                    rows = [_decode(line) for line in source if line.strip()]
+                for start in range(0, len(rows), _REPLAY_CHUNK):
+                    replayed += self._insert_missing(rows[start:start + _REPLAY_CHUNK])
+            except Exception:
+                failed = True
+                logger.warning("audit log journal replay failed for %s", path.name, exc_info=True)
+                handle.close()
+                continue
+            handle.close()
+            path.unlink(missing_ok=True)
+        self.stats["replayed"] += replayed
+        self._pending_segments = failed
+        return replayed
+
+    def _insert_missing(self, rows: List[Dict[str, Any]]) -> int:
+        db = self.session_factory()
+        try:
+            ids = [row["log_id"] for row in rows]
+            existing = set(db.execute(select(AuditLog.log_id).where(AuditLog.log_id.in_(ids))).scalars())
+        finally:
+            db.close()
+        missing = [row for row in rows if row["log_id"] not in existing]
+        if not missing:
+            return 0
+        try:
+            self._insert(missing)
+            return len(missing)
+        except Exception:
+            pass
+        # One bad row must not block the rest; isolate it.
+        inserted = 0
+        for row in missing:
+            try:
+                self._insert([row])
+                inserted += 1
+            except Exception as exc:
+                if self._database_down():
+                    raise
+                self._reject(row, exc)
+        return inserted
+
+    def _database_down(self) -> bool:
+        db = self.session_factory()
+        try:
+            db.execute(select(1))
+            return False
+        except Exception:
+            return True
+        finally:
+            db.close()
+
+    def _reject(self, row: Dict[str, Any], exc: Exception) -> None:
+        self.stats["rejected"] += 1
+        logger.error("audit log row %s rejected by the database: %s", row.get("log_id"), exc)
+        with (self.journal_dir / _REJECTED_NAME).open("a", encoding="utf-8") as handle:
+            handle.write(_encode({**row, "extra_data": {"row_extra_data": row.get("extra_data"), "rejected_error": str(exc)[:500]}}) + "\n")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+            in_flight = self._in_flight
+        return {
+            "enabled": True,
+            "started": self.started,
+            "buffered": buffered,
+            "in_flight": in_flight,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000.0,
+            "journal_dir": str(self.journal_dir),
+            "journal_fsync": self.fsync,
+            "pending_segments": self._pending_segments,
+            **self.stats,
+        }
+
+
+_writer: Optional[AuditLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> Optional[AuditLogWriter]:
+    """Process-wide writer, or None when AUDIT_LOG_GROUP_COMMIT is off."""
+    global _writer
+    if not AUDIT_GROUP_COMMIT_ENABLED:
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter()
+                atexit.register(_writer.stop)
+    return _writer
+
+
+def start_audit_writer() -> None:
+    writer = get_audit_writer()
+    if writer is not None:
+        writer.start()
+
+
+def stop_audit_writer() -> None:
+    if _writer is not None:
+        _writer.stop()
+
+
+def flush_audit_writer(timeout: float = 5.0) -> bool:
+    """Read-your-writes helper for endpoints that list audit rows."""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+
+def append_audit_logs(db, objs: List[AuditLog]) -> str:
+    """Persist AuditLog objects through the group-commit writer, else synchronously on ``db``."""
+    rows = [audit_row(obj) for obj in objs]
+    writer = get_audit_writer()
+    if writer is not None:
+        try:
+            writer.submit(rows)
+            return "group_commit"
+        except OSError:
+            logger.warning("audit journal unavailable; writing audit rows synchronously", exc_info=True)
+    db.execute(insert(AuditLog), rows)
+    db.commit()
+    return "synchronous"
@@ -1,10 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import hashlib
-import re
+import os
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -16,6 +15,7 @@ try:
     from backend.auth_jwt import get_current_user
     from backend.db import get_db
     from backend.automated_reminder_delivery_eligibility import evaluate_delivery_eligibility
+    from backend.automated_reminder_templates import REMINDER_TEMPLATE_CACHE, CompiledReminderTemplate
     from backend.models import (
         AutomatedReminderDeliveryAttempt,
         AutomatedReminderDeliveryTemplate,
@@ -27,6 +27,7 @@ except ModuleNotFoundError:
     from auth_jwt import get_current_user
     from db import get_db
     from automated_reminder_delivery_eligibility import evaluate_delivery_eligibility
+    from automated_reminder_templates import REMINDER_TEMPLATE_CACHE, CompiledReminderTemplate
     from models import (
         AutomatedReminderDeliveryAttempt,
         AutomatedReminderDeliveryTemplate,
@@ -38,7 +39,7 @@ except ModuleNotFoundError:
 
 router = APIRouter(prefix="/api/automated-reminder-delivery", tags=["automated-reminder-delivery-dry-run"])
 
-PLACEHOLDER_RE = re.compile(r"{{\s*([A-Za-z0-9_.-]+)\s*}}")
+RENDER_BATCH_MAX_ITEMS = int(os.getenv("AUTOMATED_REMINDER_RENDER_BATCH_MAX_ITEMS", "5000"))
 
 
 class AutomatedReminderDeliveryDryRunIn(BaseModel):
@@ -62,6 +63,17 @@ class AutomatedReminderDeliveryDryRunIn(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class AutomatedReminderDeliveryRenderItemIn(BaseModel):
+    reminder_id: str = Field(..., min_length=1, max_length=64)
+    context: Dict[str, Any] = Field(default_factory=dict)
+
+
+class AutomatedReminderDeliveryRenderBatchIn(BaseModel):
+    template_id: int = Field(..., ge=1)
+    context: Dict[str, Any] = Field(default_factory=dict)
+    items: List[AutomatedReminderDeliveryRenderItemIn] = Field(..., min_length=1)
+
+
 class AutomatedReminderDeliveryAttemptCancelIn(BaseModel):
     canceled_by: str = Field(..., min_length=1, max_length=100)
     reason: Optional[str] = None
@@ -129,22 +141,8 @@ def _client_preferences(db: Session, owner_id: int) -> Optional[PreventiveCareCl
     )
 
 
-def _render_text(text: Optional[str], context: Dict[str, Any]) -> str:
-    if not text:
-        return ""
-
-    def repl(match: re.Match[str]) -> str:
-        key = match.group(1)
-        value = context.get(key)
-        if value is None:
-            return match.group(0)
-        return str(value)
-
-    return PLACEHOLDER_RE.sub(repl, text)
-
-
-def _message_hash(subject: str, body: str, safety: str, opt_out: str) -> str:
-    return hashlib.sha256(f"{subject}\n{body}\n{safety}\n{opt_out}".encode("utf-8")).hexdigest()
+def _compiled_template(db: Session, template_id: int) -> CompiledReminderTemplate:
+    return REMINDER_TEMPLATE_CACHE.get(_template_or_404(db, template_id))
 
 
 def _attempt_payload(attempt: AutomatedReminderDeliveryAttempt) -> Dict[str, Any]:
@@ -296,11 +294,12 @@ def create_automated_reminder_delivery_dry_run(
     template = _template_or_404(db, data.template_id)
     pref = _client_preferences(db, reminder.owner_id)
 
-    rendered_subject = _render_text(template.subject, data.context)
-    rendered_body = _render_text(template.body, data.context)
-    rendered_safety = _render_text(template.clinical_safety_text, data.context)
-    rendered_opt_out = _render_text(template.opt_out_text, data.context)
-    rendered_hash = _message_hash(rendered_subject, rendered_body, rendered_safety, rendered_opt_out)
+    rendered = REMINDER_TEMPLATE_CACHE.get(template).render(data.context)
+    rendered_subject = rendered["subject"]
+    rendered_body = rendered["body"]
+    rendered_safety = rendered["clinical_safety_text"]
+    rendered_opt_out = rendered["opt_out_text"]
+    rendered_hash = rendered["message_hash"]
 
     eligibility_payload = _eligibility_payload(
         data=data,
@@ -393,6 +392,81 @@ def create_automated_reminder_delivery_dry_run(
     }
 
 
+def _reminder_render_defaults(reminder: PreventiveCareReminder) -> Dict[str, Any]:
+    return {
+        "reminder_id": reminder.reminder_id,
+        "pet_name": reminder.pet_name,
+        "species": reminder.species,
+        "category": reminder.category,
+        "due_date": reminder.due_date.date().isoformat() if reminder.due_date else None,
+    }
+
+
+@router.post("/render-batch", response_model=dict)
+def render_automated_reminder_delivery_batch(
+    data: AutomatedReminderDeliveryRenderBatchIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Render many reminders against one template without saving attempts.
+
+    Reminder fields (pet_name, species, category, due_date) are defaults;
+    the shared context and then each item's context override them.
+    """
+    if len(data.items) > RENDER_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"at most {RENDER_BATCH_MAX_ITEMS} items per render batch")
+
+    owner_id = _user_id(user)
+    compiled = _compiled_template(db, data.template_id)
+    reminder_ids = sorted({item.reminder_id for item in data.items})
+    reminders: Dict[str, PreventiveCareReminder] = {}
+    for offset in range(0, len(reminder_ids), 500):
+        rows = (
+            db.query(PreventiveCareReminder)
+            .filter(
+                PreventiveCareReminder.owner_id == owner_id,
+                PreventiveCareReminder.reminder_id.in_(reminder_ids[offset:offset + 500]),
+            )
+            .all()
+        )
+        reminders.update({row.reminder_id: row for row in rows})
+
+    render = compiled.render
+    shared = data.context
+    items: List[Dict[str, Any]] = []
+    not_found: List[str] = []
+    for item in data.items:
+        reminder = reminders.get(item.reminder_id)
+        if reminder is None:
+            not_found.append(item.reminder_id)
+            continue
+        context = _reminder_render_defaults(reminder)
+        context.update(shared)
+        context.update(item.context)
+        items.append({"reminder_id": item.reminder_id, **render(context)})
+
+    return {
+        "message": "automated_reminder_delivery_render_batch",
+        "mode": "automated_reminder_delivery_api_dry_run_v1",
+        "template_id": compiled.template_id,
+        "template_key": compiled.template_key,
+        "template_version": compiled.template_version,
+        "placeholder_keys": list(compiled.placeholder_keys),
+        "items": items,
+        "rendered_count": len(items),
+        "not_found": not_found,
+        "writes_database": False,
+        "writes_delivery_attempt": False,
+        "dry_run": True,
+        "creates_case": False,
+        "updates_case": False,
+        "auto_send": False,
+        "sends_external_message": False,
+        "executes_real_import": False,
+    }
+
+
 @router.get("/attempts", response_model=dict)
 def list_automated_reminder_delivery_attempts(
     status: Optional[str] = None,
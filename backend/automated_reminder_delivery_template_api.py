@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import hashlib
-import re
 from datetime import datetime
 from typing import Any, Dict, Optional
 
@@ -15,17 +14,17 @@ from sqlalchemy.orm import Session
 try:
     from backend.auth_jwt import get_current_user
     from backend.db import get_db
+    from backend.automated_reminder_templates import PLACEHOLDER_RE, REMINDER_TEMPLATE_CACHE
     from backend.models import AutomatedReminderDeliveryTemplate
 except ModuleNotFoundError:
     from auth_jwt import get_current_user
     from db import get_db
+    from automated_reminder_templates import PLACEHOLDER_RE, REMINDER_TEMPLATE_CACHE
     from models import AutomatedReminderDeliveryTemplate
 
 
 router = APIRouter(prefix="/api/automated-reminder-delivery/templates", tags=["automated-reminder-delivery-templates"])
 
-PLACEHOLDER_RE = re.compile(r"{{\s*([A-Za-z0-9_.-]+)\s*}}")
-
 
 class AutomatedReminderDeliveryTemplateCreateIn(BaseModel):
     template_key: str = Field(..., min_length=1, max_length=120)
@@ -70,20 +69,6 @@ def _template_or_404(db: Session, template_id: int) -> AutomatedReminderDelivery
     return template
 
 
-def _render_text(text: Optional[str], context: Dict[str, Any]) -> str:
-    if not text:
-        return ""
-
-    def repl(match: re.Match[str]) -> str:
-        key = match.group(1)
-        value = context.get(key)
-        if value is None:
-            return match.group(0)
-        return str(value)
-
-    return PLACEHOLDER_RE.sub(repl, text)
-
-
 def _unreplaced_placeholders(*parts: str) -> list[str]:
     found = []
     for part in parts:
@@ -246,10 +231,11 @@ def render_automated_reminder_delivery_template_preview(
 ):
     _require_user(user)
     template = _template_or_404(db, template_id)
-    rendered_subject = _render_text(template.subject, data.context)
-    rendered_body = _render_text(template.body, data.context)
-    rendered_safety = _render_text(template.clinical_safety_text, data.context)
-    rendered_opt_out = _render_text(template.opt_out_text, data.context)
+    rendered = REMINDER_TEMPLATE_CACHE.get(template).render(data.context)
+    rendered_subject = rendered["subject"]
+    rendered_body = rendered["body"]
+    rendered_safety = rendered["clinical_safety_text"]
+    rendered_opt_out = rendered["opt_out_text"]
     message_hash = _hash_message(rendered_subject, rendered_body)
 
     return {
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+PLACEHOLDER_RE = re.compile(r"{{\s*([A-Za-z0-9_.-]+)\s*}}")
+
+TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("AUTOMATED_REMINDER_TEMPLATE_CACHE_MAX_ENTRIES", "256"))
+
+RENDERED_FIELDS = ("subject", "body", "clinical_safety_text", "opt_out_text")
+
+
+class CompiledText:
+    """Template text split once into literal runs and placeholder slots."""
+
+    __slots__ = ("literals", "slots", "static")
+
+    def __init__(self, text: Optional[str]):
+        # literals has one more entry than slots; slots are (key, original token).
+        literals: List[str] = []
+        slots: List[Tuple[str, str]] = []
+        position = 0
+        source = text or ""
+        for match in PLACEHOLDER_RE.finditer(source):
+            literals.append(source[position:match.start()])
+            slots.append((match.group(1), match.group(0)))
+            position = match.end()
+        literals.append(source[position:])
+        self.literals: Tuple[str, ...] = tuple(literals)
+        self.slots: Tuple[Tuple[str, str], ...] = tuple(slots)
+        self.static: Optional[str] = source if not slots else None
+
+    def render(self, context: Dict[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        literals = self.literals
+        parts = [literals[0]]
+        for index, (key, token) in enumerate(self.slots):
+            value = context.get(key)
+            parts.append(token if value is None else str(value))
+            parts.append(literals[index + 1])
+        return "".join(parts)
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(key for key, _ in self.slots)
+
+
+def message_hash(subject: str, body: str, safety: str, opt_out: str) -> str:
+    return hashlib.sha256(f"{subject}\n{body}\n{safety}\n{opt_out}".encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CompiledReminderTemplate:
+    template_id: int
+    updated_at: Optional[datetime]
+    template_key: str
+    template_version: str
+    subject: CompiledText
+    body: CompiledText
+    clinical_safety_text: CompiledText
+    opt_out_text: CompiledText
+
+    @property
+    def placeholder_keys(self) -> Tuple[str, ...]:
+        seen: Dict[str, None] = {}
+        for name in RENDERED_FIELDS:
+            for key in getattr(self, name).keys:
+                seen.setdefault(key, None)
+        return tuple(seen)
+
+    def render(self, context: Dict[str, Any]) -> Dict[str, str]:
+        subject = self.subject.render(context)
+        body = self.body.render(context)
+        safety = self.clinical_safety_text.render(context)
+        opt_out = self.opt_out_text.render(context)
+        return {
+            "subject": subject,
+            "body": body,
+            "clinical_safety_text": safety,
+            "opt_out_text": opt_out,
+            "message_hash": message_hash(subject, body, safety, opt_out),
+        }
+
+    def render_many(self, contexts: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+        render = self.render
+        return [render(context) for context in contexts]
+
+
+def compile_reminder_template(template: Any) -> CompiledReminderTemplate:
+    return CompiledReminderTemplate(
+        template_id=int(template.id),
+        updated_at=getattr(template, "updated_at", None),
+        template_key=template.template_key,
+        template_version=template.template_version,
+        subject=CompiledText(template.subject),
+        body=CompiledText(template.body),
+        clinical_safety_text=CompiledText(template.clinical_safety_text),
+        opt_out_text=CompiledText(template.opt_out_text),
+    )
+
+
+class ReminderTemplateCache:
+    """LRU of compiled templates keyed by template id, invalidated by updated_at."""
+
+    def __init__(self, max_entries: int = TEMPLATE_CACHE_MAX_ENTRIES):
+        self.max_entries = max(int(max_entries), 1)
+        self._items: "OrderedDict[int, CompiledReminderTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template: Any) -> CompiledReminderTemplate:
+        key = int(template.id)
+        updated_at = getattr(template, "updated_at", None)
+        with self._lock:
+            compiled = self._items.get(key)
+            if compiled is not None and compiled.updated_at == updated_at:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return compiled
+
+        compiled = compile_reminder_template(template)
+        with self._lock:
+            self.misses += 1
+            self._items[key] = compiled
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+REMINDER_TEMPLATE_CACHE = ReminderTemplateCache()
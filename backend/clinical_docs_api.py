@@ -1,18 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 import hashlib
 import io
 import json
+import os
 from pathlib import Path
-from typing import Any, Dict, Optional
-import zipfile
-from xml.etree import ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 try:
@@ -37,12 +39,34 @@ except ModuleNotFoundError:
         clinical_docs_diagnostic_data_merge_safety_flags,
     )
 
+try:
+    from backend.clinical_docs_template_compiler import (
+        ClinicalDocTemplateError,
+        CompiledDocxTemplate,
+        DocxTemplateCache,
+        ZipStreamWriter,
+    )
+except ModuleNotFoundError:
+    from clinical_docs_template_compiler import (
+        ClinicalDocTemplateError,
+        CompiledDocxTemplate,
+        DocxTemplateCache,
+        ZipStreamWriter,
+    )
+
 router = APIRouter(prefix="/api/clinical-docs", tags=["clinical-docs"])
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 TEMPLATE_DIR = REPO_ROOT / "templates" / "clinical_docs"
 
 DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+ZIP_MEDIA_TYPE = "application/zip"
+
+CLINICAL_DOCS_BATCH_MODE = "clinical_docs_batch_export_v1"
+CLINICAL_DOCS_BATCH_MAX_CASES = int(os.getenv("CLINICAL_DOCS_BATCH_MAX_CASES", "200"))
+CLINICAL_DOCS_BATCH_WORKERS = max(1, int(os.getenv("CLINICAL_DOCS_BATCH_WORKERS", str(min(4, os.cpu_count() or 1)))))
+
+CLINICAL_DOC_TEMPLATE_CACHE = DocxTemplateCache()
 
 TEMPLATES: Dict[str, Dict[str, Any]] = {
     "admission_hospitalization_record_bilingual": {
@@ -91,6 +115,20 @@ class ClinicalDocRenderIn(BaseModel):
     include_diagnostic_data: bool = Field(default=False)
 
 
+class ClinicalDocBatchRenderIn(BaseModel):
+    template_id: str = Field(..., min_length=1, max_length=120)
+    case_ids: Optional[List[int]] = Field(default=None, max_length=CLINICAL_DOCS_BATCH_MAX_CASES)
+    updated_from: Optional[datetime] = None
+    updated_to: Optional[datetime] = None
+    species: Optional[str] = Field(default=None, max_length=50)
+    limit: int = Field(default=50, ge=1, le=CLINICAL_DOCS_BATCH_MAX_CASES)
+    output: str = Field(default="docx", max_length=20)
+    clinician_name: Optional[str] = Field(default=None, max_length=120)
+    clinician_id: Optional[str] = Field(default=None, max_length=120)
+    generator: Optional[str] = Field(default=None, max_length=120)
+    include_diagnostic_data: bool = Field(default=False)
+
+
 def _text(value: Any, fallback: str = "") -> str:
     raw = str(value if value is not None else "").strip()
     return raw or fallback
@@ -264,116 +302,67 @@ def _build_context(case: Case, *, data: ClinicalDocRenderIn, user, template_id:
     return context
 
 
-def _replace_placeholders_in_xml(xml_bytes: bytes, context: Dict[str, str]) -> bytes:
-    try:
-        root = ET.fromstring(xml_bytes)
-    except ET.ParseError:
-        return xml_bytes
+def _clinical_doc_filename(meta: Dict[str, Any], case_id: Any, document_hash: str) -> str:
+    return f"{meta['output_filename_prefix']}-case-{case_id}-{document_hash}.docx"
 
-    placeholders = {f"{{{{{key}}}}}": value for key, value in context.items()}
 
-    changed_any = False
-    for paragraph in root.iter():
-        if not paragraph.tag.endswith("}p"):
-            continue
-
-        text_nodes = [node for node in paragraph.iter() if node.tag.endswith("}t")]
-        if not text_nodes:
-            continue
-
-        combined = "".join(node.text or "" for node in text_nodes)
-        if "{{" not in combined:
-            continue
+def _prepare_clinical_doc_context(
+    db: Session,
+    case: Case,
+    *,
+    data: ClinicalDocRenderIn,
+    user,
+    meta: Dict[str, Any],
+) -> Tuple[Dict[str, str], Dict[str, Any], List[str]]:
+    context = _build_context(case, data=data, user=user, template_id=str(meta["template_id"]))
+    diagnostic_data_merge = _clinical_docs_diagnostic_data_merge_for_case(
+        db,
+        case,
+        include=bool(data.include_diagnostic_data),
+    )
+    context = _apply_diagnostic_data_context_to_clinical_doc_context(context, diagnostic_data_merge)
 
-        replaced = combined
-        for placeholder, value in placeholders.items():
-            replaced = replaced.replace(placeholder, value)
+    missing_required = [
+        key for key in meta["required_keys"]
+        if not _text(context.get(key))
+    ]
+    return context, diagnostic_data_merge, missing_required
 
-        if replaced != combined:
-            text_nodes[0].text = replaced
-            for node in text_nodes[1:]:
-                node.text = ""
-            changed_any = True
 
-    if not changed_any:
-        return xml_bytes
+# --- Clinical Docs compiled template rendering: start ---
+def _compiled_template(template_path: Path) -> CompiledDocxTemplate:
+    try:
+        return CLINICAL_DOC_TEMPLATE_CACHE.get(Path(template_path))
+    except ClinicalDocTemplateError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
 
+def _render_docx(template_path: Path, context: Dict[str, str]) -> bytes:
+    compiled = _compiled_template(template_path)
+    unreplaced = compiled.unreplaced_placeholders(context)
+    if unreplaced:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "clinical document template still contains unreplaced placeholders",
+                "unreplaced_placeholders": unreplaced,
+            },
+        )
+    return compiled.render(context)
 
 
-# --- Clinical Docs Diagnostic Data Merge V1 DOCX append: start ---
-def _append_diagnostic_data_section_to_document_xml(xml_bytes: bytes, context: Dict[str, str]) -> bytes:
-    section_text = str(context.get("__diagnostic_data_section") or "").strip()
-    if not section_text:
-        return xml_bytes
-    try:
-        ET.register_namespace("w", "http://schemas.openxmlformats.org/wordprocessingml/2006/main")
-        root = ET.fromstring(xml_bytes)
-    except ET.ParseError:
-        return xml_bytes
-
-    w = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
-    body = root.find(w + "body")
-    if body is None:
-        return xml_bytes
-
-    existing_text = "".join(node.text or "" for node in root.iter() if node.tag.endswith("}t"))
-    if "Diagnostic data merge / 诊断数据合并" in existing_text:
-        return xml_bytes
-
-    def paragraph(text: str, *, bold: bool = False):
-        p = ET.Element(w + "p")
-        r = ET.SubElement(p, w + "r")
-        if bold:
-            rpr = ET.SubElement(r, w + "rPr")
-            ET.SubElement(rpr, w + "b")
-        t = ET.SubElement(r, w + "t")
-        t.text = text
-        return p
-
-    insert_at = len(body)
-    if len(body) and body[-1].tag == w + "sectPr":
-        insert_at -= 1
-
-    body.insert(insert_at, paragraph("Diagnostic data merge / 诊断数据合并（医生复核）", bold=True))
-    insert_at += 1
-    for raw_line in section_text.splitlines()[:90]:
-        line = raw_line.strip()
-        if not line:
+@router.on_event("startup")
+def warm_clinical_doc_templates() -> None:
+    for meta in TEMPLATES.values():
+        path = TEMPLATE_DIR / str(meta["file"])
+        if not path.exists():
             continue
-        body.insert(insert_at, paragraph(line))
-        insert_at += 1
-
-    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
-# --- Clinical Docs Diagnostic Data Merge V1 DOCX append: end ---
-
-def _render_docx(template_path: Path, context: Dict[str, str]) -> bytes:
-    out = io.BytesIO()
-    with zipfile.ZipFile(template_path, "r") as zin:
-        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zout:
-            for item in zin.infolist():
-                raw = zin.read(item.filename)
-                if item.filename == "word/document.xml":
-                    raw = _append_diagnostic_data_section_to_document_xml(raw, context)
-                if item.filename.startswith("word/") and item.filename.endswith(".xml"):
-                    raw = _replace_placeholders_in_xml(raw, context)
-                zout.writestr(item, raw)
-    return out.getvalue()
-
-
-def _unreplaced_placeholders(docx_bytes: bytes) -> list[str]:
-    found: set[str] = set()
-    with zipfile.ZipFile(io.BytesIO(docx_bytes), "r") as zf:
-        for name in zf.namelist():
-            if not (name.startswith("word/") and name.endswith(".xml")):
-                continue
-            text = zf.read(name).decode("utf-8", errors="ignore")
-            for chunk in text.split("{{")[1:]:
-                key = chunk.split("}}", 1)[0].strip()
-                if key:
-                    found.add("{{" + key + "}}")
-    return sorted(found)
+        try:
+            CLINICAL_DOC_TEMPLATE_CACHE.get(path)
+        except ClinicalDocTemplateError:
+            # Surfaced as a 500 on the first render instead of blocking startup.
+            continue
+# --- Clinical Docs compiled template rendering: end ---
 
 
 @router.get("/templates", response_model=dict)
@@ -409,18 +398,9 @@ def preview_clinical_doc_context(
 ):
     meta = _template_meta(data.template_id)
     case = _case_or_404(db, data.case_id, user)
-    context = _build_context(case, data=data, user=user, template_id=str(meta["template_id"]))
-    diagnostic_data_merge = _clinical_docs_diagnostic_data_merge_for_case(
-        db,
-        case,
-        include=bool(data.include_diagnostic_data),
+    context, diagnostic_data_merge, missing_required = _prepare_clinical_doc_context(
+        db, case, data=data, user=user, meta=meta,
     )
-    context = _apply_diagnostic_data_context_to_clinical_doc_context(context, diagnostic_data_merge)
-
-    missing_required = [
-        key for key in meta["required_keys"]
-        if not _text(context.get(key))
-    ]
 
     return {
         "message": "clinical_doc_render_preview",
@@ -450,18 +430,9 @@ def render_clinical_doc(
 
     meta = _template_meta(data.template_id)
     case = _case_or_404(db, data.case_id, user)
-    context = _build_context(case, data=data, user=user, template_id=str(meta["template_id"]))
-    diagnostic_data_merge = _clinical_docs_diagnostic_data_merge_for_case(
-        db,
-        case,
-        include=bool(data.include_diagnostic_data),
+    context, diagnostic_data_merge, missing_required = _prepare_clinical_doc_context(
+        db, case, data=data, user=user, meta=meta,
     )
-    context = _apply_diagnostic_data_context_to_clinical_doc_context(context, diagnostic_data_merge)
-
-    missing_required = [
-        key for key in meta["required_keys"]
-        if not _text(context.get(key))
-    ]
     if missing_required:
         raise HTTPException(
             status_code=422,
@@ -472,17 +443,8 @@ def render_clinical_doc(
         )
 
     docx_bytes = _render_docx(Path(meta["path"]), context)
-    unreplaced = _unreplaced_placeholders(docx_bytes)
-    if unreplaced:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "message": "clinical document template still contains unreplaced placeholders",
-                "unreplaced_placeholders": unreplaced,
-            },
-        )
 
-    filename = f"{meta['output_filename_prefix']}-case-{case.id}-{context['hash']}.docx"
+    filename = _clinical_doc_filename(meta, case.id, context["hash"])
     headers = {
         "Content-Disposition": f'attachment; filename="{filename}"',
         "X-PMAI-Document-Hash": context["hash"],
@@ -498,3 +460,165 @@ def render_clinical_doc(
         media_type=DOCX_MEDIA_TYPE,
         headers=headers,
     )
+
+
+# --- Clinical Docs batch export: start ---
+def _batch_cases(db: Session, data: ClinicalDocBatchRenderIn, user) -> Tuple[List[Case], List[int]]:
+    user_id = getattr(user, "id", None)
+    if data.case_ids:
+        requested = list(dict.fromkeys(int(case_id) for case_id in data.case_ids))
+        found = {
+            case.id: case
+            for case in db.query(Case).filter(
+                Case.owner_id == user_id,
+                Case.deleted_at.is_(None),
+                Case.id.in_(requested),
+            ).all()
+        }
+        return [found[case_id] for case_id in requested if case_id in found], [
+            case_id for case_id in requested if case_id not in found
+        ]
+
+    if data.updated_from is None and data.updated_to is None and not _text(data.species):
+        raise HTTPException(
+            status_code=422,
+            detail="case_ids or at least one filter (updated_from, updated_to, species) is required",
+        )
+
+    touched_at = func.coalesce(Case.updated_at, Case.created_at)
+    query = db.query(Case).filter(Case.owner_id == user_id, Case.deleted_at.is_(None))
+    if data.updated_from is not None:
+        query = query.filter(touched_at >= data.updated_from)
+    if data.updated_to is not None:
+        query = query.filter(touched_at <= data.updated_to)
+    if _text(data.species):
+        query = query.filter(Case.species == _text(data.species))
+    cases = query.order_by(touched_at.desc(), Case.id.desc()).limit(data.limit).all()
+    return cases, []
+
+
+def _render_batch_entry(template_path: Path, context: Dict[str, str]) -> Tuple[Optional[bytes], Any]:
+    try:
+        return _render_docx(template_path, context), None
+    except HTTPException as exc:
+        return None, exc.detail
+
+
+def _stream_clinical_doc_batch(
+    meta: Dict[str, Any],
+    prepared: List[Dict[str, Any]],
+    manifest: Dict[str, Any],
+) -> Iterator[bytes]:
+    template_path = Path(meta["path"])
+    writer = ZipStreamWriter()
+    entries = manifest["entries"]
+    # At most 2 x workers rendered documents are held in memory at any time.
+    window = CLINICAL_DOCS_BATCH_WORKERS * 2
+    pending: "deque[Tuple[Dict[str, Any], Future]]" = deque()
+    todo = iter(item for item in prepared if item["entry"]["status"] == "pending")
+
+    with ThreadPoolExecutor(max_workers=CLINICAL_DOCS_BATCH_WORKERS, thread_name_prefix="clinical-docs") as pool:
+        while True:
+            while len(pending) < window:
+                item = next(todo, None)
+                if item is None:
+                    break
+                pending.append((item, pool.submit(_render_batch_entry, template_path, item["context"])))
+            if not pending:
+                break
+
+            item, future = pending.popleft()
+            entry = item["entry"]
+            docx_bytes, error = future.result()
+            if docx_bytes is None:
+                entry["status"] = "render_failed"
+                entry["error"] = error
+                continue
+            # DOCX parts are already deflated; storing avoids compressing twice.
+            yield writer.entry(entry["filename"], docx_bytes, compress=False)
+            entry["status"] = "rendered"
+            entry["size_bytes"] = len(docx_bytes)
+
+    manifest["rendered_count"] = sum(1 for entry in entries if entry["status"] == "rendered")
+    manifest["skipped_count"] = len(entries) - manifest["rendered_count"]
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+    yield writer.entry("manifest.json", manifest_bytes)
+    yield writer.close()
+
+
+@router.post("/render-batch", response_class=StreamingResponse)
+def render_clinical_doc_batch(
+    data: ClinicalDocBatchRenderIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    if data.output.lower() != "docx":
+        raise HTTPException(status_code=422, detail="Clinical Docs batch export supports output=docx only")
+
+    meta = _template_meta(data.template_id)
+    _compiled_template(Path(meta["path"]))
+    cases, not_found = _batch_cases(db, data, user)
+
+    # Contexts are built up front on the request's DB session; only the
+    # rendering runs on worker threads while the ZIP is streamed.
+    prepared: List[Dict[str, Any]] = []
+    for case in cases:
+        case_data = ClinicalDocRenderIn(
+            case_id=case.id,
+            template_id=str(meta["template_id"]),
+            output="docx",
+            clinician_name=data.clinician_name,
+            clinician_id=data.clinician_id,
+            generator=data.generator,
+            include_diagnostic_data=data.include_diagnostic_data,
+        )
+        context, _, missing_required = _prepare_clinical_doc_context(
+            db, case, data=case_data, user=user, meta=meta,
+        )
+        entry: Dict[str, Any] = {
+            "case_id": case.id,
+            "filename": _clinical_doc_filename(meta, case.id, context["hash"]),
+            "document_hash": context["hash"],
+            "template_id": str(meta["template_id"]),
+            "status": "pending",
+        }
+        if missing_required:
+            entry["status"] = "missing_required_keys"
+            entry["missing_required_keys"] = missing_required
+        prepared.append({"context": context, "entry": entry})
+
+    entries = [item["entry"] for item in prepared]
+    entries.extend({"case_id": case_id, "status": "not_found"} for case_id in not_found)
+    generated_at = _utc_timestamp()
+    manifest: Dict[str, Any] = {
+        "message": "clinical_doc_batch_export",
+        "mode": CLINICAL_DOCS_BATCH_MODE,
+        "template_id": str(meta["template_id"]),
+        "generated_at": generated_at,
+        "requested_count": len(entries),
+        "include_diagnostic_data": bool(data.include_diagnostic_data),
+        "diagnostic_data_mode": CLINICAL_DOCS_DIAGNOSTIC_DATA_MERGE_MODE if data.include_diagnostic_data else "not_requested",
+        "entries": entries,
+        "writes_database": False,
+        "creates_case": False,
+        "updates_case": False,
+        "downloads_attachments": False,
+        "executes_real_import": False,
+    }
+
+    stamp = generated_at.replace("-", "").replace(":", "")
+    filename = f"{meta['output_filename_prefix']}-batch-{stamp}.zip"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-PMAI-Template-Id": str(meta["template_id"]),
+        "X-PMAI-Batch-Count": str(len(entries)),
+        "X-PMAI-Writes-Database": "false",
+        "X-PMAI-Creates-Case": "false",
+        "X-PMAI-Diagnostic-Data-Merge": "true" if data.include_diagnostic_data else "false",
+    }
+    return StreamingResponse(
+        _stream_clinical_doc_batch(meta, prepared, manifest),
+        media_type=ZIP_MEDIA_TYPE,
+        headers=headers,
+    )
+# --- Clinical Docs batch export: end ---
@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import re
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import zipfile
+import zlib
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+WORDML_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DIAGNOSTIC_DATA_SECTION_KEY = "__diagnostic_data_section"
+DIAGNOSTIC_DATA_SECTION_TITLE = "Diagnostic data merge / 诊断数据合并（医生复核）"
+DIAGNOSTIC_DATA_SECTION_MARKER = "Diagnostic data merge / 诊断数据合并"
+DIAGNOSTIC_DATA_SECTION_MAX_LINES = 90
+
+# Placeholders inside paragraphs are swapped for private-use sentinels before the
+# part is serialized, so the serialized bytes can be split into static segments.
+_SLOT_OPEN = "\ue000"
+_SLOT_CLOSE = "\ue001"
+_SECTION_TAG = "pmai-diagnostic-data-section"
+_PLACEHOLDER_RE = re.compile(r"\{\{(.*?)\}\}", re.S)
+_SLOT_RE = re.compile(
+    _SLOT_OPEN.encode("utf-8") + rb"(\d+)" + _SLOT_CLOSE.encode("utf-8")
+    + rb"|<" + _SECTION_TAG.encode("ascii") + rb" />"
+)
+_SECTION_SLOT = -1
+
+_ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_ZIP_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP_END_RECORD = struct.Struct("<IHHHHIIH")
+_ZIP_VERSION = 20
+_ZIP_UTF8_FLAG = 0x800
+_ZIP_MAX_OFFSET = 0xFFFFFFFF
+
+ET.register_namespace("w", WORDML_NAMESPACE)
+
+_TEXT_OPEN_RE = re.compile(rb"<((?:[\w.-]+:)?t)(\s[^<>]*)?>\Z")
+
+
+@dataclass(frozen=True)
+class _SlotText:
+    """A text element holding only placeholders.
+
+    ElementTree writes an element with empty text as ``<w:t />``, so when every
+    value is empty the element collapses the same way the unsplit tree would.
+    """
+
+    tag: bytes
+    attrs: bytes
+    slots: Tuple[int, ...]
+
+    def render(self, values: Sequence[bytes]) -> bytes:
+        text = b"".join(values[slot] for slot in self.slots)
+        if not text:
+            return b"<" + self.tag + self.attrs + b" />"
+        return b"<" + self.tag + self.attrs + b">" + text + b"</" + self.tag + b">"
+
+
+Segment = Union[bytes, int, _SlotText]
+
+
+class ClinicalDocTemplateError(RuntimeError):
+    pass
+
+
+def _dos_datetime(date_time: Tuple[int, ...]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time[:6]
+    dos_time = (hour << 11) | (minute << 5) | (second // 2)
+    dos_date = (max(year - 1980, 0) << 9) | (month << 5) | day
+    return dos_time, dos_date
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _placeholders_in_text(text: str) -> List[str]:
+    # Same scan the post-render check used: anything between "{{" and "}}".
+    found = []
+    for chunk in text.split("{{")[1:]:
+        key = chunk.split("}}", 1)[0].strip()
+        if key:
+            found.append("{{" + key + "}}")
+    return found
+
+
+@dataclass
+class _CompiledPart:
+    name: str
+    date_time: Tuple[int, ...]
+    external_attr: int
+    flag_bits: int
+    compressed: Optional[bytes] = None
+    crc: int = 0
+    size: int = 0
+    segments: Sequence[Segment] = ()
+
+    @property
+    def is_static(self) -> bool:
+        return self.compressed is not None
+
+
+@dataclass
+class CompiledDocxTemplate:
+    path: Path
+    version: Tuple[int, int]
+    parts: List[_CompiledPart]
+    slot_keys: List[str]
+    static_unreplaced: List[str]
+    has_diagnostic_data_section: bool = False
+    placeholder_keys: frozenset = field(default_factory=frozenset)
+
+    def unreplaced_placeholders(self, context: Dict[str, str]) -> List[str]:
+        found = set(self.static_unreplaced)
+        for key in self.placeholder_keys:
+            value = context.get(key)
+            if value is None:
+                found.update(_placeholders_in_text("{{" + key + "}}"))
+            elif "{{" in value:
+                found.update(_placeholders_in_text(value))
+        if self.has_diagnostic_data_section:
+            found.update(_placeholders_in_text(str(context.get(DIAGNOSTIC_DATA_SECTION_KEY) or "")))
+        return sorted(found)
+
+    def render(self, context: Dict[str, str]) -> bytes:
+        values = [
+            escape(str(context.get(key, "{{" + key + "}}"))).encode("utf-8")
+            for key in self.slot_keys
+        ]
+        section = (
+            _diagnostic_data_section_xml(context)
+            if self.has_diagnostic_data_section
+            else b""
+        )
+
+        writer = ZipStreamWriter()
+        chunks: List[bytes] = []
+        for part in self.parts:
+            if part.is_static:
+                chunks.append(
+                    writer.precompressed_entry(
+                        part.name, part.compressed, crc=part.crc, size=part.size,
+                        date_time=part.date_time, external_attr=part.external_attr, flag_bits=part.flag_bits,
+                    )
+                )
+                continue
+            raw = b"".join(
+                segment if isinstance(segment, bytes)
+                else segment.render(values) if isinstance(segment, _SlotText)
+                else (section if segment == _SECTION_SLOT else values[segment])
+                for segment in part.segments
+            )
+            chunks.append(
+                writer.entry(
+                    part.name, raw,
+                    date_time=part.date_time, external_attr=part.external_attr, flag_bits=part.flag_bits,
+                )
+            )
+        chunks.append(writer.close())
+        return b"".join(chunks)
+
+
+class ZipStreamWriter:
+    """Minimal zip writer that hands back each entry's bytes as soon as it is added.
+
+    Entry sizes are known up front, so no data descriptors or seeking are needed
+    and only the central directory records are held until close().
+    """
+
+    def __init__(self) -> None:
+        self._central: List[bytes] = []
+        self._offset = 0
+
+    def entry(
+        self,
+        name: str,
+        data: bytes,
+        *,
+        compress: bool = True,
+        date_time: Optional[Tuple[int, ...]] = None,
+        external_attr: int = 0o600 << 16,
+        flag_bits: int = 0,
+    ) -> bytes:
+        if compress:
+            return self.precompressed_entry(
+                name, _deflate(data), crc=zlib.crc32(data), size=len(data),
+                date_time=date_time, external_attr=external_attr, flag_bits=flag_bits,
+            )
+        return self._write(
+            name, data, method=zipfile.ZIP_STORED, crc=zlib.crc32(data), size=len(data),
+            date_time=date_time, external_attr=external_attr, flag_bits=flag_bits,
+        )
+
+    def precompressed_entry(
+        self,
+        name: str,
+        compressed: bytes,
+        *,
+        crc: int,
+        size: int,
+        date_time: Optional[Tuple[int, ...]] = None,
+        external_attr: int = 0o600 << 16,
+        flag_bits: int = 0,
+    ) -> bytes:
+        return self._write(
+            name, compressed, method=zipfile.ZIP_DEFLATED, crc=crc, size=size,
+            date_time=date_time, external_attr=external_attr, flag_bits=flag_bits,
+        )
+
+    def _write(
+        self,
+        name: str,
+        payload: bytes,
+        *,
+        method: int,
+        crc: int,
+        size: int,
+        date_time: Optional[Tuple[int, ...]],
+        external_attr: int,
+        flag_bits: int,
+    ) -> bytes:
+        encoded_name = name.encode("utf-8")
+        flags = (flag_bits & _ZIP_UTF8_FLAG) | (_ZIP_UTF8_FLAG if not name.isascii() else 0)
+        dos_time, dos_date = _dos_datetime(date_time or time.localtime()[:6])
+        local = _ZIP_LOCAL_HEADER.pack(
+            0x04034B50, _ZIP_VERSION, flags, method,
+            dos_time, dos_date, crc, len(payload), size, len(encoded_name), 0,
+        )
+        if self._offset + len(local) + len(encoded_name) + len(payload) > _ZIP_MAX_OFFSET:
+            raise ClinicalDocTemplateError("zip archive exceeds 4 GiB; split the export into smaller batches")
+
+        self._central.append(
+            _ZIP_CENTRAL_HEADER.pack(
+                0x02014B50, _ZIP_VERSION, _ZIP_VERSION, flags, method,
+                dos_time, dos_date, crc, len(payload), size, len(encoded_name),
+                0, 0, 0, 0, external_attr, self._offset,
+            )
+            + encoded_name
+        )
+        self._offset += len(local) + len(encoded_name) + len(payload)
+        return b"".join((local, encoded_name, payload))
+
+    def close(self) -> bytes:
+        central = b"".join(self._central)
+        count = len(self._central)
+        return central + _ZIP_END_RECORD.pack(
+            0x06054B50, 0, 0, count, count, len(central), self._offset, 0,
+        )
+
+
+def _diagnostic_data_section_xml(context: Dict[str, str]) -> bytes:
+    section_text = str(context.get(DIAGNOSTIC_DATA_SECTION_KEY) or "").strip()
+    if not section_text:
+        return b""
+
+    paragraphs = [
+        "<w:p><w:r><w:rPr><w:b /></w:rPr><w:t>%s</w:t></w:r></w:p>" % escape(DIAGNOSTIC_DATA_SECTION_TITLE)
+    ]
+    for raw_line in section_text.splitlines()[:DIAGNOSTIC_DATA_SECTION_MAX_LINES]:
+        line = raw_line.strip()
+        if line:
+            paragraphs.append("<w:p><w:r><w:t>%s</w:t></w:r></w:p>" % escape(line))
+    return "".join(paragraphs).encode("utf-8")
+
+
+def _insert_diagnostic_data_section_slot(root: ET.Element) -> bool:
+    w = "{%s}" % WORDML_NAMESPACE
+    body = root.find(w + "body")
+    if body is None:
+        return False
+
+    existing_text = "".join(node.text or "" for node in root.iter() if node.tag.endswith("}t"))
+    if DIAGNOSTIC_DATA_SECTION_MARKER in existing_text:
+        return False
+
+    insert_at = len(body)
+    if len(body) and body[-1].tag == w + "sectPr":
+        insert_at -= 1
+    body.insert(insert_at, ET.Element(_SECTION_TAG))
+    return True
+
+
+def _compile_xml_part(
+    raw: bytes,
+    *,
+    slot_keys: List[str],
+    with_diagnostic_data_section: bool,
+) -> Tuple[Optional[List[Segment]], bool]:
+    try:
+        root = ET.fromstring(raw)
+    except ET.ParseError:
+        return None, False
+
+    has_section = with_diagnostic_data_section and _insert_diagnostic_data_section_slot(root)
+
+    def to_slot(match: "re.Match[str]") -> str:
+        slot_keys.append(match.group(1))
+        return "%s%d%s" % (_SLOT_OPEN, len(slot_keys) - 1, _SLOT_CLOSE)
+
+    changed_any = False
+    for paragraph in root.iter():
+        if not paragraph.tag.endswith("}p"):
+            continue
+
+        text_nodes = [node for node in paragraph.iter() if node.tag.endswith("}t")]
+        if not text_nodes:
+            continue
+
+        combined = "".join(node.text or "" for node in text_nodes)
+        if "{{" not in combined:
+            continue
+
+        replaced = _PLACEHOLDER_RE.sub(to_slot, combined)
+        if replaced != combined:
+            text_nodes[0].text = replaced
+            for node in text_nodes[1:]:
+                node.text = ""
+            changed_any = True
+
+    if not changed_any and not has_section:
+        return None, False
+
+    serialized = ET.tostring(root, encoding="utf-8", xml_declaration=True)
+    segments: List[Segment] = []
+    cursor = 0
+    for match in _SLOT_RE.finditer(serialized):
+        if match.start() > cursor:
+            segments.append(serialized[cursor:match.start()])
+        segments.append(int(match.group(1)) if match.group(1) is not None else _SECTION_SLOT)
+        cursor = match.end()
+    if cursor < len(serialized):
+        segments.append(serialized[cursor:])
+    return _collapse_slot_only_text(segments), has_section
+
+
+def _collapse_slot_only_text(segments: List[Segment]) -> List[Segment]:
+    """Fold ``<w:t>`` + slots + ``</w:t>`` into one _SlotText segment."""
+    out: List[Segment] = []
+    index = 0
+    while index < len(segments):
+        segment = segments[index]
+        match = _TEXT_OPEN_RE.search(segment) if isinstance(segment, bytes) else None
+        end = index + 1
+        while match and end < len(segments) and isinstance(segments[end], int) and segments[end] != _SECTION_SLOT:
+            end += 1
+        if match and end > index + 1 and end < len(segments) and isinstance(segments[end], bytes):
+            tag, attrs = match.group(1), match.group(2) or b""
+            close = b"</" + tag + b">"
+            if segments[end].startswith(close):
+                if match.start():
+                    out.append(segment[: match.start()])
+                out.append(_SlotText(tag=tag, attrs=attrs, slots=tuple(segments[index + 1:end])))
+                rest = segments[end][len(close):]
+                segments[end] = rest
+                index = end if rest else end + 1
+                continue
+        out.append(segment)
+        index += 1
+    return out
+
+
+def compile_docx_template(path: Path) -> CompiledDocxTemplate:
+    try:
+        stat = path.stat()
+        archive = zipfile.ZipFile(path, "r")
+    except (OSError, zipfile.BadZipFile) as exc:
+        raise ClinicalDocTemplateError(f"clinical document template unreadable: {path.name}: {exc}") from exc
+
+    parts: List[_CompiledPart] = []
+    slot_keys: List[str] = []
+    static_unreplaced: set[str] = set()
+    has_section = False
+    with archive:
+        for item in archive.infolist():
+            raw = archive.read(item.filename)
+            part = _CompiledPart(
+                name=item.filename,
+                date_time=tuple(item.date_time),
+                external_attr=item.external_attr,
+                flag_bits=item.flag_bits & _ZIP_UTF8_FLAG,
+            )
+
+            segments = None
+            if item.filename.startswith("word/") and item.filename.endswith(".xml"):
+                segments, part_has_section = _compile_xml_part(
+                    raw,
+                    slot_keys=slot_keys,
+                    with_diagnostic_data_section=item.filename == "word/document.xml",
+                )
+                has_section = has_section or part_has_section
+                static_bytes = (
+                    b"".join(s for s in segments if isinstance(s, bytes))
+                    if segments is not None
+                    else raw
+                )
+                static_unreplaced.update(
+                    _placeholders_in_text(static_bytes.decode("utf-8", errors="ignore"))
+                )
+
+            if segments is None:
+                part.compressed = _deflate(raw)
+                part.crc = zlib.crc32(raw)
+                part.size = len(raw)
+            else:
+                part.segments = tuple(segments)
+            parts.append(part)
+
+    return CompiledDocxTemplate(
+        path=path,
+        version=(stat.st_mtime_ns, stat.st_size),
+        parts=parts,
+        slot_keys=slot_keys,
+        static_unreplaced=sorted(static_unreplaced),
+        has_diagnostic_data_section=has_section,
+        placeholder_keys=frozenset(slot_keys),
+    )
+
+
+class DocxTemplateCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._templates: Dict[str, CompiledDocxTemplate] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path) -> CompiledDocxTemplate:
+        key = str(path)
+        try:
+            stat = path.stat()
+        except OSError as exc:
+            raise ClinicalDocTemplateError(f"clinical document template asset missing: {path.name}") from exc
+
+        with self._lock:
+            compiled = self._templates.get(key)
+        if compiled is not None and compiled.version == (stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                self.hits += 1
+            return compiled
+
+        compiled = compile_docx_template(path)
+        with self._lock:
+            self.misses += 1
+            self._templates[key] = compiled
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._templates), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage timing for the consult pipeline.
+
+Orchestrator stages are wrapped in ``stage("name")`` blocks. Outside an active
+request timer (disabled, scripts, other endpoints) ``stage`` is a context-var
+read and a shared no-op object. Inside ``/ai/consult*`` requests the middleware
+starts a timer, emits a ``Server-Timing`` header, feeds the in-process
+histograms and logs a sampled breakdown of slow requests.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("pmai.consult_timing")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+CONSULT_TIMING_ENABLED = _env_flag("CONSULT_TIMING_ENABLED", True)
+CONSULT_SLOW_REQUEST_MS = float(os.getenv("CONSULT_SLOW_REQUEST_MS", "500"))
+CONSULT_SLOW_LOG_SAMPLE_RATE = float(os.getenv("CONSULT_SLOW_LOG_SAMPLE_RATE", "1.0"))
+
+CONSULT_PATH_PREFIXES = ("/ai/consult", "/api/ai/consult")
+
+# Upper bounds in milliseconds; the last bucket is +Inf.
+HISTOGRAM_BUCKETS_MS: Tuple[float, ...] = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class StageTimer:
+    """Ordered per-stage durations (ms) for one request; repeated stages accumulate."""
+
+    __slots__ = ("started", "stages", "total_ms")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.total_ms: Optional[float] = None
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def finish(self) -> float:
+        if self.total_ms is None:
+            self.total_ms = (time.perf_counter() - self.started) * 1000
+        return self.total_ms
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={value:.2f}" for name, value in self.stages.items()]
+        parts.append(f"total;dur={self.finish():.2f}")
+        return ", ".join(parts)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("pmai_consult_timer", default=None)
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "started")
+
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.stages.setdefault(self.name, 0.0)  # keep entry order for nested stages
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.add(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name: str):
+    timer = _current_timer.get()
+    if timer is None:
+        return _NOOP_STAGE
+    return _Stage(timer, name)
+
+
+def timed_stage(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = _current_timer.get()
+            if timer is None:
+                return func(*args, **kwargs)
+            with _Stage(timer, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StageHistograms:
+    """Per-stage latency histograms; ``buckets`` holds per-bucket (non-cumulative) counts."""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = HISTOGRAM_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, name: str, value_ms: float) -> None:
+        index = bisect.bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            item = self._stages.get(name)
+            if item is None:
+                item = {"count": 0, "sum_ms": 0.0, "max_ms": 0.0, "buckets": [0] * (len(self.buckets_ms) + 1)}
+                self._stages[name] = item
+            item["count"] += 1
+            item["sum_ms"] += value_ms
+            item["max_ms"] = max(item["max_ms"], value_ms)
+            item["buckets"][index] += 1
+
+    def observe_timer(self, timer: StageTimer) -> None:
+        for name, value in timer.stages.items():
+            self.observe(name, value)
+        self.observe("total", timer.finish())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": item["count"],
+                    "sum_ms": round(item["sum_ms"], 3),
+                    "max_ms": round(item["max_ms"], 3),
+                    "mean_ms": round(item["sum_ms"] / item["count"], 3) if item["count"] else 0.0,
+                    "buckets": list(item["buckets"]),
+                }
+                for name, item in self._stages.items()
+            }
+        return {"buckets_ms": list(self.buckets_ms), "stages": stages}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+
+CONSULT_STAGE_HISTOGRAMS = StageHistograms()
+
+
+def is_consult_path(path: str) -> bool:
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in CONSULT_PATH_PREFIXES)
+
+
+def _log_slow_request(method: str, path: str, status: Optional[int], timer: StageTimer) -> None:
+    if timer.finish() < CONSULT_SLOW_REQUEST_MS or random.random() >= CONSULT_SLOW_LOG_SAMPLE_RATE:
+        return
+    logger.warning(
+        "slow consult request %s",
+        json.dumps({
+            "method": method,
+            "path": path,
+            "status": status,
+            "total_ms": round(timer.finish(), 2),
+            "stages_ms": {name: round(value, 2) for name, value in timer.stages.items()},
+        }, ensure_ascii=False),
+    )
+
+
+class ConsultTimingMiddleware:
+    """ASGI middleware that times /ai/consult* requests and adds a Server-Timing header."""
+
+    def __init__(self, app, enabled: Optional[bool] = None):
+        self.app = app
+        self.enabled = CONSULT_TIMING_ENABLED if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or not is_consult_path(scope.get("path") or ""):
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+        token = _current_timer.set(timer)
+        status: List[Optional[int]] = [None]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message.get("status")
+                headers = list(message.get("headers") or [])
+                headers.append((b"server-timing", timer.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timer.reset(token)
+            CONSULT_STAGE_HISTOGRAMS.observe_timer(timer)
+            _log_slow_request(scope.get("method") or "", scope.get("path") or "", status[0], timer)
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming database export and restore.
+
+``export_database`` writes every table to ``<table>.ndjson.gz`` in one export
+directory, plus a ``manifest.json`` holding row counts, sha256 checksums, the
+alembic revision and a per-table watermark. Rows are read through a
+server-side cursor (``stream_results`` / ``yield_per``) inside a single
+read-only REPEATABLE READ transaction on Postgres, so the export sees one
+consistent snapshot, takes no table locks and never holds a whole table in
+memory.
+
+An incremental export starts from a previous manifest and only reads rows
+whose watermark moved past it:
+
+- tables with ``updated_at``: ``coalesce(updated_at, created_at)``;
+- append-only tables: ``created_at``;
+- other tables (no reliable change column, all small): copied in full.
+
+``restore_database`` verifies every checksum before writing, then upserts
+the files by primary key in foreign-key order, one transaction for the
+whole chain of exports.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import uuid4
+
+from sqlalchemy import DateTime, Integer, Table, func, insert, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+try:
+    import backend.models  # noqa: F401  (registers every table on Base.metadata)
+    from backend.db import Base
+except ModuleNotFoundError:
+    import models  # noqa: F401
+    from db import Base
+
+
+DB_BACKUP_FORMAT = "pmai_db_export_v1"
+DB_BACKUP_BATCH_SIZE = int(os.getenv("DB_BACKUP_BATCH_SIZE", "5000"))
+DB_BACKUP_COMPRESSLEVEL = int(os.getenv("DB_BACKUP_COMPRESSLEVEL", "6"))
+# Rows committed late can carry an updated_at just below the last watermark;
+# incremental exports re-read this much overlap (restore upserts, so repeats are harmless).
+DB_BACKUP_WATERMARK_OVERLAP_SECONDS = int(os.getenv("DB_BACKUP_WATERMARK_OVERLAP_SECONDS", "300"))
+MANIFEST_NAME = "manifest.json"
+
+APPEND_ONLY_TABLES = frozenset({
+    "audit_log",
+    "automated_reminder_delivery_receipts",
+    "emr_import_batch_receipts",
+    "preventive_care_events",
+})
+
+
+# --- Table plan: start ---
+def backup_tables(names: Optional[Sequence[str]] = None) -> List[Table]:
+    """Tables in foreign-key order (parents first); ``names`` narrows the set."""
+    tables = list(Base.metadata.sorted_tables)
+    if not names:
+        return tables
+    known = {table.name for table in tables}
+    unknown = sorted(set(names) - known)
+    if unknown:
+        raise ValueError(f"unknown tables: {', '.join(unknown)}")
+    return [table for table in tables if table.name in set(names)]
+
+
+def watermark_strategy(table: Table) -> str:
+    if "updated_at" in table.c and "created_at" in table.c:
+        return "updated_at"
+    if table.name in APPEND_ONLY_TABLES and "created_at" in table.c:
+        return "created_at"
+    return "full"
+
+
+def _watermark_expr(table: Table, strategy: str):
+    if strategy == "updated_at":
+        return func.coalesce(table.c.updated_at, table.c.created_at)
+    if strategy == "created_at":
+        return table.c.created_at
+    return None
+
+
+def _datetime_columns(table: Table) -> List[str]:
+    return [column.name for column in table.columns if isinstance(column.type, DateTime)]
+# --- Table plan: end ---
+
+
+# --- Files: start ---
+class _HashingWriter:
+    """File wrapper that hashes and counts the (compressed) bytes written through it."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.handle.write(data)
+
+    def flush(self) -> None:
+        self.handle.flush()
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def read_manifest(path: Path | str) -> Dict[str, Any]:
+    path = Path(path)
+    if path.is_dir():
+        path = path / MANIFEST_NAME
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("format") != DB_BACKUP_FORMAT:
+        raise ValueError(f"{path}: not a {DB_BACKUP_FORMAT} manifest")
+    manifest["_dir"] = str(path.parent)
+    return manifest
+# --- Files: end ---
+
+
+def _alembic_revision(conn) -> Optional[str]:
+    # Checked first: a failed SELECT would abort the surrounding Postgres transaction.
+    if not inspect(conn).has_table("alembic_version"):
+        return None
+    return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+# --- Export: start ---
+def _export_table(conn, table: Table, path: Path, *, since: Optional[datetime], strategy: str, batch_size: int) -> Dict[str, Any]:
+    watermark_expr = _watermark_expr(table, strategy)
+    columns = [column.name for column in table.columns]
+    stmt = select(table)
+    if watermark_expr is not None:
+        stmt = stmt.add_columns(watermark_expr.label("_watermark"))
+        if since is not None:
+            stmt = stmt.where(watermark_expr > since)
+    stmt = stmt.order_by(*table.primary_key.columns)
+
+    rows = 0
+    watermark: Optional[datetime] = None
+    tmp = path.with_name(path.name + ".partial")
+    with tmp.open("wb") as raw:
+        writer = _HashingWriter(raw)
+        with gzip.GzipFile(fileobj=writer, mode="wb", compresslevel=DB_BACKUP_COMPRESSLEVEL, mtime=0) as gz:
+            result = conn.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+            for partition in result.partitions():
+                lines = []
+                for row in partition:
+                    values = tuple(row)
+                    if watermark_expr is not None:
+                        mark = values[-1]
+                        if mark is not None and (watermark is None or mark > watermark):
+                            watermark = mark
+                        values = values[:-1]
+                    lines.append(_ENCODER.encode(dict(zip(columns, values))))
+                rows += len(lines)
+                gz.write(("\n".join(lines) + "\n").encode("utf-8"))
+    os.replace(tmp, path)
+    return {
+        "table": table.name,
+        "file": path.name,
+        "rows": rows,
+        "bytes": writer.size,
+        "sha256": writer.sha256.hexdigest(),
+        "strategy": strategy,
+        "since": since.isoformat() if since else None,
+        "watermark": watermark.isoformat() if isinstance(watermark, datetime) else None,
+    }
+
+
+def export_database(
+    engine,
+    out_dir: Path | str,
+    *,
+    tables: Optional[Sequence[str]] = None,
+    incremental_from: Optional[Path | str] = None,
+    batch_size: int = DB_BACKUP_BATCH_SIZE,
+    overlap_seconds: int = DB_BACKUP_WATERMARK_OVERLAP_SECONDS,
+) -> Dict[str, Any]:
+    """Write one export directory under ``out_dir`` and return its manifest."""
+    selected = backup_tables(tables)
+    base = read_manifest(incremental_from) if incremental_from else None
+    base_tables = {item["table"]: item for item in (base or {}).get("tables", [])}
+
+    export_id = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ") + "_" + uuid4().hex[:8]
+    export_dir = Path(out_dir) / export_id
+    export_dir.mkdir(parents=True, exist_ok=False)
+
+    started = time.perf_counter()
+    entries: List[Dict[str, Any]] = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # One MVCC snapshot for every table; readers take no locks that block writers.
+            conn = conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+        with conn.begin():
+            revision = _alembic_revision(conn)
+            for table in selected:
+                strategy = watermark_strategy(table)
+                since = None
+                previous = base_tables.get(table.name)
+                if previous and strategy != "full" and previous.get("watermark"):
+                    since = datetime.fromisoformat(previous["watermark"]) - timedelta(seconds=overlap_seconds)
+                entry = _export_table(
+                    conn,
+                    table,
+                    export_dir / f"{table.name}.ndjson.gz",
+                    since=since,
+                    strategy=strategy,
+                    batch_size=max(1, int(batch_size)),
+                )
+                if entry["watermark"] is None and previous:
+                    # Nothing changed: carry the old watermark forward.
+                    entry["watermark"] = previous.get("watermark")
+                entries.append(entry)
+
+    manifest = {
+        "format": DB_BACKUP_FORMAT,
+        "export_id": export_id,
+        "mode": "incremental" if base else "full",
+        "base_export_id": base["export_id"] if base else None,
+        "created_at": datetime.utcnow().isoformat(),
+        "dialect": engine.dialect.name,
+        "alembic_revision": revision,
+        "overlap_seconds": overlap_seconds if base else 0,
+        "seconds": round(time.perf_counter() - started, 3),
+        "total_rows": sum(entry["rows"] for entry in entries),
+        "tables": entries,
+    }
+    # The manifest is written last: a directory without one is an incomplete export.
+    tmp = export_dir / (MANIFEST_NAME + ".partial")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, export_dir / MANIFEST_NAME)
+    manifest["export_dir"] = str(export_dir)
+    return manifest
+# --- Export: end ---
+
+
+# --- Restore: start ---
+def verify_export(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    problems = []
+    for entry in manifest["tables"]:
+        path = Path(manifest["_dir"]) / entry["file"]
+        if not path.exists():
+            problems.append({"export_id": manifest["export_id"], "table": entry["table"], "error": "file missing"})
+            continue
+        digest = file_sha256(path)
+        if digest != entry["sha256"]:
+            problems.append({"export_id": manifest["export_id"], "table": entry["table"], "error": "sha256 mismatch"})
+    return problems
+
+
+def _iter_rows(path: Path, datetime_columns: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            for name in datetime_columns:
+                if row.get(name) is not None:
+                    row[name] = datetime.fromisoformat(row[name])
+            yield row
+
+
+def _upsert_statement(conn, table: Table):
+    keys = [column.name for column in table.primary_key.columns]
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+        updates = {column.name: stmt.excluded[column.name] for column in table.columns if column.name not in keys}
+        return stmt.on_conflict_do_update(index_elements=keys, set_=updates)
+    return insert(table)
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _sync_postgres_sequences(conn, tables: Sequence[Table]) -> None:
+    # Restored explicit ids leave serial sequences behind; move them past the data.
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        keys = list(table.primary_key.columns)
+        if len(keys) == 1 and keys[0].name == "id" and isinstance(keys[0].type, Integer):
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            ))
+
+
+def restore_database(
+    engine,
+    export_dirs: Sequence[Path | str],
+    *,
+    dry_run: bool = True,
+    batch_size: int = DB_BACKUP_BATCH_SIZE,
+    allow_revision_mismatch: bool = False,
+) -> Dict[str, Any]:
+    """Verify a full export and the incrementals after it, then upsert them in order."""
+    if not export_dirs:
+        raise ValueError("at least one export directory is required")
+    manifests = [read_manifest(path) for path in export_dirs]
+    for previous, current in zip(manifests, manifests[1:]):
+        if current.get("base_export_id") != previous["export_id"]:
+            raise ValueError(
+                f"{current['export_id']} is based on {current.get('base_export_id')}, not {previous['export_id']}"
+            )
+
+    problems = [problem for manifest in manifests for problem in verify_export(manifest)]
+    report: Dict[str, Any] = {
+        "format": DB_BACKUP_FORMAT,
+        "exports": [manifest["export_id"] for manifest in manifests],
+        "dry_run": dry_run,
+        "checksum_problems": problems,
+        "tables": [],
+    }
+    if problems:
+        report["status"] = "checksum_failed"
+        return report
+
+    with engine.connect() as conn:
+        target_revision = _alembic_revision(conn)
+    report["target_alembic_revision"] = target_revision
+    expected = {manifest.get("alembic_revision") for manifest in manifests}
+    if target_revision is None:
+        raise ValueError("target database has no alembic_version; run alembic upgrade head first")
+    if expected != {target_revision} and not allow_revision_mismatch:
+        raise ValueError(f"export revision {sorted(map(str, expected))} does not match target {target_revision}")
+
+    if dry_run:
+        report["status"] = "verified"
+        report["tables"] = [
+            {"export_id": manifest["export_id"], "table": entry["table"], "rows": entry["rows"]}
+            for manifest in manifests
+            for entry in manifest["tables"]
+        ]
+        return report
+
+    tables = {table.name: table for table in backup_tables()}
+    touched: List[Table] = []
+    started = time.perf_counter()
+    size = max(1, int(batch_size))
+    with engine.begin() as conn:
+        for manifest in manifests:
+            entries = {entry["table"]: entry for entry in manifest["tables"]}
+            for table in tables.values():
+                entry = entries.get(table.name)
+                if entry is None:
+                    continue
+                stmt = _upsert_statement(conn, table)
+                path = Path(manifest["_dir"]) / entry["file"]
+                rows = 0
+                for batch in _batches(_iter_rows(path, _datetime_columns(table)), size):
+                    conn.execute(stmt, batch)
+                    rows += len(batch)
+                report["tables"].append({"export_id": manifest["export_id"], "table": table.name, "rows": rows})
+                if table not in touched:
+                    touched.append(table)
+        _sync_postgres_sequences(conn, touched)
+
+    report["status"] = "restored"
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["total_rows"] = sum(item["rows"] for item in report["tables"])
+    return report
+# --- Restore: end ---
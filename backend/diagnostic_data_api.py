@@ -2,11 +2,12 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 try:
@@ -18,12 +19,24 @@ except ModuleNotFoundError:
     from db import get_db
     from models import Case, DiagnosticReport, Observation, ImagingStudy
 
+try:
+    from backend.fast_json import FastJSONResponse, envelope_mode
+    from backend.http_caching import CONDITIONAL_GET_CACHE_CONTROL, etag_matches, not_modified_response, strong_etag
+except ModuleNotFoundError:
+    from fast_json import FastJSONResponse, envelope_mode
+    from http_caching import CONDITIONAL_GET_CACHE_CONTROL, etag_matches, not_modified_response, strong_etag
+
 
 try:
     from backend.lab_result_parser import parse_lab_result_fixture, lab_parser_safety_flags
 except ModuleNotFoundError:
     from lab_result_parser import parse_lab_result_fixture, lab_parser_safety_flags
 
+try:
+    from backend.lab_reference_ranges import reference_check
+except ModuleNotFoundError:
+    from lab_reference_ranges import reference_check
+
 try:
     from backend.imaging_metadata_parser import (
         IMAGING_METADATA_DRY_RUN_MODE,
@@ -250,13 +263,39 @@ def _imaging_query_for_case(db: Session, case_id: int):
     return db.query(ImagingStudy).filter(ImagingStudy.case_id == int(case_id))
 
 
+# Bump when the summary payload shape changes so cached copies are not revalidated.
+CASE_SUMMARY_ETAG_VERSION = "diagnostic_data_case_summary_v1"
+
+
+def _case_summary_etag(db: Session, case: Case) -> str:
+    """Version ETag from row counts, max ids and max updated_at; one indexed query, no row loads."""
+    columns = []
+    for model in (DiagnosticReport, Observation, ImagingStudy):
+        for expr in (func.count(model.id), func.max(model.id), func.max(model.updated_at)):
+            columns.append(select(expr).where(model.case_id == case.id).scalar_subquery())
+    version = db.execute(select(*columns)).one()
+    return strong_etag(
+        CASE_SUMMARY_ETAG_VERSION,
+        case.id,
+        case.owner_id,
+        _iso(case.updated_at),
+        envelope_mode(),
+        *version,
+    )
+
+
 @router.get("/cases/{case_id}/summary", response_model=dict)
 def get_diagnostic_data_case_summary(
     case_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
     case = _owned_case_or_404(db, case_id, user)
+    etag = _case_summary_etag(db, case)
+    cache_headers = {"Cache-Control": CONDITIONAL_GET_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified_response(etag, cache_headers)
 
     reports = (
         _report_query_for_case(db, case.id)
@@ -278,7 +317,8 @@ def get_diagnostic_data_case_summary(
     )
 
     safety = _safety_flags()
-    return {
+    # Large payload of plain JSON types: encode directly, skipping jsonable_encoder.
+    return FastJSONResponse({
         "message": "diagnostic_data_case_summary",
         "mode": MODE,
         "case": _case_payload(case),
@@ -292,7 +332,7 @@ def get_diagnostic_data_case_summary(
         "imaging_studies": [_imaging_study_payload(item) for item in imaging_studies],
         "safety": safety,
         **safety,
-    }
+    }, headers={"ETag": etag, **cache_headers})
 
 
 @router.get("/cases/{case_id}/reports", response_model=dict)
@@ -463,6 +503,134 @@ def list_imaging_studies(
     }
 
 
+# --- Imaging Repeat Engine V1 endpoint: start ---
+def _imaging_repeat_engine():
+    try:
+        from backend import imaging_repeat_engine
+    except ModuleNotFoundError:
+        import imaging_repeat_engine
+    return imaging_repeat_engine
+
+
+@router.get("/cases/{case_id}/imaging-studies/repeat-events", response_model=dict)
+def list_imaging_repeat_events(
+    case_id: int,
+    window_days: Optional[float] = Query(default=None, gt=0, le=365),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    engine = _imaging_repeat_engine()
+    case = _owned_case_or_404(db, case_id, user)
+    events = engine.find_repeat_events(db, case_id=case.id, window_days=window_days)
+
+    safety = {**_safety_flags(), **engine.imaging_repeat_safety_flags()}
+    return {
+        "message": "diagnostic_imaging_repeat_events",
+        "mode": engine.IMAGING_REPEAT_ENGINE_MODE,
+        "case": _case_payload(case),
+        "window_days": window_days,
+        "items": events,
+        "groups": engine.summarize_repeat_groups(events),
+        "total": len(events),
+        "safety": safety,
+        **safety,
+    }
+
+
+@router.post("/cases/{case_id}/imaging-studies/repeat-check", response_model=dict)
+def check_imaging_repeat(
+    case_id: int,
+    data: Dict[str, Any],
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Pre-creation warning for a new study; reads only."""
+    engine = _imaging_repeat_engine()
+    case = _owned_case_or_404(db, case_id, user)
+
+    modality = str(data.get("modality") or "").strip()
+    if not modality:
+        raise HTTPException(status_code=422, detail="modality is required")
+    taken_at = None
+    if data.get("taken_at"):
+        try:
+            taken_at = datetime.fromisoformat(str(data["taken_at"]).replace("Z", "+00:00"))
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail="taken_at must be ISO 8601") from exc
+        if taken_at.tzinfo is not None:
+            taken_at = taken_at.astimezone(timezone.utc).replace(tzinfo=None)
+    window_days = data.get("window_days")
+    try:
+        window_days = float(window_days) if window_days not in (None, "") else None
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=422, detail="window_days must be a number") from exc
+    if window_days is not None and not 0 < window_days <= 365:
+        raise HTTPException(status_code=422, detail="window_days must be in (0, 365]")
+
+    result = engine.check_new_study(
+        db,
+        case_id=case.id,
+        modality=modality,
+        body_part=str(data.get("body_part") or "").strip() or None,
+        taken_at=taken_at,
+        is_planned_review=bool(data.get("is_planned_review")),
+        window_days=window_days,
+    )
+    safety = {**_safety_flags(), **engine.imaging_repeat_safety_flags()}
+    return {
+        "message": "diagnostic_imaging_repeat_check",
+        "case": _case_payload(case),
+        **result,
+        "safety": safety,
+        **safety,
+    }
+# --- Imaging Repeat Engine V1 endpoint: end ---
+
+# --- Lab Trend Engine V1 endpoint: start ---
+@router.get("/cases/{case_id}/lab-trends", response_model=dict)
+def get_lab_trends(
+    case_id: int,
+    codes: str = Query(..., description="Comma separated analyte codes, e.g. CREA,ALT"),
+    scope: str = Query(default="case", pattern="^(case|patient)$"),
+    include_points: bool = True,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    try:
+        from backend import lab_trend_engine
+    except ModuleNotFoundError:
+        import lab_trend_engine
+
+    case = _owned_case_or_404(db, case_id, user)
+    wanted = lab_trend_engine.normalize_codes([codes])
+    if not wanted:
+        raise HTTPException(status_code=422, detail="codes is required")
+    if len(wanted) > lab_trend_engine.LAB_TREND_MAX_CODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"at most {lab_trend_engine.LAB_TREND_MAX_CODES} codes per request",
+        )
+
+    case_ids = lab_trend_engine.patient_case_ids(db, case) if scope == "patient" else [case.id]
+    series = lab_trend_engine.load_series(db, case_ids=case_ids, codes=wanted)
+    trends = lab_trend_engine.build_trends(series, wanted, include_points=include_points)
+
+    safety = {**_safety_flags(), **lab_trend_engine.lab_trend_safety_flags()}
+    return {
+        "message": "diagnostic_lab_trends",
+        "mode": lab_trend_engine.LAB_TREND_MODE,
+        "case": _case_payload(case),
+        "scope": scope,
+        "case_ids": case_ids,
+        "codes": wanted,
+        "missing_codes": [code for code in wanted if code not in trends],
+        "trends": trends,
+        "safety": safety,
+        **safety,
+    }
+# --- Lab Trend Engine V1 endpoint: end ---
+
+
 @router.get("/dry-run/fixtures", response_model=dict)
 def list_diagnostic_dry_run_fixtures(
     user=Depends(get_current_user),
@@ -1409,8 +1577,10 @@ def get_clinical_qa_dashboard_v2_summary(
         )
 
     try:
+        from backend.audit_writer import flush_audit_writer
         from backend.models import AuditLog
     except ModuleNotFoundError:
+        from audit_writer import flush_audit_writer
         from models import AuditLog
 
     owner_id = _user_id(user)
@@ -1457,6 +1627,8 @@ def get_clinical_qa_dashboard_v2_summary(
             .limit(1000)
             .all()
         )
+        # Group-committed audit rows may still be buffered; read our own writes.
+        flush_audit_writer()
         audit_logs = (
             db.query(AuditLog)
             .filter(AuditLog.case_id.in_(case_ids))
@@ -1682,6 +1854,15 @@ def apply_observation_abnormal_flag_review_endpoint(
         "case": _case_payload(case),
         "observation": observation_context,
         **review,
+        "reference_check": reference_check(
+            value=getattr(observation, "value_numeric", None),
+            code=getattr(observation, "code", None),
+            unit=getattr(observation, "unit", None),
+            species=case.species,
+            low=getattr(observation, "reference_low", None),
+            high=getattr(observation, "reference_high", None),
+            reviewed_flag=(review.get("observation_abnormal_flag_review") or {}).get("after", {}).get("abnormal_flag"),
+        ),
         "safety": api_safety,
         **api_safety,
     }
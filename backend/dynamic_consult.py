@@ -6,11 +6,13 @@ try:
     from backend.species_context import build_species_context
     from backend.exotic_knowledge import fallback_questions_from_text
     from backend.companion_animal_knowledge import companion_fallback_questions_from_text
+    from backend.consult_timing import timed_stage
 except ModuleNotFoundError:
     from orchestrator import run_agent
     from species_context import build_species_context
     from exotic_knowledge import fallback_questions_from_text
     from companion_animal_knowledge import companion_fallback_questions_from_text
+    from consult_timing import timed_stage
 
 
 def _get_value(item: Any, key: str, default: str = "") -> str:
@@ -260,6 +262,7 @@ def _filter_repeated_questions(
     _set_questions(result, [])
 
 
+@timed_stage("clean_consult_result")
 def clean_consult_result(
     result: Dict[str, Any],
     text: str = "",
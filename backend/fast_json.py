@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+App-wide JSON response encoding and the compact safety envelope.
+
+``FastJSONResponse`` encodes with orjson when it is installed and with the
+stdlib otherwise; both produce the same compact UTF-8 JSON as Starlette's
+``JSONResponse``. Returning ``FastJSONResponse(payload)`` from an endpoint
+also skips FastAPI's response-model validation and ``jsonable_encoder`` pass.
+
+Most endpoints publish their safety flags twice, under ``"safety"`` and
+spread at top level. Clients that send ``X-PMAI-Envelope: compact`` (or
+``?envelope=compact``) get the top-level copies dropped wherever they match
+the nested ``safety`` block. The full shape stays the default.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+from contextvars import ContextVar
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Optional
+from uuid import UUID
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+FAST_JSON_USE_ORJSON = _env_flag("FAST_JSON_USE_ORJSON", True) and orjson is not None
+
+ENVELOPE_HEADER = "x-pmai-envelope"
+ENVELOPE_QUERY_PARAM = "envelope"
+ENVELOPE_FULL = "full"
+ENVELOPE_COMPACT = "compact"
+ENVELOPE_DEFAULT = os.getenv("PMAI_ENVELOPE_DEFAULT", ENVELOPE_FULL).strip().lower() or ENVELOPE_FULL
+
+_envelope_mode: ContextVar[Optional[str]] = ContextVar("pmai_envelope_mode", default=None)
+
+
+def _default(value: Any) -> Any:
+    # Types jsonable_encoder would have handled before the response class saw them.
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (UUID, PurePath)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if FAST_JSON_USE_ORJSON:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+# --- Compact safety envelope: start ---
+def compact_envelope(content: Any) -> Any:
+    """
+    Drop keys that repeat a sibling ``safety`` dict, at any depth. A key is
+    only dropped when its value equals the nested flag, so a top-level value
+    that disagrees with ``safety`` is kept.
+    """
+    if isinstance(content, list):
+        return [compact_envelope(item) for item in content]
+    if not isinstance(content, dict):
+        return content
+    safety = content.get("safety")
+    out = {}
+    for key, value in content.items():
+        if (
+            isinstance(safety, dict)
+            and key != "safety"
+            and key in safety
+            and safety[key] == value
+        ):
+            continue
+        out[key] = compact_envelope(value) if isinstance(value, (dict, list)) else value
+    return out
+
+
+def envelope_mode() -> str:
+    return _envelope_mode.get() or ENVELOPE_DEFAULT
+
+
+def _requested_mode(scope) -> Optional[str]:
+    for name, value in scope.get("headers") or []:
+        if name == ENVELOPE_HEADER.encode("latin-1"):
+            return value.decode("latin-1").strip().lower()
+    query = (scope.get("query_string") or b"").decode("latin-1")
+    for part in query.split("&"):
+        key, _, value = part.partition("=")
+        if key == ENVELOPE_QUERY_PARAM:
+            return value.strip().lower()
+    return None
+
+
+class EnvelopeMiddleware:
+    """ASGI middleware that reads the requested envelope mode for FastJSONResponse."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = _requested_mode(scope)
+        mode = requested if requested in (ENVELOPE_FULL, ENVELOPE_COMPACT) else None
+        token = _envelope_mode.set(mode)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _envelope_mode.reset(token)
+# --- Compact safety envelope: end ---
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse with orjson encoding (stdlib fallback) and the compact envelope."""
+
+    # Explicit status_code default: FastAPI reads it from this signature for the OpenAPI responses.
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        background: Any = None,
+    ):
+        self.envelope = envelope_mode()
+        super().__init__(content, status_code=status_code, headers=headers, media_type=media_type, background=background)
+        # Only this class renders per envelope; files, streams and 304s do not vary.
+        self.headers.add_vary_header("X-PMAI-Envelope")
+        if self.envelope == ENVELOPE_COMPACT:
+            self.headers[ENVELOPE_HEADER] = ENVELOPE_COMPACT
+
+    def render(self, content: Any) -> bytes:
+        if self.envelope == ENVELOPE_COMPACT:
+            content = compact_envelope(content)
+        return dumps(content)
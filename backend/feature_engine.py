@@ -4,10 +4,12 @@ try:
     from backend.species_context import build_species_context
     from backend.exotic_knowledge import augment_exotic_features
     from backend.companion_animal_knowledge import augment_companion_animal_features
+    from backend.consult_timing import stage
 except ModuleNotFoundError:
     from species_context import build_species_context
     from exotic_knowledge import augment_exotic_features
     from companion_animal_knowledge import augment_companion_animal_features
+    from consult_timing import stage
 
 
 def _has_any(text: str, keywords: Iterable[str]) -> bool:
@@ -161,5 +163,7 @@ def extract_features(text: str) -> Dict[str, Any]:
         "avian_respiratory_risk": species_group == "avian" and respiratory_distress,
         "reptile_husbandry_risk": species_group in ("reptile", "amphibian", "fish") and husbandry_problem,
     }
-    features = augment_exotic_features(features, raw_text)
-    return augment_companion_animal_features(features, raw_text)
+    with stage("augment_exotic"):
+        features = augment_exotic_features(features, raw_text)
+    with stage("augment_companion"):
+        return augment_companion_animal_features(features, raw_text)
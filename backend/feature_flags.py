@@ -77,6 +77,27 @@ FEATURE_FLAG_DEFINITIONS: Dict[str, Dict[str, Any]] = {
         "category": "device_integration",
         "reason": "Device data should stay in mock/dry-run until interfaces are validated.",
     },
+    "ENABLE_LAB_REAL_INGEST": {
+        "label": "Allow LIS lab result import writes",
+        "default": False,
+        "risk": "P0",
+        "category": "lab_integration",
+        "reason": "Writes DiagnosticReport and Observation rows from analyser exports; dry-run until mapping is validated per clinic.",
+    },
+    "ENABLE_LEGACY_CASE_BULK_IMPORT": {
+        "label": "Allow bulk legacy case import writes",
+        "default": False,
+        "risk": "P0",
+        "category": "legacy_migration",
+        "reason": "Creates Case rows in bulk from legacy migration JSONL; only inside an approved migration window.",
+    },
+    "ENABLE_PREVENTIVE_CARE_SWEEP_WRITE": {
+        "label": "Allow preventive care reminder sweep writes",
+        "default": False,
+        "risk": "P1",
+        "category": "preventive_care",
+        "reason": "Creates and updates reminders for every live case in one run; review the dry-run report first.",
+    },
     "ENABLE_BILLING_REAL_WRITE": {
         "label": "Allow billing / invoice writes",
         "default": False,
@@ -184,6 +205,9 @@ def system_feature_flags():
         "preventive_wechat_delivery_enabled": bool(flags["ENABLE_PREVENTIVE_WECHAT_DELIVERY"]["enabled"]),
         "preventive_email_delivery_enabled": bool(flags["ENABLE_PREVENTIVE_EMAIL_DELIVERY"]["enabled"]),
         "device_real_ingest_enabled": bool(flags["ENABLE_DEVICE_REAL_INGEST"]["enabled"]),
+        "lab_real_ingest_enabled": bool(flags["ENABLE_LAB_REAL_INGEST"]["enabled"]),
+        "legacy_case_bulk_import_enabled": bool(flags["ENABLE_LEGACY_CASE_BULK_IMPORT"]["enabled"]),
+        "preventive_care_sweep_write_enabled": bool(flags["ENABLE_PREVENTIVE_CARE_SWEEP_WRITE"]["enabled"]),
         "writes_database": False,
         "exposes_secret_values": False,
         "safety_note": (
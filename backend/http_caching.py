@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+Response compression and conditional GET.
+
+- ``CompressionMiddleware``: gzip for compressible content types above a
+  size threshold; responses that already carry Content-Encoding (the /kb
+  sidecars below) pass through untouched.
+- ``KnowledgeBaseStaticFiles``: the /kb mount with strong content-hash
+  ETags, 304 handling and precompressed ``.gz`` sidecars written by a
+  background thread at startup.
+- ``ConditionalGetMiddleware``: strong ETags (body hash) and 304s for the
+  large JSON reads; endpoints that can derive a version cheaply set their own
+  ETag first and answer 304 without building the payload.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+
+logger = logging.getLogger("pmai.http_caching")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+COMPRESSION_ENABLED = _env_flag("COMPRESSION_ENABLED", True)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+COMPRESSIBLE_CONTENT_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/yaml",
+    "application/x-yaml",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+KB_PRECOMPRESS_ENABLED = _env_flag("KB_PRECOMPRESS_ENABLED", True)
+KB_PRECOMPRESS_DIR = os.getenv("KB_PRECOMPRESS_DIR", "").strip() or str(
+    Path(tempfile.gettempdir()) / "pmai-kb-precompressed"
+)
+KB_PRECOMPRESS_SUFFIXES = (".json", ".yaml", ".yml", ".md", ".txt", ".csv")
+
+# Per-user JSON reads: the client may keep a copy but must revalidate.
+CONDITIONAL_GET_CACHE_CONTROL = "private, no-cache"
+CONDITIONAL_GET_PATHS: Tuple[str, ...] = (
+    "/api/kpi/dashboard",
+    "/api/diagnostic-data/cases/",
+    "/api/diagnostic-data/clinical-qa-dashboard/",
+)
+# Buffering bound for hashing a body; larger responses are sent without an ETag.
+CONDITIONAL_GET_MAX_BODY = int(os.getenv("CONDITIONAL_GET_MAX_BODY", str(8 * 1024 * 1024)))
+
+_ENCODING_SUFFIX = "-gzip"
+
+
+# --- ETags: start ---
+def strong_etag(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _opaque_tag(tag: str) -> str:
+    # If-None-Match uses weak comparison; the -gzip suffix marks the same entity compressed.
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    if tag.endswith(_ENCODING_SUFFIX + '"'):
+        tag = tag[: -len(_ENCODING_SUFFIX) - 1] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == wanted for tag in if_none_match.split(","))
+
+
+def not_modified_response(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
+# --- ETags: end ---
+
+
+# --- Compression: start ---
+def _is_compressible(content_type: str) -> bool:
+    content_type = (content_type or "").lower()
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_CONTENT_TYPES)
+
+
+class _Responder(GZipResponder):
+    async def send_with_gzip(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message.get("status", 200) in (204, 304) or not _is_compressible(headers.get("content-type", "")):
+                # Reuse GZipResponder's pass-through for already encoded bodies.
+                await super().send_with_gzip(message)
+                self.content_encoding_set = True
+                return
+        await super().send_with_gzip(message)
+
+
+class CompressionMiddleware:
+    """gzip above COMPRESSION_MIN_SIZE for compressible types; strong ETags get a -gzip suffix."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None, compresslevel: Optional[int] = None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.compresslevel = COMPRESSION_LEVEL if compresslevel is None else compresslevel
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag", "")
+                if (
+                    headers.get("content-encoding") == "gzip"
+                    and etag.startswith('"')
+                    and not etag.endswith(_ENCODING_SUFFIX + '"')
+                ):
+                    # A strong ETag names one representation; the gzip bytes are another.
+                    headers["etag"] = etag[:-1] + _ENCODING_SUFFIX + '"'
+            await send(message)
+
+        responder = _Responder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        try:
+            await responder(scope, receive, send_with_etag)
+        finally:
+            # Uncompressed responses never close the GzipFile; close it here rather than in __del__.
+            if not responder.gzip_file.closed:
+                responder.gzip_file.close()
+# --- Compression: end ---
+
+
+# --- Conditional GET for JSON reads: start ---
+class ConditionalGetMiddleware:
+    """Adds body-hash ETags to 200 GET responses under ``paths`` and answers If-None-Match with 304."""
+
+    def __init__(self, app, paths: Iterable[str] = CONDITIONAL_GET_PATHS):
+        self.app = app
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope.get("method") not in ("GET", "HEAD")
+            or not (scope.get("path") or "").startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: List[Optional[Dict[str, Any]]] = [None]
+        chunks: List[bytes] = []
+        passthrough = [False]
+
+        async def buffer_send(message):
+            if passthrough[0]:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message.get("status") != 200 or "content-encoding" in headers:
+                    passthrough[0] = True
+                    await send(message)
+                    return
+                start[0] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            size = sum(len(chunk) for chunk in chunks)
+            if message.get("more_body", False) and size <= CONDITIONAL_GET_MAX_BODY:
+                return
+            if message.get("more_body", False):
+                # Too large to hash in memory: stream the rest through unchanged.
+                passthrough[0] = True
+                await send(start[0])
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                return
+            await self._finish(start[0], b"".join(chunks), if_none_match, send)
+
+        await self.app(scope, receive, buffer_send)
+
+    async def _finish(self, start, body: bytes, if_none_match: Optional[str], send) -> None:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        etag = headers.get("etag") or strong_etag(body)
+        headers["etag"] = etag
+        if "cache-control" not in headers:
+            headers["cache-control"] = CONDITIONAL_GET_CACHE_CONTROL
+        if etag_matches(if_none_match, etag):
+            headers["content-length"] = "0"
+            await send({**start, "status": 304, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+# --- Conditional GET for JSON reads: end ---
+
+
+# --- Knowledge-base static files: start ---
+class KnowledgeBasePrecompressor:
+    """Writes ``<name>.gz`` sidecars and a content-hash manifest for the /kb directory."""
+
+    def __init__(self, directory: str, out_dir: str = KB_PRECOMPRESS_DIR, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.directory = Path(directory).resolve()
+        self.out_dir = Path(out_dir)
+        self.minimum_size = minimum_size
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.stats: Dict[str, Any] = {}
+
+    def sidecar_path(self, rel: str) -> Path:
+        return self.out_dir / (rel + ".gz")
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        manifest_path = self.out_dir / "manifest.json"
+        previous: Dict[str, Dict[str, Any]] = {}
+        if manifest_path.exists():
+            try:
+                previous = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except ValueError:
+                previous = {}
+        written = reused = 0
+        manifest: Dict[str, Dict[str, Any]] = {}
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.suffix.lower() not in KB_PRECOMPRESS_SUFFIXES:
+                continue
+            stat = path.stat()
+            if stat.st_size < self.minimum_size:
+                continue
+            rel = path.relative_to(self.directory).as_posix()
+            old = previous.get(rel) or {}
+            sidecar = self.sidecar_path(rel)
+            if old.get("mtime_ns") == stat.st_mtime_ns and old.get("size") == stat.st_size and sidecar.exists():
+                manifest[rel] = old
+                reused += 1
+                continue
+            data = path.read_bytes()
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            tmp = sidecar.with_name(sidecar.name + ".tmp")
+            # mtime=0 keeps the gzip bytes a pure function of the content.
+            tmp.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            os.replace(tmp, sidecar)
+            manifest[rel] = {
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "gzip_size": sidecar.stat().st_size,
+            }
+            written += 1
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        tmp_manifest = manifest_path.with_name("manifest.json.tmp")
+        tmp_manifest.write_text(json.dumps(manifest, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_manifest, manifest_path)
+        self.manifest = manifest
+        self.ready = True
+        self.stats = {
+            "files": len(manifest),
+            "written": written,
+            "reused": reused,
+            "bytes": sum(item["size"] for item in manifest.values()),
+            "gzip_bytes": sum(item["gzip_size"] for item in manifest.values()),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info("kb sidecars ready: %s", self.stats)
+        return self.stats
+
+    def run_safely(self) -> None:
+        try:
+            self.run()
+        except OSError:
+            # Read-only or full disk: /kb keeps working, just without sidecars.
+            logger.exception("kb precompression failed; serving uncompressed files")
+
+    def start_background(self) -> None:
+        threading.Thread(target=self.run_safely, name="kb-precompress", daemon=True).start()
+
+    def entry(self, rel: str, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        item = self.manifest.get(rel) if self.ready else None
+        if item and item["mtime_ns"] == stat.st_mtime_ns and item["size"] == stat.st_size:
+            return item
+        return None
+
+
+class KnowledgeBaseStaticFiles(StaticFiles):
+    """StaticFiles with strong content-hash ETags and precompressed gzip sidecars."""
+
+    def __init__(self, *args, precompressor: Optional[KnowledgeBasePrecompressor] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precompressor = precompressor
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._hash_lock = threading.Lock()
+
+    def _content_hash(self, full_path: str, rel: str, stat: os.stat_result) -> str:
+        item = self.precompressor.entry(rel, stat) if self.precompressor else None
+        if item:
+            return item["sha256"]
+        cached = self._hashes.get(full_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha256(Path(full_path).read_bytes()).hexdigest()
+        with self._hash_lock:
+            self._hashes[full_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        rel = Path(full_path).resolve().relative_to(Path(str(self.directory)).resolve()).as_posix()
+        etag = f'"{self._content_hash(str(full_path), rel, stat_result)[:32]}"'
+        if status_code == 200 and etag_matches(request_headers.get("if-none-match"), etag):
+            return not_modified_response(etag, {"Vary": "Accept-Encoding"})
+
+        item = self.precompressor.entry(rel, stat_result) if self.precompressor else None
+        sidecar = self.precompressor.sidecar_path(rel) if item else None
+        if item and "gzip" in request_headers.get("accept-encoding", "") and sidecar.exists():
+            source = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            # Pass stat_result so FileResponse does not re-stat and overwrite the headers below.
+            response = FileResponse(sidecar, status_code=status_code, stat_result=os.stat(sidecar))
+            response.headers["content-type"] = source.headers["content-type"]
+            response.headers["content-encoding"] = "gzip"
+            response.headers["vary"] = "Accept-Encoding"
+            response.headers["etag"] = etag[:-1] + _ENCODING_SUFFIX + '"'
+            return response
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["etag"] = etag
+        if item:
+            response.headers["vary"] = "Accept-Encoding"
+        return response
+# --- Knowledge-base static files: end ---
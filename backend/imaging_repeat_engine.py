@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Repeat-imaging detection.
+
+A study is a repeat when the previous unplanned study of the same case,
+modality and body part was taken within the repeat window. Consecutive pairs
+come from a ``LAG()`` window over ``(case_id, modality, body_part)`` ordered
+by ``taken_at``. Modality and body part are compared trimmed and lowercased,
+with a blank or missing body part grouped as ``unknown``, the same key the
+original KPI grouping used; the case filter still seeks
+``ix_imaging_studies_case_modality_part_time``. Planned reviews are left out
+of the sequence, as before.
+
+Windows are configurable globally and per modality:
+
+    IMAGING_REPEAT_WINDOW_DAYS=7
+    IMAGING_REPEAT_WINDOWS="xray=3,ct=14,mri=30"
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Integer, func, select
+from sqlalchemy.orm import Session
+
+try:
+    from backend.models import Case, ImagingStudy
+except ModuleNotFoundError:
+    from models import Case, ImagingStudy
+
+
+IMAGING_REPEAT_ENGINE_MODE = "imaging_repeat_engine_v1"
+IMAGING_REPEAT_WINDOW_DAYS = float(os.getenv("IMAGING_REPEAT_WINDOW_DAYS", "7"))
+IMAGING_REPEAT_MAX_WINDOW_DAYS = 365.0
+
+
+def _parse_windows(raw: str) -> Dict[str, float]:
+    windows: Dict[str, float] = {}
+    for item in (raw or "").split(","):
+        modality, _, days = item.partition("=")
+        modality = modality.strip().lower()
+        if not modality or not days.strip():
+            continue
+        try:
+            windows[modality] = min(max(float(days), 0.0), IMAGING_REPEAT_MAX_WINDOW_DAYS)
+        except ValueError:
+            continue
+    return windows
+
+
+IMAGING_REPEAT_WINDOWS_BY_MODALITY = _parse_windows(os.getenv("IMAGING_REPEAT_WINDOWS", ""))
+
+
+def imaging_repeat_safety_flags() -> Dict[str, Any]:
+    return {
+        "read_only": True,
+        "writes_database": False,
+        "creates_imaging_study": False,
+        "blocks_imaging_order": False,
+        "warning_only": True,
+    }
+
+
+def repeat_window(modality: Optional[str], window_days: Optional[float] = None) -> timedelta:
+    """An explicit ``window_days`` wins over the per-modality and global defaults."""
+    if window_days is None:
+        window_days = IMAGING_REPEAT_WINDOWS_BY_MODALITY.get(
+            str(modality or "").strip().lower(), IMAGING_REPEAT_WINDOW_DAYS
+        )
+    return timedelta(days=min(max(float(window_days), 0.0), IMAGING_REPEAT_MAX_WINDOW_DAYS))
+
+
+def _max_window(window_days: Optional[float]) -> timedelta:
+    if window_days is not None:
+        return repeat_window(None, window_days)
+    return max(
+        [repeat_window(None, IMAGING_REPEAT_WINDOW_DAYS)]
+        + [repeat_window(None, days) for days in IMAGING_REPEAT_WINDOWS_BY_MODALITY.values()]
+    )
+
+
+def _hours(delta: timedelta) -> float:
+    return round(delta.total_seconds() / 3600.0, 2)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def modality_key(column: Any = ImagingStudy.modality):
+    """SQL grouping key for modality: trimmed, lowercased, NULL as ``""``."""
+    return func.lower(func.trim(func.coalesce(column, "")))
+
+
+def body_part_key(column: Any = ImagingStudy.body_part):
+    """SQL grouping key for body part: trimmed, lowercased, blank or NULL as ``unknown``."""
+    return func.lower(func.coalesce(func.nullif(func.trim(column), ""), "unknown"))
+
+
+def _consecutive_pairs(filters: Iterable[Any], owner_id: Optional[int]):
+    partition = (ImagingStudy.case_id, modality_key(), body_part_key())
+    order = (ImagingStudy.taken_at, ImagingStudy.id)
+    inner = select(
+        ImagingStudy.id.label("study_id"),
+        ImagingStudy.case_id,
+        modality_key().label("modality"),
+        body_part_key().label("body_part"),
+        ImagingStudy.taken_at,
+        func.lag(ImagingStudy.id, type_=Integer).over(partition_by=partition, order_by=order).label("previous_study_id"),
+        func.lag(ImagingStudy.taken_at, type_=DateTime).over(partition_by=partition, order_by=order).label("previous_taken_at"),
+    ).where(ImagingStudy.is_planned_review.is_(False), *filters)
+    if owner_id is not None:
+        inner = inner.join(Case, Case.id == ImagingStudy.case_id).where(Case.owner_id == owner_id)
+    pairs = inner.subquery("imaging_pairs")
+    return pairs, select(pairs).where(pairs.c.previous_study_id.is_not(None))
+
+
+def find_repeat_events(
+    db: Session,
+    *,
+    owner_id: Optional[int] = None,
+    case_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    window_days: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Repeat events (later study of each close pair) taken in ``[start, end)``.
+    Studies up to one window before ``start`` are read so a repeat of a study
+    taken just before the period is still found.
+    """
+    filters: List[Any] = []
+    if case_id is not None:
+        filters.append(ImagingStudy.case_id == int(case_id))
+    if start is not None:
+        filters.append(ImagingStudy.taken_at >= start - _max_window(window_days))
+    if end is not None:
+        filters.append(ImagingStudy.taken_at < end)
+
+    pairs, query = _consecutive_pairs(filters, owner_id)
+    if start is not None:
+        query = query.where(pairs.c.taken_at >= start)
+    query = query.order_by(pairs.c.case_id, pairs.c.taken_at, pairs.c.study_id)
+
+    events: List[Dict[str, Any]] = []
+    for row in db.execute(query).mappings():
+        window = repeat_window(row["modality"], window_days)
+        interval = row["taken_at"] - row["previous_taken_at"]
+        if interval > window:
+            continue
+        events.append({
+            "study_id": row["study_id"],
+            "previous_study_id": row["previous_study_id"],
+            "case_id": row["case_id"],
+            "modality": row["modality"],
+            "body_part": row["body_part"],
+            "taken_at": _iso(row["taken_at"]),
+            "previous_taken_at": _iso(row["previous_taken_at"]),
+            "interval_hours": _hours(interval),
+            "window_hours": _hours(window),
+        })
+    return events
+
+
+def summarize_repeat_groups(events: List[Dict[str, Any]], *, limit: int = 20) -> List[Dict[str, Any]]:
+    """One row per (case, modality, body part) with repeats, most studies first."""
+    groups: Dict[Tuple[Any, Any, Any], Dict[str, Any]] = {}
+    for event in events:
+        key = (event["case_id"], event["modality"], event["body_part"])
+        group = groups.setdefault(key, {
+            "case_id": event["case_id"],
+            "modality": event["modality"],
+            "body_part": event["body_part"],
+            "study_ids": set(),
+            "repeat_count": 0,
+            "first_taken_at": event["previous_taken_at"],
+            "last_taken_at": event["taken_at"],
+            "min_interval_hours": event["interval_hours"],
+        })
+        group["study_ids"].update((event["study_id"], event["previous_study_id"]))
+        group["repeat_count"] += 1
+        group["first_taken_at"] = min(group["first_taken_at"], event["previous_taken_at"])
+        group["last_taken_at"] = max(group["last_taken_at"], event["taken_at"])
+        group["min_interval_hours"] = min(group["min_interval_hours"], event["interval_hours"])
+
+    rows = []
+    for group in groups.values():
+        study_ids = group.pop("study_ids")
+        rows.append({**group, "count": len(study_ids)})
+    rows.sort(key=lambda item: (-item["count"], -item["repeat_count"], item["case_id"]))
+    return rows[:limit] if limit else rows
+
+
+def check_new_study(
+    db: Session,
+    *,
+    case_id: int,
+    modality: str,
+    body_part: Optional[str],
+    taken_at: Optional[datetime] = None,
+    is_planned_review: bool = False,
+    window_days: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Warning for a study about to be recorded: the closest earlier unplanned
+    study of the same case, modality and body part, and whether it falls in the
+    repeat window. One query over the case's studies; nothing is written.
+    """
+    taken_at = taken_at or datetime.utcnow()
+    window = repeat_window(modality, window_days)
+    result: Dict[str, Any] = {
+        "mode": IMAGING_REPEAT_ENGINE_MODE,
+        "repeat_warning": False,
+        "window_hours": _hours(window),
+        "previous_study": None,
+        "interval_hours": None,
+    }
+    if is_planned_review:
+        result["reason"] = "planned_review"
+        return result
+
+    previous = db.execute(
+        select(ImagingStudy.id, ImagingStudy.taken_at, ImagingStudy.tag)
+        .where(
+            ImagingStudy.case_id == int(case_id),
+            modality_key() == str(modality or "").strip().lower(),
+            body_part_key() == (str(body_part or "").strip().lower() or "unknown"),
+            ImagingStudy.taken_at <= taken_at,
+            ImagingStudy.is_planned_review.is_(False),
+        )
+        .order_by(ImagingStudy.taken_at.desc(), ImagingStudy.id.desc())
+        .limit(1)
+    ).first()
+    if previous is None:
+        result["reason"] = "no_previous_study"
+        return result
+
+    interval = taken_at - previous.taken_at
+    result["previous_study"] = {
+        "imaging_study_id": previous.id,
+        "taken_at": _iso(previous.taken_at),
+        "tag": previous.tag,
+    }
+    result["interval_hours"] = _hours(interval)
+    result["repeat_warning"] = interval <= window
+    result["reason"] = "within_repeat_window" if result["repeat_warning"] else "outside_repeat_window"
+    return result
@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from collections import Counter, defaultdict
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case as sql_case, func, select
 from sqlalchemy.orm import Session
 
 try:
@@ -17,6 +18,13 @@ except ModuleNotFoundError:
     from db import get_db
     from models import Case, ImagingStudy, ImagingBilling, FollowUp, QaAudit
 
+try:
+    from backend.fast_json import FastJSONResponse
+    from backend.imaging_repeat_engine import body_part_key, find_repeat_events, modality_key, repeat_window, summarize_repeat_groups
+except ModuleNotFoundError:
+    from fast_json import FastJSONResponse
+    from imaging_repeat_engine import body_part_key, find_repeat_events, modality_key, repeat_window, summarize_repeat_groups
+
 
 router = APIRouter(prefix="/api/kpi", tags=["kpi"])
 
@@ -174,17 +182,37 @@ def build_case_kpi(
     }
 
 
-def _owned_imaging_studies(db: Session, user: Any, start_dt: datetime, end_dt: datetime) -> List[ImagingStudy]:
-    return (
-        db.query(ImagingStudy)
+def _owned_imaging_counts(db: Session, user: Any, start_dt: datetime, end_dt: datetime) -> Tuple[int, int, int]:
+    """(studies, unplanned studies, unplanned case/modality/body-part groups) without loading rows."""
+    owned = (
+        select(
+            ImagingStudy.case_id,
+            modality_key().label("modality"),
+            body_part_key().label("body_part"),
+            ImagingStudy.is_planned_review,
+        )
         .join(Case, ImagingStudy.case_id == Case.id)
-        .filter(
+        .where(
             Case.owner_id == getattr(user, "id", None),
             ImagingStudy.taken_at >= start_dt,
             ImagingStudy.taken_at < end_dt,
         )
-        .all()
+        .subquery()
     )
+    unplanned = owned.c.is_planned_review.is_(False)
+    studies, unplanned_studies = db.execute(
+        select(func.count(), func.coalesce(func.sum(sql_case((unplanned, 1), else_=0)), 0))
+        .select_from(owned)
+    ).one()
+    groups = db.execute(
+        select(func.count()).select_from(
+            select(owned.c.case_id, owned.c.modality, owned.c.body_part)
+            .where(unplanned)
+            .distinct()
+            .subquery()
+        )
+    ).scalar_one()
+    return int(studies or 0), int(unplanned_studies or 0), int(groups or 0)
 
 
 def _owned_imaging_billing(db: Session, user: Any, start_dt: datetime, end_dt: datetime) -> List[ImagingBilling]:
@@ -207,37 +235,19 @@ def build_imaging_kpi(
     end_dt: datetime,
     *,
     include_samples: bool = True,
+    repeat_window_days: Optional[float] = None,
 ) -> Dict[str, Any]:
-    studies = _owned_imaging_studies(db, user, start_dt, end_dt)
-    unplanned = [item for item in studies if not bool(item.is_planned_review)]
-
-    groups: Dict[Tuple[Any, str, str], List[ImagingStudy]] = defaultdict(list)
-    for item in unplanned:
-        key = (
-            item.case_id,
-            _text(item.modality).lower(),
-            _text(item.body_part).lower() or "unknown",
-        )
-        groups[key].append(item)
-
-    repeat_groups = [
-        (key, rows)
-        for key, rows in groups.items()
-        if len(rows) > 1
-    ]
-
-    repeat_anomalies = []
-    if include_samples:
-        for key, rows in sorted(repeat_groups, key=lambda pair: len(pair[1]), reverse=True)[:20]:
-            case_id, modality, body_part = key
-            repeat_anomalies.append({
-                "case_id": case_id,
-                "modality": modality,
-                "body_part": body_part,
-                "count": len(rows),
-                "first_taken_at": min(row.taken_at for row in rows).isoformat(),
-                "last_taken_at": max(row.taken_at for row in rows).isoformat(),
-            })
+    study_count, unplanned_count, group_count = _owned_imaging_counts(db, user, start_dt, end_dt)
+    # Repeats are consecutive same case/modality/body-part studies inside the window (LAG over the index).
+    repeat_events = find_repeat_events(
+        db,
+        owner_id=getattr(user, "id", None),
+        start=start_dt,
+        end=end_dt,
+        window_days=repeat_window_days,
+    )
+    repeat_groups = summarize_repeat_groups(repeat_events, limit=0)
+    repeat_anomalies = repeat_groups[:20] if include_samples else []
 
     billings = _owned_imaging_billing(db, user, start_dt, end_dt)
     total_fee = sum(float(item.fee or 0.0) for item in billings)
@@ -252,12 +262,16 @@ def build_imaging_kpi(
         "period": _period_payload(start_dt, end_dt),
         "metrics": {
             "repeat_imaging": {
-                "study_count": len(studies),
-                "unplanned_study_count": len(unplanned),
-                "group_count": len(groups),
+                "study_count": study_count,
+                "unplanned_study_count": unplanned_count,
+                "group_count": group_count,
                 "repeat_group_count": len(repeat_groups),
-                "rate": _round_ratio(len(repeat_groups), len(groups)),
+                "repeat_event_count": len(repeat_events),
+                "rate": _round_ratio(len(repeat_groups), group_count),
                 "threshold": 0.08,
+                "window_days": repeat_window_days,
+                "default_window_hours": round(repeat_window(None).total_seconds() / 3600.0, 2),
+                "method": "lag_window_v1",
                 "anomalies": repeat_anomalies,
             },
             "duplicate_imaging_share": {
@@ -413,9 +427,13 @@ def build_dashboard_kpi(
     user: Any,
     start_dt: datetime,
     end_dt: datetime,
+    *,
+    repeat_window_days: Optional[float] = None,
 ) -> Dict[str, Any]:
     cases = build_case_kpi(db, user, start_dt, end_dt, include_samples=True)
-    imaging = build_imaging_kpi(db, user, start_dt, end_dt, include_samples=True)
+    imaging = build_imaging_kpi(
+        db, user, start_dt, end_dt, include_samples=True, repeat_window_days=repeat_window_days
+    )
     followups = build_followup_kpi(db, user, start_dt, end_dt, include_samples=True)
     qa = build_qa_kpi(db, user, start_dt, end_dt, include_samples=True)
 
@@ -490,11 +508,12 @@ def kpi_cases(
 def kpi_imaging(
     start: Optional[str] = None,
     end: Optional[str] = None,
+    repeat_window_days: Optional[float] = Query(default=None, gt=0, le=365),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
     start_dt, end_dt = _date_window(start, end)
-    return build_imaging_kpi(db, user, start_dt, end_dt)
+    return build_imaging_kpi(db, user, start_dt, end_dt, repeat_window_days=repeat_window_days)
 
 
 @router.get("/followups", response_model=dict)
@@ -523,8 +542,11 @@ def kpi_qa(
 def kpi_dashboard(
     start: Optional[str] = None,
     end: Optional[str] = None,
+    repeat_window_days: Optional[float] = Query(default=None, gt=0, le=365),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
     start_dt, end_dt = _date_window(start, end)
-    return build_dashboard_kpi(db, user, start_dt, end_dt)
+    return FastJSONResponse(
+        build_dashboard_kpi(db, user, start_dt, end_dt, repeat_window_days=repeat_window_days)
+    )
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Species-aware lab reference range registry and batch abnormal flagging.
+
+Ranges live in ``docs/clinical_data/LAB_REFERENCE_RANGES_V1.csv`` keyed by
+``(species, code, unit)``; ``LAB_UNIT_CONVERSIONS_V1.csv`` lists per-analyte
+unit factors. At load time every range is expanded into each convertible
+unit, so a lookup is a single dict hit and never converts values row by row.
+
+``flag_batch`` flags a whole panel (or a whole import) in one pass over
+column arrays, with NumPy when installed and identical pure-Python results
+otherwise. Explicit row ranges and explicit flags always win. Registry ranges
+are only used as a fallback when ``LAB_REFERENCE_REGISTRY_FALLBACK`` is on:
+the V1 intervals are placeholders whose source review has not started.
+"""
+from __future__ import annotations
+
+import csv
+import os
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from backend.preventive_care_rules import normalize_species
+except ModuleNotFoundError:
+    from preventive_care_rules import normalize_species
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+LAB_REFERENCE_RANGES_MODE = "lab_reference_range_registry_v1"
+LAB_REFERENCE_REGISTRY_FALLBACK = _env_flag("LAB_REFERENCE_REGISTRY_FALLBACK", False)
+
+DOCS_DIR = Path(__file__).resolve().parents[1] / "docs" / "clinical_data"
+DEFAULT_RANGES_PATH = DOCS_DIR / "LAB_REFERENCE_RANGES_V1.csv"
+DEFAULT_CONVERSIONS_PATH = DOCS_DIR / "LAB_UNIT_CONVERSIONS_V1.csv"
+
+SOURCE_ROW = "row"
+SOURCE_REGISTRY = "registry"
+
+ABNORMAL_FLAGS = {"high", "low", "critical_high", "critical_low"}
+
+# Explicit flags keep the historical parser semantics: critical_* collapses to high/low.
+_EXPLICIT_FLAGS: Dict[str, Optional[str]] = {
+    "high": "high", "h": "high", "above": "high", "critical_high": "high",
+    "low": "low", "l": "low", "below": "low", "critical_low": "low",
+    "normal": None, "n": None, "none": None, "not_abnormal": None,
+}
+
+_UNIT_ALIASES = {
+    "mg/dl": "mg/dL",
+    "g/dl": "g/dL",
+    "g/l": "g/L",
+    "mmol/l": "mmol/L",
+    "umol/l": "umol/L",
+    "µmol/l": "umol/L",
+    "μmol/l": "umol/L",
+    "meq/l": "mEq/L",
+    "u/l": "U/L",
+    "iu/l": "U/L",
+    "l/l": "L/L",
+    "%": "%",
+    "10^9/l": "10^9/L",
+    "x10^9/l": "10^9/L",
+    "10e9/l": "10^9/L",
+    "10^3/ul": "10^9/L",
+    "k/ul": "10^9/L",
+    "10^12/l": "10^12/L",
+    "x10^12/l": "10^12/L",
+    "10e12/l": "10^12/L",
+    "10^6/ul": "10^12/L",
+    "m/ul": "10^12/L",
+}
+
+
+@dataclass(frozen=True)
+class ReferenceRange:
+    species: str
+    code: str
+    unit: str
+    low: Optional[float]
+    high: Optional[float]
+    critical_low: Optional[float]
+    critical_high: Optional[float]
+    source_review_status: str
+    converted_from: Optional[str] = None
+
+
+def normalize_unit(value: Any) -> str:
+    text = str(value or "").strip().replace(" ", "")
+    return _UNIT_ALIASES.get(text.lower(), text)
+
+
+def normalize_code(value: Any) -> str:
+    return str(value or "").strip().upper()
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _scaled(value: Optional[float], factor: float) -> Optional[float]:
+    return None if value is None else round(value / factor, 6)
+
+
+# --- Registry loading: start ---
+def _read_csv(path: Path) -> List[Dict[str, str]]:
+    return list(csv.DictReader(path.read_text(encoding="utf-8").splitlines()))
+
+
+def _build_index(ranges_path: Path, conversions_path: Path) -> Dict[Tuple[str, str, str], ReferenceRange]:
+    # conversions[code][from_unit] = (to_unit, factor); value_in_to = value_in_from * factor
+    conversions: Dict[str, Dict[str, Tuple[str, float]]] = {}
+    if conversions_path.exists():
+        for row in _read_csv(conversions_path):
+            factor = _float_or_none(row.get("factor"))
+            if not factor:
+                continue
+            conversions.setdefault(normalize_code(row.get("code")), {})[normalize_unit(row.get("from_unit"))] = (
+                normalize_unit(row.get("to_unit")),
+                factor,
+            )
+
+    index: Dict[Tuple[str, str, str], ReferenceRange] = {}
+    for row in _read_csv(ranges_path):
+        code = normalize_code(row.get("code"))
+        if not code:
+            continue
+        item = ReferenceRange(
+            species=normalize_species(row.get("species")),
+            code=code,
+            unit=normalize_unit(row.get("unit")),
+            low=_float_or_none(row.get("low")),
+            high=_float_or_none(row.get("high")),
+            critical_low=_float_or_none(row.get("critical_low")),
+            critical_high=_float_or_none(row.get("critical_high")),
+            source_review_status=str(row.get("source_review_status") or "").strip() or "required_not_started",
+        )
+        index[(item.species, code, item.unit)] = item
+        for from_unit, (to_unit, factor) in conversions.get(code, {}).items():
+            if to_unit != item.unit:
+                continue
+            index.setdefault((item.species, code, from_unit), replace(
+                item,
+                unit=from_unit,
+                low=_scaled(item.low, factor),
+                high=_scaled(item.high, factor),
+                critical_low=_scaled(item.critical_low, factor),
+                critical_high=_scaled(item.critical_high, factor),
+                converted_from=item.unit,
+            ))
+    return index
+
+
+@lru_cache(maxsize=4)
+def _cached_index(ranges_path: str, ranges_mtime_ns: int, conversions_path: str, conversions_mtime_ns: int):
+    return _build_index(Path(ranges_path), Path(conversions_path))
+
+
+def load_reference_registry(
+    ranges_path: Path | str = DEFAULT_RANGES_PATH,
+    conversions_path: Path | str = DEFAULT_CONVERSIONS_PATH,
+) -> Dict[Tuple[str, str, str], ReferenceRange]:
+    # Cached per (path, mtime); editing either CSV invalidates the entry.
+    ranges_file = Path(ranges_path).resolve()
+    conversions_file = Path(conversions_path).resolve()
+    conversions_mtime = conversions_file.stat().st_mtime_ns if conversions_file.exists() else 0
+    return _cached_index(str(ranges_file), ranges_file.stat().st_mtime_ns, str(conversions_file), conversions_mtime)
+
+
+def reload_reference_registry() -> None:
+    _cached_index.cache_clear()
+
+
+def lookup_reference_range(species: Any, code: Any, unit: Any) -> Optional[ReferenceRange]:
+    """Exact ``(species, code, unit)`` hit after normalization; no unit means no match."""
+    unit_key = normalize_unit(unit)
+    if not unit_key:
+        return None
+    return load_reference_registry().get((normalize_species(species), normalize_code(code), unit_key))
+# --- Registry loading: end ---
+
+
+# --- Batch flagging: start ---
+def _column(values: Optional[Sequence[Any]], count: int) -> List[Any]:
+    if values is None:
+        return [None] * count
+    if len(values) != count:
+        raise ValueError("flag_batch columns must have the same length as values")
+    return list(values)
+
+
+def _numeric_flags(values, lows, highs, critical_lows, critical_highs) -> List[Optional[str]]:
+    if np is None:
+        flags: List[Optional[str]] = []
+        for value, low, high, critical_low, critical_high in zip(values, lows, highs, critical_lows, critical_highs):
+            if value is None:
+                flags.append(None)
+            elif critical_high is not None and value > critical_high:
+                flags.append("critical_high")
+            elif critical_low is not None and value < critical_low:
+                flags.append("critical_low")
+            elif high is not None and value > high:
+                flags.append("high")
+            elif low is not None and value < low:
+                flags.append("low")
+            else:
+                flags.append(None)
+        return flags
+
+    def array(column):
+        return np.asarray([np.nan if item is None else item for item in column], dtype=float)
+
+    v, lo, hi, clo, chi = (array(column) for column in (values, lows, highs, critical_lows, critical_highs))
+    # NaN comparisons are False, so missing values or bounds never flag.
+    with np.errstate(invalid="ignore"):
+        labels = np.select(
+            [v > chi, v < clo, v > hi, v < lo],
+            ["critical_high", "critical_low", "high", "low"],
+            default="",
+        )
+    return [str(label) or None for label in labels]
+
+
+def flag_batch(
+    values: Sequence[Optional[float]],
+    *,
+    codes: Optional[Sequence[Any]] = None,
+    units: Optional[Sequence[Any]] = None,
+    species: Any = None,
+    lows: Optional[Sequence[Optional[float]]] = None,
+    highs: Optional[Sequence[Optional[float]]] = None,
+    explicit_flags: Optional[Sequence[Any]] = None,
+    use_registry: Optional[bool] = None,
+) -> Dict[str, List[Any]]:
+    """
+    Flag parallel columns in one pass. Returns columns ``abnormal_flag``,
+    ``reference_low``, ``reference_high`` and ``reference_source`` (``row``,
+    ``registry`` or None). A row with either explicit bound uses its own range;
+    otherwise the registry range for ``(species, code, unit)`` when enabled.
+    An explicit flag overrides the numeric result.
+    """
+    count = len(values)
+    codes, units = _column(codes, count), _column(units, count)
+    lows, highs = _column(lows, count), _column(highs, count)
+    explicit = _column(explicit_flags, count)
+    if use_registry is None:
+        use_registry = LAB_REFERENCE_REGISTRY_FALLBACK
+
+    registry = load_reference_registry() if use_registry else {}
+    species_key = normalize_species(species)
+    resolved_low: List[Optional[float]] = []
+    resolved_high: List[Optional[float]] = []
+    critical_low: List[Optional[float]] = []
+    critical_high: List[Optional[float]] = []
+    sources: List[Optional[str]] = []
+    for index in range(count):
+        if lows[index] is not None or highs[index] is not None:
+            resolved_low.append(lows[index])
+            resolved_high.append(highs[index])
+            critical_low.append(None)
+            critical_high.append(None)
+            sources.append(SOURCE_ROW)
+            continue
+        match = registry.get((species_key, normalize_code(codes[index]), normalize_unit(units[index]))) if registry else None
+        resolved_low.append(match.low if match else None)
+        resolved_high.append(match.high if match else None)
+        critical_low.append(match.critical_low if match else None)
+        critical_high.append(match.critical_high if match else None)
+        sources.append(SOURCE_REGISTRY if match else None)
+
+    flags = _numeric_flags(list(values), resolved_low, resolved_high, critical_low, critical_high)
+    for index, raw in enumerate(explicit):
+        key = str(raw or "").strip().lower()
+        if key in _EXPLICIT_FLAGS:
+            flags[index] = _EXPLICIT_FLAGS[key]
+
+    return {
+        "abnormal_flag": flags,
+        "reference_low": resolved_low,
+        "reference_high": resolved_high,
+        "reference_source": sources,
+    }
+
+
+def reference_check(
+    *,
+    value: Optional[float],
+    code: Any,
+    unit: Any,
+    species: Any,
+    low: Optional[float] = None,
+    high: Optional[float] = None,
+    reviewed_flag: Any = None,
+) -> Dict[str, Any]:
+    """Range-derived flag for one stored observation, compared with a clinician-reviewed flag."""
+    flagged = flag_batch(
+        [None if value is None else float(value)],
+        codes=[code],
+        units=[unit],
+        species=species,
+        lows=[low],
+        highs=[high],
+    )
+    source = flagged["reference_source"][0]
+    computed = flagged["abnormal_flag"][0] or ("normal" if source and value is not None else None)
+    reviewed = str(reviewed_flag or "").strip().lower() or None
+    matches = None
+    if computed is not None and reviewed is not None:
+        # Review vocabulary has a single "critical" and treats not_abnormal as normal.
+        computed_key = "critical" if computed.startswith("critical_") else computed
+        matches = computed_key == reviewed or {computed_key, reviewed} <= {"normal", "not_abnormal"}
+    return {
+        "mode": LAB_REFERENCE_RANGES_MODE,
+        "computed_abnormal_flag": computed,
+        "reviewed_abnormal_flag": reviewed,
+        "matches_reviewed_flag": matches,
+        "reference_low": flagged["reference_low"][0],
+        "reference_high": flagged["reference_high"][0],
+        "reference_source": source,
+        "registry_fallback_enabled": LAB_REFERENCE_REGISTRY_FALLBACK,
+        "informational_only": True,
+    }
+# --- Batch flagging: end ---
@@ -4,6 +4,11 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+try:
+    from backend.lab_reference_ranges import flag_batch
+except ModuleNotFoundError:
+    from lab_reference_ranges import flag_batch
+
 MODE = "lab_result_dry_run_fixture_parser_v1"
 DRY_RUN_SOURCE_TYPE = "dry_run_lab_fixture"
 
@@ -56,33 +61,10 @@ def _iso_or_none(value: Any) -> Optional[str]:
         return text
 
 
-def _abnormal_flag(
-    value_numeric: Optional[float],
-    reference_low: Optional[float],
-    reference_high: Optional[float],
-    explicit_flag: Any = None,
-) -> Optional[str]:
-    explicit = _text(explicit_flag).lower()
-    if explicit in {"high", "h", "above", "critical_high"}:
-        return "high"
-    if explicit in {"low", "l", "below", "critical_low"}:
-        return "low"
-    if explicit in {"normal", "n", "none", "not_abnormal"}:
-        return None
-
-    if value_numeric is None:
-        return None
-    if reference_high is not None and value_numeric > reference_high:
-        return "high"
-    if reference_low is not None and value_numeric < reference_low:
-        return "low"
-    return None
-
-
 def _interpretation(flag: Optional[str]) -> Optional[str]:
-    if flag == "high":
+    if flag in {"high", "critical_high"}:
         return "above_reference_range"
-    if flag == "low":
+    if flag in {"low", "critical_low"}:
         return "below_reference_range"
     return None
 
@@ -134,7 +116,11 @@ def parse_lab_result_fixture(fixture: Dict[str, Any], *, case_id: Optional[int]
     observed_at = _iso_or_none(fixture.get("observed_at")) or collected_at
     specimen_type_default = _optional_text(fixture.get("specimen_type")) or "blood"
 
-    observations_preview: List[Dict[str, Any]] = []
+    species = _optional_text(fixture.get("species"))
+    if species is None and isinstance(fixture.get("patient"), dict):
+        species = _optional_text(fixture["patient"].get("species"))
+
+    rows: List[Dict[str, Any]] = []
     for idx, raw_item in enumerate(results, 1):
         if not isinstance(raw_item, dict):
             warnings.append(f"result row {idx} is not an object; skipped")
@@ -157,29 +143,49 @@ def parse_lab_result_fixture(fixture: Dict[str, Any], *, case_id: Optional[int]
         if value_numeric is None and value_text is None and raw_item.get("value") is not None:
             value_text = _optional_text(raw_item.get("value"))
 
-        reference_low = _float_or_none(raw_item.get("reference_low"))
-        reference_high = _float_or_none(raw_item.get("reference_high"))
-        abnormal_flag = _abnormal_flag(
-            value_numeric,
-            reference_low,
-            reference_high,
-            raw_item.get("abnormal_flag") or raw_item.get("flag"),
-        )
+        rows.append({
+            "idx": idx,
+            "raw": raw_item,
+            "code": code,
+            "display_name": display_name,
+            "value_numeric": value_numeric,
+            "value_text": value_text,
+            "unit": _optional_text(raw_item.get("unit")),
+            "reference_low": _float_or_none(raw_item.get("reference_low")),
+            "reference_high": _float_or_none(raw_item.get("reference_high")),
+            "explicit_flag": raw_item.get("abnormal_flag") or raw_item.get("flag"),
+        })
+
+    # One flagging pass for the whole panel; rows without a range may fall back to the registry.
+    flagged = flag_batch(
+        [row["value_numeric"] for row in rows],
+        codes=[row["code"] for row in rows],
+        units=[row["unit"] for row in rows],
+        species=species,
+        lows=[row["reference_low"] for row in rows],
+        highs=[row["reference_high"] for row in rows],
+        explicit_flags=[row["explicit_flag"] for row in rows],
+    )
+
+    observations_preview: List[Dict[str, Any]] = []
+    for position, row in enumerate(rows):
+        raw_item = row["raw"]
+        abnormal_flag = flagged["abnormal_flag"][position]
         value_type = _optional_text(raw_item.get("value_type"))
         if not value_type:
-            value_type = "numeric" if value_numeric is not None else "text"
+            value_type = "numeric" if row["value_numeric"] is not None else "text"
 
         observation = {
             "case_id": case_id,
             "diagnostic_report_id": None,
-            "code": code,
-            "display_name": display_name,
-            "value_text": value_text,
-            "value_numeric": value_numeric,
+            "code": row["code"],
+            "display_name": row["display_name"],
+            "value_text": row["value_text"],
+            "value_numeric": row["value_numeric"],
             "value_type": value_type,
-            "unit": _optional_text(raw_item.get("unit")),
-            "reference_low": reference_low,
-            "reference_high": reference_high,
+            "unit": row["unit"],
+            "reference_low": flagged["reference_low"][position],
+            "reference_high": flagged["reference_high"][position],
             "reference_text": _optional_text(raw_item.get("reference_text")),
             "abnormal_flag": abnormal_flag,
             "interpretation": _optional_text(raw_item.get("interpretation")) or _interpretation(abnormal_flag),
@@ -190,9 +196,10 @@ def parse_lab_result_fixture(fixture: Dict[str, Any], *, case_id: Optional[int]
             "review_status": "preview",
             "metadata": {
                 "fixture_id": fixture_id,
-                "row_index": idx,
+                "row_index": row["idx"],
                 "synthetic": bool(fixture.get("synthetic", True)),
                 "parser_mode": MODE,
+                "reference_source": flagged["reference_source"][position],
                 **(raw_item.get("metadata") if isinstance(raw_item.get("metadata"), dict) else {}),
             },
         }
@@ -232,7 +239,7 @@ def parse_lab_result_fixture(fixture: Dict[str, Any], *, case_id: Optional[int]
             "fixture_id": fixture_id,
             "synthetic": bool(fixture.get("synthetic", True)),
             "panel": _optional_text(fixture.get("panel")),
-            "species": _optional_text(fixture.get("species")),
+            "species": species,
             "parser_mode": MODE,
             "no_database_write": True,
             "no_external_lab_ingest": True,
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Longitudinal lab trends over Observation.
+
+``load_series`` reads every requested analyte for a case (or for one patient
+across the owner's cases) in a single query. ``analyze_series`` then works
+on column arrays: deltas, least-squares slope per day, percent change and
+reference-range crossings. It uses NumPy when installed and a pure-Python
+path with identical results otherwise.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+try:
+    from backend.models import Case, Observation
+except ModuleNotFoundError:
+    from models import Case, Observation
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+LAB_TREND_MODE = "lab_trend_engine_v1"
+LAB_TREND_MAX_CODES = int(os.getenv("LAB_TREND_MAX_CODES", "20"))
+LAB_TREND_MAX_POINTS = int(os.getenv("LAB_TREND_MAX_POINTS", "500"))
+# |percent change| below this is reported as "stable".
+LAB_TREND_STABLE_PERCENT = float(os.getenv("LAB_TREND_STABLE_PERCENT", "5"))
+
+SECONDS_PER_DAY = 86400.0
+
+
+def lab_trend_safety_flags() -> Dict[str, Any]:
+    return {
+        "read_only": True,
+        "writes_database": False,
+        "diagnosis_generated": False,
+        "clinician_review_required": True,
+    }
+
+
+def normalize_codes(codes: Iterable[str]) -> List[str]:
+    out: List[str] = []
+    for raw in codes or []:
+        for part in str(raw or "").split(","):
+            code = part.strip().upper()
+            if code and code not in out:
+                out.append(code)
+    return out
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _state(value: float, low: Optional[float], high: Optional[float]) -> Optional[str]:
+    if low is None and high is None:
+        return None
+    if low is not None and value < low:
+        return "low"
+    if high is not None and value > high:
+        return "high"
+    return "normal"
+
+
+# --- Series loading: start ---
+def patient_case_ids(db: Session, case: Case) -> List[int]:
+    """The owner's non-deleted cases for the same patient name and species (ix_cases_patient_species)."""
+    query = select(Case.id).where(
+        Case.owner_id == case.owner_id,
+        Case.patient_name == case.patient_name,
+        Case.deleted_at.is_(None),
+    )
+    query = query.where(Case.species.is_(None) if case.species is None else Case.species == case.species)
+    return [int(item) for item in db.execute(query.order_by(Case.id)).scalars()]
+
+
+def load_series(
+    db: Session,
+    *,
+    case_ids: Sequence[int],
+    codes: Sequence[str],
+    max_points: int = LAB_TREND_MAX_POINTS,
+) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    One query for all codes; returns ``{code: {column: [values...]}}`` in time
+    order. Codes match case-insensitively (``upper(trim(code))``; the case_id
+    filter keeps ix_observations_case_id usable); stored variants are folded
+    to the upper-case request code.
+    """
+    wanted = normalize_codes(codes)
+    if not case_ids or not wanted:
+        return {}
+    taken_at = func.coalesce(Observation.observed_at, Observation.collected_at, Observation.created_at)
+    rows = db.execute(
+        select(
+            Observation.id,
+            Observation.case_id,
+            Observation.code,
+            Observation.value_numeric,
+            Observation.unit,
+            Observation.reference_low,
+            Observation.reference_high,
+            taken_at.label("taken_at"),
+        )
+        .where(
+            Observation.case_id.in_([int(item) for item in case_ids]),
+            func.upper(func.trim(Observation.code)).in_(wanted),
+            Observation.value_numeric.is_not(None),
+        )
+        .order_by(Observation.code, taken_at, Observation.id)
+    ).all()
+
+    series: Dict[str, Dict[str, List[Any]]] = {}
+    for row in rows:
+        code = str(row.code).strip().upper()
+        columns = series.setdefault(code, {
+            "observation_id": [], "case_id": [], "taken_at": [], "value": [],
+            "unit": [], "reference_low": [], "reference_high": [],
+        })
+        columns["observation_id"].append(row.id)
+        columns["case_id"].append(row.case_id)
+        columns["taken_at"].append(row.taken_at)
+        columns["value"].append(float(row.value_numeric))
+        columns["unit"].append(row.unit)
+        columns["reference_low"].append(row.reference_low)
+        columns["reference_high"].append(row.reference_high)
+
+    for code, columns in series.items():
+        if len(columns["value"]) > 1 and any(
+            columns["taken_at"][index] < columns["taken_at"][index - 1] for index in range(1, len(columns["taken_at"]))
+        ):
+            # Folded case variants arrive as separate runs; restore time order.
+            order = sorted(range(len(columns["value"])), key=lambda index: (columns["taken_at"][index], columns["observation_id"][index]))
+            for name in columns:
+                columns[name] = [columns[name][index] for index in order]
+        if max_points and len(columns["value"]) > max_points:
+            for name in columns:
+                columns[name] = columns[name][-max_points:]
+    return series
+# --- Series loading: end ---
+
+
+# --- Series analysis: start ---
+def _slope_per_day(days: Sequence[float], values: Sequence[float]) -> Optional[float]:
+    count = len(values)
+    if count < 2:
+        return None
+    if np is not None:
+        x = np.asarray(days, dtype=float)
+        y = np.asarray(values, dtype=float)
+        dx = x - x.mean()
+        denominator = float(np.dot(dx, dx))
+        return float(np.dot(dx, y - y.mean()) / denominator) if denominator else None
+    mean_x = sum(days) / count
+    mean_y = sum(values) / count
+    denominator = sum((x - mean_x) ** 2 for x in days)
+    if not denominator:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(days, values)) / denominator
+
+
+def _deltas(values: Sequence[float]) -> List[float]:
+    if np is not None:
+        return [float(item) for item in np.diff(np.asarray(values, dtype=float))]
+    return [values[index] - values[index - 1] for index in range(1, len(values))]
+
+
+def _states(values: Sequence[float], lows: Sequence[Optional[float]], highs: Sequence[Optional[float]]) -> List[Optional[str]]:
+    if np is None:
+        return [_state(value, low, high) for value, low, high in zip(values, lows, highs)]
+    v = np.asarray(values, dtype=float)
+    lo = np.asarray([np.nan if item is None else item for item in lows], dtype=float)
+    hi = np.asarray([np.nan if item is None else item for item in highs], dtype=float)
+    known = ~(np.isnan(lo) & np.isnan(hi))
+    below = ~np.isnan(lo) & (v < lo)
+    above = ~np.isnan(hi) & (v > hi) & ~below
+    labels = np.where(below, "low", np.where(above, "high", "normal"))
+    return [str(label) if flag else None for label, flag in zip(labels, known)]
+
+
+def analyze_series(columns: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """Trend statistics for one analyte's columns (as returned by ``load_series``)."""
+    units = [unit for unit in dict.fromkeys(columns["unit"]) if unit]
+    latest_unit = columns["unit"][-1] if columns["unit"] else None
+    keep = [index for index, unit in enumerate(columns["unit"]) if unit == latest_unit]
+    excluded = len(columns["value"]) - len(keep)
+
+    values = [columns["value"][index] for index in keep]
+    times = [columns["taken_at"][index] for index in keep]
+    lows = [columns["reference_low"][index] for index in keep]
+    highs = [columns["reference_high"][index] for index in keep]
+    if not values:
+        return {"points": 0}
+
+    days = [(moment - times[0]).total_seconds() / SECONDS_PER_DAY for moment in times]
+    deltas = _deltas(values)
+    states = _states(values, lows, highs)
+    slope = _slope_per_day(days, values)
+    first, last = values[0], values[-1]
+    percent = ((last - first) / abs(first) * 100.0) if first else None
+
+    crossings = []
+    previous_index = None
+    for index, state in enumerate(states):
+        if state is None:
+            continue
+        if previous_index is not None and states[previous_index] != state:
+            crossings.append({
+                "from": states[previous_index],
+                "to": state,
+                "at": _iso(times[index]),
+                "value": values[index],
+                "observation_id": columns["observation_id"][keep[index]],
+            })
+        previous_index = index
+
+    if percent is None or len(values) < 2:
+        direction = "insufficient_data" if len(values) < 2 else "undetermined"
+    elif abs(percent) < LAB_TREND_STABLE_PERCENT:
+        direction = "stable"
+    else:
+        direction = "rising" if percent > 0 else "falling"
+
+    return {
+        "points": len(values),
+        "unit": latest_unit,
+        "units_seen": units,
+        "excluded_other_unit_points": excluded,
+        "first": {"value": first, "at": _iso(times[0])},
+        "last": {"value": last, "at": _iso(times[-1]), "state": states[-1]},
+        "min": min(values),
+        "max": max(values),
+        "last_delta": round(deltas[-1], 4) if deltas else None,
+        "total_change": round(last - first, 4),
+        "percent_change": round(percent, 2) if percent is not None else None,
+        "slope_per_day": round(slope, 6) if slope is not None else None,
+        "span_days": round(days[-1], 3),
+        "direction": direction,
+        "crossings": crossings,
+        "engine": "numpy" if np is not None else "python",
+    }
+
+
+def build_trends(series: Dict[str, Dict[str, List[Any]]], codes: Sequence[str], *, include_points: bool = True) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for code in normalize_codes(codes):
+        columns = series.get(code)
+        if not columns:
+            continue
+        item: Dict[str, Any] = {"code": code, "analysis": analyze_series(columns)}
+        if include_points:
+            item["points"] = [
+                {
+                    "observation_id": columns["observation_id"][index],
+                    "case_id": columns["case_id"][index],
+                    "at": _iso(columns["taken_at"][index]),
+                    "value": columns["value"][index],
+                    "unit": columns["unit"][index],
+                    "reference_low": columns["reference_low"][index],
+                    "reference_high": columns["reference_high"][index],
+                }
+                for index in range(len(columns["value"]))
+            ]
+        out[code] = item
+    return out
+# --- Series analysis: end ---
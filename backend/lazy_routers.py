@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+logger = logging.getLogger("pmai.lazy_routers")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+LAZY_ROUTERS = _env_flag("LAZY_ROUTERS", True)
+LAZY_ROUTERS_PRELOAD = _env_flag("LAZY_ROUTERS_PRELOAD", True)
+LAZY_ROUTERS_PRELOAD_DELAY_SECONDS = float(os.getenv("LAZY_ROUTERS_PRELOAD_DELAY_SECONDS", "1"))
+
+
+def import_backend_module(name: str):
+    try:
+        return importlib.import_module(f"backend.{name}")
+    except ModuleNotFoundError:
+        return importlib.import_module(name)
+
+
+def _path_matches(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix.rstrip("/") + "/")
+
+
+class LazyRouterLoader:
+    """
+    Defers importing router modules until a request needs them.
+
+    Each entry is (module name, path prefixes served by its router). A request
+    whose path matches a prefix imports every matching module, in table order,
+    and includes its router before the request is routed. Requests for the
+    OpenAPI schema or docs load everything. After startup a background thread
+    preloads the rest so only the first requests after a cold start pay the
+    import cost.
+    """
+
+    def __init__(self, app, modules: Sequence[Tuple[str, Iterable[str]]]):
+        self.app = app
+        self.modules: List[Tuple[str, Tuple[str, ...]]] = [(name, tuple(prefixes)) for name, prefixes in modules]
+        self.loaded: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started = False
+        self._lock = threading.RLock()
+        self._full_paths = {app.openapi_url, app.docs_url, app.redoc_url, "/docs/oauth2-redirect"} - {None}
+        app.add_middleware(_LazyRouterMiddleware, loader=self)
+        app.router.on_startup.append(self._on_startup)
+
+    def pending(self) -> List[str]:
+        return [name for name, _ in self.modules if name not in self.loaded]
+
+    def modules_for_path(self, path: str) -> List[str]:
+        if path in self._full_paths:
+            return self.pending()
+        return [
+            name for name, prefixes in self.modules
+            if name not in self.loaded and any(_path_matches(path, prefix) for prefix in prefixes)
+        ]
+
+    def load(self, names: Iterable[str]) -> None:
+        wanted = set(names)
+        with self._lock:
+            for name, _ in self.modules:
+                if name in wanted and name not in self.loaded:
+                    self._load_one(name)
+
+    def load_all(self) -> None:
+        self.load(self.pending())
+
+    def _load_one(self, name: str) -> None:
+        started = time.perf_counter()
+        module = import_backend_module(name)
+        router = module.router
+        self.app.include_router(router)
+        if self.started:
+            # include_router copies startup handlers onto the app, but startup has
+            # already run; run them here so warm-up hooks are not skipped.
+            for handler in router.on_startup:
+                result = handler()
+                if asyncio.iscoroutine(result):
+                    asyncio.run(result)
+        self.app.openapi_schema = None
+        self.loaded[name] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info("lazy router loaded: %s (%.1f ms)", name, self.loaded[name])
+
+    def _on_startup(self) -> None:
+        self.started = True
+        if LAZY_ROUTERS_PRELOAD and self.pending():
+            threading.Thread(target=self._preload, name="lazy-router-preload", daemon=True).start()
+
+    def _preload(self) -> None:
+        time.sleep(max(LAZY_ROUTERS_PRELOAD_DELAY_SECONDS, 0))
+        for name in self.pending():
+            try:
+                self.load([name])
+            except Exception as exc:  # keep the request path as the place errors surface
+                self.errors[name] = f"{type(exc).__name__}: {exc}"
+                logger.exception("lazy router preload failed: %s", name)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "lazy": True,
+            "started": self.started,
+            "loaded_ms": dict(self.loaded),
+            "pending": self.pending(),
+            "errors": dict(self.errors),
+        }
+
+
+class _LazyRouterMiddleware:
+    def __init__(self, app, loader: LazyRouterLoader):
+        self.app = app
+        self.loader = loader
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            names = self.loader.modules_for_path(scope.get("path") or "")
+            if names:
+                await run_in_threadpool(self.loader.load, names)
+        await self.app(scope, receive, send)
@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk import of validated legacy case payloads.
+
+Reads the ``case_create`` JSONL written by
+``scripts/legacy_cases_to_case_payloads.py`` one line at a time, drops records
+whose idempotency key is already present for the target owner (preloaded once
+into a key index) and inserts the rest with one multi-row ``Case`` insert per
+batch, each batch in its own transaction. Every committed batch gets a
+rollback manifest tagged with the ``rollback_snapshot_id`` from clinical
+sign-off; ``rollback_legacy_case_import`` hides exactly those cases again.
+
+Cases carry no idempotency column, so the key is kept on the
+``迁移幂等键：`` line of ``history`` that the mapper already writes.
+Dry-run is the default; write mode also requires
+``ENABLE_LEGACY_CASE_BULK_IMPORT``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.orm import Session
+
+try:
+    from backend.feature_flags import is_feature_enabled
+    from backend.legacy_import_mock import _record_errors
+    from backend.legacy_import_stream import iter_chunks, iter_ndjson_lines
+    from backend.models import AuditLog, Case, User
+except ModuleNotFoundError:
+    from feature_flags import is_feature_enabled
+    from legacy_import_mock import _record_errors
+    from legacy_import_stream import iter_chunks, iter_ndjson_lines
+    from models import AuditLog, Case, User
+
+
+BULK_IMPORT_MODE = "legacy_case_bulk_import_v1"
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("LEGACY_CASE_BULK_IMPORT_BATCH_SIZE", "1000"))
+BULK_IMPORT_FEATURE_FLAG = "ENABLE_LEGACY_CASE_BULK_IMPORT"
+BULK_IMPORT_ERROR_SAMPLE_LIMIT = 50
+MANIFEST_VERSION = "legacy_case_import_manifest_v1"
+
+IDEMPOTENCY_MARKER = "迁移幂等键："
+_IDEMPOTENCY_RE = re.compile(re.escape(IDEMPOTENCY_MARKER) + r"\s*(\S+)")
+
+CASE_TEXT_LIMITS = {
+    "patient_name": 255,
+    "species": 50,
+    "sex": 10,
+    "age_info": 50,
+    "breed": 100,
+    "weight": 50,
+    "coat_color": 100,
+    "owner_name": 100,
+    "owner_phone": 50,
+}
+
+
+def bulk_import_safety_flags(*, dry_run: bool, writes: bool) -> Dict[str, Any]:
+    return {
+        "dry_run": dry_run,
+        "writes_database": writes,
+        "creates_case": writes,
+        "updates_case": False,
+        "deletes_case": False,
+        "calls_case_create_api": False,
+        "downloads_attachments": False,
+        "writes_rollback_manifest": writes,
+        "writes_audit_log": writes,
+        "requires_human_review": True,
+    }
+
+
+def _text(value: Any) -> str:
+    return str(value if value is not None else "").strip()
+
+
+def _optional_text(value: Any, limit: Optional[int] = None) -> Optional[str]:
+    text_value = _text(value)
+    if limit is not None:
+        text_value = text_value[:limit]
+    return text_value or None
+
+
+def _natural_key(patient_name: Any, species: Any, owner_phone: Any) -> Optional[Tuple[str, str, str]]:
+    key = (_text(patient_name), _text(species).lower(), _text(owner_phone))
+    return key if all(key) else None
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class ImportedKeyIndex:
+    """Idempotency and patient/species/phone keys of one owner's live cases, loaded once."""
+
+    def __init__(self, db: Session, owner_id: int):
+        self.keys: set = set()
+        self.natural: set = set()
+        live = (Case.owner_id == int(owner_id), Case.deleted_at.is_(None))
+        marked = select(Case.history).where(*live, Case.history.like(f"%{IDEMPOTENCY_MARKER}%"))
+        for (history,) in db.execute(marked.execution_options(yield_per=5000)):
+            self.keys.update(_IDEMPOTENCY_RE.findall(history or ""))
+        phones = select(Case.patient_name, Case.species, Case.owner_phone).where(*live, Case.owner_phone.is_not(None))
+        for row in db.execute(phones.execution_options(yield_per=5000)):
+            key = _natural_key(*row)
+            if key:
+                self.natural.add(key)
+
+    def duplicate_reason(self, idempotency_key: str, case_create: Dict[str, Any]) -> Optional[str]:
+        if idempotency_key in self.keys:
+            return "idempotency_key already imported for this owner"
+        key = _natural_key(case_create.get("patient_name"), case_create.get("species"), case_create.get("owner_phone"))
+        if key and key in self.natural:
+            return "possible duplicate Case already exists (patient_name, species, owner_phone)"
+        return None
+
+    def add(self, idempotency_key: str, case_create: Dict[str, Any]) -> None:
+        self.keys.add(idempotency_key)
+        key = _natural_key(case_create.get("patient_name"), case_create.get("species"), case_create.get("owner_phone"))
+        if key:
+            self.natural.add(key)
+
+
+def _case_row(case_create: Dict[str, Any], idempotency_key: str, owner_id: int, now: datetime) -> Dict[str, Any]:
+    row: Dict[str, Any] = {
+        field: _optional_text(case_create.get(field), limit)
+        for field, limit in CASE_TEXT_LIMITS.items()
+    }
+    row["species"] = (row["species"] or "other").lower()
+    history = _text(case_create.get("history"))
+    if f"{IDEMPOTENCY_MARKER}{idempotency_key}" not in history:
+        history = (history + "\n" if history else "") + f"{IDEMPOTENCY_MARKER}{idempotency_key}"
+    row.update({
+        "owner_id": owner_id,
+        "chief_complaint": _text(case_create.get("chief_complaint")),
+        "history": history,
+        "exam_findings": _optional_text(case_create.get("exam_findings")),
+        "analysis": None,
+        "treatment": None,
+        "prognosis": None,
+        "attachments": None,
+        # Equal timestamps let rollback tell untouched imports from edited ones.
+        "created_at": now,
+        "updated_at": now,
+    })
+    return row
+
+
+def _analyze_cases(db: Session) -> str:
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return f"skipped:{dialect}"
+    db.execute(text("ANALYZE cases"))
+    db.commit()
+    return "analyzed"
+
+
+def _owner_rollup(db: Session, owner_id: int) -> Dict[str, Any]:
+    rows = db.execute(
+        select(Case.species, func.count(Case.id))
+        .where(Case.owner_id == owner_id, Case.deleted_at.is_(None))
+        .group_by(Case.species)
+    ).all()
+    by_species = {(species or "unknown"): int(count) for species, count in rows}
+    return {
+        "live_cases": sum(by_species.values()),
+        "live_cases_by_species": dict(sorted(by_species.items())),
+    }
+
+
+def _append_audit(db: Session, *, event_type: str, action: str, operator_id: str, import_id: str, extra: Dict[str, Any]) -> AuditLog:
+    audit = AuditLog(
+        request_id=f"{event_type}-{import_id}",
+        patient_token=None,
+        clinician_id=operator_id,
+        suggested_action=f"Legacy case bulk import {import_id}",
+        action_taken=action,
+        override_reason="Feature-flag protected legacy case bulk import",
+        event_type=event_type,
+        source="pet-med-ai",
+        extra_data={"import_id": import_id, "mode": BULK_IMPORT_MODE, **extra},
+    )
+    db.add(audit)
+    db.commit()
+    return audit
+
+
+def run_legacy_case_bulk_import(
+    db: Session,
+    *,
+    path: Path | str,
+    owner_id: int,
+    dry_run: bool = True,
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    rollback_snapshot_id: Optional[str] = None,
+    clinical_signoff_id: Optional[str] = None,
+    operator_id: Optional[str] = None,
+    manifest_dir: Path | str = "legacy_import_manifests",
+    error_sample_limit: int = BULK_IMPORT_ERROR_SAMPLE_LIMIT,
+) -> Dict[str, Any]:
+    """Import one case_create JSONL file for one owner (or report what would be imported)."""
+    rollback_snapshot_id = _text(rollback_snapshot_id)
+    clinical_signoff_id = _text(clinical_signoff_id)
+    operator_id = _text(operator_id)
+    if not dry_run:
+        if not is_feature_enabled(BULK_IMPORT_FEATURE_FLAG):
+            raise PermissionError(f"{BULK_IMPORT_FEATURE_FLAG} is disabled; run without --apply for a dry-run")
+        missing = [name for name, value in (
+            ("rollback_snapshot_id", rollback_snapshot_id),
+            ("clinical_signoff_id", clinical_signoff_id),
+            ("operator_id", operator_id),
+        ) if not value]
+        if missing:
+            raise ValueError("real import requires " + ", ".join(missing))
+    if db.get(User, int(owner_id)) is None:
+        raise ValueError(f"owner {owner_id} not found")
+
+    started = time.perf_counter()
+    owner_id = int(owner_id)
+    source_path = Path(path)
+    import_id = f"legacyimp_{uuid4().hex[:16]}"
+    run_dir = Path(manifest_dir) / import_id
+    if not dry_run:
+        run_dir.mkdir(parents=True, exist_ok=False)
+
+    index = ImportedKeyIndex(db, owner_id)
+    preloaded_keys = len(index.keys)
+    counters = {
+        "records_read": 0,
+        "records_rejected": 0,
+        "skipped_existing": 0,
+        "skipped_duplicate_in_file": 0,
+        "cases_created": 0,
+        "batches": 0,
+    }
+    species_counts: Counter = Counter()
+    errors: List[Dict[str, Any]] = []
+    manifests: List[Dict[str, Any]] = []
+    seen_in_file: set = set()
+
+    def reject(line_no: int, counter: str, key: str, message: str) -> None:
+        counters[counter] += 1
+        if len(errors) < error_sample_limit:
+            errors.append({"line": line_no, "idempotency_key": key or None, "error": message})
+
+    handle = source_path.open("r", encoding="utf-8-sig")
+    try:
+        for chunk in iter_chunks(iter_ndjson_lines(handle), max(int(batch_size), 1)):
+            now = datetime.utcnow()
+            rows: List[Dict[str, Any]] = []
+            refs: List[Dict[str, Any]] = []
+            for line_no, raw in chunk:
+                counters["records_read"] += 1
+                try:
+                    record = json.loads(raw)
+                except ValueError as exc:
+                    reject(line_no, "records_rejected", "", f"invalid JSON: {exc.msg}")
+                    continue
+                if not isinstance(record, dict):
+                    reject(line_no, "records_rejected", "", "line is not a JSON object")
+                    continue
+                key = _text(record.get("idempotency_key"))
+                record_errors = _record_errors(record, set())
+                if record_errors:
+                    reject(line_no, "records_rejected", key, "; ".join(err["error_code"] + ":" + err["field"] for err in record_errors))
+                    continue
+                case_create = record["case_create"]
+                if key in seen_in_file:
+                    reject(line_no, "skipped_duplicate_in_file", key, "idempotency_key appears earlier in this file")
+                    continue
+                seen_in_file.add(key)
+                reason = index.duplicate_reason(key, case_create)
+                if reason:
+                    reject(line_no, "skipped_existing", key, reason)
+                    continue
+                index.add(key, case_create)
+                row = _case_row(case_create, key, owner_id, now)
+                rows.append(row)
+                refs.append({"line": line_no, "idempotency_key": key, "legacy_case_id": _text(record.get("legacy_case_id")) or None})
+                species_counts[row["species"]] += 1
+
+            if not rows:
+                continue
+            counters["batches"] += 1
+            counters["cases_created"] += len(rows)
+            if dry_run:
+                continue
+
+            case_ids = [int(case_id) for case_id in db.execute(
+                insert(Case).returning(Case.id, sort_by_parameter_order=True), rows,
+            ).scalars().all()]
+            manifest = {
+                "manifest_version": MANIFEST_VERSION,
+                "import_id": import_id,
+                "batch_number": counters["batches"],
+                "status": "pending_commit",
+                "rollback_snapshot_id": rollback_snapshot_id,
+                "clinical_signoff_id": clinical_signoff_id,
+                "operator_id": operator_id,
+                "owner_id": owner_id,
+                "source_file": str(source_path),
+                "created_at": now.isoformat(),
+                "case_count": len(case_ids),
+                "items": [{**ref, "case_id": case_id} for ref, case_id in zip(refs, case_ids)],
+            }
+            # Written before the commit so a crash never leaves committed cases without a manifest.
+            manifest_path = run_dir / f"batch_{counters['batches']:05d}.json"
+            _write_json_atomic(manifest_path, manifest)
+            db.commit()
+            manifest["status"] = "committed"
+            _write_json_atomic(manifest_path, manifest)
+            manifests.append({
+                "batch_number": manifest["batch_number"],
+                "path": str(manifest_path),
+                "case_count": len(case_ids),
+                "first_case_id": case_ids[0],
+                "last_case_id": case_ids[-1],
+            })
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        handle.close()
+
+    writes = not dry_run and counters["cases_created"] > 0
+    post_import: Dict[str, Any] = {"analyze": "skipped:dry_run"}
+    audit_log_id = None
+    if not dry_run:
+        post_import = {"analyze": _analyze_cases(db) if writes else "skipped:no_writes", **_owner_rollup(db, owner_id)}
+        _write_json_atomic(run_dir / "index.json", {
+            "manifest_version": MANIFEST_VERSION,
+            "import_id": import_id,
+            "rollback_snapshot_id": rollback_snapshot_id,
+            "clinical_signoff_id": clinical_signoff_id,
+            "owner_id": owner_id,
+            "source_file": str(source_path),
+            "summary": counters,
+            "batches": manifests,
+        })
+        audit_log_id = _append_audit(
+            db,
+            event_type="legacy_case_bulk_import",
+            action="completed",
+            operator_id=operator_id,
+            import_id=import_id,
+            extra={
+                "rollback_snapshot_id": rollback_snapshot_id,
+                "clinical_signoff_id": clinical_signoff_id,
+                "owner_id": owner_id,
+                "manifest_dir": str(run_dir),
+                "summary": counters,
+            },
+        ).log_id
+
+    elapsed = time.perf_counter() - started
+    safety = bulk_import_safety_flags(dry_run=dry_run, writes=writes)
+    return {
+        "message": "legacy_case_bulk_import_dry_run" if dry_run else "legacy_case_bulk_import",
+        "mode": BULK_IMPORT_MODE,
+        "import_id": import_id,
+        "dry_run": dry_run,
+        "owner_id": owner_id,
+        "source": {"path": str(source_path)},
+        "rollback_snapshot_id": rollback_snapshot_id or None,
+        "clinical_signoff_id": clinical_signoff_id or None,
+        "summary": {
+            **counters,
+            "preloaded_idempotency_keys": preloaded_keys,
+            "species_counts": dict(sorted(species_counts.items())),
+            "elapsed_seconds": round(elapsed, 3),
+            "records_per_second": round(counters["records_read"] / elapsed, 1) if elapsed > 0 else None,
+        },
+        "errors": errors,
+        "errors_truncated": counters["records_rejected"] + counters["skipped_existing"] + counters["skipped_duplicate_in_file"] > len(errors),
+        "manifest_dir": str(run_dir) if not dry_run else None,
+        "manifests": manifests,
+        "post_import": post_import,
+        "audit_log_id": audit_log_id,
+        "quality_gate": {
+            "status": "PASS" if counters["records_rejected"] == 0 and counters["cases_created"] else "FAIL",
+            "requires_human_review": True,
+            "post_import_required": ["run smoke", "clinical spot-check of imported cases", "record Go / pause / rollback decision"],
+        },
+        "safety": safety,
+        **safety,
+    }
+
+
+def rollback_legacy_case_import(
+    db: Session,
+    *,
+    manifest_dir: Path | str,
+    rollback_snapshot_id: str,
+    operator_id: str,
+    dry_run: bool = True,
+    include_modified: bool = False,
+) -> Dict[str, Any]:
+    """Hide (soft-delete) the cases listed in one import's committed manifests.
+
+    Manifests still in ``pending_commit`` are skipped and reported: their batch
+    never committed, and SQLite may already have reused those ids. A case is
+    only hidden when its ``created_at`` equals the manifest's ``created_at``.
+    """
+    rollback_snapshot_id = _text(rollback_snapshot_id)
+    operator_id = _text(operator_id)
+    if not rollback_snapshot_id or not operator_id:
+        raise ValueError("rollback requires rollback_snapshot_id and operator_id")
+    if not dry_run and not is_feature_enabled(BULK_IMPORT_FEATURE_FLAG):
+        raise PermissionError(f"{BULK_IMPORT_FEATURE_FLAG} is disabled; run without --apply for a dry-run")
+
+    run_dir = Path(manifest_dir)
+    paths = sorted(run_dir.glob("batch_*.json"))
+    if not paths:
+        raise FileNotFoundError(f"no batch manifests in {run_dir}")
+
+    import_ids = set()
+    case_ids: List[int] = []
+    imported_at: Dict[int, datetime] = {}
+    uncommitted: List[Dict[str, Any]] = []
+    owner_ids = set()
+    for manifest_path in paths:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("manifest_version") != MANIFEST_VERSION:
+            raise ValueError(f"{manifest_path.name}: unsupported manifest_version")
+        if _text(manifest.get("rollback_snapshot_id")) != rollback_snapshot_id:
+            raise ValueError(f"{manifest_path.name}: rollback_snapshot_id does not match")
+        import_ids.add(manifest.get("import_id"))
+        owner_ids.add(manifest.get("owner_id"))
+        if manifest.get("status") != "committed":
+            uncommitted.append({
+                "batch_number": manifest.get("batch_number"),
+                "path": str(manifest_path),
+                "status": manifest.get("status"),
+                "case_count": manifest.get("case_count"),
+            })
+            continue
+        created_at = datetime.fromisoformat(manifest["created_at"])
+        for item in manifest.get("items") or []:
+            case_ids.append(int(item["case_id"]))
+            imported_at[int(item["case_id"])] = created_at
+    if len(import_ids) != 1 or len(owner_ids) != 1:
+        raise ValueError("manifest directory must hold exactly one import")
+    import_id = import_ids.pop()
+    owner_id = owner_ids.pop()
+
+    hide: List[int] = []
+    modified: List[int] = []
+    not_imported: List[int] = []
+    already_hidden = 0
+    found = set()
+    for start in range(0, len(case_ids), 1000):
+        part = case_ids[start:start + 1000]
+        rows = db.execute(
+            select(Case.id, Case.created_at, Case.updated_at, Case.deleted_at)
+            .where(Case.id.in_(part), Case.owner_id == owner_id)
+        ).all()
+        for case_id, created_at, updated_at, deleted_at in rows:
+            found.add(int(case_id))
+            if created_at != imported_at[int(case_id)]:
+                # Same id, different row: not the case this import created.
+                not_imported.append(int(case_id))
+            elif deleted_at is not None:
+                already_hidden += 1
+            elif updated_at is not None and updated_at != created_at and not include_modified:
+                modified.append(int(case_id))
+            else:
+                hide.append(int(case_id))
+    missing = len(set(case_ids) - found)
+
+    audit_log_id = None
+    if not dry_run and hide:
+        now = datetime.utcnow()
+        for start in range(0, len(hide), 1000):
+            db.execute(
+                update(Case).where(Case.id.in_(hide[start:start + 1000])).values(deleted_at=now),
+                execution_options={"synchronize_session": False},
+            )
+        db.commit()
+        audit_log_id = _append_audit(
+            db,
+            event_type="legacy_case_bulk_import_rollback",
+            action="rolled_back",
+            operator_id=operator_id,
+            import_id=import_id,
+            extra={
+                "rollback_snapshot_id": rollback_snapshot_id,
+                "owner_id": owner_id,
+                "manifest_dir": str(run_dir),
+                "hidden_count": len(hide),
+                "kept_modified_count": len(modified),
+                "skipped_created_at_mismatch_count": len(not_imported),
+                "skipped_uncommitted_batches": len(uncommitted),
+            },
+        ).log_id
+
+    return {
+        "message": "legacy_case_bulk_import_rollback_dry_run" if dry_run else "legacy_case_bulk_import_rollback",
+        "mode": BULK_IMPORT_MODE,
+        "import_id": import_id,
+        "dry_run": dry_run,
+        "rollback_snapshot_id": rollback_snapshot_id,
+        "owner_id": owner_id,
+        "summary": {
+            "manifest_batches": len(paths),
+            "skipped_uncommitted_batches": len(uncommitted),
+            "manifest_cases": len(case_ids),
+            "to_hide" if dry_run else "hidden": len(hide),
+            "kept_modified_since_import": len(modified),
+            "already_hidden": already_hidden,
+            "skipped_created_at_mismatch": len(not_imported),
+            "missing": missing,
+        },
+        "uncommitted_manifests": uncommitted,
+        "modified_case_ids_sample": modified[:50],
+        "created_at_mismatch_case_ids_sample": not_imported[:50],
+        "audit_log_id": audit_log_id,
+        "writes_database": not dry_run and bool(hide),
+        "deletes_case": False,
+        "soft_deletes_case": not dry_run and bool(hide),
+    }
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming legacy case dry-run for migrations of any size.
+
+Reads ``case_create`` NDJSON (the output of
+``scripts/legacy_cases_to_case_payloads.py``) one line at a time from a local
+file or an uploaded body, validates fixed-size chunks in a process pool with
+the same record rules as ``build_dry_run_report`` and folds the results into
+counters in input order. Duplicate idempotency keys are resolved in the parent
+against one seen-key set, so the outcome does not depend on the worker count.
+
+Nothing per record is kept besides that key set: detailed errors stream to an
+optional CSV, the report keeps a reservoir sample of rejected records and the
+first accepted payloads. It never writes to the database.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from math import ceil
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from backend.auth_jwt import get_current_user
+    from backend.legacy_import_mock import (
+        CASE_CREATE_FIELDS,
+        _counter_to_sorted_dict,
+        _error,
+        _now_iso,
+        _record_errors,
+        _record_warnings,
+        _text,
+    )
+except ModuleNotFoundError:
+    from auth_jwt import get_current_user
+    from legacy_import_mock import (
+        CASE_CREATE_FIELDS,
+        _counter_to_sorted_dict,
+        _error,
+        _now_iso,
+        _record_errors,
+        _record_warnings,
+        _text,
+    )
+
+
+router = APIRouter(prefix="/api/migrations", tags=["migrations"])
+
+STREAM_DRY_RUN_MODE = "legacy_case_stream_dry_run_v1"
+STREAM_CHUNK_SIZE = int(os.getenv("LEGACY_DRY_RUN_STREAM_CHUNK_SIZE", "2000"))
+# The API validates in-process by default; the CLI picks a pool size from the CPU count.
+STREAM_API_WORKERS = int(os.getenv("LEGACY_DRY_RUN_STREAM_WORKERS", "1"))
+STREAM_MAX_UPLOAD_BYTES = int(os.getenv("LEGACY_DRY_RUN_STREAM_MAX_BYTES", str(512 * 1024 * 1024)))
+STREAM_SAMPLE_LIMIT = 5
+STREAM_ERROR_SAMPLE_LIMIT = 20
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+ERRORS_CSV_FIELDS = [
+    "index",
+    "line",
+    "legacy_case_id",
+    "idempotency_key",
+    "field",
+    "error_code",
+    "error_reason",
+    "suggestion",
+]
+
+# _record_errors reports these before the idempotency key checks.
+_PRE_KEY_ERROR_FIELDS = {"operation", "dry_run"}
+
+
+def default_stream_workers() -> int:
+    return max(1, min(8, (os.cpu_count() or 1) - 1))
+
+
+def iter_ndjson_lines(handle: Iterable[Any]) -> Iterator[Tuple[int, str]]:
+    for line_number, raw in enumerate(handle, start=1):
+        text = raw.decode("utf-8-sig" if line_number == 1 else "utf-8", errors="replace") if isinstance(raw, bytes) else raw
+        text = text.strip()
+        if text:
+            yield line_number, text
+
+
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _LineResult(NamedTuple):
+    # Tuples keep the per-chunk pickling cost between processes low.
+    legacy_case_id: str
+    idempotency_key: str
+    operation: str
+    legacy_status: Optional[str]
+    species: str
+    errors: List[Dict[str, str]]
+    key_error_at: int
+    warning_codes: Tuple[str, ...]
+    coverage: int
+
+
+def _line_error(code: str, reason: str) -> _LineResult:
+    error = _error("__line__", code, reason, "Regenerate JSONL from scripts/legacy_cases_to_case_payloads.py.")
+    return _LineResult("", "", "unknown", None, "unknown", [error], 0, (), 0)
+
+
+def _validate_line(text: str) -> _LineResult:
+    try:
+        record = json.loads(text)
+    except ValueError as exc:
+        return _line_error("invalid_json", f"Line is not valid JSON: {exc.msg}")
+    if not isinstance(record, dict):
+        return _line_error("invalid_record", "Each JSONL line must be a JSON object.")
+
+    legacy = record.get("legacy") if isinstance(record.get("legacy"), dict) else {}
+    case_create = record.get("case_create") if isinstance(record.get("case_create"), dict) else {}
+    # Duplicates are decided by the parent; a fresh set keeps this record-local.
+    errors = _record_errors(record, set())
+    coverage = 0
+    for bit, field in enumerate(CASE_CREATE_FIELDS):
+        if _text(case_create.get(field)):
+            coverage |= 1 << bit
+    return _LineResult(
+        legacy_case_id=_text(record.get("legacy_case_id") or legacy.get("case_id")),
+        idempotency_key=_text(record.get("idempotency_key")),
+        operation=_text(record.get("operation")) or "unknown",
+        legacy_status=(_text(legacy.get("status")) or "blank") if legacy.get("status") is not None else None,
+        species=_text(case_create.get("species")).lower() or "unknown",
+        errors=errors,
+        key_error_at=sum(1 for err in errors if err.get("field") in _PRE_KEY_ERROR_FIELDS),
+        warning_codes=tuple(warn.get("warning_code") or "unknown" for warn in _record_warnings(record)),
+        coverage=coverage,
+    )
+
+
+def _validate_chunk(chunk: List[Tuple[int, str]]) -> List[_LineResult]:
+    return [_validate_line(text) for _, text in chunk]
+
+
+def _iter_validated_chunks(
+    chunks: Iterable[List[Tuple[int, str]]],
+    workers: int,
+) -> Iterator[Tuple[List[Tuple[int, str]], List[_LineResult]]]:
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, _validate_chunk(chunk)
+        return
+
+    # A bounded window of in-flight chunks keeps memory flat and results in input order.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Tuple[List[Tuple[int, str]], Any]] = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_validate_chunk, chunk)))
+            if len(pending) >= workers * 2:
+                done_chunk, future = pending.popleft()
+                yield done_chunk, future.result()
+        while pending:
+            done_chunk, future = pending.popleft()
+            yield done_chunk, future.result()
+
+
+class _ErrorsCsv:
+    def __init__(self, path: Optional[Path | str]):
+        self.path = Path(path) if path else None
+        self.rows_written = 0
+        self._handle = None
+        self._writer = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open("w", encoding="utf-8", newline="")
+            self._writer = csv.DictWriter(self._handle, fieldnames=ERRORS_CSV_FIELDS)
+            self._writer.writeheader()
+
+    def write(self, index: int, line: int, result: _LineResult) -> None:
+        if self._writer is None:
+            return
+        for err in result.errors:
+            self._writer.writerow({
+                "index": index,
+                "line": line,
+                "legacy_case_id": result.legacy_case_id,
+                "idempotency_key": result.idempotency_key,
+                "field": err.get("field"),
+                "error_code": err.get("error_code"),
+                "error_reason": err.get("error_reason"),
+                "suggestion": err.get("suggestion"),
+            })
+            self.rows_written += 1
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def run_stream_dry_run(
+    source: Path | str | Iterable[Any],
+    *,
+    batch_id: Optional[str] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    workers: int = 1,
+    sample_limit: int = STREAM_SAMPLE_LIMIT,
+    error_sample_limit: int = STREAM_ERROR_SAMPLE_LIMIT,
+    errors_csv: Optional[Path | str] = None,
+    import_chunk_size: int = 1000,
+    include_user_id: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    chunk_size = max(1, int(chunk_size))
+    workers = max(1, int(workers))
+    sample_limit = max(0, min(100, int(sample_limit)))
+    error_sample_limit = max(0, min(1000, int(error_sample_limit)))
+    import_chunk_size = max(1, int(import_chunk_size))
+    started = time.perf_counter()
+
+    seen_keys: set = set()
+    species_counts: Counter = Counter()
+    operation_counts: Counter = Counter()
+    legacy_status_counts: Counter = Counter()
+    rejected_by_code: Counter = Counter()
+    warnings_by_code: Counter = Counter()
+    coverage_counts = [0] * len(CASE_CREATE_FIELDS)
+    received = accepted = error_count = warning_count = chunks_processed = 0
+    sample_payloads: List[Dict[str, Any]] = []
+    error_samples: List[Dict[str, Any]] = []
+    sampler = random.Random(seed)
+    rejected_seen = 0
+
+    handle = None
+    if isinstance(source, (str, Path)):
+        handle = Path(source).open("r", encoding="utf-8-sig")
+        lines: Iterable[Any] = handle
+    else:
+        lines = source
+
+    writer = _ErrorsCsv(errors_csv)
+    try:
+        chunks = iter_chunks(iter_ndjson_lines(lines), chunk_size)
+        for chunk, results in _iter_validated_chunks(chunks, workers):
+            chunks_processed += 1
+            for (line, text), result in zip(chunk, results):
+                received += 1
+                errors = result.errors
+                key = result.idempotency_key
+                if key:
+                    if key in seen_keys:
+                        errors.insert(result.key_error_at, _error(
+                            "idempotency_key",
+                            "duplicate_in_batch",
+                            "idempotency_key appears more than once in this dry-run batch.",
+                            "Deduplicate the JSONL batch before real import.",
+                        ))
+                    else:
+                        seen_keys.add(key)
+
+                operation_counts[result.operation] += 1
+                species_counts[result.species] += 1
+                if result.legacy_status is not None:
+                    legacy_status_counts[result.legacy_status] += 1
+                for err in errors:
+                    rejected_by_code[err.get("error_code") or "unknown"] += 1
+                warnings_by_code.update(result.warning_codes)
+                error_count += len(errors)
+                warning_count += len(result.warning_codes)
+
+                if errors:
+                    writer.write(received, line, result)
+                    sample = {
+                        "index": received,
+                        "line": line,
+                        "legacy_case_id": result.legacy_case_id,
+                        "idempotency_key": result.idempotency_key,
+                        "errors": errors,
+                    }
+                    rejected_seen += 1
+                    if len(error_samples) < error_sample_limit:
+                        error_samples.append(sample)
+                    elif error_sample_limit:
+                        slot = sampler.randrange(rejected_seen)
+                        if slot < error_sample_limit:
+                            error_samples[slot] = sample
+                    continue
+
+                accepted += 1
+                coverage = result.coverage
+                for bit in range(len(coverage_counts)):
+                    if coverage >> bit & 1:
+                        coverage_counts[bit] += 1
+                if len(sample_payloads) < sample_limit:
+                    record = json.loads(text)
+                    sample_payloads.append({
+                        "index": received,
+                        "legacy_case_id": result.legacy_case_id,
+                        "idempotency_key": result.idempotency_key,
+                        "case_create": record.get("case_create"),
+                    })
+    finally:
+        writer.close()
+        if handle is not None:
+            handle.close()
+
+    if not received:
+        raise ValueError("records is required")
+
+    elapsed = time.perf_counter() - started
+    rejected = received - accepted
+    error_samples.sort(key=lambda item: item["index"])
+    return {
+        "message": "stream_dry_run_report",
+        "mode": STREAM_DRY_RUN_MODE,
+        "batch_id": batch_id or f"stream-dry-run-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
+        "generated_at": _now_iso(),
+        "dry_run": True,
+        "validate_only": True,
+        "writes_database": False,
+        "calls_case_create_api": False,
+        "user_id": include_user_id,
+        "received": received,
+        "accepted": accepted,
+        "rejected": rejected,
+        "ready_for_import": rejected == 0,
+        "summary": {
+            "received": received,
+            "accepted": accepted,
+            "rejected": rejected,
+            "error_count": error_count,
+            "warning_count": warning_count,
+            "species_counts": _counter_to_sorted_dict(species_counts),
+            "operation_counts": _counter_to_sorted_dict(operation_counts),
+            "legacy_status_counts": _counter_to_sorted_dict(legacy_status_counts),
+            "rejected_by_code": _counter_to_sorted_dict(rejected_by_code),
+            "warnings_by_code": _counter_to_sorted_dict(warnings_by_code),
+        },
+        "quality": {
+            "field_coverage": {
+                field: {
+                    "non_empty": coverage_counts[bit],
+                    "total": accepted,
+                    "ratio": round(coverage_counts[bit] / accepted, 4) if accepted else 0.0,
+                }
+                for bit, field in enumerate(CASE_CREATE_FIELDS)
+            },
+            "idempotency_keys": {
+                "unique_seen": len(seen_keys),
+                "duplicates_in_batch": int(rejected_by_code.get("duplicate_in_batch", 0)),
+            },
+        },
+        "import_plan": {
+            "target_operation": "case_create",
+            "chunk_size": import_chunk_size,
+            "chunks": ceil(accepted / import_chunk_size) if accepted else 0,
+            "accepted_records": accepted,
+            "can_promote_to_real_import": False,
+            "reason": "Streaming dry-run report only; it never writes database records.",
+            "next_gate": "clinical pilot sign-off and a separate real-import implementation.",
+        },
+        "sample_payloads": sample_payloads,
+        "error_samples": error_samples,
+        "error_samples_method": "reservoir",
+        "errors_csv": {
+            "path": str(writer.path) if writer.path else None,
+            "rows_written": writer.rows_written,
+        },
+        "stream": {
+            "validation_chunk_size": chunk_size,
+            "workers": workers,
+            "chunks_processed": chunks_processed,
+            "elapsed_ms": int(elapsed * 1000),
+            "records_per_second": int(received / elapsed) if elapsed > 0 else None,
+        },
+    }
+
+
+@router.post("/legacy-cases/dry-run/stream", response_model=dict)
+async def legacy_cases_import_stream_dry_run(
+    request: Request,
+    batch_id: Optional[str] = None,
+    sample_limit: int = STREAM_SAMPLE_LIMIT,
+    error_sample_limit: int = STREAM_ERROR_SAMPLE_LIMIT,
+    chunk_size: int = 1000,
+    user=Depends(get_current_user),
+):
+    # Raw NDJSON body, spooled to disk past a few MB instead of parsed into one list.
+    spool = SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES, mode="w+b")
+    try:
+        size = 0
+        async for part in request.stream():
+            size += len(part)
+            if size > STREAM_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"NDJSON upload cannot exceed {STREAM_MAX_UPLOAD_BYTES} bytes")
+            spool.write(part)
+        spool.seek(0)
+        try:
+            return await run_in_threadpool(
+                run_stream_dry_run,
+                io.TextIOWrapper(spool, encoding="utf-8-sig", errors="replace"),
+                batch_id=batch_id,
+                workers=STREAM_API_WORKERS,
+                sample_limit=sample_limit,
+                error_sample_limit=error_sample_limit,
+                import_chunk_size=chunk_size,
+                include_user_id=getattr(user, "id", None),
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        spool.close()
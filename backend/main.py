@@ -1,7 +1,6 @@
 # backend/main.py
 from fastapi import FastAPI, APIRouter, Depends, HTTPException, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles  # ← 新增：用于挂载静态目录
 from pathlib import Path                    # ← 新增：定位 knowledge-base 目录
 from typing import Optional, List, Dict, Any
 import os
@@ -28,6 +27,50 @@ try:
 except ModuleNotFoundError:
     from species_context import normalize_species, species_context_line
 
+try:
+    from backend.consult_timing import ConsultTimingMiddleware
+except ModuleNotFoundError:
+    from consult_timing import ConsultTimingMiddleware
+
+try:
+    from backend.metrics import MetricsMiddleware, instrument_engine, router as metrics_router
+except ModuleNotFoundError:
+    from metrics import MetricsMiddleware, instrument_engine, router as metrics_router
+
+try:
+    from backend.query_inspector import QUERY_INSPECTOR_ENABLED, QueryInspectorMiddleware, install_query_inspector
+except ModuleNotFoundError:
+    from query_inspector import QUERY_INSPECTOR_ENABLED, QueryInspectorMiddleware, install_query_inspector
+
+try:
+    from backend.audit_writer import start_audit_writer, stop_audit_writer
+except ModuleNotFoundError:
+    from audit_writer import start_audit_writer, stop_audit_writer
+
+try:
+    from backend.fast_json import EnvelopeMiddleware, FastJSONResponse
+except ModuleNotFoundError:
+    from fast_json import EnvelopeMiddleware, FastJSONResponse
+
+try:
+    from backend.http_caching import (
+        COMPRESSION_ENABLED,
+        KB_PRECOMPRESS_ENABLED,
+        CompressionMiddleware,
+        ConditionalGetMiddleware,
+        KnowledgeBasePrecompressor,
+        KnowledgeBaseStaticFiles,
+    )
+except ModuleNotFoundError:
+    from http_caching import (
+        COMPRESSION_ENABLED,
+        KB_PRECOMPRESS_ENABLED,
+        CompressionMiddleware,
+        ConditionalGetMiddleware,
+        KnowledgeBasePrecompressor,
+        KnowledgeBaseStaticFiles,
+    )
+
 
 def _csv_env(name: str, default: List[str]) -> List[str]:
     raw = os.getenv(name, "").strip()
@@ -68,7 +111,7 @@ CORS_ORIGINS = _csv_env(
 #   python3 -m alembic -c alembic.ini stamp head
 
 
-app = FastAPI(title="Pet Med AI Backend", version="1.0.0")
+app = FastAPI(title="Pet Med AI Backend", version="1.0.0", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,12 +119,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-PMAI-Envelope", "ETag"],
 )
+app.add_middleware(EnvelopeMiddleware)
+app.add_middleware(ConditionalGetMiddleware)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+app.add_middleware(ConsultTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if QUERY_INSPECTOR_ENABLED:
+    # Dev/test only: N+1 and slow-query detection (see docs/ops/QUERY_INSPECTOR_V1.md).
+    app.add_middleware(QueryInspectorMiddleware)
+    install_query_inspector(engine)
 
 # === 新增：挂载知识库静态目录为 /kb（只读） =========================
 # 目录定位：backend/main.py 的上一级是 backend，再上一级是仓库根目录
 KB_DIR = Path(__file__).resolve().parents[1] / "knowledge-base"
-app.mount("/kb", StaticFiles(directory=str(KB_DIR), html=False), name="kb")
+kb_precompressor = KnowledgeBasePrecompressor(str(KB_DIR))
+app.mount(
+    "/kb",
+    KnowledgeBaseStaticFiles(directory=str(KB_DIR), html=False, precompressor=kb_precompressor),
+    name="kb",
+)
+if KB_PRECOMPRESS_ENABLED:
+    # gzip sidecars are written off the request path; until ready /kb is served as-is.
+    app.router.on_startup.append(kb_precompressor.start_background)
+# Audit rows are group-committed by a background writer; startup replays any
+# journal left behind by a previous process.
+app.router.on_startup.append(start_audit_writer)
+app.router.on_shutdown.append(stop_audit_writer)
 # 现在可通过 /kb/tags.yaml、/kb/neurology/seizure.json 等路径直接访问
 # ===============================================================
 
@@ -1336,92 +1403,132 @@ except ModuleNotFoundError:
     from system_info import router as system_info_router
 
 try:
-    from backend.feature_flags import router as feature_flags_router
+    from backend.lazy_routers import LAZY_ROUTERS, LazyRouterLoader
 except ModuleNotFoundError:
-    from feature_flags import router as feature_flags_router
+    from lazy_routers import LAZY_ROUTERS, LazyRouterLoader
 
-try:
-    from backend.audit_log_api import router as audit_log_api_router
-except ModuleNotFoundError:
-    from audit_log_api import router as audit_log_api_router
+# 将 /api 路由挂载到应用
+app.include_router(api)
+app.include_router(system_info_router)
+app.include_router(metrics_router)
+
+# --- Lazy routers: start ---
+# Subsystem routers are imported on first matching request (and preloaded in the
+# background after startup) so cold starts only pay for the core app.
+# Order matches the eager include order; prefixes must cover every route path.
+LAZY_ROUTER_MODULES = (
+    ("feature_flags", ("/api/system/feature-flags",)),
+    ("audit_log_api", ("/api/audit-log", "/api/diagnostic-data")),
+    ("kpi_api", ("/api/kpi",)),
+    ("emr_webhook", ("/api/webhooks/emr/dry-run", "/api/webhooks/emr/case-mapping")),
+    ("webhook_inbox_api", ("/api/webhooks/emr/inbox",)),
+    ("emr_import_batch_api", ("/api/emr/import-batches",)),
+    ("clinical_docs_api", ("/api/clinical-docs",)),
+    ("preventive_care_api", ("/api/preventive-care",)),
+    ("preventive_care_notification_api", ("/api/preventive-care/notification-queue",)),
+    ("preventive_care_ops_api", ("/api/preventive-care/ops",)),
+    ("automated_reminder_delivery_template_api", ("/api/automated-reminder-delivery/templates",)),
+    ("automated_reminder_delivery_api", ("/api/automated-reminder-delivery",)),
+    ("diagnostic_data_api", ("/api/diagnostic-data",)),
+    ("legacy_import_mock", ("/api/migrations",)),
+    ("legacy_import_stream", ("/api/migrations/legacy-cases/dry-run/stream",)),
+)
 
-try:
-    from backend.kpi_api import router as kpi_api_router
-except ModuleNotFoundError:
-    from kpi_api import router as kpi_api_router
+if LAZY_ROUTERS:
+    lazy_routers = LazyRouterLoader(app, LAZY_ROUTER_MODULES)
+else:
+    lazy_routers = None
+    try:
+        from backend.feature_flags import router as feature_flags_router
+    except ModuleNotFoundError:
+        from feature_flags import router as feature_flags_router
 
-try:
-    from backend.emr_webhook import router as emr_webhook_router
-except ModuleNotFoundError:
-    from emr_webhook import router as emr_webhook_router
+    try:
+        from backend.audit_log_api import router as audit_log_api_router
+    except ModuleNotFoundError:
+        from audit_log_api import router as audit_log_api_router
 
-try:
-    from backend.legacy_import_mock import router as legacy_import_mock_router
-except ModuleNotFoundError:
-    from legacy_import_mock import router as legacy_import_mock_router
+    try:
+        from backend.kpi_api import router as kpi_api_router
+    except ModuleNotFoundError:
+        from kpi_api import router as kpi_api_router
 
-try:
-    from backend.webhook_inbox_api import router as webhook_inbox_api_router
-except ModuleNotFoundError:
-    from webhook_inbox_api import router as webhook_inbox_api_router
+    try:
+        from backend.emr_webhook import router as emr_webhook_router
+    except ModuleNotFoundError:
+        from emr_webhook import router as emr_webhook_router
 
-try:
-    from backend.emr_import_batch_api import router as emr_import_batch_api_router
-except ModuleNotFoundError:
-    from emr_import_batch_api import router as emr_import_batch_api_router
+    try:
+        from backend.legacy_import_mock import router as legacy_import_mock_router
+    except ModuleNotFoundError:
+        from legacy_import_mock import router as legacy_import_mock_router
 
-try:
-    from backend.clinical_docs_api import router as clinical_docs_api_router
-except ModuleNotFoundError:
-    from clinical_docs_api import router as clinical_docs_api_router
+    try:
+        from backend.legacy_import_stream import router as legacy_import_stream_router
+    except ModuleNotFoundError:
+        from legacy_import_stream import router as legacy_import_stream_router
 
-try:
-    from backend.preventive_care_api import router as preventive_care_api_router
-except ModuleNotFoundError:
-    from preventive_care_api import router as preventive_care_api_router
+    try:
+        from backend.webhook_inbox_api import router as webhook_inbox_api_router
+    except ModuleNotFoundError:
+        from webhook_inbox_api import router as webhook_inbox_api_router
 
-try:
-    from backend.preventive_care_notification_api import router as preventive_care_notification_api_router
-except ModuleNotFoundError:
-    from preventive_care_notification_api import router as preventive_care_notification_api_router
+    try:
+        from backend.emr_import_batch_api import router as emr_import_batch_api_router
+    except ModuleNotFoundError:
+        from emr_import_batch_api import router as emr_import_batch_api_router
 
-try:
-    from backend.preventive_care_ops_api import router as preventive_care_ops_api_router
-except ModuleNotFoundError:
-    from preventive_care_ops_api import router as preventive_care_ops_api_router
+    try:
+        from backend.clinical_docs_api import router as clinical_docs_api_router
+    except ModuleNotFoundError:
+        from clinical_docs_api import router as clinical_docs_api_router
 
-try:
-    from backend.automated_reminder_delivery_template_api import router as automated_reminder_delivery_template_api_router
-except ModuleNotFoundError:
-    from automated_reminder_delivery_template_api import router as automated_reminder_delivery_template_api_router
+    try:
+        from backend.preventive_care_api import router as preventive_care_api_router
+    except ModuleNotFoundError:
+        from preventive_care_api import router as preventive_care_api_router
 
-try:
-    from backend.automated_reminder_delivery_api import router as automated_reminder_delivery_api_router
-except ModuleNotFoundError:
-    from automated_reminder_delivery_api import router as automated_reminder_delivery_api_router
+    try:
+        from backend.preventive_care_notification_api import router as preventive_care_notification_api_router
+    except ModuleNotFoundError:
+        from preventive_care_notification_api import router as preventive_care_notification_api_router
 
-try:
-    from backend.diagnostic_data_api import router as diagnostic_data_api_router
-except ModuleNotFoundError:
-    from diagnostic_data_api import router as diagnostic_data_api_router
+    try:
+        from backend.preventive_care_ops_api import router as preventive_care_ops_api_router
+    except ModuleNotFoundError:
+        from preventive_care_ops_api import router as preventive_care_ops_api_router
 
-# 将 /api 路由挂载到应用
-app.include_router(api)
-app.include_router(system_info_router)
-app.include_router(feature_flags_router)
-app.include_router(audit_log_api_router)
-app.include_router(kpi_api_router)
-app.include_router(emr_webhook_router)
-app.include_router(webhook_inbox_api_router)
-app.include_router(emr_import_batch_api_router)
-app.include_router(clinical_docs_api_router)
-app.include_router(preventive_care_api_router)
-app.include_router(preventive_care_notification_api_router)
-app.include_router(preventive_care_ops_api_router)
-app.include_router(automated_reminder_delivery_template_api_router)
-app.include_router(automated_reminder_delivery_api_router)
-app.include_router(diagnostic_data_api_router)
-app.include_router(legacy_import_mock_router)
+    try:
+        from backend.automated_reminder_delivery_template_api import router as automated_reminder_delivery_template_api_router
+    except ModuleNotFoundError:
+        from automated_reminder_delivery_template_api import router as automated_reminder_delivery_template_api_router
+
+    try:
+        from backend.automated_reminder_delivery_api import router as automated_reminder_delivery_api_router
+    except ModuleNotFoundError:
+        from automated_reminder_delivery_api import router as automated_reminder_delivery_api_router
+
+    try:
+        from backend.diagnostic_data_api import router as diagnostic_data_api_router
+    except ModuleNotFoundError:
+        from diagnostic_data_api import router as diagnostic_data_api_router
+
+    app.include_router(feature_flags_router)
+    app.include_router(audit_log_api_router)
+    app.include_router(kpi_api_router)
+    app.include_router(emr_webhook_router)
+    app.include_router(webhook_inbox_api_router)
+    app.include_router(emr_import_batch_api_router)
+    app.include_router(clinical_docs_api_router)
+    app.include_router(preventive_care_api_router)
+    app.include_router(preventive_care_notification_api_router)
+    app.include_router(preventive_care_ops_api_router)
+    app.include_router(automated_reminder_delivery_template_api_router)
+    app.include_router(automated_reminder_delivery_api_router)
+    app.include_router(diagnostic_data_api_router)
+    app.include_router(legacy_import_mock_router)
+    app.include_router(legacy_import_stream_router)
+# --- Lazy routers: end ---
 
 # 本地调试
 if __name__ == "__main__":
@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+"""
+In-process Prometheus metrics.
+
+A small registry (counters, gauges, histograms with labels) rendered in the
+Prometheus text exposition format 0.0.4 at ``GET /metrics``. Request metrics
+come from an ASGI middleware, database metrics from SQLAlchemy engine hooks,
+and everything else (consult stage timings, cache stats, webhook inbox depth)
+is read from the owning modules at scrape time. No external service or
+client library is needed.
+"""
+from __future__ import annotations
+
+import bisect
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from sqlalchemy import event, func
+
+try:
+    from backend.consult_timing import CONSULT_STAGE_HISTOGRAMS
+    from backend.db import SessionLocal
+    from backend.models import WebhookInbox
+except ModuleNotFoundError:
+    from consult_timing import CONSULT_STAGE_HISTOGRAMS
+    from db import SessionLocal
+    from models import WebhookInbox
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+logger = logging.getLogger("pmai.metrics")
+
+DEV_ENVIRONMENTS = {"", "dev", "development", "local", "test"}
+
+
+def _is_dev_environment() -> bool:
+    return (
+        os.getenv("ENVIRONMENT", "").strip().lower() in DEV_ENVIRONMENTS
+        and os.getenv("RENDER", "").strip().lower() != "true"
+    )
+
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+METRICS_REQUESTED = _env_flag("METRICS_ENABLED", True)
+# Route names, latencies and queue depths are not for the public internet: outside
+# development /metrics is served only behind METRICS_TOKEN, and stays off without one.
+METRICS_ENABLED = METRICS_REQUESTED and (bool(METRICS_TOKEN) or _is_dev_environment())
+METRICS_DB_GAUGE_TTL_SECONDS = float(os.getenv("METRICS_DB_GAUGE_TTL_SECONDS", "15"))
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. Request and checkout-wait buckets; the last bucket is +Inf.
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_WAIT_BUCKETS: Tuple[float, ...] = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+QUERY_COUNT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+if METRICS_REQUESTED and not METRICS_ENABLED:
+    logger.warning("/metrics disabled: set METRICS_TOKEN to expose metrics outside development")
+
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"
+
+
+# --- Registry: start ---
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = float(value)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any):
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[Any], float]]:
+        for key, child in self._items():
+            yield self.name, self.labelnames, key, child.value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[Any], float]]:
+        for key, child in self._items():
+            counts, total, count = child.snapshot()
+            yield from histogram_samples(self.name, self.labelnames, key, self.buckets, counts, total, count)
+
+
+def histogram_samples(
+    name: str,
+    labelnames: Sequence[str],
+    labelvalues: Sequence[Any],
+    bounds: Sequence[float],
+    counts: Sequence[int],
+    total: float,
+    count: int,
+) -> Iterable[Tuple[str, Sequence[str], Sequence[Any], float]]:
+    """Expand per-bucket counts (last entry is +Inf) into cumulative ``le`` samples."""
+    names = tuple(labelnames) + ("le",)
+    running = 0
+    for bound, bucket_count in zip(tuple(bounds) + (float("inf"),), counts):
+        running += bucket_count
+        yield f"{name}_bucket", names, tuple(labelvalues) + (_format_value(bound),), running
+    yield f"{name}_sum", labelnames, labelvalues, total
+    yield f"{name}_count", labelnames, labelvalues, count
+
+
+class MetricFamily:
+    """Scrape-time metric produced by a collector function."""
+
+    def __init__(self, name: str, type_name: str, documentation: str):
+        self.name = name
+        self.type_name = type_name
+        self.documentation = documentation
+        self._samples: List[Tuple[str, Sequence[str], Sequence[Any], float]] = []
+
+    def add(self, labels: Dict[str, Any], value: float, suffix: str = "") -> "MetricFamily":
+        self._samples.append((self.name + suffix, tuple(labels), tuple(labels.values()), value))
+        return self
+
+    def add_samples(self, samples: Iterable[Tuple[str, Sequence[str], Sequence[Any], float]]) -> "MetricFamily":
+        self._samples.extend(samples)
+        return self
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[Any], float]]:
+        return list(self._samples)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Tuple[str, Callable[[], Iterable[MetricFamily]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        with self._lock:
+            self._collectors.append((name, collector))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def collect(self) -> List[Any]:
+        with self._lock:
+            families: List[Any] = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for name, collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception:  # one broken source must not take /metrics down
+                COLLECTOR_ERRORS.labels(name).inc()
+        return families
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.type_name}")
+            for sample_name, labelnames, labelvalues, value in family.samples():
+                lines.append(f"{sample_name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+# --- Registry: end ---
+
+
+COLLECTOR_ERRORS = REGISTRY.counter(
+    "pmai_metrics_collector_errors_total", "Scrape-time collectors that raised.", ("collector",)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "pmai_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "pmai_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("pmai_http_requests_in_flight", "HTTP requests currently being served.")
+DB_STATEMENTS = REGISTRY.counter(
+    "pmai_db_statements_total", "SQL statements executed, by route template and statement verb.", ("route", "verb")
+)
+DB_QUERIES_PER_REQUEST = REGISTRY.histogram(
+    "pmai_db_queries_per_request", "SQL statements executed per HTTP request.", ("route",), QUERY_COUNT_BUCKETS
+)
+DB_POOL_CHECKOUTS = REGISTRY.counter("pmai_db_pool_checkouts_total", "Connections checked out of the pool.")
+DB_POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "pmai_db_pool_checkout_wait_seconds",
+    "Time to obtain a pooled connection (includes opening a new one).",
+    buckets=POOL_WAIT_BUCKETS,
+)
+
+
+# --- Request query counting: start ---
+class RequestQueryStats:
+    """Per-request SQL statement counts by verb."""
+
+    __slots__ = ("by_verb", "total")
+
+    def __init__(self):
+        self.by_verb: Dict[str, int] = {}
+        self.total = 0
+
+    def add(self, verb: str) -> None:
+        self.by_verb[verb] = self.by_verb.get(verb, 0) + 1
+        self.total += 1
+
+
+_current_queries: ContextVar[Optional[RequestQueryStats]] = ContextVar("pmai_request_queries", default=None)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _current_queries.get()
+
+
+def statement_verb(statement: str) -> str:
+    head = (statement or "").lstrip().split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb if verb in {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"} else "OTHER"
+# --- Request query counting: end ---
+
+
+# --- Engine instrumentation: start ---
+_instrumented_engines: "set[int]" = set()
+
+
+def instrument_engine(engine) -> None:
+    """Hook statement counting and pool checkout timing into an engine (idempotent)."""
+    if id(engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        verb = statement_verb(statement)
+        stats = _current_queries.get()
+        if stats is None:
+            DB_STATEMENTS.labels(BACKGROUND_ROUTE, verb).inc()
+        else:
+            stats.add(verb)
+
+    @event.listens_for(engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+
+    # There is no "before checkout" pool event, so time the engine's entry point
+    # into the pool. The engine object (unlike its pool) survives dispose().
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
+
+    def collect_pool() -> Iterable[MetricFamily]:
+        pool = engine.pool
+        checked_out = getattr(pool, "checkedout", None)
+        size = getattr(pool, "size", None)
+        if callable(checked_out):
+            yield MetricFamily("pmai_db_pool_checked_out", "gauge", "Connections currently checked out.").add({}, checked_out())
+        if callable(size):
+            yield MetricFamily("pmai_db_pool_size", "gauge", "Configured pool size.").add({}, size())
+
+    REGISTRY.register_collector("db_pool", collect_pool)
+# --- Engine instrumentation: end ---
+
+
+# --- HTTP middleware: start ---
+def route_template(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL counts per route template."""
+
+    def __init__(self, app, enabled: Optional[bool] = None):
+        self.app = app
+        self.enabled = METRICS_ENABLED if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_queries.set(stats)
+        status: List[int] = [500]
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = int(message.get("status") or 500)
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            _current_queries.reset(token)
+            # The router stores the matched route on the shared scope, so the
+            # template is known here; unmatched paths share one label value.
+            route = route_template(scope)
+            method = scope.get("method") or ""
+            HTTP_REQUESTS.labels(method, route, status[0]).inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.total)
+            for verb, count in stats.by_verb.items():
+                DB_STATEMENTS.labels(route, verb).inc(count)
+# --- HTTP middleware: end ---
+
+
+# --- Scrape-time collectors: start ---
+def collect_consult_stages() -> Iterable[MetricFamily]:
+    snapshot = CONSULT_STAGE_HISTOGRAMS.snapshot()
+    bounds = [bound / 1000.0 for bound in snapshot["buckets_ms"]]
+    family = MetricFamily(
+        "pmai_consult_stage_duration_seconds", "histogram", "Consult pipeline stage latency."
+    )
+    for stage_name, item in sorted(snapshot["stages"].items()):
+        family.add_samples(histogram_samples(
+            family.name, ("stage",), (stage_name,), bounds, item["buckets"], item["sum_ms"] / 1000.0, item["count"],
+        ))
+    yield family
+
+
+def _loaded_module(name: str):
+    # Only report on modules something else already imported; scraping must not
+    # defeat lazy router loading.
+    return sys.modules.get(f"backend.{name}") or sys.modules.get(name)
+
+
+def _lru_stats(func_obj) -> Dict[str, int]:
+    info = func_obj.cache_info()
+    return {"entries": info.currsize, "hits": info.hits, "misses": info.misses}
+
+
+# (cache label, module, attribute, kind): "lru" uses cache_info(), "stats" uses stats().
+CACHE_SOURCES: Tuple[Tuple[str, str, str, str], ...] = (
+    ("companion_kb_index", "companion_animal_knowledge", "load_index", "lru"),
+    ("companion_kb", "companion_animal_knowledge", "load_companion_kb", "lru"),
+    ("exotic_kb_index", "exotic_knowledge", "load_index", "lru"),
+    ("exotic_kb", "exotic_knowledge", "load_exotic_kb", "lru"),
+    ("companion_intake_index", "companion_intake_templates", "load_intake_index", "lru"),
+    ("companion_intake_templates", "companion_intake_templates", "load_companion_intake_templates", "lru"),
+    ("exotic_intake_index", "exotic_intake_templates", "load_intake_index", "lru"),
+    ("exotic_intake_templates", "exotic_intake_templates", "load_intake_templates", "lru"),
+    ("preventive_care_rules", "preventive_care_rules", "_cached_rules", "lru"),
+    ("clinical_doc_template", "clinical_docs_api", "CLINICAL_DOC_TEMPLATE_CACHE", "stats"),
+    ("automated_reminder_template", "automated_reminder_templates", "REMINDER_TEMPLATE_CACHE", "stats"),
+)
+
+
+def collect_caches() -> Iterable[MetricFamily]:
+    # Gauges, not counters: cache_clear() / clear() reset these to zero, which
+    # rate() would read as a counter reset.
+    hits = MetricFamily("pmai_cache_hits", "gauge", "Cache hits since process start or last clear.")
+    misses = MetricFamily("pmai_cache_misses", "gauge", "Cache misses since process start or last clear.")
+    entries = MetricFamily("pmai_cache_entries", "gauge", "Entries currently cached.")
+    ratio = MetricFamily("pmai_cache_hit_ratio", "gauge", "Hits / (hits + misses) since process start or last clear.")
+    for label, module_name, attribute, kind in CACHE_SOURCES:
+        module = _loaded_module(module_name)
+        source = getattr(module, attribute, None) if module is not None else None
+        if source is None:
+            continue
+        stats = _lru_stats(source) if kind == "lru" else source.stats()
+        labels = {"cache": label}
+        lookups = stats["hits"] + stats["misses"]
+        hits.add(labels, stats["hits"])
+        misses.add(labels, stats["misses"])
+        entries.add(labels, stats["entries"])
+        ratio.add(labels, stats["hits"] / lookups if lookups else 0.0)
+    return [hits, misses, entries, ratio]
+
+
+_webhook_depth_cache: Dict[str, Any] = {"at": None, "rows": []}
+_webhook_depth_lock = threading.Lock()
+
+
+def _webhook_inbox_depth() -> List[Tuple[str, int]]:
+    now = time.monotonic()
+    with _webhook_depth_lock:
+        # An empty inbox is a valid cached answer too.
+        if _webhook_depth_cache["at"] is not None and now - _webhook_depth_cache["at"] < METRICS_DB_GAUGE_TTL_SECONDS:
+            return _webhook_depth_cache["rows"]
+    db = SessionLocal()
+    try:
+        rows = [
+            (str(status), int(count))
+            for status, count in db.query(WebhookInbox.status, func.count()).group_by(WebhookInbox.status).all()
+        ]
+    finally:
+        db.close()
+    with _webhook_depth_lock:
+        _webhook_depth_cache.update(at=now, rows=rows)
+    return rows
+
+
+def collect_webhook_inbox() -> Iterable[MetricFamily]:
+    family = MetricFamily("pmai_webhook_inbox_receipts", "gauge", "Webhook inbox receipts by status.")
+    for status, count in sorted(_webhook_inbox_depth()):
+        family.add({"status": status}, count)
+    yield family
+
+
+REGISTRY.register_collector("consult_stages", collect_consult_stages)
+REGISTRY.register_collector("caches", collect_caches)
+REGISTRY.register_collector("webhook_inbox", collect_webhook_inbox)
+# --- Scrape-time collectors: end ---
+
+
+router = APIRouter(tags=["system"])
+
+
+def _check_token(request: Request) -> None:
+    if not METRICS_TOKEN:
+        return
+    header = request.headers.get("authorization") or ""
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip(), METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="metrics token required")
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    _check_token(request)
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
@@ -7,6 +7,7 @@ try:
     from backend.companion_animal_knowledge import companion_knowledge_tree_leaf
     from backend.exotic_intake_templates import build_structured_intake
     from backend.companion_intake_templates import build_companion_structured_intake
+    from backend.consult_timing import stage
 except ModuleNotFoundError:
     from feature_engine import extract_features
     from risk_engine import evaluate
@@ -16,6 +17,7 @@ except ModuleNotFoundError:
     from companion_animal_knowledge import companion_knowledge_tree_leaf
     from exotic_intake_templates import build_structured_intake
     from companion_intake_templates import build_companion_structured_intake
+    from consult_timing import stage
 
 
 def _system_path(features):
@@ -38,22 +40,28 @@ def _system_path(features):
 
 
 def run_agent(text: str):
-    features = extract_features(text)
+    with stage("extract_features"):
+        features = extract_features(text)
     species_context = features.get("species_context") or {}
 
-    risk = evaluate(features)
+    with stage("evaluate"):
+        risk = evaluate(features)
 
-    tree_path = [
-        species_context.get("label") or "未知物种",
-        species_context.get("group_label") or species_context.get("group") or "未分组",
-        _system_path(features),
-    ]
+    with stage("tree_path"):
+        tree_path = [
+            species_context.get("label") or "未知物种",
+            species_context.get("group_label") or species_context.get("group") or "未分组",
+            _system_path(features),
+        ]
 
-    questions = generate(tree_path, features)
+    with stage("generate"):
+        questions = generate(tree_path, features)
 
-    diseases = rank(features, tree_path)
+    with stage("rank"):
+        diseases = rank(features, tree_path)
     actions = diseases.get("actions") or ["建议进一步检查血常规、生化、影像学"]
-    structured_intake = build_companion_structured_intake(features) or build_structured_intake(features)
+    with stage("structured_intake"):
+        structured_intake = build_companion_structured_intake(features) or build_structured_intake(features)
 
     return {
         "risk_level": risk,
@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 try:
     from backend.auth_jwt import get_current_user
     from backend.db import get_db
+    from backend.feature_flags import assert_feature_enabled
     from backend.models import (
         Case,
         PreventiveCareClientPreference,
@@ -24,9 +25,11 @@ try:
         compute_preventive_care_reminders,
         load_preventive_care_rules,
     )
+    from backend.preventive_care_sweep import SWEEP_WRITE_FEATURE_FLAG, run_preventive_care_sweep
 except ModuleNotFoundError:
     from auth_jwt import get_current_user
     from db import get_db
+    from feature_flags import assert_feature_enabled
     from models import (
         Case,
         PreventiveCareClientPreference,
@@ -38,6 +41,7 @@ except ModuleNotFoundError:
         compute_preventive_care_reminders,
         load_preventive_care_rules,
     )
+    from preventive_care_sweep import SWEEP_WRITE_FEATURE_FLAG, run_preventive_care_sweep
 
 
 router = APIRouter(prefix="/api/preventive-care", tags=["preventive-care"])
@@ -50,6 +54,12 @@ class PreventiveCareDryRunIn(BaseModel):
     include_active: bool = True
 
 
+class PreventiveCareSweepIn(BaseModel):
+    as_of_date: Optional[str] = None
+    dry_run: bool = True
+    include_active: bool = False
+
+
 class PreventiveCareReminderCreateIn(BaseModel):
     case_id: Optional[int] = Field(default=None, ge=1)
     pet_id: Optional[str] = Field(default=None, max_length=64)
@@ -283,6 +293,23 @@ def preventive_care_dry_run(
     return report
 
 
+@router.post("/sweep", response_model=dict)
+def preventive_care_sweep(
+    data: PreventiveCareSweepIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    if not data.dry_run:
+        assert_feature_enabled(SWEEP_WRITE_FEATURE_FLAG)
+    return run_preventive_care_sweep(
+        db,
+        as_of=data.as_of_date,
+        owner_id=_user_id(user),
+        dry_run=data.dry_run,
+        include_active=data.include_active,
+    )
+
+
 @router.get("/reminders", response_model=dict)
 def list_preventive_care_reminders(
     status: Optional[str] = None,
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from fastapi import APIRouter, Depends
+from sqlalchemy import case, func, or_
 from sqlalchemy.orm import Session
 
 try:
@@ -34,18 +38,152 @@ def _user_id(user) -> int:
     return int(getattr(user, "id"))
 
 
-def _count_by(items: List[Any], attr: str) -> Dict[str, int]:
-    result: Dict[str, int] = {}
-    for item in items:
-        key = str(getattr(item, attr, None) or "unknown")
-        result[key] = result.get(key, 0) + 1
-    return dict(sorted(result.items()))
+CLOSED_REMINDER_STATUSES = ("completed", "dismissed", "disabled")
+QUEUE_REVIEW_STATUSES = ("draft", "review_required")
+SAMPLE_LIMIT = 5
+
+# Optional per-owner summary cache; 0 (default) disables it.
+OPS_SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("PREVENTIVE_CARE_OPS_SUMMARY_CACHE_TTL_SECONDS", "0"))
+_SUMMARY_CACHE: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_SUMMARY_CACHE_LOCK = threading.Lock()
+
+
+def clear_ops_summary_cache() -> None:
+    with _SUMMARY_CACHE_LOCK:
+        _SUMMARY_CACHE.clear()
+
+
+def _add_count(result: Dict[str, int], key: Any, count: int) -> None:
+    name = str(key or "unknown")
+    result[name] = result.get(name, 0) + int(count or 0)
 
 
 def _iso(value) -> str | None:
     return value.isoformat() if value else None
 
 
+def _sample_ids(query, column, order_by) -> List[str]:
+    return [row[0] for row in query.with_entities(column).order_by(*order_by).limit(SAMPLE_LIMIT).all()]
+
+
+def _reminder_summary(db: Session, owner_id: int, today_start: datetime, tomorrow_start: datetime) -> Dict[str, Any]:
+    base = db.query(PreventiveCareReminder).filter(PreventiveCareReminder.owner_id == owner_id)
+
+    by_status: Dict[str, int] = {}
+    by_category: Dict[str, int] = {}
+    rows = (
+        base.with_entities(PreventiveCareReminder.status, PreventiveCareReminder.category, func.count())
+        .group_by(PreventiveCareReminder.status, PreventiveCareReminder.category)
+        .all()
+    )
+    for status, category, count in rows:
+        _add_count(by_status, status, count)
+        _add_count(by_category, category, count)
+
+    due_today_q = base.filter(
+        PreventiveCareReminder.due_date >= today_start,
+        PreventiveCareReminder.due_date < tomorrow_start,
+    )
+    overdue_q = base.filter(
+        PreventiveCareReminder.due_date < today_start,
+        PreventiveCareReminder.status.notin_(CLOSED_REMINDER_STATUSES),
+    )
+    total = sum(by_status.values())
+    closed = sum(by_status.get(status, 0) for status in CLOSED_REMINDER_STATUSES)
+    return {
+        "total": total,
+        "open": total - closed,
+        "due_today": due_today_q.with_entities(func.count()).scalar() or 0,
+        "due_soon": by_status.get("due_soon", 0),
+        "overdue": overdue_q.with_entities(func.count()).scalar() or 0,
+        "by_status": dict(sorted(by_status.items())),
+        "by_category": dict(sorted(by_category.items())),
+        "overdue_ids": _sample_ids(
+            overdue_q,
+            PreventiveCareReminder.reminder_id,
+            (PreventiveCareReminder.due_date, PreventiveCareReminder.reminder_id),
+        ),
+    }
+
+
+def _queue_summary(db: Session, owner_id: int) -> Dict[str, Any]:
+    Queue = PreventiveCareNotificationQueue
+    base = db.query(Queue).filter(Queue.owner_id == owner_id)
+    needs_review = or_(Queue.status.in_(QUEUE_REVIEW_STATUSES), Queue.manual_review_required.is_(True))
+    blocked_opt_out = or_(Queue.status == "blocked_opt_out", Queue.client_opt_out_snapshot.is_(True))
+
+    by_status: Dict[str, int] = {}
+    by_channel: Dict[str, int] = {}
+    needs_review_count = 0
+    blocked_count = 0
+    rows = (
+        base.with_entities(
+            Queue.status,
+            Queue.channel,
+            Queue.manual_review_required,
+            Queue.client_opt_out_snapshot,
+            func.count(),
+        )
+        .group_by(Queue.status, Queue.channel, Queue.manual_review_required, Queue.client_opt_out_snapshot)
+        .all()
+    )
+    for status, channel, manual_review, opt_out_snapshot, count in rows:
+        _add_count(by_status, status, count)
+        _add_count(by_channel, channel, count)
+        if status in QUEUE_REVIEW_STATUSES or manual_review:
+            needs_review_count += count
+        if status == "blocked_opt_out" or opt_out_snapshot:
+            blocked_count += count
+
+    order = (Queue.created_at, Queue.notification_id)
+    return {
+        "total": sum(by_status.values()),
+        "needs_review": needs_review_count,
+        "blocked_opt_out": blocked_count,
+        "contacted_manually": by_status.get("contacted_manually", 0),
+        "by_status": dict(sorted(by_status.items())),
+        "by_channel": dict(sorted(by_channel.items())),
+        "needs_review_ids": _sample_ids(base.filter(needs_review), Queue.notification_id, order),
+        "blocked_opt_out_ids": _sample_ids(base.filter(blocked_opt_out), Queue.notification_id, order),
+    }
+
+
+def _preference_summary(db: Session, owner_id: int) -> Dict[str, int]:
+    Pref = PreventiveCareClientPreference
+
+    def flag(column):
+        return func.coalesce(func.sum(case((column.is_(True), 1), else_=0)), 0)
+
+    total, opt_out_all, allow_sms, allow_wechat, allow_email = (
+        db.query(func.count(Pref.id), flag(Pref.opt_out_all), flag(Pref.allow_sms), flag(Pref.allow_wechat), flag(Pref.allow_email))
+        .filter(Pref.owner_id == owner_id)
+        .one()
+    )
+    return {
+        "total": int(total or 0),
+        "opt_out_all": int(opt_out_all),
+        "allow_sms": int(allow_sms),
+        "allow_wechat": int(allow_wechat),
+        "allow_email": int(allow_email),
+    }
+
+
+def _event_summary(db: Session, owner_id: int, since: datetime) -> Dict[str, Any]:
+    by_type: Dict[str, int] = {}
+    rows = (
+        db.query(PreventiveCareEvent.event_type, func.count())
+        .filter(PreventiveCareEvent.owner_id == owner_id, PreventiveCareEvent.created_at >= since)
+        .group_by(PreventiveCareEvent.event_type)
+        .all()
+    )
+    for event_type, count in rows:
+        _add_count(by_type, event_type, count)
+    return {
+        "recent_30d_total": sum(by_type.values()),
+        "recent_30d_by_type": dict(sorted(by_type.items())),
+    }
+
+
 @router.get("/summary", response_model=dict)
 def preventive_care_ops_summary(
     db: Session = Depends(get_db),
@@ -58,68 +196,35 @@ def preventive_care_ops_summary(
     Does not create reminders, send messages, or mutate Case records.
     """
     owner_id = _user_id(user)
+    if OPS_SUMMARY_CACHE_TTL_SECONDS > 0:
+        with _SUMMARY_CACHE_LOCK:
+            cached = _SUMMARY_CACHE.get(owner_id)
+        if cached and cached[0] > time.monotonic():
+            return {**cached[1], "cache": {"hit": True, "ttl_seconds": OPS_SUMMARY_CACHE_TTL_SECONDS}}
+
+    summary = _build_ops_summary(db, owner_id)
+    if OPS_SUMMARY_CACHE_TTL_SECONDS > 0:
+        with _SUMMARY_CACHE_LOCK:
+            _SUMMARY_CACHE[owner_id] = (time.monotonic() + OPS_SUMMARY_CACHE_TTL_SECONDS, summary)
+    return {**summary, "cache": {"hit": False, "ttl_seconds": OPS_SUMMARY_CACHE_TTL_SECONDS}}
+
+
+def _build_ops_summary(db: Session, owner_id: int) -> Dict[str, Any]:
     now = datetime.utcnow()
     today_start = datetime(now.year, now.month, now.day)
     tomorrow_start = today_start + timedelta(days=1)
 
-    reminders = (
-        db.query(PreventiveCareReminder)
-        .filter(PreventiveCareReminder.owner_id == owner_id)
-        .all()
-    )
-    queue_items = (
-        db.query(PreventiveCareNotificationQueue)
-        .filter(PreventiveCareNotificationQueue.owner_id == owner_id)
-        .all()
-    )
-    prefs = (
-        db.query(PreventiveCareClientPreference)
-        .filter(PreventiveCareClientPreference.owner_id == owner_id)
-        .all()
-    )
-    recent_events = (
-        db.query(PreventiveCareEvent)
-        .filter(
-            PreventiveCareEvent.owner_id == owner_id,
-            PreventiveCareEvent.created_at >= now - timedelta(days=30),
-        )
-        .all()
-    )
-
-    due_today = [
-        item for item in reminders
-        if item.due_date and today_start <= item.due_date < tomorrow_start
-    ]
-    overdue = [
-        item for item in reminders
-        if item.due_date and item.due_date < today_start and item.status not in {"completed", "dismissed", "disabled"}
-    ]
-    due_soon = [
-        item for item in reminders
-        if item.status == "due_soon"
-    ]
-    open_reminders = [
-        item for item in reminders
-        if item.status not in {"completed", "dismissed", "disabled"}
-    ]
-    queue_needs_review = [
-        item for item in queue_items
-        if item.status in {"draft", "review_required"} or item.manual_review_required
-    ]
-    queue_blocked_opt_out = [
-        item for item in queue_items
-        if item.status == "blocked_opt_out" or item.client_opt_out_snapshot
-    ]
-    queue_contacted = [
-        item for item in queue_items
-        if item.status == "contacted_manually"
-    ]
+    reminders = _reminder_summary(db, owner_id, today_start, tomorrow_start)
+    queue = _queue_summary(db, owner_id)
+    overdue_ids = reminders.pop("overdue_ids")
+    needs_review_ids = queue.pop("needs_review_ids")
+    blocked_opt_out_ids = queue.pop("blocked_opt_out_ids")
 
     attention_count = (
-        len(overdue)
-        + len(due_today)
-        + len(queue_needs_review)
-        + len(queue_blocked_opt_out)
+        reminders["overdue"]
+        + reminders["due_today"]
+        + queue["needs_review"]
+        + queue["blocked_opt_out"]
     )
 
     return {
@@ -127,48 +232,24 @@ def preventive_care_ops_summary(
         "mode": "preventive_care_reminder_ops_dashboard_v1",
         "owner_id": owner_id,
         "generated_at": now.isoformat() + "Z",
-        "reminders": {
-            "total": len(reminders),
-            "open": len(open_reminders),
-            "due_today": len(due_today),
-            "due_soon": len(due_soon),
-            "overdue": len(overdue),
-            "by_status": _count_by(reminders, "status"),
-            "by_category": _count_by(reminders, "category"),
-        },
-        "notification_queue": {
-            "total": len(queue_items),
-            "needs_review": len(queue_needs_review),
-            "blocked_opt_out": len(queue_blocked_opt_out),
-            "contacted_manually": len(queue_contacted),
-            "by_status": _count_by(queue_items, "status"),
-            "by_channel": _count_by(queue_items, "channel"),
-        },
-        "client_preferences": {
-            "total": len(prefs),
-            "opt_out_all": sum(1 for item in prefs if item.opt_out_all),
-            "allow_sms": sum(1 for item in prefs if item.allow_sms),
-            "allow_wechat": sum(1 for item in prefs if item.allow_wechat),
-            "allow_email": sum(1 for item in prefs if item.allow_email),
-        },
-        "events": {
-            "recent_30d_total": len(recent_events),
-            "recent_30d_by_type": _count_by(recent_events, "event_type"),
-        },
+        "reminders": reminders,
+        "notification_queue": queue,
+        "client_preferences": _preference_summary(db, owner_id),
+        "events": _event_summary(db, owner_id, now - timedelta(days=30)),
         "attention": {
             "count": attention_count,
             "needs_attention": attention_count > 0,
             "reasons": {
-                "overdue_reminders": len(overdue),
-                "due_today_reminders": len(due_today),
-                "queue_needs_review": len(queue_needs_review),
-                "queue_blocked_opt_out": len(queue_blocked_opt_out),
+                "overdue_reminders": reminders["overdue"],
+                "due_today_reminders": reminders["due_today"],
+                "queue_needs_review": queue["needs_review"],
+                "queue_blocked_opt_out": queue["blocked_opt_out"],
             },
         },
         "latest": {
-            "overdue_reminder_ids": [item.reminder_id for item in overdue[:5]],
-            "queue_needs_review_ids": [item.notification_id for item in queue_needs_review[:5]],
-            "queue_blocked_opt_out_ids": [item.notification_id for item in queue_blocked_opt_out[:5]],
+            "overdue_reminder_ids": overdue_ids,
+            "queue_needs_review_ids": needs_review_ids,
+            "queue_blocked_opt_out_ids": blocked_opt_out_ids,
         },
         "safety": {
             "read_only": True,
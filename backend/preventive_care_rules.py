@@ -4,8 +4,9 @@ from __future__ import annotations
 import csv
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 
 STATUS_DRAFT = "draft"
@@ -71,8 +72,7 @@ def parse_int(value: Any) -> Optional[int]:
         return None
 
 
-def load_preventive_care_rules(path: Path | str = DEFAULT_RULES_PATH) -> List[PreventiveCareRule]:
-    csv_path = Path(path)
+def _parse_rules_csv(csv_path: Path) -> List[PreventiveCareRule]:
     rows = list(csv.DictReader(csv_path.read_text(encoding="utf-8").splitlines()))
     rules: List[PreventiveCareRule] = []
     for row in rows:
@@ -97,6 +97,22 @@ def load_preventive_care_rules(path: Path | str = DEFAULT_RULES_PATH) -> List[Pr
     return [rule for rule in rules if rule.rule_id]
 
 
+@lru_cache(maxsize=8)
+def _cached_rules(path: str, mtime_ns: int, size: int) -> Tuple[PreventiveCareRule, ...]:
+    return tuple(_parse_rules_csv(Path(path)))
+
+
+def load_preventive_care_rules(path: Path | str = DEFAULT_RULES_PATH) -> List[PreventiveCareRule]:
+    # Parsed rules are cached per (path, mtime, size); editing the CSV invalidates the entry.
+    csv_path = Path(path).resolve()
+    stat = csv_path.stat()
+    return list(_cached_rules(str(csv_path), stat.st_mtime_ns, stat.st_size))
+
+
+def reload_preventive_care_rules() -> None:
+    _cached_rules.cache_clear()
+
+
 def normalize_species(value: Any) -> str:
     text = str(value or "").strip().lower()
     if text in {"dog", "canine", "犬", "狗"}:
@@ -138,6 +154,29 @@ def life_stage_matches(rule_life_stage: str, pet_life_stage: str) -> bool:
     return rule == pet
 
 
+class PreventiveCareRuleIndex:
+    """Rules grouped by normalized (species, life_stage), resolved once per pair."""
+
+    def __init__(self, rules: Iterable[PreventiveCareRule]):
+        self.rules: Tuple[PreventiveCareRule, ...] = tuple(rules)
+        self._by_key: Dict[Tuple[str, str], Tuple[PreventiveCareRule, ...]] = {}
+
+    def rules_for(self, species: Any, life_stage: Any) -> Tuple[PreventiveCareRule, ...]:
+        key = (normalize_species(species), normalize_life_stage(life_stage))
+        matched = self._by_key.get(key)
+        if matched is None:
+            matched = tuple(
+                rule
+                for rule in self.rules
+                if species_matches(rule.species, key[0]) and life_stage_matches(rule.life_stage, key[1])
+            )
+            self._by_key[key] = matched
+        return matched
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
 def trigger_date_for_rule(pet: Dict[str, Any], rule: PreventiveCareRule) -> Optional[date]:
     trigger = rule.trigger_basis
     if trigger in pet:
@@ -166,6 +205,22 @@ def status_for_due_window(as_of: date, due_date: date, due_window_start: date, d
     return STATUS_ACTIVE
 
 
+def due_window_for_rule(
+    rule: PreventiveCareRule,
+    last_date: Optional[date],
+    as_of_date: date,
+) -> Tuple[date, date, date, str, str]:
+    if last_date is None:
+        due_window_end = as_of_date + timedelta(days=max(rule.due_window_days, 0))
+        return as_of_date, as_of_date, due_window_end, STATUS_DUE, "missing_trigger_date"
+
+    due_date = last_date + timedelta(days=rule.interval_days or 0)
+    due_window_start = due_date - timedelta(days=max(rule.lead_days, 0))
+    due_window_end = due_date + timedelta(days=max(rule.due_window_days, 0))
+    status = status_for_due_window(as_of_date, due_date, due_window_start, due_window_end)
+    return due_date, due_window_start, due_window_end, status, "computed_from_last_event"
+
+
 def reminder_preview_for_rule(
     *,
     pet: Dict[str, Any],
@@ -174,20 +229,7 @@ def reminder_preview_for_rule(
 ) -> Dict[str, Any]:
     last_date = trigger_date_for_rule(pet, rule)
     missing_trigger = last_date is None
-
-    if missing_trigger:
-        due_date = as_of_date
-        due_window_start = as_of_date
-        due_window_end = as_of_date + timedelta(days=max(rule.due_window_days, 0))
-        status = STATUS_DUE
-        reason = "missing_trigger_date"
-    else:
-        interval = rule.interval_days or 0
-        due_date = last_date + timedelta(days=interval)
-        due_window_start = due_date - timedelta(days=max(rule.lead_days, 0))
-        due_window_end = due_date + timedelta(days=max(rule.due_window_days, 0))
-        status = status_for_due_window(as_of_date, due_date, due_window_start, due_window_end)
-        reason = "computed_from_last_event"
+    due_date, due_window_start, due_window_end, status, reason = due_window_for_rule(rule, last_date, as_of_date)
 
     return {
         "message": "preventive_care_reminder_preview",
@@ -232,14 +274,10 @@ def compute_preventive_care_reminders(
     as_of_date = parse_date(as_of) or date.today()
     pet_species = normalize_species(pet.get("species"))
     pet_stage = normalize_life_stage(pet.get("life_stage"))
-    active_rules = list(rules or load_preventive_care_rules())
+    index = PreventiveCareRuleIndex(rules or load_preventive_care_rules())
 
     previews = []
-    for rule in active_rules:
-        if not species_matches(rule.species, pet_species):
-            continue
-        if not life_stage_matches(rule.life_stage, pet_stage):
-            continue
+    for rule in index.rules_for(pet_species, pet_stage):
         preview = reminder_preview_for_rule(pet=pet, rule=rule, as_of_date=as_of_date)
         if include_active or preview["status"] != STATUS_ACTIVE:
             previews.append(preview)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+try:
+    from backend.feature_flags import is_feature_enabled
+    from backend.models import (
+        Case,
+        PreventiveCareClientPreference,
+        PreventiveCareEvent,
+        PreventiveCareReminder,
+    )
+    from backend.preventive_care_rules import (
+        DEFAULT_RULES_PATH,
+        STATUS_ACTIVE,
+        STATUS_DRAFT,
+        STATUS_DUE,
+        STATUS_DUE_SOON,
+        STATUS_OVERDUE,
+        PreventiveCareRuleIndex,
+        due_window_for_rule,
+        load_preventive_care_rules,
+        normalize_life_stage,
+        normalize_species,
+        parse_date,
+    )
+except ModuleNotFoundError:
+    from feature_flags import is_feature_enabled
+    from models import (
+        Case,
+        PreventiveCareClientPreference,
+        PreventiveCareEvent,
+        PreventiveCareReminder,
+    )
+    from preventive_care_rules import (
+        DEFAULT_RULES_PATH,
+        STATUS_ACTIVE,
+        STATUS_DRAFT,
+        STATUS_DUE,
+        STATUS_DUE_SOON,
+        STATUS_OVERDUE,
+        PreventiveCareRuleIndex,
+        due_window_for_rule,
+        load_preventive_care_rules,
+        normalize_life_stage,
+        normalize_species,
+        parse_date,
+    )
+
+
+SWEEP_MODE = "preventive_care_reminder_sweep_v1"
+SWEEP_WRITE_FEATURE_FLAG = "ENABLE_PREVENTIVE_CARE_SWEEP_WRITE"
+SWEEP_CHUNK_SIZE = int(os.getenv("PREVENTIVE_CARE_SWEEP_CHUNK_SIZE", "500"))
+SWEEP_REPORT_ITEM_LIMIT = 200
+DEFAULT_LIFE_STAGE = "adult"
+
+# Reminders the sweep may refresh in place. Snoozed/dismissed/disabled rows and
+# clinician overrides are staff decisions and are never touched; completed rows
+# close a cycle, so the next cycle gets a new reminder.
+OPEN_REMINDER_STATUSES = frozenset({STATUS_DRAFT, STATUS_ACTIVE, STATUS_DUE_SOON, STATUS_DUE, STATUS_OVERDUE})
+CLOSED_REMINDER_STATUSES = frozenset({"completed"})
+
+ACTION_CREATE = "create"
+ACTION_UPDATE = "update"
+ACTION_UNCHANGED = "unchanged"
+ACTION_SKIP_EXISTING = "skip_existing_staff_decision"
+ACTION_SKIP_OPT_OUT = "skip_client_opt_out"
+
+
+def _as_datetime(value: date) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def iter_case_chunks(
+    db: Session,
+    *,
+    owner_id: Optional[int] = None,
+    chunk_size: int = SWEEP_CHUNK_SIZE,
+) -> Iterator[List[Tuple[int, int, str, str]]]:
+    """Keyset-paginate live cases as (id, owner_id, patient_name, species) rows."""
+    last_id = 0
+    while True:
+        q = (
+            db.query(Case.id, Case.owner_id, Case.patient_name, Case.species)
+            .filter(Case.deleted_at.is_(None), Case.id > last_id)
+        )
+        if owner_id is not None:
+            q = q.filter(Case.owner_id == int(owner_id))
+        rows = [tuple(row) for row in q.order_by(Case.id).limit(chunk_size).all()]
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _last_event_dates(db: Session, case_ids: Sequence[int]) -> Dict[Tuple[int, str], date]:
+    """Latest event date per (case_id, category).
+
+    Category is the clinical act (a core vaccine, a deworming, a fecal exam) and
+    is what PreventiveCareEvent records; trigger_basis only names the pet-payload
+    field the single-pet dry-run reads for that act. Within one species and life
+    stage every rule has its own category, so the key picks exactly one rule.
+    Rules sharing a category across life stages (juvenile/adult deworming) must
+    see the same last deworming, which a trigger_basis key would split.
+    """
+    rows = (
+        db.query(PreventiveCareEvent.case_id, PreventiveCareEvent.category, func.max(PreventiveCareEvent.event_date))
+        .filter(
+            PreventiveCareEvent.case_id.in_(case_ids),
+            PreventiveCareEvent.category.isnot(None),
+            PreventiveCareEvent.event_date.isnot(None),
+        )
+        .group_by(PreventiveCareEvent.case_id, PreventiveCareEvent.category)
+        .all()
+    )
+    out: Dict[Tuple[int, str], date] = {}
+    for case_id, category, event_date in rows:
+        parsed = parse_date(event_date)
+        if parsed is not None:
+            out[(int(case_id), str(category))] = parsed
+    return out
+
+
+def _existing_reminders(db: Session, case_ids: Sequence[int]) -> Dict[Tuple[int, str], List[PreventiveCareReminder]]:
+    rows = (
+        db.query(PreventiveCareReminder)
+        .filter(
+            PreventiveCareReminder.case_id.in_(case_ids),
+            PreventiveCareReminder.source_rule_id.isnot(None),
+        )
+        .all()
+    )
+    out: Dict[Tuple[int, str], List[PreventiveCareReminder]] = {}
+    for reminder in rows:
+        out.setdefault((int(reminder.case_id), reminder.source_rule_id), []).append(reminder)
+    return out
+
+
+def _opted_out_owners(db: Session, owner_ids: Sequence[int]) -> set:
+    rows = (
+        db.query(PreventiveCareClientPreference.owner_id)
+        .filter(
+            PreventiveCareClientPreference.owner_id.in_(owner_ids),
+            PreventiveCareClientPreference.opt_out_all.is_(True),
+        )
+        .all()
+    )
+    return {int(row[0]) for row in rows}
+
+
+def _classify(existing: List[PreventiveCareReminder], due_date: datetime) -> Tuple[str, Optional[PreventiveCareReminder]]:
+    open_rows = [item for item in existing if item.status in OPEN_REMINDER_STATUSES]
+    held_rows = [
+        item for item in existing
+        if item.status not in OPEN_REMINDER_STATUSES and item.status not in CLOSED_REMINDER_STATUSES
+    ]
+    if held_rows or any(item.clinician_override or item.client_opt_out for item in open_rows):
+        return ACTION_SKIP_EXISTING, None
+    if open_rows:
+        current = max(open_rows, key=lambda item: item.updated_at or item.created_at or datetime.min)
+        return ACTION_UPDATE, current
+    completed_due = [item.due_date for item in existing if item.due_date is not None]
+    if completed_due and max(completed_due) >= due_date:
+        # The completed reminder already covered this due date.
+        return ACTION_UNCHANGED, None
+    return ACTION_CREATE, None
+
+
+def run_preventive_care_sweep(
+    db: Session,
+    *,
+    as_of: str | date | datetime | None = None,
+    owner_id: Optional[int] = None,
+    dry_run: bool = True,
+    include_active: bool = False,
+    chunk_size: int = SWEEP_CHUNK_SIZE,
+    rules_path: Optional[str | Path] = None,
+    report_item_limit: int = SWEEP_REPORT_ITEM_LIMIT,
+) -> Dict[str, Any]:
+    """Evaluate preventive-care rules for every live case and upsert reminders in bulk."""
+    if not dry_run and not is_feature_enabled(SWEEP_WRITE_FEATURE_FLAG):
+        raise PermissionError(f"{SWEEP_WRITE_FEATURE_FLAG} is disabled; run without --apply for a dry-run")
+    as_of_date = parse_date(as_of) or date.today()
+    index = PreventiveCareRuleIndex(load_preventive_care_rules(rules_path or DEFAULT_RULES_PATH))
+    now = datetime.utcnow()
+
+    by_action: Dict[str, int] = {}
+    by_status: Dict[str, int] = {}
+    items: List[Dict[str, Any]] = []
+    cases_scanned = 0
+    chunks = 0
+
+    for chunk in iter_case_chunks(db, owner_id=owner_id, chunk_size=max(int(chunk_size), 1)):
+        chunks += 1
+        cases_scanned += len(chunk)
+        case_ids = [row[0] for row in chunk]
+        last_events = _last_event_dates(db, case_ids)
+        existing = _existing_reminders(db, case_ids)
+        opted_out = _opted_out_owners(db, sorted({int(row[1]) for row in chunk}))
+
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+
+        for case_id, case_owner_id, patient_name, species in chunk:
+            pet_species = normalize_species(species)
+            for rule in index.rules_for(pet_species, DEFAULT_LIFE_STAGE):
+                last_date = last_events.get((case_id, rule.category))
+                due, window_start, window_end, status, reason = due_window_for_rule(rule, last_date, as_of_date)
+                if not include_active and status == STATUS_ACTIVE:
+                    continue
+
+                due_dt = _as_datetime(due)
+                if int(case_owner_id) in opted_out:
+                    action, current = ACTION_SKIP_OPT_OUT, None
+                else:
+                    action, current = _classify(existing.get((case_id, rule.rule_id), []), due_dt)
+
+                values = {
+                    "status": status,
+                    "due_date": due_dt,
+                    "due_window_start": _as_datetime(window_start),
+                    "due_window_end": _as_datetime(window_end),
+                    "reminder_lead_days": rule.lead_days,
+                }
+                if action == ACTION_UPDATE:
+                    # Without a recorded event the due date is "as of the first sweep"; keep it stable.
+                    if reason == "missing_trigger_date" or all(getattr(current, key) == value for key, value in values.items()):
+                        action = ACTION_UNCHANGED
+                    else:
+                        updates.append({"reminder_id": current.reminder_id, "updated_at": now, **values})
+                elif action == ACTION_CREATE:
+                    inserts.append({
+                        "reminder_id": f"pcr_{uuid4().hex}",
+                        "owner_id": int(case_owner_id),
+                        "case_id": case_id,
+                        "pet_name": patient_name,
+                        "species": pet_species,
+                        "category": rule.category,
+                        "source_rule_id": rule.rule_id,
+                        "clinician_override": False,
+                        "client_opt_out": False,
+                        "channel_preference": "in_app",
+                        "extra_data": {"source": SWEEP_MODE, "reason": reason, "as_of_date": as_of_date.isoformat()},
+                        "created_at": now,
+                        "updated_at": now,
+                        **values,
+                    })
+
+                by_action[action] = by_action.get(action, 0) + 1
+                by_status[status] = by_status.get(status, 0) + 1
+                if len(items) < report_item_limit:
+                    items.append({
+                        "case_id": case_id,
+                        "owner_id": int(case_owner_id),
+                        "pet_name": patient_name,
+                        "species": pet_species,
+                        "rule_id": rule.rule_id,
+                        "category": rule.category,
+                        "status": status,
+                        "reason": reason,
+                        "due_date": due.isoformat(),
+                        "due_window_start": window_start.isoformat(),
+                        "due_window_end": window_end.isoformat(),
+                        "action": action,
+                    })
+
+        if not dry_run and (inserts or updates):
+            if inserts:
+                db.bulk_insert_mappings(PreventiveCareReminder, inserts)
+            if updates:
+                db.bulk_update_mappings(PreventiveCareReminder, updates)
+            db.commit()
+        # Drop per-chunk ORM state so memory stays flat across the sweep.
+        db.expunge_all()
+
+    writes = not dry_run and bool(by_action.get(ACTION_CREATE) or by_action.get(ACTION_UPDATE))
+    return {
+        "message": "preventive_care_reminder_sweep_dry_run" if dry_run else "preventive_care_reminder_sweep",
+        "mode": SWEEP_MODE,
+        "as_of_date": as_of_date.isoformat(),
+        "dry_run": dry_run,
+        "owner_id": owner_id,
+        "life_stage": normalize_life_stage(DEFAULT_LIFE_STAGE),
+        "rule_count": len(index),
+        "summary": {
+            "cases_scanned": cases_scanned,
+            "chunks": chunks,
+            "evaluated": sum(by_action.values()),
+            "by_action": by_action,
+            "by_status": by_status,
+        },
+        "items": items,
+        "items_truncated": sum(by_action.values()) > len(items),
+        "writes_database": writes,
+        "writes_preventive_care_reminders": writes,
+        "creates_case": False,
+        "updates_case": False,
+        "sends_external_message": False,
+        "executes_real_import": False,
+    }
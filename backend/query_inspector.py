@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in SQL inspector for development and tests.
+
+Attached to an engine it fingerprints every statement (literals and bind
+lists collapsed), counts statements per request, flags repeated shapes
+(N+1 loops) and keeps the slowest statements, with EXPLAIN plans when
+``QUERY_INSPECTOR_EXPLAIN`` is on. Threshold breaches are logged, or raised
+as ``QueryBudgetExceeded`` with ``QUERY_INSPECTOR_ACTION=raise``.
+
+``assert_max_queries`` is the test helper::
+
+    with assert_max_queries(4, engine=engine):
+        client.get("/api/webhooks/inbox")
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+
+logger = logging.getLogger("pmai.query_inspector")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+QUERY_INSPECTOR_ENABLED = _env_flag("QUERY_INSPECTOR_ENABLED", False)
+QUERY_INSPECTOR_ACTION = os.getenv("QUERY_INSPECTOR_ACTION", "log").strip().lower()
+QUERY_INSPECTOR_MAX_STATEMENTS = int(os.getenv("QUERY_INSPECTOR_MAX_STATEMENTS", "50"))
+QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD", "5"))
+QUERY_INSPECTOR_SLOW_MS = float(os.getenv("QUERY_INSPECTOR_SLOW_MS", "100"))
+QUERY_INSPECTOR_SLOW_LOG_SIZE = int(os.getenv("QUERY_INSPECTOR_SLOW_LOG_SIZE", "20"))
+QUERY_INSPECTOR_EXPLAIN = _env_flag("QUERY_INSPECTOR_EXPLAIN", False)
+
+ACTION_LOG = "log"
+ACTION_RAISE = "raise"
+
+SQL_PREVIEW_CHARS = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a request or test block exceeds its query budget."""
+
+
+# --- Fingerprints: start ---
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_VALUE_LIST_RE = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)")
+_VALUES_ROWS_RE = re.compile(r"(VALUES\s*\(\?\+\))(?:\s*,\s*\(\?\+\))+", re.I)
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse literals, bind markers and IN/VALUES lists so repeated shapes compare equal."""
+    text = _COMMENT_RE.sub(" ", statement or "")
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _VALUE_LIST_RE.sub("(?+)", text)
+    text = _VALUES_ROWS_RE.sub(r"\1", text)
+    return _WS_RE.sub(" ", text).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:16]
+
+
+def _preview(statement: str) -> str:
+    text = _WS_RE.sub(" ", statement or "").strip()
+    return text if len(text) <= SQL_PREVIEW_CHARS else text[:SQL_PREVIEW_CHARS] + "..."
+# --- Fingerprints: end ---
+
+
+class QueryInspection:
+    """Statements seen inside one request or ``inspect_queries`` block."""
+
+    def __init__(
+        self,
+        label: str = "",
+        *,
+        max_statements: Optional[int] = None,
+        n_plus_one_threshold: Optional[int] = None,
+        action: Optional[str] = None,
+    ):
+        self.label = label
+        self.max_statements = QUERY_INSPECTOR_MAX_STATEMENTS if max_statements is None else max_statements
+        self.n_plus_one_threshold = (
+            QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD if n_plus_one_threshold is None else n_plus_one_threshold
+        )
+        self.action = QUERY_INSPECTOR_ACTION if action is None else action
+        self.statements = 0
+        self.total_ms = 0.0
+        self.shapes: Dict[str, Dict[str, Any]] = {}
+        self.slow: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, key: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.statements += 1
+            self.total_ms += elapsed_ms
+            shape = self.shapes.get(key)
+            if shape is None:
+                shape = {"fingerprint": key, "count": 0, "total_ms": 0.0, "sql": _preview(statement)}
+                self.shapes[key] = shape
+            shape["count"] += 1
+            shape["total_ms"] += elapsed_ms
+            count, repeats = self.statements, shape["count"]
+        if self.action == ACTION_RAISE:
+            # Raising from inside execute stops the loop at the statement that
+            # crossed the line, which is the most useful traceback.
+            if self.max_statements and count > self.max_statements:
+                raise QueryBudgetExceeded(f"{self.label or 'block'}: {count} statements > max {self.max_statements}")
+            if self.n_plus_one_threshold and repeats > self.n_plus_one_threshold:
+                raise QueryBudgetExceeded(
+                    f"{self.label or 'block'}: statement repeated {repeats}x (possible N+1): {shape['sql']}"
+                )
+
+    def repeated(self) -> List[Dict[str, Any]]:
+        threshold = self.n_plus_one_threshold
+        if not threshold:
+            return []
+        with self._lock:
+            rows = [dict(item) for item in self.shapes.values() if item["count"] > threshold]
+        return sorted(rows, key=lambda item: item["count"], reverse=True)
+
+    def exceeded(self) -> bool:
+        return bool((self.max_statements and self.statements > self.max_statements) or self.repeated())
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            shapes = sorted(self.shapes.values(), key=lambda item: item["total_ms"], reverse=True)
+            report = {
+                "label": self.label,
+                "statements": self.statements,
+                "distinct_shapes": len(self.shapes),
+                "total_ms": round(self.total_ms, 3),
+                "top_shapes": [
+                    {**item, "total_ms": round(item["total_ms"], 3)} for item in shapes[:5]
+                ],
+                "slow": list(self.slow),
+            }
+        report["repeated"] = [
+            {**item, "total_ms": round(item["total_ms"], 3)} for item in self.repeated()
+        ]
+        return report
+
+
+class SlowQueryLog:
+    """Process-wide top-N slowest statements."""
+
+    def __init__(self, size: int = QUERY_INSPECTOR_SLOW_LOG_SIZE):
+        self.size = max(int(size), 1)
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def would_keep(self, elapsed_ms: float) -> bool:
+        with self._lock:
+            return len(self._heap) < self.size or elapsed_ms > self._heap[0][0]
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._seq += 1
+            item = (entry["elapsed_ms"], self._seq, entry)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            elif item[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(entry) for _, _, entry in sorted(self._heap, key=lambda item: item[0], reverse=True)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+
+
+SLOW_QUERY_LOG = SlowQueryLog()
+
+_current_inspection: ContextVar[Optional[QueryInspection]] = ContextVar("pmai_query_inspection", default=None)
+
+# Blocks opened with inspect_queries() see every statement on instrumented
+# engines, whatever thread runs it; TestClient serves requests on its own
+# thread, so a context variable alone would miss them.
+_global_inspections: List[QueryInspection] = []
+_global_lock = threading.Lock()
+
+
+def current_inspection() -> Optional[QueryInspection]:
+    return _current_inspection.get()
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[List[str]]:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if verb not in {"SELECT", "WITH"}:
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # A separate DBAPI cursor keeps the original cursor's pending rows intact.
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f"explain failed: {type(exc).__name__}: {exc}"]
+    finally:
+        cursor.close()
+
+
+# --- Engine hooks: start ---
+_installed_engines: "set[int]" = set()
+
+
+def install_query_inspector(engine) -> None:
+    """Attach the inspector to an engine. Idempotent; cheap when nothing is inspecting."""
+    if id(engine) in _installed_engines:
+        return
+    _installed_engines.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info["pmai_query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("pmai_query_started", None)
+        elapsed_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+        targets: List[QueryInspection] = []
+        inspection = _current_inspection.get()
+        if inspection is not None:
+            targets.append(inspection)
+        if _global_inspections:
+            with _global_lock:
+                targets.extend(item for item in _global_inspections if item is not inspection)
+        if not targets and not QUERY_INSPECTOR_ENABLED:
+            return
+
+        if elapsed_ms >= QUERY_INSPECTOR_SLOW_MS and (targets or SLOW_QUERY_LOG.would_keep(elapsed_ms)):
+            entry = {
+                "elapsed_ms": round(elapsed_ms, 3),
+                "fingerprint": fingerprint(statement),
+                "sql": _preview(statement),
+                "label": inspection.label if inspection is not None else "",
+            }
+            if QUERY_INSPECTOR_EXPLAIN and not executemany:
+                entry["plan"] = _explain(conn, statement, parameters)
+            SLOW_QUERY_LOG.add(entry)
+            for target in targets:
+                with target._lock:
+                    target.slow.append(entry)
+
+        if targets:
+            key = fingerprint(statement)
+            for target in targets:
+                target.record(statement, key, elapsed_ms)
+# --- Engine hooks: end ---
+
+
+@contextmanager
+def inspect_queries(label: str = "", *, engine=None, **options) -> Iterator[QueryInspection]:
+    """Collect every statement run on instrumented engines while the block is open."""
+    if engine is not None:
+        install_query_inspector(engine)
+    inspection = QueryInspection(label, **options)
+    token = _current_inspection.set(inspection)
+    with _global_lock:
+        _global_inspections.append(inspection)
+    try:
+        yield inspection
+    finally:
+        with _global_lock:
+            _global_inspections.remove(inspection)
+        _current_inspection.reset(token)
+
+
+@contextmanager
+def assert_max_queries(
+    max_queries: int,
+    *,
+    label: str = "",
+    engine=None,
+    n_plus_one_threshold: Optional[int] = None,
+) -> Iterator[QueryInspection]:
+    """Fail the block if it runs more than ``max_queries`` statements or repeats a shape too often."""
+    with inspect_queries(
+        label,
+        engine=engine,
+        max_statements=max_queries,
+        n_plus_one_threshold=0 if n_plus_one_threshold is None else n_plus_one_threshold,
+        action=ACTION_LOG,
+    ) as inspection:
+        yield inspection
+    if inspection.exceeded():
+        raise QueryBudgetExceeded(
+            f"{label or 'block'}: {inspection.statements} statements (max {max_queries})\n"
+            + json.dumps(inspection.report(), ensure_ascii=False, indent=2)
+        )
+
+
+# --- HTTP middleware: start ---
+class QueryInspectorMiddleware:
+    """Per-request inspection; logs over-budget requests and adds X-Query-Count in dev."""
+
+    def __init__(self, app, enabled: Optional[bool] = None):
+        self.app = app
+        self.enabled = QUERY_INSPECTOR_ENABLED if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inspection = QueryInspection(f"{scope.get('method') or ''} {scope.get('path') or ''}")
+        token = _current_inspection.set(inspection)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-query-count", str(inspection.statements).encode("latin-1")))
+                headers.append((b"x-query-time-ms", f"{inspection.total_ms:.2f}".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current_inspection.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                inspection.label = f"{scope.get('method') or ''} {route}"
+            if inspection.exceeded() or inspection.slow:
+                logger.warning("query budget %s", json.dumps(inspection.report(), ensure_ascii=False))
+# --- HTTP middleware: end ---
@@ -1,7 +1,17 @@
 # backend/seed_demo.py
+import argparse
 import os
+import random
+from datetime import datetime, timedelta
 from pathlib import Path
-from sqlalchemy import create_engine, text
+from uuid import uuid4
+
+from sqlalchemy import create_engine, func, insert, select, text
+
+try:
+    from backend.models import Case, ConsultSession, DiagnosticReport, Observation, User
+except ModuleNotFoundError:
+    from models import Case, ConsultSession, DiagnosticReport, Observation, User
 
 # 让 SQLite 路径始终指向脚本同目录下的 app.db
 here = Path(__file__).resolve().parent
@@ -46,5 +56,200 @@ def main():
 
     print(f"✅ 已连接 {engine.url} 并插入/保留 demo 数据")
 
+
+# --- Load-test dataset: start ---
+# Bulk synthetic data for scripts/load_test_api.py. Users are
+# load-user-<n>@example.com with LOAD_TEST_PASSWORD; ids are assigned
+# explicitly so related rows can be inserted in a few executemany batches.
+LOAD_TEST_EMAIL_TEMPLATE = "load-user-{index}@example.com"
+LOAD_TEST_PASSWORD = "loadtest-password"
+LOAD_TEST_BATCH_SIZE = 1000
+
+LOAD_TEST_PETS = [
+    ("dog", "狗狗今天呕吐三次，精神差，不吃东西"),
+    ("cat", "猫咪两天不吃东西，躲起来，尿少"),
+    ("dog", "狗狗反复干呕吐不出，腹胀，坐立不安"),
+    ("cat", "猫咪张口呼吸，呼吸急促"),
+    ("rabbit", "兔子停食一天，粪便减少，精神差"),
+    ("bird", "鹦鹉蓬毛，嗜睡，食欲下降"),
+    ("dog", "狗狗误食巧克力约一小时"),
+    ("cat", "猫咪频繁进出猫砂盆，排尿困难"),
+]
+
+# (code, display name, unit, reference low, reference high)
+LOAD_TEST_LABS = [
+    ("ALT", "ALT", "U/L", 10.0, 125.0),
+    ("BUN", "BUN", "mmol/L", 2.5, 9.6),
+    ("CREA", "Creatinine", "umol/L", 44.0, 159.0),
+    ("GLU", "Glucose", "mmol/L", 3.9, 7.9),
+    ("WBC", "WBC", "10^9/L", 5.5, 16.9),
+    ("HCT", "HCT", "%", 37.0, 55.0),
+]
+
+
+def _next_id(conn, model) -> int:
+    return int(conn.execute(select(func.coalesce(func.max(model.id), 0))).scalar_one()) + 1
+
+
+def _insert_batches(conn, model, rows) -> None:
+    for start in range(0, len(rows), LOAD_TEST_BATCH_SIZE):
+        conn.execute(insert(model), rows[start:start + LOAD_TEST_BATCH_SIZE])
+
+
+def _sync_postgres_sequences(conn, models) -> None:
+    # Explicit ids leave Postgres serial sequences behind; move them past the data.
+    if conn.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+def seed_load_dataset(
+    target_engine=None,
+    *,
+    users: int = 20,
+    cases_per_user: int = 50,
+    sessions_per_user: int = 5,
+    reports_per_case: int = 1,
+    observations_per_report: int = 6,
+    seed: int = 20240601,
+) -> dict:
+    """Insert a synthetic dataset and return the seeded user emails, ids and case ids."""
+    from passlib.hash import bcrypt
+
+    target_engine = target_engine or engine
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = bcrypt.hash(LOAD_TEST_PASSWORD)
+
+    with target_engine.begin() as conn:
+        user_id = _next_id(conn, User)
+        case_id = _next_id(conn, Case)
+        report_id = _next_id(conn, DiagnosticReport)
+        observation_id = _next_id(conn, Observation)
+        existing = set(conn.execute(select(User.email).where(User.email.like("load-user-%@example.com"))).scalars())
+
+        user_rows, case_rows, session_rows, report_rows, observation_rows = [], [], [], [], []
+        seeded_users = []
+        for index in range(users):
+            email = LOAD_TEST_EMAIL_TEMPLATE.format(index=index)
+            if email in existing:
+                continue
+            owner_id = user_id
+            user_id += 1
+            user_rows.append({
+                "id": owner_id,
+                "email": email,
+                "hashed_password": password_hash,
+                "full_name": f"Load User {index}",
+                "created_at": now,
+            })
+            owned_cases = []
+            for number in range(cases_per_user):
+                species, complaint = rng.choice(LOAD_TEST_PETS)
+                created = now - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+                case_rows.append({
+                    "id": case_id,
+                    "owner_id": owner_id,
+                    "patient_name": f"pet-{index}-{number}",
+                    "species": species,
+                    "sex": rng.choice(["M", "F", None]),
+                    "age_info": f"{rng.randint(1, 14)}y",
+                    "chief_complaint": complaint,
+                    "history": "load-test seed",
+                    "created_at": created,
+                })
+                for _ in range(reports_per_case):
+                    report_rows.append({
+                        "id": report_id,
+                        "case_id": case_id,
+                        "report_type": "lab",
+                        "source_type": "seed",
+                        "status": "final",
+                        "title": "Chemistry / CBC panel",
+                        "created_at": created,
+                    })
+                    for code, display, unit, low, high in rng.sample(LOAD_TEST_LABS, min(observations_per_report, len(LOAD_TEST_LABS))):
+                        value = round(rng.uniform(low * 0.6, high * 1.4), 2)
+                        flag = "low" if value < low else "high" if value > high else "normal"
+                        observation_rows.append({
+                            "id": observation_id,
+                            "case_id": case_id,
+                            "diagnostic_report_id": report_id,
+                            "code": code,
+                            "display_name": display,
+                            "value_numeric": value,
+                            "value_type": "numeric",
+                            "unit": unit,
+                            "reference_low": low,
+                            "reference_high": high,
+                            "abnormal_flag": flag,
+                            "observed_at": created,
+                            "source_type": "seed",
+                            "created_at": created,
+                        })
+                        observation_id += 1
+                    report_id += 1
+                owned_cases.append(case_id)
+                case_id += 1
+            for _ in range(sessions_per_user):
+                species, complaint = rng.choice(LOAD_TEST_PETS)
+                session_rows.append({
+                    "session_uid": uuid4().hex,
+                    "owner_id": owner_id,
+                    "text": complaint,
+                    "answers": [],
+                    "result": None,
+                    "created_at": now,
+                })
+            seeded_users.append({"email": email, "user_id": owner_id, "case_ids": owned_cases})
+
+        _insert_batches(conn, User, user_rows)
+        _insert_batches(conn, Case, case_rows)
+        _insert_batches(conn, ConsultSession, session_rows)
+        _insert_batches(conn, DiagnosticReport, report_rows)
+        _insert_batches(conn, Observation, observation_rows)
+        _sync_postgres_sequences(conn, (User, Case, DiagnosticReport, Observation))
+
+    return {
+        "users": seeded_users,
+        "counts": {
+            "users": len(user_rows),
+            "cases": len(case_rows),
+            "consult_sessions": len(session_rows),
+            "diagnostic_reports": len(report_rows),
+            "observations": len(observation_rows),
+        },
+        "skipped_existing_users": len(existing),
+    }
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Seed demo data, or a load-test dataset with --users")
+    parser.add_argument("--users", type=int, default=0, help="seed N load-test users instead of the single demo row")
+    parser.add_argument("--cases-per-user", type=int, default=50)
+    parser.add_argument("--sessions-per-user", type=int, default=5)
+    parser.add_argument("--reports-per-case", type=int, default=1)
+    parser.add_argument("--observations-per-report", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=20240601)
+    return parser.parse_args()
+# --- Load-test dataset: end ---
+
 if __name__ == "__main__":
-    main()
+    args = _parse_args()
+    if args.users > 0:
+        result = seed_load_dataset(
+            users=args.users,
+            cases_per_user=args.cases_per_user,
+            sessions_per_user=args.sessions_per_user,
+            reports_per_case=args.reports_per_case,
+            observations_per_report=args.observations_per_report,
+            seed=args.seed,
+        )
+        print(f"✅ 已连接 {engine.url} 并插入压测数据：{result['counts']}")
+    else:
+        main()
@@ -4,10 +4,14 @@ from __future__ import annotations
 import ast
 import os
 import subprocess
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Optional
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from sqlalchemy import text
 
 try:
@@ -22,6 +26,14 @@ BACKEND_DIR = Path(__file__).resolve().parent
 REPO_ROOT = BACKEND_DIR.parent
 MIGRATION_VERSIONS = BACKEND_DIR / "migrations" / "versions"
 
+# Build metadata and the migration graph are fixed for the life of the process;
+# only the database revision is re-read, at most once per TTL.
+DB_REVISION_TTL_SECONDS = float(os.getenv("SYSTEM_DB_REVISION_TTL_SECONDS", "5"))
+PROCESS_STARTED_AT = time.time()
+
+_db_revision_lock = threading.Lock()
+_db_revision_cache: dict[str, Any] = {"expires_at": 0.0, "value": None}
+
 
 def _short(value: Optional[str], length: int = 12) -> Optional[str]:
     raw = str(value or "").strip()
@@ -74,6 +86,20 @@ def _git_commit() -> Optional[str]:
     return _git_commit_from_env() or _git_commit_from_repo()
 
 
+@lru_cache(maxsize=1)
+def _build_info() -> dict[str, Any]:
+    commit = _git_commit()
+    return {
+        "app_name": "Pet-Med-AI",
+        "app_version": os.getenv("APP_VERSION", "development"),
+        "environment": os.getenv("ENVIRONMENT", "development"),
+        "service_name": os.getenv("RENDER_SERVICE_NAME") or os.getenv("SERVICE_NAME") or "local",
+        "git_commit": commit,
+        "git_commit_short": _short(commit),
+        "database_backend": _db_backend(),
+    }
+
+
 def _read_alembic_current() -> Optional[str]:
     try:
         with engine.connect() as conn:
@@ -84,6 +110,15 @@ def _read_alembic_current() -> Optional[str]:
         return None
 
 
+def _database_reachable() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
 def _literal_assignment(path: Path, name: str) -> Any:
     tree = ast.parse(path.read_text(encoding="utf-8"))
     for node in tree.body:
@@ -141,6 +176,37 @@ def _migration_graph() -> dict[str, Any]:
     }
 
 
+@lru_cache(maxsize=1)
+def _cached_migration_graph() -> dict[str, Any]:
+    return _migration_graph()
+
+
+def _cached_alembic_current() -> Optional[str]:
+    now = time.monotonic()
+    with _db_revision_lock:
+        if _db_revision_cache["expires_at"] > now:
+            return _db_revision_cache["value"]
+    value = _read_alembic_current()
+    with _db_revision_lock:
+        _db_revision_cache["value"] = value
+        _db_revision_cache["expires_at"] = time.monotonic() + DB_REVISION_TTL_SECONDS
+    return value
+
+
+def reload_system_info() -> None:
+    _build_info.cache_clear()
+    _cached_migration_graph.cache_clear()
+    with _db_revision_lock:
+        _db_revision_cache["expires_at"] = 0.0
+        _db_revision_cache["value"] = None
+
+
+@router.on_event("startup")
+def warm_system_info() -> None:
+    _build_info()
+    _cached_migration_graph()
+
+
 def _schema_status(current_revision: Optional[str], graph: dict[str, Any]) -> dict[str, Any]:
     head = graph.get("head")
     heads = graph.get("heads") or []
@@ -164,20 +230,11 @@ def system_version():
     database state. It is used for release verification and upgrade support.
     """
 
-    graph = _migration_graph()
-    current_revision = _read_alembic_current()
-    schema = _schema_status(current_revision, graph)
-    commit = _git_commit()
+    schema = _schema_status(_cached_alembic_current(), _cached_migration_graph())
 
     return {
         "message": "system_version",
-        "app_name": "Pet-Med-AI",
-        "app_version": os.getenv("APP_VERSION", "development"),
-        "environment": os.getenv("ENVIRONMENT", "development"),
-        "service_name": os.getenv("RENDER_SERVICE_NAME") or os.getenv("SERVICE_NAME") or "local",
-        "git_commit": commit,
-        "git_commit_short": _short(commit),
-        "database_backend": _db_backend(),
+        **_build_info(),
         **schema,
         "release_framework": True,
         "upgrade_ready": bool(schema.get("schema_ok")),
@@ -197,3 +254,32 @@ def system_health():
         "alembic_head": version.get("alembic_head"),
         "writes_database": False,
     }
+
+
+@router.get("/live", response_model=dict)
+def system_live():
+    """Liveness probe: the process is up and serving. No database or filesystem access."""
+    return {
+        "ok": True,
+        "message": "system_live",
+        "uptime_seconds": round(time.time() - PROCESS_STARTED_AT, 3),
+        "writes_database": False,
+    }
+
+
+@router.get("/ready", response_model=dict)
+def system_ready():
+    """Readiness probe: reads the database revision directly and compares it with the migration head."""
+    reachable = _database_reachable()
+    current_revision = _read_alembic_current() if reachable else None
+    schema = _schema_status(current_revision, _cached_migration_graph())
+    payload = {
+        "ok": reachable and bool(schema.get("schema_ok")),
+        "message": "system_ready",
+        "database_reachable": reachable,
+        **schema,
+        "writes_database": False,
+    }
+    if not payload["ok"]:
+        return JSONResponse(status_code=503, content=payload)
+    return payload
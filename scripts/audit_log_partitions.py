@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monthly partition management for audit_log on Postgres.
+
+Scope:
+- status   shows whether audit_log is partitioned and lists partitions.
+- plan     prints the one-time conversion DDL; writes nothing.
+- convert  runs that DDL in one transaction (needs --confirm and
+           --acknowledge-fk-drop, see the warning printed by plan).
+- ensure   creates missing partitions for the coming months (run monthly).
+- detach   detaches months older than --before for archiving.
+- Every write command is a dry-run unless --apply is given.
+- SQLite keeps the plain table; write commands refuse to run there.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from audit_log_partitions import (  # noqa: E402
+    AUDIT_LOG_APPROVAL_FOREIGN_KEY,
+    AUDIT_LOG_APPROVAL_TRIGGER,
+    AUDIT_LOG_PARTITION_CONFIRMATION,
+    AUDIT_LOG_PARTITION_MONTHS_AHEAD,
+    apply_statements,
+    audit_log_partition_status,
+    month_start,
+    plan_audit_log_partitioning,
+    plan_future_partitions,
+    plan_partition_detach,
+)
+from db import engine  # noqa: E402
+
+
+def _month(value: str) -> date:
+    return month_start(datetime.strptime(value, "%Y-%m").date())
+
+
+FK_DROP_WARNING = (
+    f"WARNING: convert drops the foreign key {AUDIT_LOG_APPROVAL_FOREIGN_KEY} "
+    "(emr_import_execution_runs.approval_audit_log_id -> audit_log.log_id); a partitioned "
+    f"audit_log cannot back it. Constraint trigger {AUDIT_LOG_APPROVAL_TRIGGER} replaces the "
+    "insert/update check, ON DELETE SET NULL is not kept, and `status` reports orphaned "
+    "references (approval_audit_log_reference.orphaned_rows). Detaching a month does not "
+    "clear approval ids that point into it. "
+    f"convert --apply requires --acknowledge-fk-drop {AUDIT_LOG_APPROVAL_FOREIGN_KEY}"
+)
+
+
+def convert_refusal(args: argparse.Namespace) -> Optional[str]:
+    if args.confirm != AUDIT_LOG_PARTITION_CONFIRMATION:
+        return f"convert --apply requires --confirm {AUDIT_LOG_PARTITION_CONFIRMATION}"
+    if args.acknowledge_fk_drop != AUDIT_LOG_APPROVAL_FOREIGN_KEY:
+        return f"convert --apply requires --acknowledge-fk-drop {AUDIT_LOG_APPROVAL_FOREIGN_KEY}"
+    return None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage monthly audit_log partitions (Postgres).")
+    parser.add_argument("command", choices=("status", "plan", "convert", "ensure", "detach"))
+    parser.add_argument("--from-month", type=_month, default=None, help="First monthly partition (YYYY-MM). Default: month of the oldest row.")
+    parser.add_argument("--months-ahead", type=int, default=AUDIT_LOG_PARTITION_MONTHS_AHEAD, help="Partitions to keep ready after the current month.")
+    parser.add_argument("--before", type=_month, default=None, help="With detach: detach partitions older than this month (YYYY-MM).")
+    parser.add_argument("--confirm", default="", help=f"With convert --apply: {AUDIT_LOG_PARTITION_CONFIRMATION}")
+    parser.add_argument("--acknowledge-fk-drop", default="", help=f"With convert --apply: {AUDIT_LOG_APPROVAL_FOREIGN_KEY}")
+    parser.add_argument("--apply", action="store_true", help="Execute the statements; default prints them.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    with engine.connect() as conn:
+        status = audit_log_partition_status(conn)
+
+    if args.command == "status":
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+        return 0
+
+    if not status["supported"]:
+        print(f"ERROR: audit_log partitioning needs Postgres (dialect: {status['dialect']}).", file=sys.stderr)
+        return 2
+
+    if args.command in ("plan", "convert"):
+        if status["partitioned"]:
+            print("audit_log is already partitioned; use ensure / detach.")
+            return 0
+        oldest = status.get("oldest_created_at")
+        first_month = args.from_month or (month_start(datetime.fromisoformat(oldest).date()) if oldest else month_start(date.today()))
+        statements = plan_audit_log_partitioning(first_month, months_ahead=args.months_ahead)
+        print(FK_DROP_WARNING, file=sys.stderr)
+        refusal = convert_refusal(args) if args.command == "convert" and args.apply else None
+        if refusal:
+            print(f"ERROR: {refusal}", file=sys.stderr)
+            return 2
+    elif args.command == "ensure":
+        statements = plan_future_partitions(status, months_ahead=args.months_ahead)
+    else:
+        if args.before is None:
+            print("ERROR: detach requires --before YYYY-MM", file=sys.stderr)
+            return 2
+        statements = plan_partition_detach(status, args.before)
+
+    if args.command == "plan" or not args.apply:
+        for statement in statements:
+            print(statement + ";")
+        return 0
+
+    with engine.begin() as conn:
+        count = apply_statements(conn, statements)
+    print(json.dumps({"command": args.command, "statements_applied": count}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
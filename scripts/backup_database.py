@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming database export for Pet-Med-AI (replaces backend/backup_cases.py).
+
+Scope:
+- Exports every table to <table>.ndjson.gz plus manifest.json (rows, sha256, watermarks).
+- Reads through server-side cursors in one read-only snapshot; no table locks.
+- --incremental-from exports only rows changed since a previous export.
+- Never writes database records.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from db import engine  # noqa: E402
+from db_backup import (  # noqa: E402
+    DB_BACKUP_BATCH_SIZE,
+    DB_BACKUP_WATERMARK_OVERLAP_SECONDS,
+    export_database,
+)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export the database to compressed NDJSON with a manifest.")
+    parser.add_argument("--out-dir", default="backups", help="Parent directory; each export gets its own subdirectory.")
+    parser.add_argument("--incremental-from", default="", help="Previous export directory (or its manifest.json).")
+    parser.add_argument("--tables", default="", help="Comma separated table names; default is every table.")
+    parser.add_argument("--batch-size", type=int, default=DB_BACKUP_BATCH_SIZE, help="Rows fetched per server-side cursor batch.")
+    parser.add_argument("--overlap-seconds", type=int, default=DB_BACKUP_WATERMARK_OVERLAP_SECONDS, help="Incremental re-read window before the previous watermark.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    tables = [name.strip() for name in args.tables.split(",") if name.strip()]
+    try:
+        manifest = export_database(
+            engine,
+            args.out_dir,
+            tables=tables or None,
+            incremental_from=args.incremental_from or None,
+            batch_size=args.batch_size,
+            overlap_seconds=args.overlap_seconds,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"ERROR: export failed: {exc}", file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        "export_id": manifest["export_id"],
+        "export_dir": manifest["export_dir"],
+        "mode": manifest["mode"],
+        "base_export_id": manifest["base_export_id"],
+        "alembic_revision": manifest["alembic_revision"],
+        "total_rows": manifest["total_rows"],
+        "seconds": manifest["seconds"],
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
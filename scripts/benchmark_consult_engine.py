@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consult engine benchmark.
+
+Builds a consult corpus from the knowledge base (companion and exotic rule
+files plus their intake templates): one text per red flag and intake
+red-flag prompt for every species the rule covers, and multi-round
+transcripts that answer intake questions. Then measures throughput and
+p50/p90/p99 latency for extract_features, run_agent and run_dynamic_consult,
+and writes a JSON report. Compare reports with compare_benchmark_reports.py.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import hashlib
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+KB_DIR = ROOT / "knowledge-base"
+
+sys.path.insert(0, str(BACKEND))
+
+from dynamic_consult import run_dynamic_consult  # noqa: E402
+from feature_engine import extract_features  # noqa: E402
+from orchestrator import run_agent  # noqa: E402
+from species_context import SPECIES_PROFILES  # noqa: E402
+
+REPORT_MODE = "consult_engine_benchmark_v1"
+TRANSCRIPT_ROUNDS = 3
+CANNED_ANSWERS = ("今天早上开始", "没有", "精神比平时差一些", "最近换过粮")
+FRAGMENT_SPLIT_RE = re.compile(r"[，。；、？！,.;?!（）()\n]+")
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _species_label(species: str) -> str:
+    profile = SPECIES_PROFILES.get(species) or {}
+    return str(profile.get("label") or species)
+
+
+def _rule_species(index: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Map each rule key to the species that resolve to it."""
+    out: Dict[str, List[str]] = {}
+    for species, rule in (index.get("species_to_rule") or {}).items():
+        if species in SPECIES_PROFILES:
+            out.setdefault(rule, []).append(species)
+    for rule in index.get("rules") or []:
+        if not out.get(rule):
+            # Group-level rules (e.g. rodent) have no species of their own;
+            # fall back to the rule key when it is itself a species profile.
+            out[rule] = [rule] if rule in SPECIES_PROFILES else []
+    return out
+
+
+def _rule_fragments(rule: Dict[str, Any], intake: Dict[str, Any]) -> List[str]:
+    strings: List[str] = []
+    strings.extend(flag.get("reason", "") for flag in rule.get("red_flags") or [])
+    strings.extend(rule.get("questions") or [])
+    strings.extend(rule.get("checks") or [])
+    strings.extend(intake.get("red_flag_prompts") or [])
+    for section in intake.get("sections") or []:
+        strings.extend(question.get("label", "") for question in section.get("questions") or [])
+    fragments = {part.strip() for text in strings for part in FRAGMENT_SPLIT_RE.split(text or "")}
+    return sorted((item for item in fragments if len(item) >= 2), key=lambda item: (len(item), item))
+
+
+def _red_flag_text(name: str, flag: Dict[str, Any], fragments: List[str], probes: Dict[str, str]) -> str:
+    """
+    Owner-style text for one red flag. The reason sentence usually trips the
+    flag's features on its own; features it misses get the shortest knowledge
+    base phrase that does, so every reachable red flag is exercised.
+    """
+    text = f"{name}：{flag.get('reason', '')}"
+    features = extract_features(text)
+    extra: List[str] = []
+    for feature in flag.get("features") or []:
+        if features.get(feature):
+            continue
+        if feature not in probes:
+            probes[feature] = next(
+                (fragment for fragment in fragments if extract_features(f"{name}{fragment}").get(feature)), ""
+            )
+        if probes[feature]:
+            extra.append(probes[feature])
+    return text + ("，" + "，".join(extra) if extra else "")
+
+
+def build_corpus() -> Dict[str, Any]:
+    cases: List[Dict[str, Any]] = []
+    transcripts: List[Dict[str, Any]] = []
+    unreachable: set = set()
+
+    for area in ("companion", "exotics"):
+        index = _load(KB_DIR / area / "index.json")
+        intake_dir = KB_DIR / area / "intake"
+        for rule_key, species_list in sorted(_rule_species(index).items()):
+            rule = _load(KB_DIR / area / f"{rule_key}.json")
+            intake_path = intake_dir / f"{rule_key}.json"
+            intake = _load(intake_path) if intake_path.exists() else {}
+            label_fallback = str(rule.get("label") or rule_key)
+            fragments = _rule_fragments(rule, intake)
+            for species in species_list or [None]:
+                name = _species_label(species) if species else label_fallback
+                probes: Dict[str, str] = {}
+                for position, flag in enumerate(rule.get("red_flags") or []):
+                    cases.append({
+                        "id": f"{area}/{rule_key}/{species or '-'}/red_flag/{position}",
+                        "species": species,
+                        "text": _red_flag_text(name, flag, fragments, probes),
+                        "expect_features": list(flag.get("features") or []),
+                    })
+                for position, prompt in enumerate(intake.get("red_flag_prompts") or []):
+                    cases.append({
+                        "id": f"{area}/{rule_key}/{species or '-'}/intake_prompt/{position}",
+                        "species": species,
+                        "text": f"{name}：{prompt}",
+                        "expect_features": [],
+                    })
+
+                questions = [
+                    question.get("label", "")
+                    for section in intake.get("sections") or []
+                    for question in section.get("questions") or []
+                    if question.get("label")
+                ]
+                if rule.get("red_flags") and questions:
+                    opening = f"{name}：{rule['red_flags'][0].get('reason', '')}"
+                    answers = [
+                        {"question": question, "answer": CANNED_ANSWERS[position % len(CANNED_ANSWERS)]}
+                        for position, question in enumerate(questions[:TRANSCRIPT_ROUNDS])
+                    ]
+                    transcripts.append({
+                        "id": f"{area}/{rule_key}/{species or '-'}/transcript",
+                        "text": opening,
+                        "answers": answers,
+                    })
+
+                unreachable.update(feature for feature, phrase in probes.items() if not phrase)
+
+    digest = hashlib.sha256(
+        json.dumps({"cases": cases, "transcripts": transcripts}, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return {"cases": cases, "transcripts": transcripts, "unreachable_features": sorted(unreachable), "sha256": digest}
+
+
+def corpus_coverage(corpus: Dict[str, Any]) -> Dict[str, Any]:
+    """How much of the knowledge base the corpus actually exercises."""
+    species_expected = sorted({case["species"] for case in corpus["cases"] if case["species"]})
+    species_seen = set()
+    unreachable = set(corpus["unreachable_features"])
+    flags_total = 0
+    flags_reachable = 0
+    flags_triggered = 0
+    missed: List[str] = []
+    for case in corpus["cases"]:
+        features = extract_features(case["text"])
+        if case["species"] and features.get("species") == case["species"]:
+            species_seen.add(case["species"])
+        if case["expect_features"]:
+            flags_total += 1
+            flags_reachable += not unreachable.intersection(case["expect_features"])
+            if all(features.get(name) for name in case["expect_features"]):
+                flags_triggered += 1
+            else:
+                missed.append(case["id"])
+    return {
+        "cases": len(corpus["cases"]),
+        "transcripts": len(corpus["transcripts"]),
+        "species": len(species_expected),
+        "species_detected": len(species_seen),
+        "species_missed": sorted(set(species_expected) - species_seen),
+        "red_flags": flags_total,
+        "red_flags_triggered": flags_triggered,
+        "red_flag_coverage": round(flags_triggered / flags_total, 4) if flags_total else 0.0,
+        "red_flags_reachable": flags_reachable,
+        "red_flags_missed": missed,
+        # Red-flag features no knowledge-base phrase makes extract_features set.
+        "red_flag_features_unreached": corpus["unreachable_features"],
+    }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def measure(func: Callable[[Any], Any], inputs: List[Any], *, passes: int, warmup: int) -> Dict[str, Any]:
+    for item in inputs[:warmup]:
+        func(item)
+    timings: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # keep collector pauses out of per-call latency
+    try:
+        started = time.perf_counter()
+        for _ in range(passes):
+            for item in inputs:
+                t0 = time.perf_counter_ns()
+                func(item)
+                timings.append((time.perf_counter_ns() - t0) / 1e6)
+        elapsed = time.perf_counter() - started
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "total_s": round(elapsed, 4),
+        "throughput_per_s": round(len(timings) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(timings) / len(timings), 4) if timings else 0.0,
+        "p50_ms": round(_percentile(timings, 50), 4),
+        "p90_ms": round(_percentile(timings, 90), 4),
+        "p99_ms": round(_percentile(timings, 99), 4),
+        "max_ms": round(timings[-1], 4) if timings else 0.0,
+    }
+
+
+def measure_repeated(func: Callable[[Any], Any], inputs: List[Any], *, passes: int, warmup: int, repeat: int) -> Dict[str, Any]:
+    """Median of each statistic over ``repeat`` independent measurements, to damp scheduler noise."""
+    runs = [measure(func, inputs, passes=passes, warmup=warmup) for _ in range(max(repeat, 1))]
+    out = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key != "calls"}
+    return {"calls": runs[0]["calls"], "repeat": len(runs), **out}
+
+
+def _dynamic_rounds(transcripts: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, str]]]]:
+    # Every prefix of every transcript is one consult round, as the session API replays them.
+    return [
+        (item["text"], item["answers"][:count])
+        for item in transcripts
+        for count in range(len(item["answers"]) + 1)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passes", type=int, default=10, help="times each corpus is replayed per target")
+    parser.add_argument("--repeat", type=int, default=3, help="independent measurements per target; the report keeps the median")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed calls before each target")
+    parser.add_argument("--targets", default="extract_features,run_agent,run_dynamic_consult")
+    parser.add_argument("--out", default="", help="write the JSON report here as well as stdout")
+    parser.add_argument("--list-corpus", action="store_true", help="print the generated corpus and exit")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    if args.list_corpus:
+        print(json.dumps(corpus, ensure_ascii=False, indent=2))
+        return 0
+
+    texts = [case["text"] for case in corpus["cases"]]
+    rounds = _dynamic_rounds(corpus["transcripts"])
+    targets: Dict[str, Tuple[Callable[[Any], Any], List[Any]]] = {
+        "extract_features": (extract_features, texts),
+        "run_agent": (run_agent, texts),
+        "run_dynamic_consult": (lambda item: run_dynamic_consult(item[0], item[1]), rounds),
+    }
+
+    report: Dict[str, Any] = {
+        "mode": REPORT_MODE,
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "passes": args.passes,
+        "repeat": max(args.repeat, 1),
+        "corpus_sha256": corpus["sha256"],
+        "corpus": corpus_coverage(corpus),
+        "results": {},
+    }
+    for name in [item.strip() for item in args.targets.split(",") if item.strip()]:
+        if name not in targets:
+            parser.error(f"unknown target: {name}")
+        func, inputs = targets[name]
+        report["results"][name] = measure_repeated(
+            func, inputs, passes=max(args.passes, 1), warmup=max(args.warmup, 0), repeat=args.repeat
+        )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+# Runs in a fresh interpreter per sample so every measurement is a cold import.
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    live = client.get("/api/system/live").status_code
+    t3 = time.perf_counter()
+    lazy = client.get(sys.argv[1]).status_code
+    t4 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "startup_ms": (t2 - t1) * 1000,
+    "first_live_ms": (t3 - t2) * 1000,
+    "first_subsystem_ms": (t4 - t3) * 1000,
+    "ready_to_serve_ms": (t3 - t0) * 1000,
+    "live_status": live,
+    "subsystem_status": lazy,
+}))
+"""
+
+METRICS = ("import_ms", "startup_ms", "first_live_ms", "first_subsystem_ms", "ready_to_serve_ms")
+
+
+def run_sample(*, lazy: bool, subsystem_path: str) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = "sqlite:///" + str(Path(tempfile.gettempdir()) / "pmai_startup_benchmark.db")
+    env["LAZY_ROUTERS"] = "true" if lazy else "false"
+    env["LAZY_ROUTERS_PRELOAD"] = "false"  # measure on-demand loading, not the background thread
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, subsystem_path],
+        cwd=str(BACKEND),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"startup sample failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for metric in METRICS:
+        values = sorted(sample[metric] for sample in samples)
+        out[metric] = {
+            "median": round(statistics.median(values), 1),
+            "min": round(values[0], 1),
+            "max": round(values[-1], 1),
+        }
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the backend app (lazy vs eager routers)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--subsystem-path", default="/api/preventive-care/rules", help="First subsystem request")
+    parser.add_argument("--modes", default="lazy,eager", help="Comma separated: lazy,eager")
+    parser.add_argument("--out", default="", help="Optional output JSON file for tracking over time")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        "mode": "startup_benchmark_v1",
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "subsystem_path": args.subsystem_path,
+        "results": {},
+    }
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+        samples = [run_sample(lazy=mode == "lazy", subsystem_path=args.subsystem_path) for _ in range(max(args.runs, 1))]
+        report["results"][mode] = summarize(samples)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query-count budgets for list/summary endpoints.
+
+Seeds a throwaway SQLite database, calls each endpoint with the inspector's
+assert_max_queries helper and fails if an endpoint runs more statements than
+its budget or repeats one statement shape (an N+1 loop). Budgets must not
+depend on the number of seeded rows; --rows lets you prove that.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+# (method, path, max statements). Keep these tight; raise one only with a reason.
+QUERY_BUDGETS: Tuple[Tuple[str, str, int], ...] = (
+    ("GET", "/api/cases", 2),
+    ("GET", "/api/ai/consult/sessions", 2),
+    ("GET", "/api/webhooks/emr/inbox", 2),
+    ("GET", "/api/emr/import-batches", 2),
+    ("GET", "/api/preventive-care/reminders", 2),
+    ("GET", "/api/preventive-care/ops/summary", 10),
+)
+
+
+def _seed(db, models, rows: int):
+    user = models.User(email="query-budget@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    for index in range(rows):
+        case = models.Case(
+            owner_id=user.id,
+            patient_name=f"pet-{index}",
+            species="dog" if index % 2 else "cat",
+            chief_complaint="vomiting",
+        )
+        db.add(case)
+        db.add(models.WebhookInbox(
+            idempotency_key=f"budget-{index}",
+            payload_hash=f"hash-{index}",
+            status="received" if index % 3 else "validated",
+        ))
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=25, help="rows seeded per table")
+    parser.add_argument("--json", action="store_true", help="print per-endpoint reports as JSON")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + str(Path(tempfile.mkdtemp()) / "query_budgets.db")
+    os.environ.setdefault("LAZY_ROUTERS", "false")
+    sys.path.insert(0, str(BACKEND))
+
+    import db as db_module
+    import main as app_module
+    import models
+    from auth_jwt import get_current_user
+    from fastapi.testclient import TestClient
+    from query_inspector import QueryBudgetExceeded, assert_max_queries
+
+    db_module.Base.metadata.create_all(db_module.engine)
+    session = db_module.SessionLocal()
+    user = _seed(session, models, max(args.rows, 0))
+    app_module.app.dependency_overrides[get_current_user] = lambda: user
+
+    failures: List[str] = []
+    reports: List[Dict[str, Any]] = []
+    with TestClient(app_module.app) as client:
+        for method, path, budget in QUERY_BUDGETS:
+            label = f"{method} {path}"
+            try:
+                with assert_max_queries(budget, label=label, engine=db_module.engine) as inspection:
+                    response = client.request(method, path)
+                status = "ok" if response.status_code < 400 else f"http {response.status_code}"
+            except QueryBudgetExceeded as exc:
+                status = "over budget"
+                failures.append(str(exc))
+            if status.startswith("http"):
+                failures.append(f"{label}: {status}")
+            reports.append({**inspection.report(), "budget": budget, "status": status})
+            print(f"[{status}] {label}: {inspection.statements}/{budget} statements")
+
+    session.close()
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare two benchmark JSON reports and fail on regressions.
+
+Works with any report that has a ``results`` object of ``{target: {metric:
+value}}`` (benchmark_consult_engine.py, benchmark_startup.py). Latency
+metrics (``*_ms``, ``median``) regress when they grow, throughput metrics
+(``*_per_s``) when they shrink. Exit status is 1 if any compared metric moves
+the wrong way by more than the tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_METRICS = ("p50_ms", "p99_ms", "throughput_per_s", "median")
+# Sub-threshold absolute changes are timer noise, whatever the percentage.
+DEFAULT_MIN_DELTA_MS = 0.05
+
+
+def _load(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _flatten(results: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    # benchmark_startup nests {mode: {metric: {median, min, max}}}; flatten to "mode.metric".
+    out: Dict[str, Dict[str, float]] = {}
+    for target, metrics in (results or {}).items():
+        for name, value in (metrics or {}).items():
+            if isinstance(value, dict):
+                out.setdefault(f"{target}.{name}", {}).update(
+                    {key: item for key, item in value.items() if isinstance(item, (int, float))}
+                )
+            elif isinstance(value, (int, float)):
+                out.setdefault(target, {})[name] = value
+    return out
+
+
+def higher_is_better(metric: str) -> Optional[bool]:
+    if metric.endswith("_per_s"):
+        return True
+    if metric.endswith("_ms") or metric == "median":
+        return False
+    return None
+
+
+def compare(
+    base: Dict[str, Any],
+    head: Dict[str, Any],
+    *,
+    tolerance: float,
+    metrics: List[str],
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> List[Dict[str, Any]]:
+    base_results = _flatten(base.get("results") or {})
+    head_results = _flatten(head.get("results") or {})
+    rows: List[Dict[str, Any]] = []
+    for target in sorted(set(base_results) & set(head_results)):
+        for metric in metrics:
+            direction = higher_is_better(metric)
+            if direction is None or metric not in base_results[target] or metric not in head_results[target]:
+                continue
+            before = float(base_results[target][metric])
+            after = float(head_results[target][metric])
+            change = (after - before) / before if before else 0.0
+            worse = change < -tolerance if direction else change > tolerance
+            if worse and not direction and abs(after - before) < min_delta_ms:
+                worse = False
+            rows.append({
+                "target": target,
+                "metric": metric,
+                "base": before,
+                "head": after,
+                "change_pct": round(change * 100, 2),
+                "regression": worse,
+            })
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="baseline report (e.g. from main)")
+    parser.add_argument("head", help="report to check")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown, 0.10 = 10%%")
+    parser.add_argument("--metrics", default=",".join(DEFAULT_METRICS), help="comma separated metric names")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    base = _load(args.base)
+    head = _load(args.head)
+    if base.get("mode") != head.get("mode"):
+        print(f"report modes differ: {base.get('mode')} vs {head.get('mode')}", file=sys.stderr)
+        return 2
+    notes: List[str] = []
+    if base.get("corpus_sha256") and base.get("corpus_sha256") != head.get("corpus_sha256"):
+        notes.append("corpus changed between reports; compare with care")
+
+    rows = compare(
+        base,
+        head,
+        tolerance=max(args.tolerance, 0.0),
+        metrics=[item.strip() for item in args.metrics.split(",") if item.strip()],
+        min_delta_ms=max(args.min_delta_ms, 0.0),
+    )
+    regressions = [row for row in rows if row["regression"]]
+
+    if args.json:
+        print(json.dumps({"tolerance": args.tolerance, "notes": notes, "rows": rows, "regressions": len(regressions)}, indent=2))
+    else:
+        for note in notes:
+            print(f"note: {note}")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"[{flag}] {row['target']} {row['metric']}: {row['base']} -> {row['head']} ({row['change_pct']:+.2f}%)")
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
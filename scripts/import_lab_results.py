@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from db import SessionLocal  # noqa: E402
+from lab_result_importer import FORMATS, LAB_IMPORT_CHUNK_SIZE, run_lab_result_import  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Streaming LIS lab result import V1")
+    parser.add_argument("path", help="Local CSV, NDJSON or HL7 ORU-like flat file")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Defaults to the file extension")
+    parser.add_argument("--owner-id", type=int, default=None, help="Map rows only to this owner's cases")
+    parser.add_argument("--source-system", default=None, help="Defaults to lis_file:<file name>")
+    parser.add_argument("--chunk-size", type=int, default=LAB_IMPORT_CHUNK_SIZE)
+    parser.add_argument("--apply", action="store_true", help="Write rows (needs ENABLE_LAB_REAL_INGEST); default is a dry-run report")
+    parser.add_argument("--out", default="", help="Optional output JSON file")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = run_lab_result_import(
+            db,
+            path=args.path,
+            fmt=args.format,
+            owner_id=args.owner_id,
+            dry_run=not args.apply,
+            chunk_size=args.chunk_size,
+            source_system=args.source_system,
+        )
+    except (PermissionError, ValueError, FileNotFoundError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0 if report["quality_gate"]["status"] == "PASS" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk legacy case import for Pet-Med-AI.
+
+Scope:
+- Imports case_create JSONL from scripts/legacy_cases_to_case_payloads.py for one owner.
+- Skips records whose idempotency key is already imported.
+- Writes one rollback manifest per committed batch.
+- --rollback hides the cases of one import again (soft delete).
+- Dry-run unless --apply and ENABLE_LEGACY_CASE_BULK_IMPORT=true.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from db import SessionLocal  # noqa: E402
+from legacy_case_bulk_import import (  # noqa: E402
+    BULK_IMPORT_BATCH_SIZE,
+    rollback_legacy_case_import,
+    run_legacy_case_bulk_import,
+)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk import validated legacy case JSONL.")
+    parser.add_argument("jsonl_file", nargs="?", default="", help="case_create JSONL (not needed with --rollback).")
+    parser.add_argument("--owner-id", type=int, default=None, help="User that owns the imported cases.")
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE, help="Cases per insert and per transaction.")
+    parser.add_argument("--rollback-snapshot-id", default="", help="Snapshot id from the Go / No-Go sign-off.")
+    parser.add_argument("--clinical-signoff-id", default="", help="Clinical sign-off id.")
+    parser.add_argument("--operator-id", default="", help="Person running the import.")
+    parser.add_argument("--manifest-dir", default="legacy_import_manifests", help="Parent directory for per-import manifests; with --rollback, one import's directory.")
+    parser.add_argument("--rollback", action="store_true", help="Hide the cases listed in --manifest-dir instead of importing.")
+    parser.add_argument("--include-modified", action="store_true", help="With --rollback, also hide cases edited since import.")
+    parser.add_argument("--apply", action="store_true", help="Write (needs ENABLE_LEGACY_CASE_BULK_IMPORT); default is a dry-run report.")
+    parser.add_argument("--out", default="", help="Optional output JSON file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.rollback and (not args.jsonl_file or args.owner_id is None):
+        print("ERROR: jsonl_file and --owner-id are required for import.", file=sys.stderr)
+        return 2
+
+    db = SessionLocal()
+    try:
+        if args.rollback:
+            report = rollback_legacy_case_import(
+                db,
+                manifest_dir=args.manifest_dir,
+                rollback_snapshot_id=args.rollback_snapshot_id,
+                operator_id=args.operator_id,
+                dry_run=not args.apply,
+                include_modified=args.include_modified,
+            )
+        else:
+            report = run_legacy_case_bulk_import(
+                db,
+                path=args.jsonl_file,
+                owner_id=args.owner_id,
+                dry_run=not args.apply,
+                batch_size=args.batch_size,
+                rollback_snapshot_id=args.rollback_snapshot_id,
+                clinical_signoff_id=args.clinical_signoff_id,
+                operator_id=args.operator_id,
+                manifest_dir=args.manifest_dir,
+            )
+    except (PermissionError, ValueError, FileNotFoundError, FileExistsError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.rollback:
+        return 0
+    return 0 if report["quality_gate"]["status"] == "PASS" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
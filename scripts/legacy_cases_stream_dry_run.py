@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming legacy case dry-run for large migrations.
+
+Scope:
+- Validates case_create JSONL from scripts/legacy_cases_to_case_payloads.py.
+- Streams the file in chunks across a process pool; no record cap.
+- Writes detailed errors to CSV and a report built from aggregates.
+- Never writes database records.
+- Never calls /api/cases.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from legacy_import_stream import (  # noqa: E402
+    STREAM_CHUNK_SIZE,
+    STREAM_ERROR_SAMPLE_LIMIT,
+    STREAM_SAMPLE_LIMIT,
+    default_stream_workers,
+    run_stream_dry_run,
+)
+
+
+def default_errors_path(jsonl_path: Path) -> Path:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return jsonl_path.parent / f"migration_stream_errors_{timestamp}.csv"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Streaming legacy case dry-run for JSONL of any size.")
+    parser.add_argument("jsonl_file", help="case_create JSONL from legacy_cases_to_case_payloads.py.")
+    parser.add_argument("--batch-id", default="", help="Batch id for the report.")
+    parser.add_argument("--workers", type=int, default=default_stream_workers(), help="Validation processes; 1 validates in-process.")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE, help="Records per validation chunk.")
+    parser.add_argument("--import-chunk-size", type=int, default=1000, help="Chunk size used for the import plan estimate.")
+    parser.add_argument("--sample-limit", type=int, default=STREAM_SAMPLE_LIMIT, help="Accepted payloads to include in the report.")
+    parser.add_argument("--error-sample-limit", type=int, default=STREAM_ERROR_SAMPLE_LIMIT, help="Rejected records kept by reservoir sampling.")
+    parser.add_argument("--errors-out", default="", help="Error CSV path. Default: migration_stream_errors_YYYYMMDD_HHMMSS.csv next to input.")
+    parser.add_argument("--report-out", default="", help="Optional JSON report output path.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    jsonl_path = Path(args.jsonl_file)
+
+    if not jsonl_path.exists():
+        print(f"ERROR: JSONL file not found: {jsonl_path}", file=sys.stderr)
+        return 1
+
+    errors_out = Path(args.errors_out) if args.errors_out else default_errors_path(jsonl_path)
+    try:
+        report = run_stream_dry_run(
+            jsonl_path,
+            batch_id=args.batch_id or None,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            sample_limit=args.sample_limit,
+            error_sample_limit=args.error_sample_limit,
+            errors_csv=errors_out,
+            import_chunk_size=args.import_chunk_size,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"ERROR: streaming dry-run failed: {exc}", file=sys.stderr)
+        return 1
+
+    if args.report_out:
+        path = Path(args.report_out)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    stream = report["stream"]
+    print("Legacy cases streaming dry-run")
+    print(f"  file: {jsonl_path}")
+    print(f"  received: {report['received']}")
+    print(f"  accepted: {report['accepted']}")
+    print(f"  rejected: {report['rejected']}")
+    print(f"  workers: {stream['workers']}")
+    print(f"  records_per_second: {stream['records_per_second']}")
+    print(f"  errors_out: {errors_out}")
+
+    if not report["ready_for_import"]:
+        print("  status: FAILED")
+        return 2
+
+    print("  status: PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local HTTP load test for the backend API.
+
+Migrates and seeds a database (a fresh SQLite file by default, or
+--database-url for Postgres), boots the app and drives a weighted mix of
+endpoints from concurrent virtual users:
+
+    case_list, case_search, consult_create, consult_answer,
+    kpi_dashboard, diagnostic_summary, webhook_ingest
+
+--mode asgi (default) calls the app in process through httpx's ASGI
+transport, so no socket is opened. --mode uvicorn starts uvicorn on
+127.0.0.1 and drives it over loopback HTTP. The JSON report has per-endpoint
+throughput, latency percentiles and error rates, in the same ``results``
+shape as the other benchmark reports so compare_benchmark_reports.py works
+on it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+REPORT_MODE = "api_load_test_v1"
+LOAD_TEST_SECRET_KEY = "load-test-secret-key"
+MAX_ANSWERS_PER_SESSION = 5
+
+DEFAULT_MIX = {
+    "case_list": 25,
+    "case_search": 15,
+    "consult_create": 10,
+    "consult_answer": 10,
+    "kpi_dashboard": 10,
+    "diagnostic_summary": 20,
+    "webhook_ingest": 10,
+}
+
+SEARCH_TERMS = ("呕吐", "pet-1", "不吃", "呼吸", "dog", "cat")
+ANSWERS = ("昨天开始", "没有", "一天三次", "精神比平时差", "最近换过粮")
+
+
+def _parse_mix(raw: str) -> Dict[str, int]:
+    if not raw:
+        return dict(DEFAULT_MIX)
+    mix: Dict[str, int] = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"unknown workload: {name} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = int(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+# --- Database: start ---
+def prepare_database(database_url: str, args) -> Dict[str, Any]:
+    env = {**os.environ, "DATABASE_URL": database_url}
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "-c", "alembic.ini", "upgrade", "head"],
+        cwd=str(BACKEND), env=env, check=True, capture_output=True,
+    )
+    from sqlalchemy import create_engine
+    import seed_demo
+
+    engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False} if database_url.startswith("sqlite") else {},
+    )
+    try:
+        return seed_demo.seed_load_dataset(
+            engine,
+            users=args.users,
+            cases_per_user=args.cases_per_user,
+            sessions_per_user=args.sessions_per_user,
+            reports_per_case=args.reports_per_case,
+            observations_per_report=args.observations_per_report,
+            seed=args.seed,
+        )
+    finally:
+        engine.dispose()
+
+
+def load_existing_users(database_url: str, limit: int) -> Dict[str, Any]:
+    from sqlalchemy import create_engine, select
+    from models import Case, User
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            users = conn.execute(
+                select(User.id, User.email).where(User.email.like("load-user-%@example.com")).order_by(User.id).limit(limit)
+            ).all()
+            out = []
+            for user_id, email in users:
+                case_ids = conn.execute(select(Case.id).where(Case.owner_id == user_id).limit(500)).scalars().all()
+                out.append({"email": email, "user_id": user_id, "case_ids": list(case_ids)})
+    finally:
+        engine.dispose()
+    return {"users": out, "counts": {}, "skipped_existing_users": len(out)}
+
+
+def seeded_session_uids(database_url: str) -> Dict[int, List[str]]:
+    from sqlalchemy import create_engine, select
+    from models import ConsultSession
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(select(ConsultSession.owner_id, ConsultSession.session_uid)).all()
+    finally:
+        engine.dispose()
+    out: Dict[int, List[str]] = {}
+    for owner_id, uid in rows:
+        out.setdefault(int(owner_id or 0), []).append(uid)
+    return out
+# --- Database: end ---
+
+
+# --- Workloads: start ---
+class VirtualUser:
+    def __init__(self, user: Dict[str, Any], token: str, sessions: List[str], rng: random.Random):
+        self.user = user
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.sessions = {uid: 0 for uid in sessions}
+        self.rng = rng
+
+    def pick_session(self) -> Optional[str]:
+        open_sessions = [uid for uid, count in self.sessions.items() if count < MAX_ANSWERS_PER_SESSION]
+        return self.rng.choice(open_sessions) if open_sessions else None
+
+
+def _webhook_request(rng: random.Random, secret: str) -> Tuple[bytes, Dict[str, str]]:
+    payload = {
+        "case_id": f"LOAD-{rng.randint(1, 10**9)}",
+        "pet": {"name": "LoadPet", "species": rng.choice(["dog", "cat", "rabbit"]), "weight_kg": 4.2},
+        "owner": {"name": "Load Owner"},
+        "encounter": {"encounter_id": f"E-{rng.randint(1, 10**9)}", "chief_complaint": "呕吐两天"},
+    }
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    timestamp = datetime.now(timezone.utc).isoformat()
+    digest = hmac.new(secret.encode("utf-8"), timestamp.encode("utf-8") + b"." + body, hashlib.sha256).hexdigest()
+    return body, {
+        "Content-Type": "application/json",
+        "X-PMAI-Timestamp": timestamp,
+        "X-PMAI-Signature": f"sha256={digest}",
+        "Idempotency-Key": f"load-{rng.getrandbits(64):x}",
+    }
+
+
+async def run_workload(name: str, client, vu: VirtualUser, webhook_secret: str):
+    rng = vu.rng
+    if name == "case_list":
+        return await client.get("/api/cases", params={"page": rng.randint(1, 3), "page_size": 20}, headers=vu.headers)
+    if name == "case_search":
+        return await client.get("/api/cases", params={"q": rng.choice(SEARCH_TERMS), "page_size": 20}, headers=vu.headers)
+    if name == "consult_create":
+        response = await client.post(
+            "/api/ai/consult/session",
+            json={"text": rng.choice(("狗狗今天呕吐三次，精神差", "猫咪不吃东西两天", "兔子停食，粪便减少"))},
+            headers=vu.headers,
+        )
+        if response.status_code < 400:
+            vu.sessions[response.json().get("session_id")] = 0
+        return response
+    if name == "consult_answer":
+        uid = vu.pick_session()
+        if uid is None:
+            return await run_workload("consult_create", client, vu, webhook_secret)
+        vu.sessions[uid] += 1
+        return await client.post(
+            f"/api/ai/consult/session/{uid}/answer",
+            json={"answer": rng.choice(ANSWERS), "question": "症状持续多久了？"},
+            headers=vu.headers,
+        )
+    if name == "kpi_dashboard":
+        return await client.get("/api/kpi/dashboard", headers=vu.headers)
+    if name == "diagnostic_summary":
+        case_ids = vu.user["case_ids"]
+        case_id = rng.choice(case_ids) if case_ids else 1
+        return await client.get(f"/api/diagnostic-data/cases/{case_id}/summary", headers=vu.headers)
+    if name == "webhook_ingest":
+        body, headers = _webhook_request(rng, webhook_secret)
+        return await client.post("/api/webhooks/emr/dry-run", content=body, headers=headers)
+    raise ValueError(name)
+# --- Workloads: end ---
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.started = 0.0
+        self.finished = 0.0
+
+    def add(self, name: str, elapsed_ms: float, error: Optional[str]) -> None:
+        self.samples.setdefault(name, []).append(elapsed_ms)
+        if error:
+            bucket = self.errors.setdefault(name, {})
+            bucket[error] = bucket.get(error, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(self.finished - self.started, 1e-9)
+        results: Dict[str, Any] = {}
+        all_samples: List[float] = []
+        all_errors = 0
+        for name in sorted(self.samples):
+            values = sorted(self.samples[name])
+            errors = sum(self.errors.get(name, {}).values())
+            all_samples.extend(values)
+            all_errors += errors
+            results[name] = _stats(values, errors, elapsed, self.errors.get(name, {}))
+        results["all"] = _stats(sorted(all_samples), all_errors, elapsed, {})
+        return results
+
+
+def _stats(values: List[float], errors: int, elapsed: float, by_error: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "throughput_per_s": round(len(values) / elapsed, 2),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(_percentile(values, 50), 3),
+        "p90_ms": round(_percentile(values, 90), 3),
+        "p99_ms": round(_percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+        **({"errors_by_kind": dict(by_error)} if by_error else {}),
+    }
+
+
+async def drive(
+    client,
+    users: List[VirtualUser],
+    mix: Dict[str, int],
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    max_requests: int,
+    webhook_secret: str,
+) -> Recorder:
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    issued = [0]
+    deadline = [0.0]
+    measuring = [False]
+
+    async def worker(position: int) -> None:
+        vu = users[position % len(users)]
+        while time.perf_counter() < deadline[0] and (not max_requests or issued[0] < max_requests):
+            name = vu.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            error: Optional[str] = None
+            try:
+                response = await run_workload(name, client, vu, webhook_secret)
+                if response.status_code >= 400:
+                    error = f"http_{response.status_code}"
+            except Exception as exc:  # record and keep the worker alive
+                error = type(exc).__name__
+            if measuring[0]:
+                issued[0] += 1
+                recorder.add(name, (time.perf_counter() - started) * 1000, error)
+
+    if warmup > 0:
+        deadline[0] = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+
+    measuring[0] = True
+    recorder.started = time.perf_counter()
+    deadline[0] = recorder.started + duration
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run(args, database_url: str, seeded: Dict[str, Any]) -> Dict[str, Any]:
+    import httpx
+
+    os.environ["SECRET_KEY"] = LOAD_TEST_SECRET_KEY
+    import auth_jwt
+
+    auth_jwt.SECRET_KEY = LOAD_TEST_SECRET_KEY
+    webhook_secret = os.getenv("PMAI_WEBHOOK_SECRET", "").strip()
+    if not webhook_secret:
+        from emr_webhook import DEFAULT_DRY_RUN_SECRET
+        webhook_secret = DEFAULT_DRY_RUN_SECRET
+
+    sessions = seeded_session_uids(database_url)
+    rng = random.Random(args.seed)
+    users = [
+        VirtualUser(user, auth_jwt.create_access_token(user["email"]), sessions.get(user["user_id"], []), random.Random(rng.random()))
+        for user in seeded["users"]
+    ]
+    if not users:
+        raise SystemExit("no load-test users in the database; run without --skip-seed first")
+
+    mix = _parse_mix(args.mix)
+    server = None
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        if args.mode == "uvicorn":
+            port = args.port or _free_port()
+            env = {**os.environ, "DATABASE_URL": database_url, "SECRET_KEY": LOAD_TEST_SECRET_KEY, "LAZY_ROUTERS": "false"}
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=str(BACKEND), env=env,
+            )
+            base_url = f"http://127.0.0.1:{port}"
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+                for _ in range(200):
+                    try:
+                        if (await client.get("/api/system/live")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(0.1)
+                else:
+                    raise SystemExit("uvicorn did not become live")
+                recorder = await drive(
+                    client, users, mix, concurrency=args.concurrency, duration=args.duration,
+                    warmup=args.warmup, max_requests=args.requests, webhook_secret=webhook_secret,
+                )
+        else:
+            os.environ["DATABASE_URL"] = database_url
+            os.environ.setdefault("LAZY_ROUTERS", "false")
+            import main
+
+            await main.app.router.startup()
+            transport = httpx.ASGITransport(app=main.app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+                    recorder = await drive(
+                        client, users, mix, concurrency=args.concurrency, duration=args.duration,
+                        warmup=args.warmup, max_requests=args.requests, webhook_secret=webhook_secret,
+                    )
+            finally:
+                await main.app.router.shutdown()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    return {
+        "mix": mix,
+        "results": recorder.summary(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="", help="default: a fresh SQLite file in a temp dir")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse load-test users already in --database-url")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--cases-per-user", type=int, default=50)
+    parser.add_argument("--sessions-per-user", type=int, default=5)
+    parser.add_argument("--reports-per-case", type=int, default=1)
+    parser.add_argument("--observations-per-report", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=20240601)
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn mode)")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before measuring")
+    parser.add_argument("--requests", type=int, default=0, help="stop after N measured requests (0 = duration only)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--mix", default="", help="e.g. case_list=30,consult_create=10 (default: built-in mix)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="exit 1 if the overall error rate is higher")
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    database_url = args.database_url or "sqlite:///" + str(Path(tempfile.mkdtemp()) / "pmai_load_test.db")
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(BACKEND))
+
+    seed_started = time.perf_counter()
+    seeded = load_existing_users(database_url, args.users) if args.skip_seed else prepare_database(database_url, args)
+    if not args.skip_seed and not seeded["users"]:
+        seeded = load_existing_users(database_url, args.users)
+    seed_seconds = time.perf_counter() - seed_started
+
+    outcome = asyncio.run(_run(args, database_url, seeded))
+    report = {
+        "mode": REPORT_MODE,
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "server_mode": args.mode,
+        "database": database_url.split(":", 1)[0],
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "seed": {"seconds": round(seed_seconds, 2), **seeded["counts"], "users_driven": len(seeded["users"])},
+        **outcome,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 1 if report["results"]["all"]["error_rate"] > args.max_error_rate else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
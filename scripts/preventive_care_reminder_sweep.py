@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from db import SessionLocal  # noqa: E402
+from preventive_care_sweep import SWEEP_CHUNK_SIZE, run_preventive_care_sweep  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Clinic-wide preventive care reminder sweep V1")
+    parser.add_argument("--rules", default=str(ROOT / "docs" / "preventive_care" / "VACCINE_DEWORMING_RULES_V1.csv"))
+    parser.add_argument("--as-of", default=None, help="YYYY-MM-DD; defaults to today")
+    parser.add_argument("--owner-id", type=int, default=None, help="Limit the sweep to one owner")
+    parser.add_argument("--chunk-size", type=int, default=SWEEP_CHUNK_SIZE)
+    parser.add_argument("--include-active", action="store_true", help="Also upsert reminders whose window has not started")
+    parser.add_argument("--apply", action="store_true", help="Write reminders (needs ENABLE_PREVENTIVE_CARE_SWEEP_WRITE); default is a dry-run report")
+    parser.add_argument("--out", default="", help="Optional output JSON file")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = run_preventive_care_sweep(
+            db,
+            as_of=args.as_of,
+            owner_id=args.owner_id,
+            dry_run=not args.apply,
+            include_active=args.include_active,
+            chunk_size=args.chunk_size,
+            rules_path=args.rules,
+        )
+    except PermissionError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
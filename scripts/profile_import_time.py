@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+
+def run_importtime(module: str, *, eager: bool) -> str:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///./app.db")
+    env["LAZY_ROUTERS"] = "false" if eager else env.get("LAZY_ROUTERS", "true")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BACKEND),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        tail = "\n".join(result.stderr.splitlines()[-20:])
+        raise SystemExit(f"import {module} failed:\n{tail}")
+    return result.stderr
+
+
+def parse_importtime(text: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        try:
+            self_value = int(self_us.strip())
+            cumulative_value = int(cumulative_us.strip())
+        except ValueError:
+            continue  # header row
+        stripped = name.lstrip()
+        rows.append({
+            "module": stripped.strip(),
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": self_value,
+            "cumulative_us": cumulative_value,
+        })
+    return rows
+
+
+def _is_backend_module(name: str) -> bool:
+    head = name.split(".")[0]
+    if head == "backend":
+        return True
+    return (BACKEND / f"{head}.py").exists() or (BACKEND / head / "__init__.py").exists()
+
+
+def build_report(rows: List[Dict[str, Any]], *, top: int) -> Dict[str, Any]:
+    by_package: Dict[str, Dict[str, int]] = {}
+    for row in rows:
+        head = row["module"].split(".")[0]
+        bucket = by_package.setdefault(head, {"self_us": 0, "modules": 0})
+        bucket["self_us"] += row["self_us"]
+        bucket["modules"] += 1
+
+    backend_rows = [row for row in rows if _is_backend_module(row["module"])]
+    total_us = sum(row["self_us"] for row in rows)
+    return {
+        "mode": "import_time_profile_v1",
+        "total_ms": round(total_us / 1000, 1),
+        "module_count": len(rows),
+        "backend_self_ms": round(sum(row["self_us"] for row in backend_rows) / 1000, 1),
+        "top_packages": [
+            {"package": name, "self_ms": round(value["self_us"] / 1000, 1), "modules": value["modules"]}
+            for name, value in sorted(by_package.items(), key=lambda item: -item[1]["self_us"])[:top]
+        ],
+        "top_modules_self": [
+            {"module": row["module"], "self_ms": round(row["self_us"] / 1000, 1)}
+            for row in sorted(rows, key=lambda item: -item["self_us"])[:top]
+        ],
+        "backend_modules": [
+            {
+                "module": row["module"],
+                "self_ms": round(row["self_us"] / 1000, 1),
+                "cumulative_ms": round(row["cumulative_us"] / 1000, 1),
+            }
+            for row in sorted(backend_rows, key=lambda item: -item["cumulative_us"])[:top]
+        ],
+    }
+
+
+def _print_table(title: str, items: List[Dict[str, Any]], key: str) -> None:
+    print(f"\n{title}")
+    for item in items:
+        values = "  ".join(f"{name}={value}" for name, value in item.items() if name != key)
+        print(f"  {item[key]:<60} {values}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Aggregated python -X importtime report for the backend")
+    parser.add_argument("--module", default="main", help="Module to import from backend/ (default: main)")
+    parser.add_argument("--eager", action="store_true", help="Import with LAZY_ROUTERS=false")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of tables")
+    parser.add_argument("--out", default="", help="Optional output JSON file")
+    args = parser.parse_args()
+
+    report = build_report(parse_importtime(run_importtime(args.module, eager=args.eager)), top=args.top)
+    report["module"] = args.module
+    report["lazy_routers"] = not args.eager
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"import {args.module}: {report['total_ms']} ms across {report['module_count']} modules "
+          f"(backend self {report['backend_self_ms']} ms, lazy_routers={report['lazy_routers']})")
+    _print_table("Top packages (self time)", report["top_packages"], "package")
+    _print_table("Top modules (self time)", report["top_modules_self"], "module")
+    _print_table("Backend modules (cumulative)", report["backend_modules"], "module")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Restore exports written by scripts/backup_database.py.
+
+Scope:
+- Takes a full export followed by any incrementals based on it, in order.
+- Verifies every sha256 and the alembic revision before writing.
+- Upserts rows by primary key in foreign-key order, in one transaction.
+- Dry-run (verification only) unless --apply.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from db import engine  # noqa: E402
+from db_backup import DB_BACKUP_BATCH_SIZE, restore_database  # noqa: E402
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verify and bulk-load database exports.")
+    parser.add_argument("export_dirs", nargs="+", help="Full export directory, then incremental ones in order.")
+    parser.add_argument("--batch-size", type=int, default=DB_BACKUP_BATCH_SIZE, help="Rows per insert.")
+    parser.add_argument("--allow-revision-mismatch", action="store_true", help="Load even if the target alembic revision differs.")
+    parser.add_argument("--apply", action="store_true", help="Write rows; default only verifies.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        report = restore_database(
+            engine,
+            args.export_dirs,
+            dry_run=not args.apply,
+            batch_size=args.batch_size,
+            allow_revision_mismatch=args.allow_revision_mismatch,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"ERROR: restore failed: {exc}", file=sys.stderr)
+        return 2
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["status"] in ("verified", "restored") else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
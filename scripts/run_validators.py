@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel runner for scripts/validate_*.py.
+
+Scope:
+- Discovers validators (all, by --match, by path, or those a shell script such as
+  scripts/ci_static_checks.sh invokes) and runs them in-process in a pool of
+  worker processes; each worker shares a file/compile/AST cache
+  (scripts/validator_cache.py) across the validators it runs.
+- Caches results in .validator_cache/results.json, keyed by a content hash of
+  every file each validator read, imported, compiled, listed or probed.
+- In-process failures are re-run standalone (python3 <validator>) before they
+  are reported, so the runner never fails a check that passes on its own.
+- Writes JUnit XML with --junit.
+- Exit 0 when every validator passed, 1 otherwise.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import validator_cache  # noqa: E402
+
+RESULT_CACHE_VERSION = "validator_results_v2"
+DEFAULT_CACHE_DIR = ROOT / ".validator_cache"
+DEFAULT_TIMEOUT_SECONDS = 300.0
+OUTPUT_TAIL_CHARS = 4000
+# Imported once in the parent so forked workers start with them loaded.
+PRELOAD_MODULES = ("sqlalchemy", "pydantic", "fastapi", "yaml", "jsonschema")
+# Changes to these variables can change what backend modules do at import time.
+FINGERPRINT_ENV_PREFIXES = ("ENABLE_", "DATABASE_URL", "SECRET_KEY")
+_IGNORED_PARTS = {"__pycache__", ".git", ".validator_cache", "node_modules"}
+
+
+# --- Discovery: start ---
+def discover(match: Optional[List[str]] = None, paths: Optional[List[str]] = None, from_script: Optional[str] = None) -> List[Path]:
+    if paths:
+        found = [Path(path).resolve() for path in paths]
+    elif from_script:
+        text = Path(from_script).read_text(encoding="utf-8")
+        names = re.findall(r"scripts/(validate_[A-Za-z0-9_]+\.py)", text)
+        found = [SCRIPTS / name for name in dict.fromkeys(names) if (SCRIPTS / name).exists()]
+    else:
+        found = sorted(SCRIPTS.glob("validate_*.py"))
+    if match:
+        found = [path for path in found if any(token in path.name for token in match)]
+    return found
+# --- Discovery: end ---
+
+
+# --- Worker: start ---
+def _run_in_process(path: str) -> Dict[str, Any]:
+    """Run one validator as __main__ with fd-level output capture and state restored afterwards."""
+    saved_environ = dict(os.environ)
+    saved_path = list(sys.path)
+    saved_argv = list(sys.argv)
+    saved_cwd = os.getcwd()
+    sys.argv = [path]
+    os.chdir(ROOT)
+
+    exit_code = 0
+    started = time.perf_counter()
+    with tempfile.TemporaryFile() as capture, validator_cache.recording() as inputs:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = os.dup(1), os.dup(2)
+        # fd-level redirect also captures child processes the validator starts.
+        os.dup2(capture.fileno(), 1)
+        os.dup2(capture.fileno(), 2)
+        try:
+            runpy.run_path(path, run_name="__main__")
+        except SystemExit as exc:
+            if exc.code is None:
+                exit_code = 0
+            elif isinstance(exc.code, int):
+                exit_code = exc.code
+            else:
+                print(exc.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            os.close(saved_fds[0])
+            os.close(saved_fds[1])
+            os.environ.clear()
+            os.environ.update(saved_environ)
+            sys.path[:] = saved_path
+            sys.argv = saved_argv
+            os.chdir(saved_cwd)
+        capture.seek(0)
+        output = capture.read().decode("utf-8", "replace")
+        inputs.update(validator_cache.release_modules(str(ROOT), _worker_modules))
+        touched = sorted(inputs)
+
+    return {
+        "exit_code": exit_code,
+        "output": output,
+        "seconds": round(time.perf_counter() - started, 3),
+        "inputs": touched,
+    }
+
+
+# Modules the worker itself needs (this runner, validator_cache); never unloaded.
+_worker_modules: Set[str] = set()
+
+
+def _worker_main(conn) -> None:
+    validator_cache.install()
+    _worker_modules.update(sys.modules)
+    while True:
+        path = conn.recv()
+        if path is None:
+            break
+        conn.send(_run_in_process(path))
+    conn.send({"cache_stats": dict(validator_cache.stats)})
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.task: Optional[str] = None
+        self.deadline = 0.0
+
+    def assign(self, path: str, timeout: float) -> None:
+        self.task = path
+        self.deadline = time.monotonic() + timeout
+        self.conn.send(path)
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+# --- Worker: end ---
+
+
+def run_isolated(path: str, timeout: float) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run(
+            [sys.executable, path],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            timeout=timeout,
+        )
+        exit_code, output = completed.returncode, completed.stdout.decode("utf-8", "replace")
+    except subprocess.TimeoutExpired as exc:
+        exit_code, output = 124, (exc.stdout or b"").decode("utf-8", "replace") + f"\nTIMEOUT after {timeout}s"
+    return {"exit_code": exit_code, "output": output, "seconds": round(time.perf_counter() - started, 3), "inputs": []}
+
+
+# --- Result cache: start ---
+def _relevant_inputs(paths: List[str], validator: str) -> List[str]:
+    root = str(ROOT) + os.sep
+    keep = {validator}
+    for path in paths:
+        if path.startswith(root) and not _IGNORED_PARTS.intersection(Path(path).parts):
+            keep.add(path)
+    return sorted(keep)
+
+
+def fingerprint(validator: str, inputs: List[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{RESULT_CACHE_VERSION}\0{sys.version}\0".encode("utf-8"))
+    for name in sorted(os.environ):
+        if name.startswith(FINGERPRINT_ENV_PREFIXES):
+            digest.update(f"env:{name}={os.environ[name]}\0".encode("utf-8"))
+    for path in inputs:
+        digest.update(f"{os.path.relpath(path, ROOT)}={validator_cache.path_digest(path)}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_cache(cache_dir: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads((cache_dir / "results.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get("results", {}) if data.get("version") == RESULT_CACHE_VERSION else {}
+
+
+def _save_cache(cache_dir: Path, results: Dict[str, Any]) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_dir / "results.json.partial"
+    tmp.write_text(json.dumps({"version": RESULT_CACHE_VERSION, "results": results}, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, cache_dir / "results.json")
+# --- Result cache: end ---
+
+
+def run_validators(
+    validators: List[Path],
+    *,
+    workers: int,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+    isolated: bool = False,
+    confirm_failures: bool = True,
+    progress=None,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    cached = _load_cache(cache_dir) if cache_dir else {}
+    results: Dict[str, Dict[str, Any]] = {}
+    pending: List[str] = []
+
+    for path in validators:
+        key = str(path)
+        entry = cached.get(os.path.relpath(key, ROOT))
+        if entry and fingerprint(key, [os.path.join(ROOT, item) for item in entry["inputs"]]) == entry["fingerprint"]:
+            results[key] = {**entry, "status": "passed" if entry["exit_code"] == 0 else "failed", "cached": True}
+            if progress:
+                progress(key, results[key])
+        else:
+            pending.append(key)
+
+    cache_stats: Dict[str, int] = {}
+    if isolated:
+        for key in pending:
+            results[key] = {**run_isolated(key, timeout), "mode": "isolated", "cacheable": False}
+            if progress:
+                progress(key, results[key])
+    elif pending:
+        for name in PRELOAD_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        pool = [_Worker(context) for _ in range(max(1, min(workers, len(pending))))]
+        queue = list(pending)
+        busy: Dict[Any, _Worker] = {}
+
+        def feed(worker: _Worker) -> None:
+            if queue:
+                worker.assign(queue.pop(0), timeout)
+                busy[worker.conn] = worker
+
+        for worker in pool:
+            feed(worker)
+        while busy:
+            now = time.monotonic()
+            ready = wait(list(busy), timeout=max(0.05, min(w.deadline for w in busy.values()) - now))
+            for conn in ready:
+                worker = busy.pop(conn)
+                task = worker.task
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    # The validator killed its worker (os._exit, crash); record it and start a new one.
+                    result = {"exit_code": 1, "output": "worker exited unexpectedly", "seconds": 0.0, "inputs": []}
+                    pool.remove(worker)
+                    worker.kill()
+                    worker = _Worker(context)
+                    pool.append(worker)
+                results[task] = {**result, "mode": "in_process", "cacheable": True}
+                # Failures are reported once the standalone re-run has confirmed them.
+                if progress and (result["exit_code"] == 0 or not confirm_failures):
+                    progress(task, results[task])
+                feed(worker)
+            for conn, worker in list(busy.items()):
+                if time.monotonic() > worker.deadline:
+                    busy.pop(conn)
+                    results[worker.task] = {"exit_code": 124, "output": f"TIMEOUT after {timeout}s", "seconds": timeout, "inputs": [], "mode": "in_process", "cacheable": False}
+                    if progress:
+                        progress(worker.task, results[worker.task])
+                    pool.remove(worker)
+                    worker.kill()
+                    replacement = _Worker(context)
+                    pool.append(replacement)
+                    feed(replacement)
+        for worker in pool:
+            worker.conn.send(None)
+            try:
+                stats = worker.conn.recv().get("cache_stats", {})
+                for name, value in stats.items():
+                    cache_stats[name] = cache_stats.get(name, 0) + value
+            except EOFError:
+                pass
+            worker.process.join()
+
+    if confirm_failures and not isolated:
+        for key in pending:
+            result = results[key]
+            if result["exit_code"] != 0 and result.get("mode") == "in_process":
+                confirmed = run_isolated(key, timeout)
+                result["in_process_exit_code"] = result["exit_code"]
+                result["exit_code"] = confirmed["exit_code"]
+                result["output"] = confirmed["output"]
+                result["confirmed_isolated"] = True
+                if confirmed["exit_code"] == 0:
+                    # Passes alone: in-process state leaked into it; never cache that.
+                    result["cacheable"] = False
+                if progress:
+                    progress(key, result)
+
+    if cache_dir is not None:
+        for key in pending:
+            result = results[key]
+            if not result.get("cacheable") or result["exit_code"] == 124:
+                continue
+            source = Path(key).read_text(encoding="utf-8", errors="replace")
+            if "subprocess" in source:
+                # Child processes read files the runner cannot see.
+                continue
+            inputs = _relevant_inputs(result["inputs"], key)
+            cached[os.path.relpath(key, ROOT)] = {
+                "fingerprint": fingerprint(key, inputs),
+                "inputs": [os.path.relpath(path, ROOT) for path in inputs],
+                "exit_code": result["exit_code"],
+                "output": result["output"][-OUTPUT_TAIL_CHARS:],
+                "seconds": result["seconds"],
+            }
+        _save_cache(cache_dir, cached)
+
+    items = []
+    for path in validators:
+        key = str(path)
+        result = results[key]
+        items.append({
+            "validator": os.path.relpath(key, ROOT),
+            "status": "passed" if result["exit_code"] == 0 else "failed",
+            "exit_code": result["exit_code"],
+            "seconds": result["seconds"],
+            "cached": bool(result.get("cached")),
+            "mode": result.get("mode", "cache"),
+            "in_process_exit_code": result.get("in_process_exit_code"),
+            "output": result["output"],
+        })
+    return {
+        "total": len(items),
+        "passed": sum(1 for item in items if item["status"] == "passed"),
+        "failed": sum(1 for item in items if item["status"] == "failed"),
+        "cached": sum(1 for item in items if item["cached"]),
+        "seconds": round(time.perf_counter() - started, 3),
+        "workers": 0 if isolated else workers,
+        "file_cache": cache_stats,
+        "items": items,
+    }
+
+
+def write_junit(report: Dict[str, Any], path: Path) -> None:
+    suite = ET.Element(
+        "testsuite",
+        name="validators",
+        tests=str(report["total"]),
+        failures=str(report["failed"]),
+        errors="0",
+        skipped="0",
+        time=str(report["seconds"]),
+    )
+    for item in report["items"]:
+        case = ET.SubElement(suite, "testcase", classname="scripts", name=Path(item["validator"]).stem, time=str(item["seconds"]))
+        output = item["output"][-OUTPUT_TAIL_CHARS:]
+        if item["status"] == "failed":
+            failure = ET.SubElement(case, "failure", message=f"exit code {item['exit_code']}")
+            failure.text = output
+        system_out = ET.SubElement(case, "system-out")
+        system_out.text = ("[cached result]\n" if item["cached"] else "") + output
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run scripts/validate_*.py in parallel with shared caches.")
+    parser.add_argument("validators", nargs="*", help="Validator paths; default discovers scripts/validate_*.py.")
+    parser.add_argument("--match", action="append", default=[], help="Only validators whose file name contains this (repeatable).")
+    parser.add_argument("--from-script", default="", help="Run the validators a shell script invokes, e.g. scripts/ci_static_checks.sh.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS, help="Seconds per validator.")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Result cache directory.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not write cached results.")
+    parser.add_argument("--isolated", action="store_true", help="Run each validator as its own python3 process.")
+    parser.add_argument("--no-confirm-failures", action="store_true", help="Report in-process failures without a standalone re-run.")
+    parser.add_argument("--junit", default="", help="Write JUnit XML to this path.")
+    parser.add_argument("--json", default="", help="Write the full JSON report to this path.")
+    parser.add_argument("--quiet", action="store_true", help="Only print failures and the summary.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    validators = discover(args.match, args.validators, args.from_script or None)
+    if not validators:
+        print("ERROR: no validators found", file=sys.stderr)
+        return 2
+
+    def progress(key: str, result: Dict[str, Any]) -> None:
+        ok = result["exit_code"] == 0
+        if args.quiet and ok:
+            return
+        tag = "cached" if result.get("cached") else f"{result['seconds']:.2f}s"
+        print(f"{'PASS' if ok else 'FAIL'} {os.path.relpath(key, ROOT)} ({tag})", flush=True)
+
+    report = run_validators(
+        validators,
+        workers=args.workers,
+        timeout=args.timeout,
+        cache_dir=None if args.no_cache else Path(args.cache_dir),
+        isolated=args.isolated,
+        confirm_failures=not args.no_confirm_failures,
+        progress=progress,
+    )
+
+    failed = [item for item in report["items"] if item["status"] == "failed"]
+    for item in failed:
+        print(f"\n--- {item['validator']} (exit {item['exit_code']}) ---")
+        print(item["output"][-OUTPUT_TAIL_CHARS:].rstrip())
+    if args.junit:
+        write_junit(report, Path(args.junit))
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    print(
+        f"\nvalidators: {report['total']} passed: {report['passed']} failed: {report['failed']} "
+        f"cached: {report['cached']} seconds: {report['seconds']}"
+    )
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
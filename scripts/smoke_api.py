@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent API smoke runner.
+
+Runs the checks declared in scripts/smoke_api_checks.py. Every check is one
+request plus in-process assertions on its JSON response. A check starts as
+soon as the checks it depends on have passed; dependencies come from
+``after=`` and from the ``{variables}`` it uses that another check saves.
+All requests share one pooled keep-alive httpx client.
+
+    python3 scripts/smoke_api.py --base-url https://staging.example.com
+    python3 scripts/smoke_api.py --local
+
+--local migrates a fresh SQLite database, imports the app and calls it in
+process through httpx's ASGI transport: no server, no network. Exit 0 when
+every selected check passed, 1 otherwise.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import smoke_api_checks  # noqa: E402
+from smoke_api_checks import CHECKS, Check, evaluate  # noqa: E402
+
+REPORT_MODE = "api_smoke_v1"
+LOCAL_SECRET_KEY = "smoke-api-local-secret-key"
+DEFAULT_BASE_URL = "http://127.0.0.1:8000"
+DEFAULT_PASSWORD = "123456"
+EMR_DRY_RUN_SECRET = "petmed-emr-webhook-dry-run-secret-v1"
+BODY_EXCERPT_CHARS = 800
+
+_FORMATTER = string.Formatter()
+
+
+# --- Context: start ---
+def _emr_webhook_vars(run_id: str, secret: str) -> Dict[str, str]:
+    body = json.dumps(smoke_api_checks.emr_webhook_payload(run_id), ensure_ascii=False, separators=(",", ":"))
+    ts = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    signature = "sha256=" + hmac.new(secret.encode("utf-8"), (ts + "." + body).encode("utf-8"), hashlib.sha256).hexdigest()
+    return {"emr_body": body, "emr_ts": ts, "emr_sig": signature}
+
+
+def initial_context(args) -> Dict[str, Any]:
+    run_id = args.run_id or f"{int(time.time())}{os.getpid() % 100000}"
+    secret = os.getenv("PMAI_WEBHOOK_SECRET", "").strip() or EMR_DRY_RUN_SECRET
+    return {
+        "run_id": run_id,
+        "email_a": f"smokea{run_id}@gmail.com",
+        "email_b": f"smokeb{run_id}@gmail.com",
+        "password": args.password,
+        "frontend_url": "" if args.local else args.frontend_url,
+        **_emr_webhook_vars(run_id, secret),
+    }
+# --- Context: end ---
+
+
+# --- Plan: start ---
+def template_names(value: Any) -> Set[str]:
+    """``{name}`` placeholders used anywhere in a string / dict / list."""
+    if isinstance(value, str):
+        return {name for _, name, _, _ in _FORMATTER.parse(value) if name}
+    if isinstance(value, dict):
+        return set().union(*(template_names(item) for item in value.values())) if value else set()
+    if isinstance(value, (list, tuple)):
+        return set().union(*(template_names(item) for item in value)) if value else set()
+    return set()
+
+
+def render(value: Any, context: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        names = template_names(value)
+        if not names:
+            return value
+        # A bare "{name}" keeps the saved value's type (ids stay ints in JSON bodies).
+        if len(names) == 1 and value == "{%s}" % next(iter(names)):
+            return context[value[1:-1]]
+        return value.format_map(context)
+    if isinstance(value, dict):
+        return {key: render(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, context) for item in value]
+    if isinstance(value, tuple):
+        return tuple(render(item, context) for item in value)
+    return value
+
+
+def check_inputs(check: Check) -> Set[str]:
+    names = template_names([check.path, check.json, check.form, check.content, check.headers, check.params])
+    names |= template_names([list(expect.args) for expect in check.expect])
+    if check.auth:
+        names.add(f"token_{check.auth}")
+    if check.only_if:
+        names.add(check.only_if)
+    return names
+
+
+def build_plan(checks: Iterable[Check], base_vars: Iterable[str]) -> Dict[str, Set[str]]:
+    """Dependencies per check name; raises ValueError on a broken catalogue."""
+    checks = list(checks)
+    names = [check.name for check in checks]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate check names: {', '.join(duplicates)}")
+    producers: Dict[str, str] = {}
+    for check in checks:
+        for var in check.save:
+            if var in producers:
+                raise ValueError(f"{var} is saved by both {producers[var]} and {check.name}")
+            producers[var] = check.name
+    known = set(base_vars)
+    deps: Dict[str, Set[str]] = {}
+    for check in checks:
+        needed = set(check.after)
+        for var in check_inputs(check):
+            if var in producers:
+                needed.add(producers[var])
+            elif var not in known:
+                raise ValueError(f"{check.name}: unknown variable {{{var}}}")
+        unknown = needed - set(names)
+        if unknown:
+            raise ValueError(f"{check.name}: unknown dependency {', '.join(sorted(unknown))}")
+        needed.discard(check.name)
+        deps[check.name] = needed
+
+    state: Dict[str, int] = {}
+
+    def visit(name: str, trail: Tuple[str, ...]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError("dependency cycle: " + " -> ".join(trail + (name,)))
+        state[name] = 1
+        for dep in sorted(deps[name]):
+            visit(dep, trail + (name,))
+        state[name] = 2
+
+    for name in names:
+        visit(name, ())
+    return deps
+
+
+def select_checks(checks: List[Check], deps: Dict[str, Set[str]], patterns: List[str], groups: List[str]) -> List[Check]:
+    """Checks matching --match / --group plus everything they depend on."""
+    if not patterns and not groups:
+        return list(checks)
+    wanted = {
+        check.name for check in checks
+        if any(pattern in check.name for pattern in patterns) or check.group in groups
+    }
+    stack = list(wanted)
+    while stack:
+        for dep in deps[stack.pop()]:
+            if dep not in wanted:
+                wanted.add(dep)
+                stack.append(dep)
+    return [check for check in checks if check.name in wanted]
+# --- Plan: end ---
+
+
+# --- Execution: start ---
+def _excerpt(response) -> str:
+    text = response.text if response is not None else ""
+    return text if len(text) <= BODY_EXCERPT_CHARS else text[:BODY_EXCERPT_CHARS] + "..."
+
+
+async def run_check(client, check: Check, context: Dict[str, Any]) -> Dict[str, Any]:
+    headers = dict(render(check.headers, context))
+    if check.auth:
+        headers["Authorization"] = f"Bearer {context[f'token_{check.auth}']}"
+    request: Dict[str, Any] = {"headers": headers}
+    if check.params:
+        request["params"] = render(check.params, context)
+    if check.json is not None:
+        request["json"] = render(check.json, context)
+    elif check.form is not None:
+        request["data"] = render(check.form, context)
+    elif check.content is not None:
+        request["content"] = render(check.content, context).encode("utf-8")
+        headers.setdefault("Content-Type", "application/json")
+
+    started = time.perf_counter()
+    response = None
+    errors: List[str] = []
+    try:
+        response = await client.request(check.method, render(check.path, context), **request)
+    except Exception as exc:  # transport errors fail the check, not the run
+        errors.append(f"request failed: {type(exc).__name__}: {exc}")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if response is not None:
+        expected = check.status if isinstance(check.status, tuple) else (check.status,)
+        if response.status_code not in expected:
+            errors.append(f"expected HTTP {'/'.join(map(str, expected))}, got {response.status_code}")
+        else:
+            data: Any = None
+            if check.expect or check.save:
+                try:
+                    data = response.json()
+                except ValueError:
+                    errors.append("response is not JSON")
+            if not errors:
+                expects = [replace(expect, args=render(expect.args, context)) for expect in check.expect]
+                errors.extend(evaluate(expects, data))
+                for var, dotted in check.save.items():
+                    value = smoke_api_checks.lookup(data, dotted)
+                    if value in (None, ""):
+                        errors.append(f"save {var}: {dotted} is empty")
+                    else:
+                        context[var] = value
+
+    result = {
+        "name": check.name,
+        "group": check.group,
+        "method": check.method,
+        "path": check.path,
+        "status": "passed" if not errors else "failed",
+        "http_status": response.status_code if response is not None else None,
+        "elapsed_ms": round(elapsed_ms, 3),
+    }
+    if errors:
+        result["errors"] = errors
+        result["body"] = _excerpt(response)
+    return result
+
+
+async def run_plan(client, checks: List[Check], deps: Dict[str, Set[str]], context: Dict[str, Any], *, concurrency: int, verbose: bool) -> List[Dict[str, Any]]:
+    done: Dict[str, asyncio.Future] = {check.name: asyncio.get_running_loop().create_future() for check in checks}
+    gate = asyncio.Semaphore(max(1, concurrency))
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async def one(check: Check) -> None:
+        blocked = [dep for dep in sorted(deps[check.name]) if not await done[dep]]
+        if check.only_if and not context.get(check.only_if):
+            result = {"name": check.name, "group": check.group, "status": "not_applicable"}
+        elif blocked:
+            result = {"name": check.name, "group": check.group, "status": "skipped", "errors": [f"blocked by {', '.join(blocked)}"]}
+        else:
+            async with gate:
+                result = await run_check(client, check, context)
+        results[check.name] = result
+        done[check.name].set_result(result["status"] in ("passed", "not_applicable"))
+        if verbose or result["status"] == "failed":
+            _print_result(result)
+
+    await asyncio.gather(*(one(check) for check in checks))
+    return [results[check.name] for check in checks]
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    label = {"passed": "PASS", "failed": "FAIL", "skipped": "SKIP", "not_applicable": "N/A "}[result["status"]]
+    timing = f"  {result['elapsed_ms']:.0f} ms" if "elapsed_ms" in result else ""
+    print(f"{label} {result['name']}{timing}", flush=True)
+    if result["status"] == "failed":
+        for error in result.get("errors", []):
+            print(f"     {error}", flush=True)
+        if result.get("body"):
+            print(f"     HTTP {result.get('http_status')}: {result['body']}", flush=True)
+# --- Execution: end ---
+
+
+# --- Targets: start ---
+def prepare_local_database(database_url: str) -> None:
+    env = {**os.environ, "DATABASE_URL": database_url}
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "-c", "alembic.ini", "upgrade", "head"],
+        cwd=str(BACKEND), env=env, check=True, capture_output=True,
+    )
+
+
+async def _run(args, checks: List[Check], deps: Dict[str, Set[str]], context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout, connect=15.0)
+    if not args.local:
+        async with httpx.AsyncClient(base_url=args.base_url.rstrip("/"), limits=limits, timeout=timeout) as client:
+            return await run_plan(client, checks, deps, context, concurrency=args.concurrency, verbose=not args.quiet)
+
+    import main
+
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://smoke.local", timeout=timeout) as client:
+            return await run_plan(client, checks, deps, context, concurrency=args.concurrency, verbose=not args.quiet)
+    finally:
+        await main.app.router.shutdown()
+
+
+def _local_environment(args) -> str:
+    work_dir = Path(tempfile.mkdtemp(prefix="pmai_smoke_"))
+    database_url = args.database_url or "sqlite:///" + str(work_dir / "pmai_smoke.db")
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SECRET_KEY"] = os.environ.get("SECRET_KEY") or LOCAL_SECRET_KEY
+    os.environ.setdefault("AUDIT_LOG_JOURNAL_DIR", str(work_dir / "audit_journal"))
+    os.environ.setdefault("AUDIT_LOG_GROUP_COMMIT", "true")
+    sys.path.insert(0, str(BACKEND))
+    if not args.skip_migrate:
+        prepare_local_database(database_url)
+    return database_url
+# --- Targets: end ---
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL", DEFAULT_BASE_URL))
+    parser.add_argument("--frontend-url", default=os.getenv("FRONTEND_URL", ""), help="also check the frontend responds (remote only)")
+    parser.add_argument("--local", action="store_true", help="in-process ASGI app on a fresh database instead of --base-url")
+    parser.add_argument("--database-url", default="", help="--local: use this database instead of a fresh SQLite file")
+    parser.add_argument("--skip-migrate", action="store_true", help="--local: do not run alembic upgrade head first")
+    parser.add_argument("--password", default=os.getenv("PASSWORD", DEFAULT_PASSWORD))
+    parser.add_argument("--run-id", default="", help="suffix for smoke users and idempotency keys (default: time + pid)")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once (1 = declaration order)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per request, seconds")
+    parser.add_argument("--match", action="append", default=[], help="only checks whose name contains this (plus their dependencies)")
+    parser.add_argument("--group", action="append", default=[], help="only checks in this group (plus their dependencies)")
+    parser.add_argument("--list", action="store_true", help="print the checks and their dependencies, run nothing")
+    parser.add_argument("--json", default="", help="write a JSON report here")
+    parser.add_argument("--quiet", action="store_true", help="print failures and the summary only")
+    args = parser.parse_args()
+
+    context = initial_context(args)
+    deps = build_plan(CHECKS, context)
+    checks = select_checks(CHECKS, deps, args.match, args.group)
+    if args.list:
+        for check in checks:
+            after = ", ".join(sorted(deps[check.name]))
+            print(f"{check.group:<18} {check.name}" + (f"  <- {after}" if after else ""))
+        return 0
+
+    target = args.base_url
+    if args.local:
+        target = "asgi:" + _local_environment(args).split(":", 1)[0]
+    print(f"[smoke_api] {len(checks)} checks against {target} (run_id={context['run_id']}, concurrency={args.concurrency})", flush=True)
+
+    started = time.perf_counter()
+    results = asyncio.run(_run(args, checks, deps, context))
+    elapsed = time.perf_counter() - started
+
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in ("passed", "failed", "skipped", "not_applicable")}
+    ok = counts["failed"] == 0 and counts["skipped"] == 0
+    print(
+        f"[smoke_api] {'PASS' if ok else 'FAIL'}: {counts['passed']} passed, {counts['failed']} failed, "
+        f"{counts['skipped']} skipped, {counts['not_applicable']} n/a in {elapsed:.2f} s",
+        flush=True,
+    )
+    if args.json:
+        report = {
+            "mode": REPORT_MODE,
+            "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "target": target,
+            "run_id": context["run_id"],
+            "concurrency": args.concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "counts": counts,
+            "results": results,
+        }
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,725 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative API smoke checks for scripts/smoke_api.py.
+
+Each ``Check`` is one request and the assertions on its JSON response.
+``{name}`` placeholders in the path, headers, params, body and expectations
+are filled from the run context: the base variables set up by the runner
+(run_id, email_a, email_b, password, frontend_url, emr_body, emr_ts,
+emr_sig) plus whatever earlier checks ``save``. Using a saved variable makes
+the check wait for the one that saves it; ``after`` orders checks that share
+server-side state without sharing a variable. Everything else runs
+concurrently.
+
+Assertions mirror the helpers in scripts/smoke_petmed.sh:
+
+    contains(path, needle)    str(value) contains needle (json_assert_text_contains)
+    equals(path, value)       value == expected, type included
+    not_empty(path)           value is not None / "" / [] / {}
+    one_of(path, *values)     value is one of the given values
+    at_least(path, n)         numeric value >= n
+    has_item(path, key, v)    some item of the list has str(item[key]) == str(v)
+    lacks_item(path, key, v)  no item of the list has str(item[key]) == str(v)
+
+Paths are dotted; list positions are numbers (``sections.0.title``).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+
+@dataclass(frozen=True)
+class Expect:
+    op: str
+    path: str
+    args: Tuple[Any, ...] = ()
+
+
+@dataclass(frozen=True)
+class Check:
+    name: str
+    method: str
+    path: str
+    status: Union[int, Tuple[int, ...]] = 200
+    group: str = ""
+    auth: Optional[str] = None  # "a" / "b": send the token saved as token_a / token_b
+    json: Any = None
+    form: Optional[Dict[str, str]] = None
+    content: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    params: Dict[str, Any] = field(default_factory=dict)
+    expect: Tuple[Expect, ...] = ()
+    save: Dict[str, str] = field(default_factory=dict)
+    after: Tuple[str, ...] = ()
+    only_if: str = ""  # run only when this context variable is non-empty
+
+
+# --- Assertions: start ---
+def contains(path: str, needle: Any) -> Expect:
+    return Expect("contains", path, (needle,))
+
+
+def equals(path: str, value: Any) -> Expect:
+    return Expect("equals", path, (value,))
+
+
+def not_empty(path: str) -> Expect:
+    return Expect("not_empty", path)
+
+
+def one_of(path: str, *values: Any) -> Expect:
+    return Expect("one_of", path, tuple(values))
+
+
+def at_least(path: str, minimum: float) -> Expect:
+    return Expect("at_least", path, (minimum,))
+
+
+def has_item(path: str, key: str, value: Any) -> Expect:
+    return Expect("has_item", path, (key, value))
+
+
+def lacks_item(path: str, key: str, value: Any) -> Expect:
+    return Expect("lacks_item", path, (key, value))
+
+
+def lookup(data: Any, dotted: str) -> Any:
+    current = data
+    for part in dotted.split("."):
+        if part == "":
+            continue
+        if isinstance(current, list):
+            try:
+                current = current[int(part)]
+            except (ValueError, IndexError):
+                return None
+        elif isinstance(current, dict):
+            current = current.get(part)
+        else:
+            return None
+        if current is None:
+            return None
+    return current
+
+
+def _check_one(expect: Expect, data: Any) -> Optional[str]:
+    value = lookup(data, expect.path)
+    shown = repr(value)
+    if len(shown) > 200:
+        shown = shown[:200] + "..."
+    if expect.op == "contains":
+        needle = str(expect.args[0])
+        if value is None or needle not in str(value):
+            return f"{expect.path}: does not contain {needle!r}; actual={shown}"
+    elif expect.op == "equals":
+        if value != expect.args[0] or type(value) is not type(expect.args[0]):
+            return f"{expect.path}: expected {expect.args[0]!r}, actual={shown}"
+    elif expect.op == "not_empty":
+        if value in (None, "", [], {}):
+            return f"{expect.path}: is empty"
+    elif expect.op == "one_of":
+        if value not in expect.args:
+            return f"{expect.path}: expected one of {list(expect.args)!r}, actual={shown}"
+    elif expect.op == "at_least":
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < expect.args[0]:
+            return f"{expect.path}: expected >= {expect.args[0]!r}, actual={shown}"
+    elif expect.op in ("has_item", "lacks_item"):
+        key, wanted = expect.args
+        items = value if isinstance(value, list) else []
+        found = any(isinstance(item, dict) and str(item.get(key)) == str(wanted) for item in items)
+        if expect.op == "has_item" and not found:
+            return f"{expect.path}: no item with {key}={wanted!r}"
+        if expect.op == "lacks_item" and found:
+            return f"{expect.path}: unexpected item with {key}={wanted!r}"
+    else:
+        return f"{expect.path}: unknown assertion {expect.op!r}"
+    return None
+
+
+def evaluate(expects: Sequence[Expect], data: Any) -> List[str]:
+    """Error messages for the failed assertions; empty when all hold."""
+    return [error for error in (_check_one(expect, data) for expect in expects) if error]
+# --- Assertions: end ---
+
+
+# --- Fixtures: start ---
+def emr_webhook_payload(run_id: str) -> Dict[str, Any]:
+    return {
+        "case_id": f"CASE-SMOKE-{run_id}",
+        "pet": {"name": "咪咪", "species": "cat", "dob": "2023-09-01", "weight_kg": 3.2},
+        "owner": {"name": "王小花", "phone": "+86-13900000000", "id": "OWNER-SMOKE"},
+        "encounter": {
+            "encounter_id": f"ENC-SMOKE-{run_id}",
+            "status": "updated",
+            "chief_complaint": "呕吐、腹泻、食欲差",
+            "vitals": {"temp_c": 39.2, "hr": 160, "rr": 32, "weight_kg": 3.1, "bcs": 4},
+            "diagnosis_codes": ["K52.9", "R11"],
+            "procedures": ["US-ABDOMEN", "CBC", "BIOCHEM"],
+            "meds": [{"name": "奥美拉唑", "dose": "1 mg/kg", "route": "PO", "freq": "q24h"}],
+        },
+        "attachments": [{"presigned_url": "https://files.example.com/presigned/smoke.jpg"}],
+        "clinician": {"id": "CLN-SMOKE", "name": "Smoke Clinician"},
+        "timestamps": {"created_at": "2026-05-25T09:12:33Z", "updated_at": "2026-05-25T10:05:11Z"},
+    }
+
+
+DANGEROUS_FLAGS = (
+    "ENABLE_EMR_REAL_IMPORT",
+    "ENABLE_EMR_IMPORT_CASE_UPDATE",
+    "ENABLE_EMR_ATTACHMENT_DOWNLOAD",
+    "ENABLE_PREVENTIVE_AUTO_DELIVERY",
+    "ENABLE_PREVENTIVE_SMS_DELIVERY",
+    "ENABLE_PREVENTIVE_WECHAT_DELIVERY",
+    "ENABLE_PREVENTIVE_EMAIL_DELIVERY",
+    "ENABLE_PRESCRIPTION_STRUCTURED_WRITE",
+    "ENABLE_DEVICE_REAL_INGEST",
+    "ENABLE_BILLING_REAL_WRITE",
+)
+
+EMR_HEADERS = {"X-PMAI-Timestamp": "{emr_ts}", "X-PMAI-Signature": "{emr_sig}"}
+
+AUDIT_LOG_BODY = {
+    "request_id": "smoke-audit-{run_id}",
+    "patient_token": "tok-smoke-{run_id}",
+    "clinician_id": "SMOKE-CLINICIAN",
+    "model_version": "pet-med-ai@smoke",
+    "confidence": 0.82,
+    "suggested_action": "建议：根据问诊风险提示完善检查计划。",
+    "action_taken": "accepted",
+    "override_reason": "与临床体征一致",
+    "note": "Smoke test append-only audit log entry.",
+    "event_type": "ai_review",
+    "source": "smoke",
+    "metadata": {"test": "audit-log-api-v1"},
+}
+
+CONSULT_QUESTION_1 = "目前是否有腹胀、干呕或精神沉郁？"
+CONSULT_ANSWER_1 = "突然出现，已经持续4小时，期间有干呕，肚子越来越胀"
+CONSULT_QUESTION_2 = "今天症状是否缓解？腹部触诊和精神状态如何？"
+CONSULT_ANSWER_2 = "今天仍有干呕，腹部紧张，精神比昨天更差"
+
+SAVE_CASE_BODY = {
+    "patient_name": "Smoke乐乐",
+    "species": "dog",
+    "sex": "M",
+    "age_info": "4y",
+    "breed": "贵宾",
+    "weight": "5.2kg",
+    "coat_color": "白色",
+    "owner_name": "张三",
+    "owner_phone": "13800000000",
+}
+
+# species, text, risk level, tree_path label, tree_path branch. Rabbit and
+# lizard use the current taxonomy wording, as smoke_petmed.sh's legacy patch does.
+EXOTIC_CONSULTS = (
+    ("rabbit", "兔子24小时不吃东西，粪便明显减少，精神差，腹胀", "高", "兔", "胃肠"),
+    ("bird", "鹦鹉张口呼吸，尾巴上下摆，蓬毛闭眼", "高", "鸟", "呼吸"),
+    ("lizard", "鬃狮蜥拒食一周，UVB灯坏了，腿软，活动少", "中", "蜥蜴", "UVB"),
+    ("ferret", "雪貂突然虚弱，流口水，后肢无力，发呆", "高", "雪貂", "低血糖"),
+    ("guinea_pig", "豚鼠不吃东西，流口水，粪便减少，精神差", "高", "豚鼠", "牙科"),
+)
+
+# name, species, text, tree_path.2 branch
+COMPANION_CONSULTS = (
+    ("dog_gdv", "dog", "犬反复干呕吐不出来，腹部胀大，坐立不安，流口水", "GDV"),
+    ("dog_toxin", "dog", "狗误食巧克力后呕吐、烦躁、心跳快", "毒理"),
+    ("dog_seizure", "dog", "狗连续抽搐两次，意识不清，流口水", "神经"),
+    ("cat_urinary_obstruction", "cat", "公猫频繁蹲猫砂盆，尿不出来，叫唤，精神差", "尿闭"),
+    ("cat_anorexia", "cat", "猫三天不吃东西，精神差，体重下降", "不吃"),
+    ("cat_respiratory", "cat", "猫张口呼吸，呼吸急促，趴着不动", "呼吸"),
+)
+# --- Fixtures: end ---
+
+
+# --- Checks: start ---
+SYSTEM_CHECKS = [
+    Check("healthz", "GET", "/healthz", group="system"),
+    Check(
+        "system_version", "GET", "/api/system/version", group="system",
+        expect=(
+            contains("message", "system_version"),
+            equals("database_revision", "0009_diag_data"),
+            equals("alembic_head", "0009_diag_data"),
+            equals("schema_ok", True),
+            equals("migration_errors", []),
+            equals("writes_database", False),
+            equals("exposes_database_url", False),
+        ),
+    ),
+    Check(
+        "system_feature_flags", "GET", "/api/system/feature-flags", group="system",
+        expect=(
+            contains("message", "system_feature_flags"),
+            equals("all_dangerous_features_disabled", True),
+            equals("writes_database", False),
+            equals("exposes_secret_values", False),
+            *(equals(f"flags.{flag}.enabled", False) for flag in DANGEROUS_FLAGS),
+        ),
+    ),
+    Check("frontend_reachable", "GET", "{frontend_url}", status=(200, 304), group="system", only_if="frontend_url"),
+]
+
+EMR_WEBHOOK_CHECKS = [
+    Check(
+        "emr_webhook_dry_run", "POST", "/api/webhooks/emr/dry-run", 202, group="emr_webhook",
+        content="{emr_body}", headers={**EMR_HEADERS, "Idempotency-Key": "smoke-emr-{run_id}"},
+        expect=(
+            contains("message", "emr_webhook_dry_run"),
+            equals("status", "accepted"),
+            equals("writes_webhook_inbox", True),
+            equals("writes_case_database", False),
+            equals("creates_case", False),
+            equals("downloads_attachments", False),
+            equals("receipt_persisted", True),
+            equals("mapped_case_preview.patient_name", "咪咪"),
+            equals("mapped_case_preview.species", "cat"),
+        ),
+        save={"emr_receipt_id": "receipt_id"},
+    ),
+    Check(
+        "emr_webhook_dry_run_duplicate", "POST", "/api/webhooks/emr/dry-run", 202, group="emr_webhook",
+        content="{emr_body}", headers={**EMR_HEADERS, "Idempotency-Key": "smoke-emr-{run_id}"},
+        expect=(equals("status", "duplicate"), equals("receipt_persisted", True)),
+        after=("emr_webhook_dry_run",),
+    ),
+    Check(
+        "emr_webhook_rejects_bad_signature", "POST", "/api/webhooks/emr/dry-run", 401, group="emr_webhook",
+        content="{emr_body}",
+        headers={"X-PMAI-Timestamp": "{emr_ts}", "X-PMAI-Signature": "sha256=bad", "Idempotency-Key": "smoke-emr-bad-{run_id}"},
+    ),
+    Check(
+        "emr_case_mapping_dry_run", "POST", "/api/webhooks/emr/case-mapping/dry-run", 202, group="emr_webhook",
+        content="{emr_body}", headers={**EMR_HEADERS, "Idempotency-Key": "smoke-emr-map-{run_id}"},
+        expect=(
+            contains("message", "emr_case_mapping_dry_run"),
+            equals("mode", "case_mapping_dry_run"),
+            equals("writes_webhook_inbox", True),
+            equals("writes_case_database", False),
+            equals("creates_case", False),
+            equals("mapping.case_create.patient_name", "咪咪"),
+            equals("mapping.case_create.species", "cat"),
+            contains("mapping.case_create.chief_complaint", "呕吐"),
+            equals("import_plan.can_promote_to_real_import", False),
+        ),
+        save={"emr_map_receipt_id": "receipt_id"},
+    ),
+    Check(
+        "emr_case_mapping_dry_run_duplicate", "POST", "/api/webhooks/emr/case-mapping/dry-run", 202, group="emr_webhook",
+        content="{emr_body}", headers={**EMR_HEADERS, "Idempotency-Key": "smoke-emr-map-{run_id}"},
+        expect=(equals("status", "duplicate"), equals("receipt_persisted", True)),
+        after=("emr_case_mapping_dry_run",),
+    ),
+]
+
+AUTH_CHECKS = [
+    Check(
+        "signup_user_a", "POST", "/auth/signup", group="auth",
+        json={"email": "{email_a}", "password": "{password}", "full_name": "Smoke A"},
+    ),
+    Check(
+        "login_user_a", "POST", "/auth/login", group="auth",
+        form={"username": "{email_a}", "password": "{password}"},
+        save={"token_a": "access_token"}, after=("signup_user_a",),
+    ),
+    Check(
+        "signup_user_b", "POST", "/auth/signup", group="auth",
+        json={"email": "{email_b}", "password": "{password}", "full_name": "Smoke B"},
+    ),
+    Check(
+        "login_user_b", "POST", "/auth/login", group="auth",
+        form={"username": "{email_b}", "password": "{password}"},
+        save={"token_b": "access_token"}, after=("signup_user_b",),
+    ),
+]
+
+
+WEBHOOK_INBOX_CHECKS = [
+    Check(
+        "webhook_inbox_list", "GET", "/api/webhooks/emr/inbox", group="webhook_inbox", auth="a",
+        params={"page": 1, "page_size": 5, "status": "accepted"},
+        expect=(
+            contains("message", "webhook_inbox_receipts"),
+            equals("review_only", True),
+            equals("writes_database", False),
+            contains("items", "{emr_receipt_id}"),
+        ),
+    ),
+    Check(
+        "webhook_inbox_detail", "GET", "/api/webhooks/emr/inbox/{emr_receipt_id}", group="webhook_inbox", auth="a",
+        expect=(
+            contains("message", "webhook_inbox_receipt"),
+            equals("receipt.receipt_id", "{emr_receipt_id}"),
+            equals("receipt.payload_omitted", True),
+            equals("receipt.mapped_case_preview.patient_name", "咪咪"),
+        ),
+    ),
+    Check(
+        "webhook_inbox_detail_with_payload", "GET", "/api/webhooks/emr/inbox/{emr_receipt_id}", group="webhook_inbox", auth="a",
+        params={"include_payload": "true"},
+        expect=(equals("receipt.payload_omitted", False), contains("receipt.payload.case_id", "CASE-SMOKE")),
+    ),
+    Check("webhook_inbox_requires_auth", "GET", "/api/webhooks/emr/inbox", 401, group="webhook_inbox", params={"page": 1, "page_size": 5}),
+    Check("webhook_inbox_missing_receipt", "GET", "/api/webhooks/emr/inbox/rcpt_missing_{run_id}", 404, group="webhook_inbox", auth="a"),
+    Check(
+        "webhook_inbox_review_action", "POST", "/api/webhooks/emr/inbox/{emr_receipt_id}/review-action", group="webhook_inbox", auth="a",
+        json={
+            "action": "ready_for_import",
+            "clinician_id": "SMOKE-CLINICIAN",
+            "reason": "映射字段完整，已人工复核",
+            "note": "Smoke review action only marks the webhook receipt; it does not create a Case.",
+            "request_id": "smoke-webhook-review-{run_id}",
+            "metadata": {"test": "webhook-inbox-review-action-v1"},
+        },
+        expect=(
+            not_empty("audit_log_id"),
+            contains("message", "webhook_inbox_review_action"),
+            equals("status_after", "ready_for_import"),
+            equals("writes_webhook_inbox", True),
+            equals("writes_audit_log", True),
+            equals("creates_case", False),
+        ),
+        # The list above filters on status=accepted; review only after it has run.
+        after=("webhook_inbox_list", "webhook_inbox_detail", "webhook_inbox_detail_with_payload"),
+    ),
+    Check(
+        "webhook_inbox_detail_after_review", "GET", "/api/webhooks/emr/inbox/{emr_receipt_id}", group="webhook_inbox", auth="a",
+        expect=(equals("receipt.status", "ready_for_import"),),
+        after=("webhook_inbox_review_action",),
+    ),
+]
+
+AUDIT_LOG_CHECKS = [
+    Check(
+        "audit_log_create", "POST", "/api/audit-log", 201, group="audit_log", auth="a", json=AUDIT_LOG_BODY,
+        expect=(
+            not_empty("log_id"),
+            contains("message", "created"),
+            equals("append_only", True),
+            equals("can_update", False),
+            equals("can_delete", False),
+        ),
+    ),
+    Check(
+        "audit_log_rejects_invalid_confidence", "POST", "/api/audit-log", 422, group="audit_log", auth="a",
+        json={
+            "request_id": "smoke-audit-bad-confidence",
+            "clinician_id": "SMOKE-CLINICIAN",
+            "confidence": 1.5,
+            "suggested_action": "bad",
+            "action_taken": "accepted",
+        },
+    ),
+    Check("audit_log_requires_auth", "POST", "/api/audit-log", 401, group="audit_log", json=AUDIT_LOG_BODY),
+    Check("audit_log_has_no_update_route", "PUT", "/api/audit-log", 405, group="audit_log", auth="a", json=AUDIT_LOG_BODY),
+    Check("audit_log_has_no_delete_route", "DELETE", "/api/audit-log", 405, group="audit_log", auth="a"),
+]
+
+CONSULT_CHECKS = [
+    Check(
+        "consult_create", "POST", "/api/ai/consult/session", group="consult", auth="a",
+        json={"text": "小狗频繁呕吐，精神差，腹部胀"},
+        save={"session_id": "session_id"},
+    ),
+    Check(
+        "consult_answer", "POST", "/api/ai/consult/session/{session_id}/answer", group="consult", auth="a",
+        json={"question": CONSULT_QUESTION_1, "answer": CONSULT_ANSWER_1},
+        expect=(equals("result.dynamic.answered_count", 1),),
+    ),
+    Check(
+        "consult_save_case", "POST", "/api/ai/consult/session/{session_id}/save-case", group="consult", auth="a",
+        json=SAVE_CASE_BODY,
+        expect=(one_of("message", "saved", "already_saved"),),
+        save={"case_id": "case_id"},
+        after=("consult_answer",),
+    ),
+    Check(
+        "consult_history", "GET", "/api/ai/consult/sessions", group="consult", auth="a",
+        params={"page": 1, "page_size": 20},
+        expect=(at_least("total", 1), has_item("items", "session_id", "{session_id}"), has_item("items", "case_id", "{case_id}")),
+    ),
+    Check(
+        "consult_history_saved_filter", "GET", "/api/ai/consult/sessions", group="consult", auth="a",
+        params={"page": 1, "page_size": 20, "saved": "saved"},
+        expect=(has_item("items", "case_id", "{case_id}"),),
+    ),
+    Check(
+        "consult_repeat_save", "POST", "/api/ai/consult/session/{session_id}/save-case", group="consult", auth="a",
+        json=SAVE_CASE_BODY,
+        expect=(equals("message", "already_saved"), equals("case_id", "{case_id}")),
+    ),
+    Check(
+        "consult_unsaved_create", "POST", "/api/ai/consult/session", group="consult", auth="a",
+        json={"text": "Smoke未保存问诊，准备删除"},
+        save={"unsaved_session_id": "session_id"},
+    ),
+    Check(
+        "consult_history_unsaved_filter", "GET", "/api/ai/consult/sessions", group="consult", auth="a",
+        params={"page": 1, "page_size": 20, "saved": "unsaved"},
+        expect=(has_item("items", "session_id", "{unsaved_session_id}"),),
+    ),
+    Check(
+        "consult_delete_unsaved", "DELETE", "/api/ai/consult/session/{unsaved_session_id}", group="consult", auth="a",
+        after=("consult_history_unsaved_filter",),
+    ),
+    Check(
+        "consult_deleted_cannot_be_read", "GET", "/api/ai/consult/session/{unsaved_session_id}", 404, group="consult", auth="a",
+        after=("consult_delete_unsaved",),
+    ),
+    Check(
+        "consult_saved_cannot_be_deleted", "DELETE", "/api/ai/consult/session/{session_id}", 400, group="consult", auth="a",
+        after=("consult_save_case",),
+    ),
+    Check(
+        "consult_continue", "POST", "/api/ai/consult/session/{session_id}/answer", group="consult", auth="a",
+        json={"question": CONSULT_QUESTION_2, "answer": CONSULT_ANSWER_2},
+        after=("consult_save_case", "consult_repeat_save"),
+    ),
+    Check(
+        "consult_update_case", "POST", "/api/ai/consult/session/{session_id}/update-case", group="consult", auth="a",
+        expect=(equals("message", "updated"),),
+        after=("consult_continue",),
+    ),
+    Check(
+        "case_detail", "GET", "/api/cases/{case_id}", group="consult", auth="a",
+        expect=(
+            contains("history", CONSULT_ANSWER_2),
+            contains("analysis", "风险"),
+            contains("breed", "贵宾"),
+            contains("weight", "5.2kg"),
+            contains("coat_color", "白色"),
+            contains("owner_name", "张三"),
+            contains("owner_phone", "13800000000"),
+        ),
+        after=("consult_update_case",),
+    ),
+]
+
+DIAGNOSTIC_DATA_CHECKS = [
+    Check(
+        "diagnostic_case_summary", "GET", "/api/diagnostic-data/cases/{case_id}/summary", group="diagnostic_data", auth="a",
+        expect=(
+            contains("message", "diagnostic_data_case_summary"),
+            equals("case.case_id", "{case_id}"),
+            equals("counts.reports", 0),
+            equals("writes_database", False),
+            equals("sends_external_message", False),
+            equals("executes_real_import", False),
+        ),
+    ),
+    Check(
+        "diagnostic_reports", "GET", "/api/diagnostic-data/cases/{case_id}/reports", group="diagnostic_data", auth="a",
+        params={"page": 1, "page_size": 10},
+        expect=(contains("message", "diagnostic_reports"), equals("total", 0), equals("writes_database", False)),
+    ),
+    Check(
+        "diagnostic_observations", "GET", "/api/diagnostic-data/cases/{case_id}/observations", group="diagnostic_data", auth="a",
+        params={"page": 1, "page_size": 10},
+        expect=(contains("message", "diagnostic_observations"), equals("writes_database", False)),
+    ),
+    Check(
+        "diagnostic_imaging_studies", "GET", "/api/diagnostic-data/cases/{case_id}/imaging-studies", group="diagnostic_data", auth="a",
+        params={"page": 1, "page_size": 10},
+        expect=(contains("message", "diagnostic_imaging_studies"), equals("writes_database", False)),
+    ),
+    Check(
+        "diagnostic_fixture_list", "GET", "/api/diagnostic-data/dry-run/fixtures", group="diagnostic_data", auth="a",
+        expect=(
+            contains("fixture_ids", "diagnostic_data_dry_run_fixture_v1"),
+            equals("dry_run", True),
+            equals("writes_database", False),
+        ),
+    ),
+    Check(
+        "diagnostic_fixture_get", "GET", "/api/diagnostic-data/dry-run/fixtures/diagnostic_data_dry_run_fixture_v1",
+        group="diagnostic_data", auth="a",
+        expect=(
+            contains("message", "diagnostic_data_dry_run_fixture"),
+            contains("fixture.diagnostic_reports", "CBC + Chemistry Dry-run Fixture"),
+            contains("fixture.observations", "WBC"),
+            contains("fixture.imaging_studies", "DRYRUN-STUDY-0001"),
+            equals("executes_real_lab_ingest", False),
+        ),
+    ),
+    Check(
+        "diagnostic_fixture_requires_auth", "GET", "/api/diagnostic-data/dry-run/fixtures/diagnostic_data_dry_run_fixture_v1",
+        401, group="diagnostic_data",
+    ),
+]
+
+CLINICAL_DOCS_PREVIEW_BODY = {
+    "case_id": "{case_id}",
+    "template_id": "admission_hospitalization_record_bilingual",
+    "output": "docx",
+    "clinician_name": "Smoke Clinician",
+    "clinician_id": "HS-SMOKE-DOCS",
+    "generator": "Pet-Med-AI smoke clinical docs",
+    "include_preview_context": True,
+}
+
+CLINICAL_DOCS_CHECKS = [
+    Check(
+        "clinical_docs_templates", "GET", "/api/clinical-docs/templates", group="clinical_docs", auth="a",
+        expect=(
+            contains("message", "clinical_doc_templates"),
+            contains("templates", "admission_hospitalization_record_bilingual"),
+            contains("templates", "discharge_summary_bilingual"),
+            equals("writes_database", False),
+            equals("creates_case", False),
+        ),
+    ),
+    Check(
+        "clinical_docs_render_preview", "POST", "/api/clinical-docs/render-preview", group="clinical_docs", auth="a",
+        json=CLINICAL_DOCS_PREVIEW_BODY,
+        expect=(
+            not_empty("document_hash"),
+            contains("message", "clinical_doc_render_preview"),
+            equals("template_id", "admission_hospitalization_record_bilingual"),
+            contains("context", "Smoke乐乐"),
+            equals("context.clinician_id", "HS-SMOKE-DOCS"),
+            equals("writes_database", False),
+            equals("creates_case", False),
+            equals("updates_case", False),
+            equals("downloads_attachments", False),
+            equals("executes_real_import", False),
+        ),
+    ),
+    Check(
+        "clinical_docs_render_preview_requires_auth", "POST", "/api/clinical-docs/render-preview", 401, group="clinical_docs",
+        json={**CLINICAL_DOCS_PREVIEW_BODY, "case_id": 1},
+    ),
+]
+
+KPI_CHECKS = [
+    Check(
+        "kpi_cases", "GET", "/api/kpi/cases", group="kpi", auth="a",
+        expect=(contains("message", "kpi_cases"), at_least("metrics.case_completeness.total_cases", 1)),
+        after=("consult_save_case",),
+    ),
+    Check(
+        "kpi_imaging", "GET", "/api/kpi/imaging", group="kpi", auth="a",
+        expect=(contains("message", "kpi_imaging"), equals("metrics.repeat_imaging.rate", 0.0)),
+    ),
+    Check(
+        "kpi_followups", "GET", "/api/kpi/followups", group="kpi", auth="a",
+        expect=(contains("message", "kpi_followups"), equals("metrics.followup_compliance.due_total", 0)),
+    ),
+    Check(
+        "kpi_qa", "GET", "/api/kpi/qa", group="kpi", auth="a",
+        expect=(contains("message", "kpi_qa"), at_least("metrics.qa_audit_coverage.total_cases", 1)),
+        after=("consult_save_case",),
+    ),
+    Check(
+        "kpi_dashboard", "GET", "/api/kpi/dashboard", group="kpi", auth="a",
+        expect=(
+            contains("message", "kpi_dashboard"),
+            contains("cards.case_completeness.label", "病例字段完整度率"),
+            contains("sections.cases.message", "kpi_cases"),
+        ),
+    ),
+]
+
+ISOLATION_CHECKS = [
+    Check(
+        "user_b_history_excludes_user_a", "GET", "/api/ai/consult/sessions", group="isolation", auth="b",
+        params={"page": 1, "page_size": 20, "saved": "all"},
+        expect=(lacks_item("items", "session_id", "{session_id}"),),
+    ),
+    Check("user_b_cannot_read_user_a_diagnostic_data", "GET", "/api/diagnostic-data/cases/{case_id}/summary", 404, group="isolation", auth="b"),
+    Check("user_b_cannot_read_user_a_session", "GET", "/api/ai/consult/session/{session_id}", 404, group="isolation", auth="b"),
+    Check("user_b_cannot_read_user_a_case", "GET", "/api/cases/{case_id}", 404, group="isolation", auth="b"),
+    Check(
+        "user_b_cannot_update_user_a_case", "PUT", "/api/cases/{case_id}", 404, group="isolation", auth="b",
+        json={"patient_name": "非法修改"},
+    ),
+    Check(
+        "user_b_cannot_reanalyze_user_a_case", "POST", "/api/cases/{case_id}/analyze", 404, group="isolation", auth="b",
+        json={"chief_complaint": "非法重分析"},
+    ),
+    Check("user_b_cannot_delete_user_a_case", "DELETE", "/api/cases/{case_id}", 404, group="isolation", auth="b"),
+]
+
+PREVENTIVE_CARE_CHECKS = [
+    Check(
+        "preventive_care_rules", "GET", "/api/preventive-care/rules", group="preventive_care", auth="a",
+        expect=(
+            contains("message", "preventive_care_rules"),
+            contains("items", "internal_deworming"),
+            equals("sends_external_message", False),
+        ),
+    ),
+    Check(
+        "preventive_care_dry_run", "POST", "/api/preventive-care/dry-run", group="preventive_care", auth="a",
+        json={
+            "case_id": "{case_id}",
+            "as_of_date": "2026-06-11",
+            "include_active": True,
+            "pet": {
+                "pet_name": "Smoke乐乐",
+                "species": "dog",
+                "life_stage": "adult",
+                "last_core_vaccine_date": "2025-06-01",
+                "last_rabies_vaccine_date": "2025-06-01",
+                "last_deworming_date": "2026-02-01",
+                "last_external_parasite_prevention_date": "2026-05-20",
+                "last_fecal_exam_date": "2025-12-01",
+                "last_preventive_exam_date": "2025-06-01",
+            },
+        },
+        expect=(contains("message", "preventive_care_rule_engine_dry_run"), at_least("summary.total", 0)),
+    ),
+]
+
+KNOWLEDGE_CHECKS = [
+    *(
+        Check(
+            f"exotic_consult_{species}", "POST", "/api/ai/consult/session", group="knowledge", auth="a",
+            json={"species": species, "text": text},
+            expect=(contains("result.risk_level", risk), contains("result.tree_path", label), contains("result.tree_path", branch)),
+        )
+        for species, text, risk, label, branch in EXOTIC_CONSULTS
+    ),
+    Check(
+        "structured_intake_rabbit", "POST", "/api/ai/consult/session", group="knowledge", auth="a",
+        json={"species": "rabbit", "text": "兔子24小时不吃东西，粪便明显减少，精神差，腹胀"},
+        expect=(
+            contains("result.structured_intake.template_key", "rabbit"),
+            contains("result.structured_intake.sections.0.title", "基础"),
+            contains("result.structured_intake.sections.1.title", "采食"),
+            contains("result.risk_level", "高"),
+        ),
+    ),
+    Check(
+        "structured_intake_bird", "POST", "/api/ai/consult/session", group="knowledge", auth="a",
+        json={"species": "bird", "text": "鹦鹉张口呼吸，尾巴上下摆，蓬毛闭眼"},
+        expect=(
+            contains("result.structured_intake.template_key", "bird"),
+            contains("result.structured_intake.sections.1.title", "呼吸"),
+        ),
+    ),
+    *(
+        Check(
+            f"companion_{name}", "POST", "/api/ai/consult/session", group="knowledge", auth="a",
+            json={"species": species, "text": text},
+            expect=(contains("result.risk_level", "高"), contains("result.tree_path.2", branch)),
+        )
+        for name, species, text, branch in COMPANION_CONSULTS
+    ),
+]
+
+CHECKS = [
+    *SYSTEM_CHECKS,
+    *EMR_WEBHOOK_CHECKS,
+    *AUTH_CHECKS,
+    *WEBHOOK_INBOX_CHECKS,
+    *AUDIT_LOG_CHECKS,
+    *CONSULT_CHECKS,
+    *DIAGNOSTIC_DATA_CHECKS,
+    *CLINICAL_DOCS_CHECKS,
+    *KPI_CHECKS,
+    *ISOLATION_CHECKS,
+    *PREVENTIVE_CARE_CHECKS,
+    *KNOWLEDGE_CHECKS,
+]
+# --- Checks: end ---
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import logging
+import os
+import py_compile
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "audit_writer.py"
+DOC = ROOT / "docs" / "ops" / "AUDIT_LOG_GROUP_COMMIT_V1.md"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _row(log_id: str, **overrides) -> dict:
+    row = {
+        "log_id": log_id,
+        "request_id": f"req-{log_id}",
+        "patient_token": None,
+        "clinician_id": "validator",
+        "model_version": None,
+        "confidence": None,
+        "suggested_action": None,
+        "action_taken": "accepted",
+        "override_reason": None,
+        "note": None,
+        "case_id": None,
+        "session_uid": None,
+        "event_type": "ai_review",
+        "source": "validator",
+        "extra_data": {"n": log_id},
+        "created_at": datetime(2026, 6, 1, 9, 0, 0),
+    }
+    row.update(overrides)
+    return row
+
+
+def validate_default_gate() -> int:
+    """Group commit stays off unless both the flag and a journal directory are set."""
+    probe = (
+        "import sys; sys.path.insert(0, sys.argv[1]); import audit_writer as w; "
+        "print(int(w.AUDIT_GROUP_COMMIT_ENABLED), int(w.get_audit_writer() is not None))"
+    )
+    cases = (
+        ({}, "0 0"),
+        ({"AUDIT_LOG_GROUP_COMMIT": "true"}, "0 0"),
+        ({"AUDIT_LOG_GROUP_COMMIT": "true", "AUDIT_LOG_JOURNAL_DIR": tempfile.gettempdir()}, "1 1"),
+    )
+    for extra, expected in cases:
+        env = {k: v for k, v in os.environ.items() if not k.startswith("AUDIT_LOG_")}
+        env.update({"DATABASE_URL": "sqlite://", **extra})
+        result = subprocess.run(
+            [sys.executable, "-c", probe, str(BACKEND)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode != 0:
+            return fail(f"audit_writer import failed with {extra}: {result.stderr.strip()[-400:]}")
+        if result.stdout.strip() != expected:
+            return fail(f"group commit gate with {extra or 'no env'} should be {expected!r}, got {result.stdout.strip()!r}")
+    return 0
+
+
+def validate_replay() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    from sqlalchemy import create_engine, func, insert, select  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    from audit_writer import AuditLogWriter, _encode  # noqa: WPS433
+    from db import Base  # noqa: WPS433
+    from models import AuditLog  # noqa: WPS433
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    # The rejected row below is expected; keep its error log out of the validator output.
+    logging.getLogger("pmai.audit_writer").setLevel(logging.CRITICAL)
+
+    def count() -> int:
+        with session_factory() as db:
+            return int(db.execute(select(func.count()).select_from(AuditLog)).scalar_one())
+
+    with tempfile.TemporaryDirectory(prefix="pmai_audit_journal_") as tmp:
+        journal_dir = Path(tmp)
+        # A crash after the commit but before the segment was deleted: rows a, b are
+        # already in audit_log; c, d only exist in the journal.
+        with session_factory() as db:
+            db.execute(insert(AuditLog), [_row("a"), _row("b")])
+            db.commit()
+        segment = journal_dir / "audit_journal.1.1.1.segment.ndjson"
+        segment.write_text("".join(_encode(_row(i)) + "\n" for i in ("a", "b", "c")), encoding="utf-8")
+        active = journal_dir / "audit_journal.1.1.2.active.ndjson"
+        active.write_text(
+            _encode(_row("d")) + "\n" + _encode(_row("bad", clinician_id=None)) + "\n",
+            encoding="utf-8",
+        )
+
+        writer = AuditLogWriter(session_factory, journal_dir=journal_dir, max_delay_ms=0)
+        replayed = writer.replay()
+        if replayed != 2:
+            return fail(f"replay should insert only the 2 missing rows, inserted {replayed}")
+        if count() != 4:
+            return fail(f"audit_log should hold 4 rows after replay, got {count()}")
+        if segment.exists() or active.exists():
+            return fail("replayed journal files must be deleted")
+        rejected = journal_dir / "audit_journal.rejected.ndjson"
+        if not rejected.exists():
+            return fail("a row the database rejects must go to audit_journal.rejected.ndjson")
+        rejected_ids = [json.loads(line)["log_id"] for line in rejected.read_text(encoding="utf-8").splitlines()]
+        if rejected_ids != ["bad"] or writer.stats["rejected"] != 1:
+            return fail(f"only the invalid row should be rejected, got {rejected_ids}")
+
+        # Replaying the same journal twice inserts nothing the second time.
+        segment.write_text("".join(_encode(_row(i)) + "\n" for i in ("a", "c", "d")), encoding="utf-8")
+        if writer.replay() != 0 or count() != 4:
+            return fail("a second replay of committed rows must not insert duplicates")
+
+        # Normal path: submit, flush, journal emptied.
+        writer.start()
+        try:
+            writer.submit([_row(f"live-{i}") for i in range(5)])
+            if not writer.flush(5.0):
+                return fail("writer.flush timed out")
+        finally:
+            writer.stop()
+        if count() != 9:
+            return fail(f"submitted rows should be committed, audit_log has {count()}")
+        leftovers = [p.name for p in journal_dir.glob("audit_journal.*.ndjson") if p.name != rejected.name]
+        if leftovers:
+            return fail(f"journal files left after a clean stop: {leftovers}")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(
+        MODULE,
+        (
+            'AUDIT_GROUP_COMMIT_REQUESTED = _env_flag("AUDIT_LOG_GROUP_COMMIT", False)',
+            "AUDIT_JOURNAL_DIR_CONFIGURED",
+            "Durability trade-off",
+        ),
+        "backend/audit_writer.py",
+    )
+    if rc:
+        return rc
+
+    rc = require_text(DOC, ("Durability trade-off", "ephemeral"), "docs/ops/AUDIT_LOG_GROUP_COMMIT_V1.md")
+    if rc:
+        return rc
+
+    rc = validate_default_gate()
+    if rc:
+        return rc
+
+    rc = validate_replay()
+    if rc:
+        return rc
+
+    print("PASS audit log group commit journal replay")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
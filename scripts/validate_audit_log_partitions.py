@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import contextlib
+import importlib.util
+import io
+import os
+import py_compile
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "audit_log_partitions.py"
+CLI = ROOT / "scripts" / "audit_log_partitions.py"
+DOC = ROOT / "docs" / "ops" / "AUDIT_LOG_QUERY_V1.md"
+
+FOREIGN_KEY = "emr_import_execution_runs_approval_audit_log_id_fkey"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _index(statements, prefix: str) -> int:
+    for position, statement in enumerate(statements):
+        if statement.startswith(prefix):
+            return position
+    return -1
+
+
+def validate_plan() -> int:
+    import audit_log_partitions as parts  # noqa: WPS433
+
+    if parts.add_months(date(2025, 11, 1), 3) != date(2026, 2, 1) or parts.add_months(date(2026, 1, 1), -1) != date(2025, 12, 1):
+        return fail("add_months must roll over year boundaries")
+    if parts.partition_name(date(2026, 2, 1)) != "audit_log_p202602":
+        return fail("partition names must be audit_log_pYYYYMM")
+
+    statements = parts.plan_audit_log_partitioning(date(2025, 11, 1), months_ahead=2, today=date(2026, 1, 20))
+    if not statements[0].startswith("LOCK TABLE audit_log IN ACCESS EXCLUSIVE MODE"):
+        return fail("the plan must take the exclusive lock first")
+    fk_drop = _index(statements, f"ALTER TABLE emr_import_execution_runs DROP CONSTRAINT IF EXISTS {FOREIGN_KEY}")
+    rename = _index(statements, "ALTER TABLE audit_log RENAME TO audit_log_unpartitioned")
+    create = _index(statements, "CREATE TABLE audit_log (LIKE audit_log_unpartitioned")
+    copy = _index(statements, "INSERT INTO audit_log SELECT * FROM audit_log_unpartitioned")
+    orphan_check = _index(statements, "DO $$")
+    trigger = _index(statements, f"CREATE CONSTRAINT TRIGGER {parts.AUDIT_LOG_APPROVAL_TRIGGER}")
+    if not 0 < fk_drop < rename < create < copy < orphan_check < trigger:
+        return fail(f"unexpected statement order: fk_drop={fk_drop} rename={rename} create={create} copy={copy} check={orphan_check} trigger={trigger}")
+    if trigger != len(statements) - 1:
+        return fail("the approval trigger must be the last statement")
+    if "PRIMARY KEY (log_id, created_at)" not in "\n".join(statements):
+        return fail("the partitioned table must key on (log_id, created_at)")
+
+    months = [statement.split()[5] for statement in statements if statement.startswith("CREATE TABLE IF NOT EXISTS audit_log_p")]
+    expected = ["audit_log_p202511", "audit_log_p202512", "audit_log_p202601", "audit_log_p202602", "audit_log_p202603"]
+    if months != expected:
+        return fail(f"month partitions {months} != {expected}")
+    if "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')" not in parts.partition_ddl(date(2025, 12, 15)):
+        return fail("partition bounds must cover one calendar month")
+
+    trigger_sql = "\n".join(statements[orphan_check:])
+    for needle in ("foreign_key_violation", "NEW.approval_audit_log_id IS NOT NULL", "AFTER INSERT OR UPDATE OF approval_audit_log_id"):
+        if needle not in trigger_sql:
+            return fail(f"approval reference DDL missing {needle!r}")
+
+    status = {"partitioned": True, "partitions": [{"name": name} for name in ("audit_log_default", "audit_log_p202511", "audit_log_p202601")]}
+    ensure = parts.plan_future_partitions(status, months_ahead=2, today=date(2026, 1, 5))
+    if [statement.split()[5] for statement in ensure] != ["audit_log_p202602", "audit_log_p202603"]:
+        return fail(f"ensure should only add the missing future months: {ensure}")
+    detach = parts.plan_partition_detach(status, date(2026, 1, 1))
+    if detach != ["ALTER TABLE audit_log DETACH PARTITION audit_log_p202511"]:
+        return fail(f"detach should skip the default and current partitions: {detach}")
+    if parts.plan_future_partitions({"partitioned": False}) or parts.plan_partition_detach({"partitioned": False}, date(2026, 1, 1)):
+        return fail("ensure/detach must plan nothing for an unpartitioned table")
+
+    from sqlalchemy import create_engine  # noqa: WPS433
+
+    with create_engine("sqlite://").connect() as conn:
+        sqlite_status = parts.audit_log_partition_status(conn)
+    if sqlite_status.get("supported") is not False or sqlite_status.get("partitioned") is not False:
+        return fail(f"SQLite must report partitioning unsupported: {sqlite_status}")
+    return 0
+
+
+def validate_cli() -> int:
+    spec = importlib.util.spec_from_file_location("audit_log_partitions_cli", CLI)
+    cli = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cli)
+
+    def run(argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            rc = cli.main(argv)
+        return rc, out.getvalue(), err.getvalue()
+
+    rc, _, err = run(["convert", "--apply"])
+    if rc != 2 or "needs Postgres" not in err:
+        return fail(f"convert on SQLite must refuse with exit 2: {rc} {err!r}")
+
+    # Pretend to be an unconverted Postgres database; nothing below reaches engine.begin().
+    cli.audit_log_partition_status = lambda conn: {
+        "supported": True,
+        "dialect": "postgresql",
+        "partitioned": False,
+        "oldest_created_at": "2026-01-03T10:00:00",
+    }
+    confirm = cli.AUDIT_LOG_PARTITION_CONFIRMATION
+    rc, out, err = run(["plan"])
+    if rc != 0 or "LOCK TABLE audit_log" not in out:
+        return fail(f"plan should print the DDL: {rc}")
+    if "WARNING" not in err or FOREIGN_KEY not in err or "--acknowledge-fk-drop" not in err:
+        return fail(f"plan must warn about the dropped foreign key: {err!r}")
+    for argv, needle in (
+        (["convert", "--apply"], "--confirm"),
+        (["convert", "--apply", "--confirm", confirm], "--acknowledge-fk-drop"),
+        (["convert", "--apply", "--confirm", confirm, "--acknowledge-fk-drop", "yes"], "--acknowledge-fk-drop"),
+    ):
+        rc, out, err = run(argv)
+        if rc != 2 or "WARNING" not in err or f"ERROR: convert --apply requires {needle}" not in err or out:
+            return fail(f"{' '.join(argv)} must be refused before running anything: {rc} {err!r}")
+    rc, out, err = run(["convert"])
+    if rc != 0 or "WARNING" not in err or "CREATE CONSTRAINT TRIGGER" not in out:
+        return fail("convert without --apply should warn and print the plan")
+    args = cli.parse_args(["convert", "--apply", "--confirm", confirm, "--acknowledge-fk-drop", FOREIGN_KEY])
+    if cli.convert_refusal(args) is not None:
+        return fail("convert with both acknowledgements should be allowed")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, CLI, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ("def approval_reference_ddl", "_approval_reference_status", "orphaned_rows"), "backend/audit_log_partitions.py")
+    if rc:
+        return rc
+    rc = require_text(CLI, ("FK_DROP_WARNING", "--acknowledge-fk-drop", "def convert_refusal"), "scripts/audit_log_partitions.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("--acknowledge-fk-drop", "approval_audit_log_reference", "orphaned_rows"), "docs/ops/AUDIT_LOG_QUERY_V1.md")
+    if rc:
+        return rc
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    rc = validate_plan()
+    if rc:
+        return rc
+    rc = validate_cli()
+    if rc:
+        return rc
+
+    print("PASS audit log partition plan and approval reference guard")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import hashlib
+import py_compile
+import random
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "automated_reminder_templates.py"
+API = BACKEND / "automated_reminder_delivery_api.py"
+
+ROUNDS = 3000
+SEED = 20260611
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+# --- Reference regex renderer (pre-compilation automated_reminder_delivery_api): start ---
+REFERENCE_PLACEHOLDER_RE = re.compile(r"{{\s*([A-Za-z0-9_.-]+)\s*}}")
+
+
+def reference_render_text(text: Optional[str], context: Dict[str, Any]) -> str:
+    if not text:
+        return ""
+
+    def repl(match: "re.Match[str]") -> str:
+        value = context.get(match.group(1))
+        if value is None:
+            return match.group(0)
+        return str(value)
+
+    return REFERENCE_PLACEHOLDER_RE.sub(repl, text)
+
+
+def reference_message_hash(subject: str, body: str, safety: str, opt_out: str) -> str:
+    return hashlib.sha256(f"{subject}\n{body}\n{safety}\n{opt_out}".encode("utf-8")).hexdigest()
+# --- Reference regex renderer (pre-compilation automated_reminder_delivery_api): end ---
+
+
+KEYS = ("pet_name", "owner.name", "due_date", "clinic-phone", "x_1", "宠物")
+LITERALS = ("", " ", "Hi ", "，", "{", "}", "{{", "}}", "{ {", "{{ }}", "$1", "\\1", "\n", "请于 ", " 前复诊。", "{{bad key}}")
+VALUES = (None, "", "Mochi", "{{pet_name}}", "\\g<0>", 0, 12, 3.5, False, "王先生", "a}}b", "line\nbreak")
+
+
+def _random_text(rng: random.Random) -> Optional[str]:
+    if rng.random() < 0.05:
+        return None
+    pieces = []
+    for _ in range(rng.randint(0, 8)):
+        if rng.random() < 0.5:
+            key = rng.choice(KEYS)
+            pad_left = rng.choice(("", " ", "  "))
+            pad_right = rng.choice(("", " ", "\t"))
+            pieces.append("{{" + pad_left + key + pad_right + "}}")
+        else:
+            pieces.append(rng.choice(LITERALS))
+    return "".join(pieces)
+
+
+def _random_context(rng: random.Random) -> Dict[str, Any]:
+    return {key: rng.choice(VALUES) for key in KEYS if rng.random() < 0.8}
+
+
+def validate_runtime() -> int:
+    sys.path.insert(0, str(BACKEND))
+    from automated_reminder_templates import (  # noqa: WPS433
+        CompiledText,
+        ReminderTemplateCache,
+        compile_reminder_template,
+        message_hash,
+    )
+
+    rng = random.Random(SEED)
+    for round_index in range(ROUNDS):
+        template = SimpleNamespace(
+            id=round_index + 1,
+            updated_at=datetime(2026, 6, 1),
+            template_key="t",
+            template_version="v1",
+            subject=_random_text(rng),
+            body=_random_text(rng),
+            clinical_safety_text=_random_text(rng),
+            opt_out_text=_random_text(rng),
+        )
+        compiled = compile_reminder_template(template)
+        for _ in range(3):
+            context = _random_context(rng)
+            rendered = compiled.render(context)
+            expected = {
+                name: reference_render_text(getattr(template, name), context)
+                for name in ("subject", "body", "clinical_safety_text", "opt_out_text")
+            }
+            expected["message_hash"] = reference_message_hash(
+                expected["subject"], expected["body"], expected["clinical_safety_text"], expected["opt_out_text"],
+            )
+            if rendered != expected:
+                return fail(f"round {round_index}: compiled render differs from regex render\n  template={vars(template)}\n  context={context}")
+
+    text = "{{pet_name}} / {{ pet_name }} / {{missing}}"
+    if CompiledText(text).render({"pet_name": "Mochi"}) != "Mochi / Mochi / {{missing}}":
+        return fail("unknown placeholders must be left as written")
+    if message_hash("a", "b", "c", "d") != reference_message_hash("a", "b", "c", "d"):
+        return fail("message_hash must match the stored attempt hash format")
+
+    cache = ReminderTemplateCache(max_entries=2)
+    first = SimpleNamespace(id=1, updated_at=datetime(2026, 6, 1), template_key="k", template_version="v1",
+                            subject="{{pet_name}}", body="", clinical_safety_text="", opt_out_text="")
+    if cache.get(first) is not cache.get(first):
+        return fail("unchanged template should be served from the cache")
+    edited = SimpleNamespace(**{**vars(first), "updated_at": datetime(2026, 6, 2), "subject": "Hi {{pet_name}}"})
+    if cache.get(edited).render({"pet_name": "Bean"})["subject"] != "Hi Bean":
+        return fail("a template with a new updated_at must be recompiled")
+    for template_id in (2, 3):
+        cache.get(SimpleNamespace(**{**vars(first), "id": template_id}))
+    if cache.stats()["entries"] != 2:
+        return fail(f"cache must stay within max_entries: {cache.stats()}")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, API):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ("class CompiledText", "class ReminderTemplateCache", "def message_hash"), "backend/automated_reminder_templates.py")
+    if rc:
+        return rc
+    rc = require_text(API, ("REMINDER_TEMPLATE_CACHE", '@router.post("/render-batch"'), "backend/automated_reminder_delivery_api.py")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print(f"PASS automated reminder compiled templates match the regex renderer ({ROUNDS} random templates)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
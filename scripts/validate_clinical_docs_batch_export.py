@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import json
+import os
+import py_compile
+import sys
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+API = BACKEND / "clinical_docs_api.py"
+DOC = ROOT / "docs" / "clinical_docs" / "CLINICAL_DOCS_EXPORT_API_V1.md"
+
+TEMPLATE_ID = "discharge_summary_bilingual"
+FIXED_TIMESTAMP = "2026-06-08T09:30:00Z"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _case(Case, owner_id: int, name: str, **overrides):
+    values = {
+        "owner_id": owner_id,
+        "patient_name": name,
+        "species": "dog",
+        "owner_name": "Owner <&> 张",
+        "owner_phone": "",
+        "chief_complaint": "vomiting",
+        "history": "Hospitalised 2 days; fluids & antiemetics.",
+        "exam_findings": "T 39.1",
+        "analysis": "gastroenteritis",
+        "treatment": "maropitant",
+        "prognosis": "good",
+    }
+    values.update(overrides)
+    return Case(**values)
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SECRET_KEY", "validator")
+    sys.path.insert(0, str(BACKEND))
+    from fastapi import FastAPI  # noqa: WPS433
+    from fastapi.testclient import TestClient  # noqa: WPS433
+    from sqlalchemy import create_engine  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    import clinical_docs_api  # noqa: WPS433
+    from auth_jwt import get_current_user  # noqa: WPS433
+    from db import Base, get_db  # noqa: WPS433
+    from models import Case, User  # noqa: WPS433
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        owner = User(email="docs-owner@example.com", hashed_password="x")
+        other = User(email="docs-other@example.com", hashed_password="x")
+        db.add_all([owner, other])
+        db.flush()
+        cases = [
+            _case(Case, owner.id, "Mochi"),
+            _case(Case, owner.id, "Deleted", deleted_at=datetime(2026, 6, 1)),
+            _case(Case, other.id, "Foreign"),
+            _case(Case, owner.id, "NoCourse", history=""),
+            _case(Case, owner.id, "Bean", species="cat", owner_phone="138 0000 0000"),
+        ]
+        db.add_all(cases)
+        db.commit()
+        owner_id = owner.id
+        own, deleted, foreign, no_course, bean = (case.id for case in cases)
+
+    app = FastAPI()
+    app.include_router(clinical_docs_api.router)
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_user():
+        with session_factory() as db:
+            return db.get(User, owner_id)
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = override_user
+    # Rendered documents carry the render time; pin it so a batch entry and a
+    # single render of the same case can be compared byte for byte.
+    clinical_docs_api._utc_timestamp = lambda: FIXED_TIMESTAMP
+    client = TestClient(app)
+
+    requested = [bean, deleted, own, foreign, no_course, 999999]
+    response = client.post(
+        "/api/clinical-docs/render-batch",
+        json={"template_id": TEMPLATE_ID, "case_ids": requested, "clinician_name": "赵海生"},
+    )
+    if response.status_code != 200:
+        return fail(f"render-batch returned {response.status_code}: {response.text[:300]}")
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        if archive.testzip() is not None:
+            return fail("batch ZIP has a CRC mismatch")
+        names = archive.namelist()
+        manifest = json.loads(archive.read("manifest.json"))
+        documents = {name: archive.read(name) for name in names if name.endswith(".docx")}
+    if names[-1] != "manifest.json":
+        return fail(f"manifest.json must be the last archive entry: {names}")
+
+    statuses = {entry["case_id"]: entry["status"] for entry in manifest["entries"]}
+    expected = {
+        bean: "rendered",
+        own: "rendered",
+        no_course: "missing_required_keys",
+        deleted: "not_found",
+        foreign: "not_found",
+        999999: "not_found",
+    }
+    if statuses != expected:
+        return fail(f"batch manifest statuses {statuses} != {expected}")
+    if [entry["case_id"] for entry in manifest["entries"]][:3] != [bean, own, no_course]:
+        return fail("found case_ids must keep request order in the manifest")
+    if manifest.get("writes_database") is not False or manifest.get("rendered_count") != 2:
+        return fail(f"manifest flags/counts wrong: {manifest}")
+
+    for entry in manifest["entries"]:
+        if entry["status"] != "rendered":
+            continue
+        single = client.post(
+            "/api/clinical-docs/render",
+            json={"case_id": entry["case_id"], "template_id": TEMPLATE_ID, "clinician_name": "赵海生"},
+        )
+        if single.status_code != 200:
+            return fail(f"single render of case {entry['case_id']} returned {single.status_code}")
+        if single.headers.get("x-pmai-document-hash") != entry["document_hash"]:
+            return fail(f"case {entry['case_id']}: manifest document_hash differs from X-PMAI-Document-Hash")
+        if documents.get(entry["filename"]) != single.content:
+            return fail(f"case {entry['case_id']}: batch DOCX is not byte-identical to the single render")
+    return 0
+
+
+def main() -> int:
+    for path in (API, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(
+        API,
+        ('@router.post("/render-batch"', "Case.deleted_at.is_(None)", "ZipStreamWriter"),
+        "backend/clinical_docs_api.py",
+    )
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS clinical docs batch export matches single renders")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
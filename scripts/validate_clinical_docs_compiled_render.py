@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import os
+import py_compile
+import sys
+import zipfile
+from pathlib import Path
+from typing import Dict
+from xml.etree import ElementTree as ET
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+COMPILER = BACKEND / "clinical_docs_template_compiler.py"
+API = BACKEND / "clinical_docs_api.py"
+TEMPLATE_DIR = ROOT / "templates" / "clinical_docs"
+DOC = ROOT / "docs" / "clinical_docs" / "CLINICAL_DOCS_EXPORT_API_V1.md"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+# --- Reference ElementTree renderer (pre-compilation clinical_docs_api): start ---
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def reference_replace_placeholders(xml_bytes: bytes, context: Dict[str, str]) -> bytes:
+    try:
+        root = ET.fromstring(xml_bytes)
+    except ET.ParseError:
+        return xml_bytes
+    placeholders = {f"{{{{{key}}}}}": value for key, value in context.items()}
+    changed_any = False
+    for paragraph in root.iter():
+        if not paragraph.tag.endswith("}p"):
+            continue
+        text_nodes = [node for node in paragraph.iter() if node.tag.endswith("}t")]
+        if not text_nodes:
+            continue
+        combined = "".join(node.text or "" for node in text_nodes)
+        if "{{" not in combined:
+            continue
+        replaced = combined
+        for placeholder, value in placeholders.items():
+            replaced = replaced.replace(placeholder, value)
+        if replaced != combined:
+            text_nodes[0].text = replaced
+            for node in text_nodes[1:]:
+                node.text = ""
+            changed_any = True
+    if not changed_any:
+        return xml_bytes
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def reference_append_section(xml_bytes: bytes, context: Dict[str, str]) -> bytes:
+    section_text = str(context.get("__diagnostic_data_section") or "").strip()
+    if not section_text:
+        return xml_bytes
+    try:
+        root = ET.fromstring(xml_bytes)
+    except ET.ParseError:
+        return xml_bytes
+    body = root.find(W + "body")
+    if body is None:
+        return xml_bytes
+    existing_text = "".join(node.text or "" for node in root.iter() if node.tag.endswith("}t"))
+    if "Diagnostic data merge / 诊断数据合并" in existing_text:
+        return xml_bytes
+
+    def paragraph(text: str, *, bold: bool = False):
+        p = ET.Element(W + "p")
+        r = ET.SubElement(p, W + "r")
+        if bold:
+            rpr = ET.SubElement(r, W + "rPr")
+            ET.SubElement(rpr, W + "b")
+        t = ET.SubElement(r, W + "t")
+        t.text = text
+        return p
+
+    insert_at = len(body)
+    if len(body) and body[-1].tag == W + "sectPr":
+        insert_at -= 1
+    body.insert(insert_at, paragraph("Diagnostic data merge / 诊断数据合并（医生复核）", bold=True))
+    insert_at += 1
+    for raw_line in section_text.splitlines()[:90]:
+        line = raw_line.strip()
+        if not line:
+            continue
+        body.insert(insert_at, paragraph(line))
+        insert_at += 1
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def reference_parts(template_path: Path, context: Dict[str, str]) -> Dict[str, bytes]:
+    parts: Dict[str, bytes] = {}
+    with zipfile.ZipFile(template_path, "r") as zin:
+        for item in zin.infolist():
+            raw = zin.read(item.filename)
+            if item.filename == "word/document.xml":
+                raw = reference_append_section(raw, context)
+            if item.filename.startswith("word/") and item.filename.endswith(".xml"):
+                raw = reference_replace_placeholders(raw, context)
+            parts[item.filename] = raw
+    return parts
+# --- Reference ElementTree renderer (pre-compilation clinical_docs_api): end ---
+
+
+def _contexts(slot_keys) -> Dict[str, Dict[str, str]]:
+    plain = {key: f"value-{index}" for index, key in enumerate(sorted(set(slot_keys)))}
+    special = {key: f"<{key}> & \"quoted\" 'x' 宠物 {index}" for index, key in enumerate(sorted(set(slot_keys)))}
+    merged = dict(plain)
+    merged["__diagnostic_data_section"] = "CBC: WBC 18.2 x10^9/L (H)\n\n  Radiograph <thorax> & abdomen  \nUS: 胆囊壁增厚"
+    empty = {key: "" for key in set(slot_keys)}
+    return {"plain": plain, "special": special, "diagnostic_section": merged, "empty": empty}
+
+
+def validate_runtime() -> int:
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    sys.path.insert(0, str(BACKEND))
+    from clinical_docs_template_compiler import DocxTemplateCache, compile_docx_template  # noqa: WPS433
+
+    templates = sorted(TEMPLATE_DIR.glob("*.docx"))
+    if not templates:
+        return fail("no templates under templates/clinical_docs")
+    for template_path in templates:
+        compiled = compile_docx_template(template_path)
+        for label, context in _contexts(compiled.slot_keys).items():
+            rendered = compiled.render(context)
+            if compiled.render(context) != rendered:
+                return fail(f"{template_path.name}/{label}: two renders of one context differ")
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(rendered))
+            except zipfile.BadZipFile as exc:
+                return fail(f"{template_path.name}/{label}: rendered DOCX is not a valid zip: {exc}")
+            with archive:
+                if archive.testzip() is not None:
+                    return fail(f"{template_path.name}/{label}: CRC mismatch in rendered DOCX")
+                actual = {name: archive.read(name) for name in archive.namelist()}
+            expected = reference_parts(template_path, context)
+            if list(actual) != list(expected):
+                return fail(f"{template_path.name}/{label}: part order differs from the template")
+            for name, raw in expected.items():
+                if actual[name] != raw:
+                    return fail(f"{template_path.name}/{label}: {name} is not byte-identical to the ElementTree renderer")
+
+        cache = DocxTemplateCache()
+        if cache.get(template_path) is not cache.get(template_path):
+            return fail(f"{template_path.name}: template cache should return the same compiled object")
+        if cache.stats()["hits"] != 1:
+            return fail(f"{template_path.name}: template cache hit not counted: {cache.stats()}")
+    return 0
+
+
+def main() -> int:
+    for path in (COMPILER, API, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(API, ("CLINICAL_DOC_TEMPLATE_CACHE", "compiled.render(context)"), "backend/clinical_docs_api.py")
+    if rc:
+        return rc
+    if "CLINICAL_DOC_RENDER_CACHE" in API.read_text(encoding="utf-8"):
+        return fail("rendered documents embed {{timestamp}} and must not be cached")
+
+    # The old renderer registered the w prefix before serializing; the compiler does so at import.
+    ET.register_namespace("w", W[1:-1])
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS clinical docs compiled render matches the ElementTree renderer")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
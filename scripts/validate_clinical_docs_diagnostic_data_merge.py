@@ -40,13 +40,18 @@ SNIPPETS = {
         "build_clinical_docs_diagnostic_data_merge",
         "_clinical_docs_diagnostic_data_merge_for_case",
         "_apply_diagnostic_data_context_to_clinical_doc_context",
-        "_append_diagnostic_data_section_to_document_xml",
+        "__diagnostic_data_section",
         "diagnostic_data_merge",
         "X-PMAI-Diagnostic-Data-Merge",
         "DiagnosticReport",
         "Observation",
         "ImagingStudy",
     ],
+    "backend/clinical_docs_template_compiler.py": [
+        "DIAGNOSTIC_DATA_SECTION_KEY",
+        "_insert_diagnostic_data_section_slot",
+        "_diagnostic_data_section_xml",
+    ],
     "docs/clinical_data/CLINICAL_DOCS_DIAGNOSTIC_DATA_MERGE_V1.md": [
         "Clinical Docs Diagnostic Data Merge V1",
         "POST /api/clinical-docs/render-preview",
@@ -59,7 +59,7 @@ def main() -> int:
             "StreamingResponse",
             "DOCX_MEDIA_TYPE",
             "_render_docx",
-            "_replace_placeholders_in_xml",
+            "CLINICAL_DOC_TEMPLATE_CACHE",
             "_case_or_404",
             "owner_id",
             "document_hash",
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "db_backup.py"
+BACKUP_CLI = ROOT / "scripts" / "backup_database.py"
+RESTORE_CLI = ROOT / "scripts" / "restore_database.py"
+DOC = ROOT / "docs" / "ops" / "DATABASE_BACKUP_EXPORT_V1.md"
+
+REVISION = "0009_diag_data"
+BASE_TIME = datetime(2026, 5, 1, 9, 0, 0)
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def run_cli(script: Path, database: Path, *args: str):
+    """Run a CLI against a SQLite file; db.py binds DATABASE_URL at import."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    result = subprocess.run([sys.executable, str(script), *args], cwd=str(ROOT), env=env, capture_output=True, text=True, check=False)
+    payload = None
+    if result.stdout.strip().startswith("{"):
+        payload = json.loads(result.stdout)
+    return result.returncode, payload, result.stderr
+
+
+def validate_runtime(tmp_path: Path) -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    from sqlalchemy import create_engine, select, text  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+
+    from db import Base  # noqa: WPS433
+    from models import AuditLog, Case, User  # noqa: WPS433
+
+    def make_database(name: str, revision):
+        path = tmp_path / f"{name}.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        if revision:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+                conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"), {"revision": revision})
+        return path, engine
+
+    def snapshot(engine) -> dict:
+        with engine.connect() as conn:
+            return {
+                table.name: sorted(tuple(row) for row in conn.execute(select(table).order_by(*table.primary_key.columns)))
+                for table in Base.metadata.sorted_tables
+            }
+
+    source_path, source = make_database("source", REVISION)
+    session_factory = sessionmaker(bind=source)
+    with session_factory() as db:
+        owner = User(email="backup-owner@example.com", hashed_password="x")
+        db.add(owner)
+        db.flush()
+        for index in range(7):
+            stamp = BASE_TIME + timedelta(minutes=index)
+            db.add(Case(owner_id=owner.id, patient_name=f"Pet {index}", species="dog", chief_complaint="cough", created_at=stamp, updated_at=stamp))
+            db.add(AuditLog(request_id=f"req-{index}", clinician_id="vet-1", action_taken="viewed", created_at=stamp))
+        db.commit()
+        owner_id = owner.id
+
+    backups = tmp_path / "backups"
+    rc, full, err = run_cli(BACKUP_CLI, source_path, "--out-dir", str(backups), "--batch-size", "3")
+    if rc != 0 or not full or full["mode"] != "full" or full["alembic_revision"] != REVISION:
+        return fail(f"full export failed: rc={rc} {full} {err[-400:]}")
+
+    # Changes after the full export: one edited case, one new case, one new audit row.
+    later = BASE_TIME + timedelta(days=1)
+    with session_factory() as db:
+        edited = db.execute(select(Case).where(Case.patient_name == "Pet 2")).scalar_one()
+        edited.chief_complaint = "cough, now febrile"
+        edited.updated_at = later
+        db.add(Case(owner_id=owner_id, patient_name="Pet new", species="cat", chief_complaint="limp", created_at=later, updated_at=later))
+        db.add(AuditLog(request_id="req-new", clinician_id="vet-1", action_taken="edited", created_at=later))
+        db.commit()
+
+    rc, incremental, err = run_cli(BACKUP_CLI, source_path, "--out-dir", str(backups), "--incremental-from", full["export_dir"], "--overlap-seconds", "0")
+    if rc != 0 or not incremental or incremental["base_export_id"] != full["export_id"]:
+        return fail(f"incremental export failed: rc={rc} {incremental} {err[-400:]}")
+    entries = {item["table"]: item for item in json.loads((Path(incremental["export_dir"]) / "manifest.json").read_text(encoding="utf-8"))["tables"]}
+    if entries["cases"]["rows"] != 2 or entries["audit_log"]["rows"] != 1 or entries["users"]["rows"] != 1:
+        return fail(f"incremental should carry only changed rows (users copied in full): cases={entries['cases']} audit_log={entries['audit_log']}")
+    if entries["cases"]["strategy"] != "updated_at" or entries["audit_log"]["strategy"] != "created_at":
+        return fail("cases must use the updated_at watermark and audit_log the created_at one")
+
+    chain = [full["export_dir"], incremental["export_dir"]]
+    target_path, target = make_database("target", REVISION)
+    rc, report, err = run_cli(RESTORE_CLI, target_path, *chain)
+    if rc != 0 or report["status"] != "verified" or any(snapshot(target).values()):
+        return fail(f"restore without --apply must only verify: rc={rc} {report} {err[-400:]}")
+    rc, report, err = run_cli(RESTORE_CLI, target_path, *reversed(chain))
+    if rc != 2 or "is based on" not in err:
+        return fail(f"an out-of-order chain must be refused: rc={rc} {err[-400:]}")
+
+    rc, report, err = run_cli(RESTORE_CLI, target_path, *chain, "--apply", "--batch-size", "2")
+    if rc != 0 or report["status"] != "restored":
+        return fail(f"restore --apply failed: rc={rc} {report} {err[-400:]}")
+    expected, restored = snapshot(source), snapshot(target)
+    for name, rows in expected.items():
+        if restored[name] != rows:
+            return fail(f"row parity broken for {name}: source={len(rows)} restored={len(restored[name])}")
+    if len(restored["cases"]) != 8 or len(restored["audit_log"]) != 8:
+        return fail(f"fixture should restore 8 cases and 8 audit rows: {len(restored['cases'])} {len(restored['audit_log'])}")
+    rc, report, err = run_cli(RESTORE_CLI, target_path, *chain, "--apply")
+    if rc != 0 or snapshot(target) != expected:
+        return fail(f"re-applying the same chain must upsert, not duplicate: rc={rc} {err[-400:]}")
+
+    # Tampered file: same name, valid gzip, different bytes.
+    tampered = tmp_path / "tampered"
+    shutil.copytree(full["export_dir"], tampered)
+    cases_file = tampered / "cases.ndjson.gz"
+    with gzip.open(cases_file, "rt", encoding="utf-8") as handle:
+        original = handle.read()
+    lines = original.replace('"chief_complaint":"cough"', '"chief_complaint":"altered"', 1)
+    if lines == original:
+        return fail("tamper fixture did not change any row")
+    with gzip.open(cases_file, "wt", encoding="utf-8") as handle:
+        handle.write(lines)
+    empty_path, empty = make_database("empty", REVISION)
+    rc, report, err = run_cli(RESTORE_CLI, empty_path, str(tampered), "--apply")
+    problems = (report or {}).get("checksum_problems") or []
+    if rc != 1 or report["status"] != "checksum_failed" or [(item["table"], item["error"]) for item in problems] != [("cases", "sha256 mismatch")]:
+        return fail(f"a tampered .ndjson.gz must be rejected with checksum_failed: rc={rc} {report}")
+    if any(snapshot(empty).values()):
+        return fail("a checksum failure must stop before writing any table")
+
+    mismatch_path, mismatch = make_database("mismatch", "0008_older")
+    rc, report, err = run_cli(RESTORE_CLI, mismatch_path, *chain, "--apply")
+    if rc != 2 or "does not match target 0008_older" not in err or any(snapshot(mismatch).values()):
+        return fail(f"a revision mismatch must be refused before writing: rc={rc} {err[-400:]}")
+    rc, report, err = run_cli(RESTORE_CLI, mismatch_path, *chain, "--allow-revision-mismatch")
+    if rc != 0 or report["status"] != "verified":
+        return fail(f"--allow-revision-mismatch should let verification pass: rc={rc} {err[-400:]}")
+    unstamped_path, _ = make_database("unstamped", None)
+    rc, report, err = run_cli(RESTORE_CLI, unstamped_path, *chain)
+    if rc != 2 or "no alembic_version" not in err:
+        return fail(f"an unstamped target must be refused: rc={rc} {err[-400:]}")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, BACKUP_CLI, RESTORE_CLI, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ('report["status"] = "checksum_failed"', "allow_revision_mismatch", "def verify_export"), "backend/db_backup.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("--incremental-from", "--allow-revision-mismatch"), "docs/ops/DATABASE_BACKUP_EXPORT_V1.md")
+    if rc:
+        return rc
+
+    with tempfile.TemporaryDirectory(prefix="pmai_db_backup_") as tmp:
+        rc = validate_runtime(Path(tmp))
+    if rc:
+        return rc
+
+    print("PASS database export, incremental export and restore (parity, checksum and revision guards)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
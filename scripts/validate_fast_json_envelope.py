@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import py_compile
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "fast_json.py"
+DOC = ROOT / "docs" / "ops" / "FAST_JSON_ENVELOPE_V1.md"
+
+SAFETY = {"read_only": True, "writes_database": False}
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _vary(response) -> list:
+    return [item.strip().lower() for item in response.headers.get("vary", "").split(",") if item.strip()]
+
+
+def validate_runtime(docx: Path) -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    from fastapi import FastAPI  # noqa: WPS433
+    from fastapi.responses import FileResponse, StreamingResponse  # noqa: WPS433
+    from fastapi.testclient import TestClient  # noqa: WPS433
+
+    from fast_json import EnvelopeMiddleware, FastJSONResponse  # noqa: WPS433
+    from http_caching import CompressionMiddleware, not_modified_response  # noqa: WPS433
+
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=0)
+    app.add_middleware(EnvelopeMiddleware)
+
+    @app.get("/json")
+    def read_json():
+        return {"safety": SAFETY, **SAFETY, "items": [1, 2, 3]}
+
+    @app.get("/docx")
+    def read_docx():
+        return FileResponse(docx, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+
+    @app.get("/ndjson")
+    def read_ndjson():
+        return StreamingResponse(iter([b'{"a": 1}\n', b'{"a": 2}\n']), media_type="application/x-ndjson")
+
+    @app.get("/not-modified")
+    def read_not_modified():
+        return not_modified_response('"abc"')
+
+    client = TestClient(app)
+    response = client.get("/json", headers={"Accept-Encoding": "identity"})
+    if response.status_code != 200 or "x-pmai-envelope" not in _vary(response):
+        return fail(f"JSON responses must carry Vary: X-PMAI-Envelope: {response.headers}")
+    if response.json()["read_only"] is not True:
+        return fail("the full envelope must stay the default")
+
+    response = client.get("/json", headers={"X-PMAI-Envelope": "compact", "Accept-Encoding": "gzip"})
+    if "read_only" in response.json() or response.headers.get("x-pmai-envelope") != "compact":
+        return fail(f"compact mode must drop top-level safety copies: {response.json()}")
+    if sorted(_vary(response)) != ["accept-encoding", "x-pmai-envelope"]:
+        return fail(f"gzip must add to Vary, not replace it: {response.headers.get('vary')}")
+
+    for path in ("/docx", "/ndjson", "/not-modified"):
+        response = client.get(path, headers={"X-PMAI-Envelope": "compact", "Accept-Encoding": "identity"})
+        if "x-pmai-envelope" in _vary(response) or "x-pmai-envelope" in response.headers:
+            return fail(f"{path} ({response.status_code}) does not depend on the envelope and must not vary on it: {response.headers}")
+
+    # FastAPI takes the default status code from the response class signature.
+    response = TestClient(app, raise_server_exceptions=False).get("/openapi.json")
+    if response.status_code != 200 or "200" not in response.json()["paths"]["/json"]["get"]["responses"]:
+        return fail(f"/openapi.json must render routes that use FastJSONResponse: {response.status_code}")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ('self.headers.add_vary_header("X-PMAI-Envelope")',), "backend/fast_json.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("(FastJSONResponse only)",), "docs/ops/FAST_JSON_ENVELOPE_V1.md")
+    if rc:
+        return rc
+
+    with tempfile.TemporaryDirectory(prefix="pmai_fast_json_") as tmp:
+        docx = Path(tmp) / "note.docx"
+        docx.write_bytes(b"PK\x03\x04 not a real document")
+        rc = validate_runtime(docx)
+    if rc:
+        return rc
+
+    print("PASS fast JSON envelope varies only JSON responses")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
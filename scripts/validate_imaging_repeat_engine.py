@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import py_compile
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "imaging_repeat_engine.py"
+KPI_API = BACKEND / "kpi_api.py"
+DOC = ROOT / "docs" / "clinical_data" / "IMAGING_REPEAT_ENGINE_V1.md"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    from sqlalchemy import create_engine  # noqa: WPS433
+    from sqlalchemy.orm import Session  # noqa: WPS433
+
+    from db import Base  # noqa: WPS433
+    from imaging_repeat_engine import check_new_study, find_repeat_events, summarize_repeat_groups  # noqa: WPS433
+    from kpi_api import _owned_imaging_counts  # noqa: WPS433
+    from models import Case, ImagingStudy, User  # noqa: WPS433
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    base = datetime(2026, 6, 1, 9, 0, 0)
+    with Session(engine) as db:
+        user = User(email="imaging-validator@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        case = Case(owner_id=user.id, patient_name="Validator", species="dog", chief_complaint="repeat imaging")
+        db.add(case)
+        db.flush()
+        studies = [
+            # "CT" / " ct " / "Ct" with chest in mixed case: one group, two repeats.
+            ("CT", "Chest", 0, False),
+            (" ct ", "chest ", 24, False),
+            ("Ct", "CHEST", 48, False),
+            # NULL and blank body part: one "unknown" group, one repeat.
+            ("xray", None, 0, False),
+            ("XRAY", "", 12, False),
+            # Planned review stays out of the sequence.
+            ("xray", "abdomen", 0, False),
+            ("xray", "abdomen", 6, True),
+            # Outside the 7-day default window: not a repeat.
+            ("mri", "head", 0, False),
+            ("MRI", "head", 24 * 30, False),
+        ]
+        for modality, body_part, hours, planned in studies:
+            db.add(ImagingStudy(
+                case_id=case.id,
+                modality=modality,
+                body_part=body_part,
+                taken_at=base + timedelta(hours=hours),
+                is_planned_review=planned,
+            ))
+        db.commit()
+
+        events = find_repeat_events(db, owner_id=user.id)
+        if len(events) != 3:
+            return fail(f"expected 3 repeat events, got {len(events)}: {events}")
+        groups = {(row["modality"], row["body_part"]): row for row in summarize_repeat_groups(events, limit=0)}
+        if set(groups) != {("ct", "chest"), ("xray", "unknown")}:
+            return fail(f"repeat groups must use the normalized key, got {sorted(groups)}")
+        if groups[("ct", "chest")]["count"] != 3 or groups[("ct", "chest")]["repeat_count"] != 2:
+            return fail(f"CT/ct chest group should hold 3 studies and 2 repeats: {groups[('ct', 'chest')]}")
+
+        studies_total, unplanned, group_count = _owned_imaging_counts(
+            db, user, base - timedelta(days=1), base + timedelta(days=60)
+        )
+        if (studies_total, unplanned, group_count) != (9, 8, 4):
+            return fail(f"KPI counts must be (9, 8, 4) with normalized groups, got {(studies_total, unplanned, group_count)}")
+
+        warning = check_new_study(db, case_id=case.id, modality="XRay", body_part="", taken_at=base + timedelta(hours=20))
+        if not warning["repeat_warning"] or warning["reason"] != "within_repeat_window":
+            return fail(f"blank body part must match earlier NULL/blank studies: {warning}")
+        warning = check_new_study(db, case_id=case.id, modality="ct", body_part="chest", taken_at=base + timedelta(days=20))
+        if warning["repeat_warning"] or warning["reason"] != "outside_repeat_window":
+            return fail(f"study 18 days after the last CT chest is outside the window: {warning}")
+        warning = check_new_study(db, case_id=case.id, modality="ct", body_part="chest", is_planned_review=True)
+        if warning["repeat_warning"] or warning["reason"] != "planned_review":
+            return fail(f"planned review must never warn: {warning}")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, KPI_API, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(
+        MODULE,
+        (
+            "IMAGING_REPEAT_ENGINE_MODE",
+            "def modality_key",
+            "def body_part_key",
+            "func.lag(",
+            '"writes_database": False',
+        ),
+        "backend/imaging_repeat_engine.py",
+    )
+    if rc:
+        return rc
+
+    rc = require_text(KPI_API, ("modality_key()", "body_part_key()"), "backend/kpi_api.py")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS imaging repeat engine grouping")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import csv
+import json
+import os
+import py_compile
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "lab_result_importer.py"
+CLI = ROOT / "scripts" / "import_lab_results.py"
+DOC = ROOT / "docs" / "clinical_data" / "LAB_RESULT_STREAMING_IMPORT_V1.md"
+
+FLAG = "ENABLE_LAB_REAL_INGEST"
+CSV_FIELDS = ("case_id", "patient_name", "accession", "panel", "code", "value", "unit", "reference_range", "collected_at")
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _write_csv(path: Path, ids: dict) -> None:
+    rows = [
+        # ACC-1 spans three chunks of two rows; it must stay one report.
+        {"patient_name": " mochi ", "accession": "ACC-1", "panel": "CHEM", "code": "ALT", "value": "250", "unit": "U/L", "reference_range": "10-100", "collected_at": "2026-06-01T08:00:00"},
+        {"patient_name": "Mochi", "accession": "ACC-1", "panel": "CHEM", "code": "CREA", "value": "90", "unit": "umol/L", "reference_range": "44-159", "collected_at": "2026-06-01T08:00:00"},
+        {"patient_name": "MOCHI", "accession": "ACC-1", "panel": "CHEM", "code": "GLU", "value": "5.1", "unit": "mmol/L", "reference_range": "3.9-7.9", "collected_at": "2026-06-01T08:00:00"},
+        {"case_id": str(ids["bean"]), "accession": "ACC-2", "panel": "CBC", "code": "WBC", "value": "3.0", "unit": "10e9/L", "reference_range": "5.5-19.5", "collected_at": "2026-06-02T09:00:00"},
+        {"patient_name": "Twin", "accession": "ACC-3", "code": "ALT", "value": "40", "unit": "U/L"},
+        {"case_id": "999999", "accession": "ACC-4", "code": "ALT", "value": "40", "unit": "U/L"},
+        {"case_id": str(ids["gone"]), "accession": "ACC-5", "code": "ALT", "value": "40", "unit": "U/L"},
+        {"patient_name": "Mochi", "accession": "ACC-6", "code": "ALT", "value": ""},
+    ]
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({name: row.get(name, "") for name in CSV_FIELDS})
+
+
+def _write_ndjson(path: Path, ids: dict) -> None:
+    lines = [
+        json.dumps({"case_id": ids["bean"], "source_report_id": "NDJ-1", "code": "HCT", "value_numeric": 22, "unit": "%", "reference_low": 30, "reference_high": 45}),
+        "{not json",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"case_id": "abc", "code": "HCT", "value": 40}),
+        "",
+        json.dumps({"patient_name": "Mochi", "source_report_id": "NDJ-2", "code": "NOTE", "value_text": "lipaemic"}),
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _write_hl7(path: Path, ids: dict) -> None:
+    segments = [
+        "MSH|^~\\&|LIS|CLINIC|PMAI|PMAI|20260603100000||ORU^R01|1|P|2.5",
+        f"PID|1||{ids['mochi']}||Mochi",
+        "OBR|1||HL7-ACC-1|CBC^Complete blood count|||20260603093000",
+        "OBX|1|NM|WBC^White blood cells||18.2|x10e9/L|6-17|H|||F|||20260603094500",
+        "OBX|2|NM|PLT^Platelets||90|x10e9/L|175-500|LL",
+        "OBX|3|ST|MORPH^Morphology||toxic neutrophils",
+    ]
+    path.write_text("\r".join(segments) + "\r", encoding="utf-8")
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SECRET_KEY", "validator")
+    os.environ.pop(FLAG, None)
+    sys.path.insert(0, str(BACKEND))
+    from sqlalchemy import create_engine, event, func, select  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    from db import Base  # noqa: WPS433
+    from lab_result_importer import run_lab_result_import  # noqa: WPS433
+    from models import Case, DiagnosticReport, Observation, User  # noqa: WPS433
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        owner, other = User(email="lab-owner@example.com", hashed_password="x"), User(email="lab-other@example.com", hashed_password="x")
+        db.add_all([owner, other])
+        db.flush()
+        cases = {
+            "mochi": Case(owner_id=owner.id, patient_name="Mochi", species="dog", chief_complaint="x"),
+            "bean": Case(owner_id=owner.id, patient_name="Bean", species="cat", chief_complaint="x"),
+            "twin_a": Case(owner_id=owner.id, patient_name="Twin", species="dog", chief_complaint="x"),
+            "twin_b": Case(owner_id=owner.id, patient_name="twin", species="dog", chief_complaint="x"),
+            "gone": Case(owner_id=owner.id, patient_name="Gone", species="dog", chief_complaint="x", deleted_at=datetime(2026, 1, 1)),
+            "other_mochi": Case(owner_id=other.id, patient_name="Mochi", species="dog", chief_complaint="x"),
+        }
+        db.add_all(cases.values())
+        db.commit()
+        ids = {name: case.id for name, case in cases.items()}
+        owner_id = owner.id
+
+    case_selects = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record_case_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM cases" in statement:
+            case_selects.append(statement)
+
+    def count(model) -> int:
+        with session_factory() as db:
+            return int(db.execute(select(func.count()).select_from(model)).scalar_one())
+
+    with tempfile.TemporaryDirectory(prefix="pmai_lab_import_") as tmp:
+        tmp_path = Path(tmp)
+        csv_path, ndjson_path, hl7_path = tmp_path / "export.csv", tmp_path / "export.ndjson", tmp_path / "export.hl7"
+        _write_csv(csv_path, ids)
+        _write_ndjson(ndjson_path, ids)
+        _write_hl7(hl7_path, ids)
+
+        with session_factory() as db:
+            dry = run_lab_result_import(db, path=csv_path, owner_id=owner_id, chunk_size=2)
+            summary = dry["summary"]
+            expected = {"rows_read": 8, "rows_rejected": 1, "rows_unmapped": 3, "observations": 4, "reports": 2, "chunks": 4}
+            if {name: summary[name] for name in expected} != expected:
+                return fail(f"CSV dry-run summary {summary} != {expected}")
+            if summary["by_flag"].get("high") != 1 or summary["by_flag"].get("low") != 1:
+                return fail(f"CSV dry-run flags wrong: {summary['by_flag']}")
+            unmapped = " ".join(item["error"] for item in dry["errors"])
+            if "matches several cases" not in unmapped or f"case {ids['gone']} not found" not in unmapped:
+                return fail(f"ambiguous names and deleted cases must be unmapped: {dry['errors']}")
+            if count(DiagnosticReport) or count(Observation) or dry["writes_database"] is not False:
+                return fail("dry-run must not write")
+            if not case_selects or any(" IN (" not in statement for statement in case_selects):
+                return fail("cases must be looked up per chunk with IN queries, not preloaded")
+
+            # Without --owner-id the other owner's Mochi makes the name ambiguous.
+            clinic_wide = run_lab_result_import(db, path=csv_path, chunk_size=50)
+            if clinic_wide["summary"]["observations"] != 1:
+                return fail(f"clinic-wide dry-run should only map the case_id row: {clinic_wide['summary']}")
+
+            ndjson = run_lab_result_import(db, path=ndjson_path, owner_id=owner_id)
+            expected = {"rows_read": 5, "rows_rejected": 3, "observations": 2, "reports": 2}
+            if {name: ndjson["summary"][name] for name in expected} != expected:
+                return fail(f"NDJSON dry-run summary {ndjson['summary']} != {expected}")
+
+            hl7 = run_lab_result_import(db, path=hl7_path, owner_id=owner_id)
+            preview = {item["code"]: item for item in hl7["observations_preview"]}
+            if hl7["summary"]["observations"] != 3 or hl7["summary"]["reports"] != 1 or hl7["source"]["format"] != "hl7":
+                return fail(f"HL7 dry-run summary wrong: {hl7['summary']}")
+            # HH/LL go through the parser's explicit-flag mapping (critical_low -> low).
+            if preview["WBC"]["abnormal_flag"] != "high" or preview["PLT"]["abnormal_flag"] != "low":
+                return fail(f"HL7 OBX-8 flags not applied: {preview}")
+            if preview["WBC"]["observed_at"] != "2026-06-03T09:45:00" or preview["MORPH"]["value_text"] != "toxic neutrophils":
+                return fail(f"HL7 fields not mapped: {preview['WBC']} {preview['MORPH']}")
+
+            try:
+                run_lab_result_import(db, path=csv_path, owner_id=owner_id, dry_run=False)
+                return fail(f"apply must be refused while {FLAG} is off")
+            except PermissionError:
+                pass
+
+        os.environ[FLAG] = "true"
+        try:
+            with session_factory() as db:
+                first = run_lab_result_import(db, path=csv_path, owner_id=owner_id, dry_run=False, chunk_size=2)
+                if first["summary"]["observations"] != 4 or count(Observation) != 4 or count(DiagnosticReport) != 2:
+                    return fail(f"apply should write 2 reports / 4 observations: {first['summary']}")
+                acc1 = db.execute(select(Observation.diagnostic_report_id).where(Observation.case_id == ids["mochi"])).scalars().all()
+                if len(acc1) != 3 or len(set(acc1)) != 1:
+                    return fail(f"rows of one accession across chunks must share one report: {acc1}")
+                review = db.execute(select(Observation.review_status).distinct()).scalars().all()
+                if review != ["draft"]:
+                    return fail(f"imported observations must stay draft: {review}")
+
+                again = run_lab_result_import(db, path=csv_path, owner_id=owner_id, dry_run=False, chunk_size=2)
+                if again["summary"]["observations"] != 0 or again["summary"]["rows_duplicate_report"] != 4:
+                    return fail(f"re-running the same file must write nothing: {again['summary']}")
+                if count(Observation) != 4 or count(DiagnosticReport) != 2:
+                    return fail("re-run inserted rows")
+        finally:
+            os.environ.pop(FLAG, None)
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, CLI, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ("def load(self, rows", "cases.load("), "backend/lab_result_importer.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("two IN queries per chunk", "one `(case_id, report key)` entry"), "docs/clinical_data/LAB_RESULT_STREAMING_IMPORT_V1.md")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS lab result streaming import (CSV, NDJSON, HL7, dedup, flag gate)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import py_compile
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "lab_trend_engine.py"
+API = BACKEND / "diagnostic_data_api.py"
+DOC = ROOT / "docs" / "clinical_data" / "LAB_TREND_ENGINE_V1.md"
+
+START = datetime(2026, 3, 1, 8, 0, 0)
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def validate_analysis(engine) -> int:
+    columns = {
+        "observation_id": [1, 2, 3, 4, 5],
+        "case_id": [1] * 5,
+        "taken_at": [START + timedelta(days=day) for day in range(5)],
+        "value": [3.0, 5.0, 5.5, 9.0, 7.0],
+        "unit": ["mmol/L"] * 5,
+        # Point 3 has no range: it must not break the low -> normal -> high chain.
+        "reference_low": [4.0, 4.0, None, 4.0, 4.0],
+        "reference_high": [8.0, 8.0, None, 8.0, 8.0],
+    }
+    analysis = engine.analyze_series(columns)
+    crossings = [(item["from"], item["to"], item["observation_id"]) for item in analysis["crossings"]]
+    if crossings != [("low", "normal", 2), ("normal", "high", 4), ("high", "normal", 5)]:
+        return fail(f"unexpected crossings {crossings}")
+    if analysis["crossings"][1]["at"] != (START + timedelta(days=3)).isoformat() or analysis["crossings"][1]["value"] != 9.0:
+        return fail(f"crossing must carry the crossing point's time and value: {analysis['crossings'][1]}")
+    expected = {"points": 5, "first": {"value": 3.0, "at": START.isoformat()}, "min": 3.0, "max": 9.0, "last_delta": -2.0, "total_change": 4.0, "percent_change": 133.33, "slope_per_day": 1.2, "direction": "rising"}
+    if {name: analysis[name] for name in expected} != expected:
+        return fail(f"analysis {analysis} does not match {expected}")
+    if analysis["last"]["state"] != "normal":
+        return fail(f"last point state should be normal: {analysis['last']}")
+
+    mixed = dict(columns, unit=["mg/dL", "mmol/L", "mmol/L", "mmol/L", "mmol/L"])
+    analysis = engine.analyze_series(mixed)
+    if analysis["points"] != 4 or analysis["excluded_other_unit_points"] != 1 or analysis["units_seen"] != ["mg/dL", "mmol/L"]:
+        return fail(f"points in another unit must be excluded: {analysis}")
+    if engine.analyze_series(dict(columns, **{name: values[:1] for name, values in columns.items()}))["direction"] != "insufficient_data":
+        return fail("a single point must report insufficient_data")
+    return 0
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SECRET_KEY", "validator")
+    sys.path.insert(0, str(BACKEND))
+    from fastapi import FastAPI  # noqa: WPS433
+    from fastapi.testclient import TestClient  # noqa: WPS433
+    from sqlalchemy import create_engine  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    import diagnostic_data_api  # noqa: WPS433
+    import lab_trend_engine  # noqa: WPS433
+    from auth_jwt import get_current_user  # noqa: WPS433
+    from db import Base, get_db  # noqa: WPS433
+    from models import Case, DiagnosticReport, Observation, User  # noqa: WPS433
+
+    rc = validate_analysis(lab_trend_engine)
+    if rc:
+        return rc
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        owner, other = User(email="trend-owner@example.com", hashed_password="x"), User(email="trend-other@example.com", hashed_password="x")
+        db.add_all([owner, other])
+        db.flush()
+        cases = {
+            "visit_1": Case(owner_id=owner.id, patient_name="Mochi", species="dog", chief_complaint="x"),
+            "visit_2": Case(owner_id=owner.id, patient_name="Mochi", species="dog", chief_complaint="x"),
+            "cat": Case(owner_id=owner.id, patient_name="Mochi", species="cat", chief_complaint="x"),
+            "foreign": Case(owner_id=other.id, patient_name="Mochi", species="dog", chief_complaint="x"),
+        }
+        db.add_all(cases.values())
+        db.flush()
+        reports = {name: DiagnosticReport(case_id=case.id, report_type="lab") for name, case in cases.items()}
+        db.add_all(reports.values())
+        db.flush()
+
+        def observe(name: str, code: str, day: int, value, low=10.0, high=100.0, unit="U/L") -> None:
+            db.add(Observation(
+                case_id=cases[name].id,
+                diagnostic_report_id=reports[name].id,
+                code=code,
+                display_name=code.strip(),
+                value_numeric=value,
+                value_text=None if value is not None else "haemolysed",
+                unit=unit,
+                reference_low=low,
+                reference_high=high,
+                observed_at=START + timedelta(days=day),
+            ))
+
+        # Mixed-case stored codes; the old three-variant filter missed "aLT" and " alt ".
+        observe("visit_1", "ALT", 0, 80)
+        observe("visit_1", "aLT", 1, 150)
+        observe("visit_1", "Alt", 2, 120)
+        observe("visit_1", " alt ", 3, 50)
+        observe("visit_1", "ALT", 4, None)
+        observe("visit_1", "Alt-P", 1, 30, low=None, high=None)
+        observe("visit_2", "alt", 10, 210)
+        observe("visit_2", "Crea", 10, 180, low=44, high=159, unit="umol/L")
+        observe("cat", "ALT", 5, 999)
+        observe("foreign", "ALT", 5, 999)
+        db.commit()
+        ids = {name: case.id for name, case in cases.items()}
+        owner_id = owner.id
+
+    with session_factory() as db:
+        series = lab_trend_engine.load_series(db, case_ids=[ids["visit_1"]], codes=["alt", "ALT-P"])
+        if sorted(series) != ["ALT", "ALT-P"]:
+            return fail(f"stored code variants must fold into the request code: {sorted(series)}")
+        if series["ALT"]["value"] != [80.0, 150.0, 120.0, 50.0]:
+            return fail(f"ALT series must include every case variant in time order: {series['ALT']['value']}")
+        capped = lab_trend_engine.load_series(db, case_ids=[ids["visit_1"]], codes=["ALT"], max_points=2)
+        if capped["ALT"]["value"] != [120.0, 50.0]:
+            return fail(f"max_points must keep the latest points: {capped['ALT']['value']}")
+
+    app = FastAPI()
+    app.include_router(diagnostic_data_api.router)
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_user():
+        with session_factory() as db:
+            return db.get(User, owner_id)
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = override_user
+    client = TestClient(app)
+    url = f"/api/diagnostic-data/cases/{ids['visit_1']}/lab-trends"
+
+    response = client.get(url, params={"codes": "alt,crea,GLU"})
+    if response.status_code != 200:
+        return fail(f"lab-trends returned {response.status_code}: {response.text[:200]}")
+    body = response.json()
+    if body["codes"] != ["ALT", "CREA", "GLU"] or body["missing_codes"] != ["CREA", "GLU"] or body["case_ids"] != [ids["visit_1"]]:
+        return fail(f"case scope should only see visit_1's ALT: {body['codes']} {body['missing_codes']} {body['case_ids']}")
+    alt = body["trends"]["ALT"]
+    if [point["value"] for point in alt["points"]] != [80.0, 150.0, 120.0, 50.0]:
+        return fail(f"endpoint points wrong: {alt['points']}")
+    crossings = [(item["from"], item["to"], item["value"]) for item in alt["analysis"]["crossings"]]
+    if crossings != [("normal", "high", 150.0), ("high", "normal", 50.0)]:
+        return fail(f"endpoint crossings wrong: {crossings}")
+    if body["writes_database"] is not False or body["read_only"] is not True:
+        return fail("lab-trends must report the read-only safety flags")
+
+    response = client.get(url, params={"codes": "ALT,CREA", "scope": "patient", "include_points": "false"})
+    body = response.json()
+    if response.status_code != 200 or body["case_ids"] != [ids["visit_1"], ids["visit_2"]]:
+        return fail(f"patient scope should cover the owner's same-species cases only: {response.status_code} {body.get('case_ids')}")
+    if body["trends"]["ALT"]["analysis"]["points"] != 5 or "points" in body["trends"]["ALT"] or body["missing_codes"]:
+        return fail(f"patient scope should merge ALT across visits and find CREA: {body['trends']}")
+    if body["trends"]["CREA"]["analysis"]["last"]["state"] != "high":
+        return fail(f"CREA above its range should be high: {body['trends']['CREA']['analysis']['last']}")
+
+    if client.get(url, params={"codes": " , "}).status_code != 422:
+        return fail("empty codes must return 422")
+    too_many = ",".join(f"C{index}" for index in range(lab_trend_engine.LAB_TREND_MAX_CODES + 1))
+    if client.get(url, params={"codes": too_many}).status_code != 422:
+        return fail("more than LAB_TREND_MAX_CODES codes must return 422")
+    if client.get(f"/api/diagnostic-data/cases/{ids['foreign']}/lab-trends", params={"codes": "ALT"}).status_code != 404:
+        return fail("another owner's case must return 404")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, API, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ("func.upper(func.trim(Observation.code)).in_(wanted)",), "backend/lab_trend_engine.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("upper(trim(code))",), "docs/clinical_data/LAB_TREND_ENGINE_V1.md")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS lab trend engine (case-insensitive codes, crossings, endpoint scopes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import os
+import py_compile
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "lazy_routers.py"
+MAIN = BACKEND / "main.py"
+DOC = ROOT / "docs" / "ops" / "LAZY_ROUTERS_STARTUP_V1.md"
+
+RESULT_MARKER = "LAZY_ROUTERS_RESULT "
+
+# Runs in a fresh interpreter from backend/ (like benchmark_startup.py): LAZY_ROUTERS is read when main is imported.
+PROBE = r'''
+import json
+import sys
+
+sys.path.insert(0, sys.argv[1])
+step = sys.argv[2]
+import main
+from fastapi.testclient import TestClient
+from lazy_routers import _path_matches
+
+
+def routes():
+    return [[route.path, sorted(getattr(route, "methods", None) or [])] for route in main.app.routes]
+
+
+out = {"lazy": main.lazy_routers is not None, "initial": routes()}
+loader = main.lazy_routers
+if step == "ownership":
+    owners = {}
+    for name, prefixes in loader.modules:
+        before = {json.dumps(item) for item in routes()}
+        loader.load([name])
+        added = [item for item in routes() if json.dumps(item) not in before]
+        owners[name] = {"added": added, "uncovered": [path for path, _ in added if not any(_path_matches(path, prefix) for prefix in prefixes)]}
+    out["owners"] = owners
+elif step == "requests":
+    client = TestClient(main.app)
+    client.get("/api/preventive-care/ops/summary")
+    out["after_ops_request"] = sorted(loader.loaded)
+    out["openapi_status"] = client.get("/openapi.json").status_code
+    out["pending_after_openapi"] = loader.pending()
+out["final"] = routes()
+print("LAZY_ROUTERS_RESULT " + json.dumps(out))
+'''
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def probe(lazy: bool, step: str):
+    env = {
+        **os.environ,
+        "DATABASE_URL": "sqlite://",
+        "LAZY_ROUTERS": "true" if lazy else "false",
+        "LAZY_ROUTERS_PRELOAD": "false",
+    }
+    result = subprocess.run([sys.executable, "-c", PROBE, str(BACKEND), step], cwd=str(BACKEND), env=env, capture_output=True, text=True, check=False)
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):]), ""
+    return None, f"rc={result.returncode} {result.stderr.strip()[-600:]}"
+
+
+def validate_routes() -> int:
+    eager, error = probe(False, "eager")
+    if eager is None or eager["lazy"]:
+        return fail(f"eager import failed: {error}")
+    ownership, error = probe(True, "ownership")
+    if ownership is None or not ownership["lazy"]:
+        return fail(f"lazy import failed: {error}")
+    requests, error = probe(True, "requests")
+    if requests is None:
+        return fail(f"lazy request probe failed: {error}")
+
+    eager_routes = eager["final"]
+    if len(ownership["initial"]) >= len(eager_routes):
+        return fail("lazy mode should start with only the core routes")
+    for name, item in ownership["owners"].items():
+        if not item["added"]:
+            return fail(f"{name} added no routes when loaded")
+        if item["uncovered"]:
+            # A request to these paths would 404 until something else loaded the module.
+            return fail(f"{name} serves paths outside its LAZY_ROUTER_MODULES prefixes: {item['uncovered']}")
+    # Loading in table order must rebuild the eager route list, order included.
+    if ownership["final"] != eager_routes:
+        missing = [item for item in eager_routes if item not in ownership["final"]]
+        extra = [item for item in ownership["final"] if item not in eager_routes]
+        return fail(f"lazy route list differs from eager: missing={missing[:5]} extra={extra[:5]}")
+
+    if requests["after_ops_request"] != ["preventive_care_api", "preventive_care_ops_api"]:
+        return fail(f"a request should only load the routers whose prefixes match it: {requests['after_ops_request']}")
+    if requests["openapi_status"] != 200 or requests["pending_after_openapi"]:
+        return fail(f"/openapi.json must load every pending router: {requests['openapi_status']} {requests['pending_after_openapi']}")
+    key = lambda item: (item[0], item[1])  # noqa: E731
+    if sorted(requests["final"], key=key) != sorted(eager_routes, key=key):
+        return fail("routes loaded on demand must match the eager route set")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, MAIN, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MAIN, ("LAZY_ROUTER_MODULES = (", "LazyRouterLoader(app, LAZY_ROUTER_MODULES)"), "backend/main.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("Every route path must be covered by a\nprefix of its own module",), "docs/ops/LAZY_ROUTERS_STARTUP_V1.md")
+    if rc:
+        return rc
+
+    rc = validate_routes()
+    if rc:
+        return rc
+
+    print("PASS lazy routers rebuild the eager route set and every path is covered by its module's prefixes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import os
+import py_compile
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "legacy_case_bulk_import.py"
+CLI = ROOT / "scripts" / "import_legacy_cases.py"
+DOC = ROOT / "docs" / "migrations" / "LEGACY_BULK_CASE_IMPORT.md"
+
+FLAG = "ENABLE_LEGACY_CASE_BULK_IMPORT"
+SNAPSHOT = "snap-validator"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _record(key: str, name: str, species: str = "dog", **overrides) -> str:
+    record = {
+        "operation": "case_create",
+        "dry_run": True,
+        "idempotency_key": key,
+        "legacy_case_id": f"HS-{key}",
+        "case_create": {
+            "patient_name": name,
+            "species": species,
+            "chief_complaint": "vomiting",
+            "owner_phone": f"138{key[-4:]:0>8}",
+            "history": "legacy note",
+        },
+    }
+    record.update(overrides)
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _write_fixture(path: Path, keys) -> None:
+    lines = [_record(key, f"Pet {key}", "cat" if index % 2 else "dog") for index, key in enumerate(keys)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SECRET_KEY", "validator")
+    os.environ.pop(FLAG, None)
+    sys.path.insert(0, str(BACKEND))
+    from sqlalchemy import create_engine, func, select  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    from db import Base  # noqa: WPS433
+    from legacy_case_bulk_import import rollback_legacy_case_import, run_legacy_case_bulk_import  # noqa: WPS433
+    from models import AuditLog, Case, User  # noqa: WPS433
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        owner = User(email="legacy-import@example.com", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+
+    def live_cases(db) -> int:
+        return int(db.execute(select(func.count()).select_from(Case).where(Case.deleted_at.is_(None))).scalar_one())
+
+    real = dict(rollback_snapshot_id=SNAPSHOT, clinical_signoff_id="signoff-1", operator_id="validator")
+    with tempfile.TemporaryDirectory(prefix="pmai_legacy_import_") as tmp:
+        tmp_path = Path(tmp)
+        manifests = tmp_path / "manifests"
+        source = tmp_path / "cases.jsonl"
+        keys = [f"k{index:04d}" for index in range(6)]
+        _write_fixture(source, keys)
+        with source.open("a", encoding="utf-8") as handle:
+            handle.write(_record("k0001", "Again") + "\n")
+            handle.write("{not json\n")
+            handle.write(_record("k9999", "Wrong", operation="case_update") + "\n")
+
+        with session_factory() as db:
+            dry = run_legacy_case_bulk_import(db, path=source, owner_id=owner_id, batch_size=2, manifest_dir=manifests)
+            summary = dry["summary"]
+            expected = {"records_read": 9, "records_rejected": 2, "skipped_duplicate_in_file": 1, "cases_created": 6, "batches": 3}
+            if {name: summary[name] for name in expected} != expected:
+                return fail(f"dry-run summary {summary} != {expected}")
+            if live_cases(db) != 0 or manifests.exists() or dry["writes_database"] is not False:
+                return fail("dry-run must not write cases or manifests")
+            try:
+                run_legacy_case_bulk_import(db, path=source, owner_id=owner_id, dry_run=False, manifest_dir=manifests, **real)
+                return fail(f"apply must be refused while {FLAG} is off")
+            except PermissionError:
+                pass
+
+        os.environ[FLAG] = "true"
+        try:
+            with session_factory() as db:
+                try:
+                    run_legacy_case_bulk_import(db, path=source, owner_id=owner_id, dry_run=False, manifest_dir=manifests)
+                    return fail("apply without rollback_snapshot_id / sign-off / operator must be refused")
+                except ValueError:
+                    pass
+
+                first = run_legacy_case_bulk_import(db, path=source, owner_id=owner_id, dry_run=False, batch_size=2, manifest_dir=manifests, **real)
+                if first["summary"]["cases_created"] != 6 or live_cases(db) != 6:
+                    return fail(f"apply should create 6 cases: {first['summary']}")
+                run_dir = Path(first["manifest_dir"])
+                statuses = [json.loads(path.read_text(encoding="utf-8"))["status"] for path in sorted(run_dir.glob("batch_*.json"))]
+                if statuses != ["committed"] * 3 or not (run_dir / "index.json").exists():
+                    return fail(f"each batch needs a committed manifest plus index.json: {statuses}")
+                if not db.get(AuditLog, first["audit_log_id"]):
+                    return fail("apply must write an audit_log row")
+
+                again = run_legacy_case_bulk_import(db, path=source, owner_id=owner_id, dry_run=False, manifest_dir=manifests, **real)
+                if again["summary"]["cases_created"] != 0 or again["summary"]["skipped_existing"] != 6 or live_cases(db) != 6:
+                    return fail(f"re-running the same file must create nothing: {again['summary']}")
+
+                # Interrupted import: batch 1 commits, batch 2's commit fails and rolls back.
+                second_source = tmp_path / "more.jsonl"
+                _write_fixture(second_source, [f"m{index:04d}" for index in range(4)])
+                real_commit, commits = db.commit, []
+
+                def crashing_commit():
+                    commits.append(1)
+                    if len(commits) == 2:
+                        raise RuntimeError("simulated crash during commit")
+                    real_commit()
+
+                db.commit = crashing_commit
+                try:
+                    run_legacy_case_bulk_import(db, path=second_source, owner_id=owner_id, dry_run=False, batch_size=2, manifest_dir=manifests, **real)
+                    return fail("the simulated crash did not surface")
+                except RuntimeError:
+                    pass
+                finally:
+                    db.commit = real_commit
+                crashed_dir = max((path for path in manifests.iterdir() if path != run_dir), key=lambda path: len(list(path.glob("batch_*.json"))))
+                pending = json.loads((crashed_dir / "batch_00002.json").read_text(encoding="utf-8"))
+                if pending["status"] != "pending_commit":
+                    return fail("the crashed batch should leave a pending_commit manifest")
+
+                # Unrelated cases of the same owner now get the rolled-back ids (SQLite reuses them).
+                stamp = datetime(2026, 1, 1, 8, 0, 0)
+                unrelated = [
+                    Case(owner_id=owner_id, patient_name=f"Walk-in {index}", species="dog", chief_complaint="limp", created_at=stamp, updated_at=stamp)
+                    for index in range(2)
+                ]
+                db.add_all(unrelated)
+                db.commit()
+                unrelated_ids = {case.id for case in unrelated}
+                pending_ids = {item["case_id"] for item in pending["items"]}
+                if not unrelated_ids & pending_ids:
+                    return fail(f"fixture expected SQLite to reuse ids {pending_ids}, got {unrelated_ids}")
+
+                report = rollback_legacy_case_import(db, manifest_dir=crashed_dir, rollback_snapshot_id=SNAPSHOT, operator_id="validator", dry_run=False)
+                summary = report["summary"]
+                if summary["skipped_uncommitted_batches"] != 1 or [item["batch_number"] for item in report["uncommitted_manifests"]] != [2]:
+                    return fail(f"rollback must skip and report the pending_commit manifest: {report['uncommitted_manifests']}")
+                if summary["hidden"] != 2 or summary["manifest_cases"] != 2:
+                    return fail(f"rollback should hide only the committed batch: {summary}")
+                for case_id in unrelated_ids:
+                    if db.get(Case, case_id).deleted_at is not None:
+                        return fail(f"rollback hid unrelated case {case_id}")
+
+                # A committed manifest whose id now points at another row is left alone.
+                batch_path = run_dir / "batch_00001.json"
+                committed = json.loads(batch_path.read_text(encoding="utf-8"))
+                committed["items"][0]["case_id"] = sorted(unrelated_ids)[0]
+                batch_path.write_text(json.dumps(committed), encoding="utf-8")
+                report = rollback_legacy_case_import(db, manifest_dir=run_dir, rollback_snapshot_id=SNAPSHOT, operator_id="validator", dry_run=True)
+                if report["summary"]["skipped_created_at_mismatch"] != 1 or report["summary"]["to_hide"] != 5:
+                    return fail(f"rollback must skip ids whose created_at differs from the manifest: {report['summary']}")
+                report = rollback_legacy_case_import(db, manifest_dir=run_dir, rollback_snapshot_id=SNAPSHOT, operator_id="validator", dry_run=False)
+                # Live: the two walk-ins plus the import whose manifest entry was overwritten.
+                if report["summary"]["hidden"] != 5 or live_cases(db) != 3:
+                    return fail(f"rollback should hide exactly the matching imports: {report['summary']}, live={live_cases(db)}")
+                try:
+                    rollback_legacy_case_import(db, manifest_dir=run_dir, rollback_snapshot_id="other", operator_id="validator")
+                    return fail("rollback with another snapshot id must be refused")
+                except ValueError:
+                    pass
+        finally:
+            os.environ.pop(FLAG, None)
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, CLI, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ('manifest.get("status") != "committed"', "uncommitted_manifests", "skipped_created_at_mismatch"), "backend/legacy_case_bulk_import.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("uncommitted_manifests", "skipped_created_at_mismatch"), "docs/migrations/LEGACY_BULK_CASE_IMPORT.md")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS legacy case bulk import dry-run, apply, dedup and rollback")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
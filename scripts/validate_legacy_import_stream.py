@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import csv
+import json
+import os
+import py_compile
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "legacy_import_stream.py"
+BATCH = BACKEND / "legacy_import_mock.py"
+CLI = ROOT / "scripts" / "legacy_cases_stream_dry_run.py"
+DOC = ROOT / "docs" / "migrations" / "LEGACY_STREAM_DRY_RUN.md"
+
+RECORD_COUNT = 60
+CHUNK_SIZE = 4
+ERROR_SAMPLE_LIMIT = 4
+# Lines that never become records: one bad JSON line and one non-object line.
+BROKEN_LINES = {10: "{not json", 25: "[1, 2, 3]"}
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def fixture_records() -> list:
+    records = []
+    for index in range(RECORD_COUNT):
+        case_create = {
+            "patient_name": f"Pet {index}",
+            "species": "dragon" if index % 10 == 3 else ("cat" if index % 2 else "dog"),
+            "chief_complaint": "" if index % 9 == 4 else "vomiting",
+            "breed": "mixed" if index % 3 else "",
+            "weight": str(3 + index % 7) if index % 4 else "",
+            "owner_name": f"Owner {index}",
+            "owner_phone": f"138{index:08d}" if index % 5 else "",
+            "history": "legacy note" if index % 2 else "",
+            "exam_findings": "T 38.9" if index % 6 == 1 else "",
+        }
+        record = {
+            "operation": "case_update" if index % 11 == 5 else "case_create",
+            "dry_run": index % 13 != 7,
+            # Every 7th record reuses an earlier key; index 12 duplicates and has an operation error too.
+            "idempotency_key": "" if index == 17 else f"key-{index - 3 if index % 7 == 5 else index:04d}",
+            "legacy_case_id": f"HS-{index}",
+            "case_create": case_create,
+        }
+        if index % 4 == 0:
+            record["legacy"] = {"case_id": f"HS-{index}", "status": "" if index % 8 == 0 else "closed"}
+        records.append(record)
+    records[12]["operation"] = "case_delete"
+    records[12]["idempotency_key"] = records[11]["idempotency_key"]
+    return records
+
+
+def _comparable(report: dict) -> dict:
+    return {name: report[name] for name in ("received", "accepted", "rejected", "ready_for_import", "summary", "quality", "sample_payloads")}
+
+
+def validate_parity(tmp_path: Path) -> int:
+    from legacy_import_mock import build_dry_run_report  # noqa: WPS433
+    from legacy_import_stream import ERRORS_CSV_FIELDS, run_stream_dry_run  # noqa: WPS433
+
+    records = fixture_records()
+    clean = tmp_path / "clean.jsonl"
+    clean.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+
+    batch = build_dry_run_report(records=records, batch_id="b", mode="batch", message="batch", max_records=5000)
+    # A sample limit above the rejected count keeps every error list for the order check below.
+    stream = run_stream_dry_run(clean, chunk_size=CHUNK_SIZE, workers=2, error_sample_limit=1000)
+    if stream["stream"]["workers"] != 2 or stream["stream"]["chunks_processed"] != -(-len(records) // CHUNK_SIZE):
+        return fail(f"stream should validate {len(records)} records in chunks of {CHUNK_SIZE} on 2 workers: {stream['stream']}")
+    for name in ("summary", "quality", "sample_payloads"):
+        if stream[name] != batch[name]:
+            return fail(f"stream {name} differs from build_dry_run_report:\n  stream={stream[name]}\n  batch={batch[name]}")
+    summary = stream["summary"]
+    codes = summary["rejected_by_code"]
+    if not (codes.get("duplicate_in_batch", 0) >= 5 and codes.get("unsupported_operation") and codes.get("not_dry_run") and codes.get("invalid_species") and codes.get("required")):
+        return fail(f"fixture must exercise duplicates and rejected operations: {codes}")
+    batch_errors = {item["index"]: item["errors"] for item in batch["errors"]}
+    if sorted(sample["index"] for sample in stream["error_samples"]) != sorted(batch_errors):
+        return fail("stream and batch must reject the same records")
+    for sample in stream["error_samples"]:
+        # Same error list in the same order, including where duplicate_in_batch is inserted.
+        if sample["errors"] != batch_errors.get(sample["index"]):
+            return fail(f"error sample {sample['index']} differs from the batch report: {sample['errors']} != {batch_errors.get(sample['index'])}")
+
+    # With broken lines in the file, only invalid_json / invalid_record are added on top.
+    lines = [json.dumps(record) for record in records]
+    for position, text in sorted(BROKEN_LINES.items()):
+        lines.insert(position, text)
+    lines.insert(3, "")
+    broken = tmp_path / "broken.jsonl"
+    broken.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    errors_csv = tmp_path / "errors.csv"
+    reports = {
+        workers: run_stream_dry_run(broken, chunk_size=CHUNK_SIZE, workers=workers, error_sample_limit=ERROR_SAMPLE_LIMIT, errors_csv=errors_csv if workers == 2 else None, seed=7)
+        for workers in (1, 2)
+    }
+    if _comparable(reports[1]) != _comparable(reports[2]) or reports[1]["error_samples"] != reports[2]["error_samples"]:
+        return fail("the report must not depend on the worker count")
+    report = reports[2]
+    expected_summary = dict(batch["summary"])
+    expected_summary.update(
+        received=batch["summary"]["received"] + 2,
+        rejected=batch["summary"]["rejected"] + 2,
+        error_count=batch["summary"]["error_count"] + 2,
+        rejected_by_code={**codes, "invalid_json": 1, "invalid_record": 1},
+    )
+    expected_summary["rejected_by_code"] = dict(sorted(expected_summary["rejected_by_code"].items()))
+    expected_summary["operation_counts"] = {**batch["summary"]["operation_counts"], "unknown": batch["summary"]["operation_counts"].get("unknown", 0) + 2}
+    expected_summary["species_counts"] = {**batch["summary"]["species_counts"], "unknown": batch["summary"]["species_counts"].get("unknown", 0) + 2}
+    for name in ("operation_counts", "species_counts"):
+        expected_summary[name] = dict(sorted(expected_summary[name].items()))
+    if report["summary"] != expected_summary or report["quality"] != batch["quality"]:
+        return fail(f"broken lines should only add two line-level rejections:\n  got={report['summary']}\n  want={expected_summary}")
+
+    with errors_csv.open(encoding="utf-8", newline="") as handle:
+        reader = csv.DictReader(handle)
+        rows = list(reader)
+    if reader.fieldnames != ERRORS_CSV_FIELDS or len(rows) != report["summary"]["error_count"] or report["errors_csv"]["rows_written"] != len(rows):
+        return fail(f"errors CSV must hold one row per error: {len(rows)} rows, {report['errors_csv']}")
+    line_errors = {row["error_code"]: int(row["line"]) for row in rows if row["field"] == "__line__"}
+    if line_errors != {"invalid_json": 12, "invalid_record": 27}:
+        return fail(f"line-level errors must point at the physical file line: {line_errors}")
+
+    samples = report["error_samples"]
+    indices = [sample["index"] for sample in samples]
+    if report["rejected"] <= ERROR_SAMPLE_LIMIT or len(samples) != ERROR_SAMPLE_LIMIT or indices != sorted(set(indices)):
+        return fail(f"reservoir must hold exactly {ERROR_SAMPLE_LIMIT} distinct rejected samples in index order: {indices}")
+    rejected_indices = {int(row["index"]) for row in rows}
+    if not set(indices) <= rejected_indices or report["error_samples_method"] != "reservoir":
+        return fail(f"reservoir samples must be rejected records: {indices}")
+    if len(report["sample_payloads"]) > 5 or any(sample["index"] in rejected_indices for sample in report["sample_payloads"]):
+        return fail("sample payloads must be accepted records within sample_limit")
+    none = run_stream_dry_run(broken, chunk_size=CHUNK_SIZE, error_sample_limit=0, sample_limit=0)
+    if none["error_samples"] or none["sample_payloads"] or none["summary"] != report["summary"]:
+        return fail("zero sample limits must keep no samples and leave counts unchanged")
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, BATCH, CLI, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ("def run_stream_dry_run", "_record_errors(record, set())", '"error_samples_method": "reservoir"'), "backend/legacy_import_stream.py")
+    if rc:
+        return rc
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    with tempfile.TemporaryDirectory(prefix="pmai_legacy_stream_") as tmp:
+        rc = validate_parity(Path(tmp))
+    if rc:
+        return rc
+
+    print("PASS legacy stream dry-run matches build_dry_run_report (2 workers, duplicates, broken lines, sample limits)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import functools
+import os
+import py_compile
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "metrics.py"
+DOC = ROOT / "docs" / "ops" / "METRICS_ENDPOINT_V1.md"
+
+FIXTURE_MODULE = "metrics_validator_fixture"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _samples(families) -> dict:
+    values = {}
+    for family in families:
+        for name, _, label_values, value in family.samples():
+            values[(name, tuple(label_values))] = value
+    return values
+
+
+def validate_cache_gauges(metrics) -> int:
+    @functools.lru_cache(maxsize=8)
+    def lookup(key: int) -> int:
+        return key
+
+    fixture = types.ModuleType(FIXTURE_MODULE)
+    fixture.lookup = lookup
+    sys.modules[FIXTURE_MODULE] = fixture
+    saved_sources = metrics.CACHE_SOURCES
+    metrics.CACHE_SOURCES = (("validator", FIXTURE_MODULE, "lookup", "lru"),)
+    try:
+        families = {family.name: family.type_name for family in metrics.collect_caches()}
+        for name in ("pmai_cache_hits", "pmai_cache_misses"):
+            # Values drop to zero on cache_clear(); as counters rate() would spike.
+            if families.get(name) != "gauge":
+                return fail(f"{name} must be exported as a gauge, got {families.get(name)}")
+        if any(name.endswith("_total") for name in families):
+            return fail(f"cache families must not use the counter _total suffix: {sorted(families)}")
+        for key in range(3):
+            lookup(key)
+        for _ in range(5):
+            lookup(0)
+        scraped = _samples(metrics.collect_caches())
+        if (scraped[("pmai_cache_hits", ("validator",))], scraped[("pmai_cache_misses", ("validator",))]) != (5, 3):
+            return fail(f"cache gauges should report 5 hits / 3 misses: {scraped}")
+        lookup.cache_clear()
+        scraped = _samples(metrics.collect_caches())
+        if scraped[("pmai_cache_hits", ("validator",))] != 0 or scraped[("pmai_cache_entries", ("validator",))] != 0:
+            return fail("cache gauges should follow cache_clear() back to zero")
+    finally:
+        metrics.CACHE_SOURCES = saved_sources
+        sys.modules.pop(FIXTURE_MODULE, None)
+    return 0
+
+
+def validate_inbox_depth_cache(metrics) -> int:
+    from sqlalchemy import create_engine, event  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    from db import Base  # noqa: WPS433
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    queries = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        if "webhook_inbox" in statement:
+            queries.append(statement)
+
+    saved_session, saved_ttl = metrics.SessionLocal, metrics.METRICS_DB_GAUGE_TTL_SECONDS
+    metrics.SessionLocal = sessionmaker(bind=engine)
+    metrics.METRICS_DB_GAUGE_TTL_SECONDS = 3600.0
+    metrics._webhook_depth_cache.update(at=None, rows=[])
+    try:
+        for _ in range(3):
+            if metrics._webhook_inbox_depth() != []:
+                return fail("an empty inbox should report no status rows")
+        if len(queries) != 1:
+            return fail(f"an empty inbox must be cached between scrapes; ran {len(queries)} GROUP BY queries")
+        metrics.METRICS_DB_GAUGE_TTL_SECONDS = 0.0
+        metrics._webhook_inbox_depth()
+        if len(queries) != 2:
+            return fail("an expired cache entry must re-query the inbox")
+    finally:
+        metrics.SessionLocal, metrics.METRICS_DB_GAUGE_TTL_SECONDS = saved_session, saved_ttl
+        metrics._webhook_depth_cache.update(at=None, rows=[])
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ('"pmai_cache_hits", "gauge"', '_webhook_depth_cache["at"] is not None'), "backend/metrics.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("Hits and misses are gauges, not counters",), "docs/ops/METRICS_ENDPOINT_V1.md")
+    if rc:
+        return rc
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    import metrics  # noqa: WPS433
+
+    rc = validate_cache_gauges(metrics)
+    if rc:
+        return rc
+    rc = validate_inbox_depth_cache(metrics)
+    if rc:
+        return rc
+
+    print("PASS metrics cache stats are gauges and the inbox depth cache holds empty results")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
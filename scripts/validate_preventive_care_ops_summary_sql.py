@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import py_compile
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+API = BACKEND / "preventive_care_ops_api.py"
+DOC = ROOT / "docs" / "preventive_care" / "PREVENTIVE_CARE_OPS_DASHBOARD_V1.md"
+
+# Grouped SQL: 4 reminder, 3 queue, 1 preference and 1 event statement, whatever the row count.
+MAX_STATEMENTS = 9
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def _count_by(items, attr: str) -> dict:
+    result: dict = {}
+    for item in items:
+        key = str(getattr(item, attr, None) or "unknown")
+        result[key] = result.get(key, 0) + 1
+    return dict(sorted(result.items()))
+
+
+def reference_summary(reminders, queue_items, prefs, events, now: datetime) -> dict:
+    """The pre-SQL Python loops. Rows come pre-sorted by the documented sample order;
+    the old queries had no ORDER BY, so their samples followed storage order."""
+    today_start = datetime(now.year, now.month, now.day)
+    tomorrow_start = today_start + timedelta(days=1)
+    closed = {"completed", "dismissed", "disabled"}
+    recent = [item for item in events if item.created_at >= now - timedelta(days=30)]
+    due_today = [item for item in reminders if item.due_date and today_start <= item.due_date < tomorrow_start]
+    overdue = [item for item in reminders if item.due_date and item.due_date < today_start and item.status not in closed]
+    needs_review = [item for item in queue_items if item.status in {"draft", "review_required"} or item.manual_review_required]
+    blocked = [item for item in queue_items if item.status == "blocked_opt_out" or item.client_opt_out_snapshot]
+    return {
+        "reminders": {
+            "total": len(reminders),
+            "open": sum(1 for item in reminders if item.status not in closed),
+            "due_today": len(due_today),
+            "due_soon": sum(1 for item in reminders if item.status == "due_soon"),
+            "overdue": len(overdue),
+            "by_status": _count_by(reminders, "status"),
+            "by_category": _count_by(reminders, "category"),
+        },
+        "notification_queue": {
+            "total": len(queue_items),
+            "needs_review": len(needs_review),
+            "blocked_opt_out": len(blocked),
+            "contacted_manually": sum(1 for item in queue_items if item.status == "contacted_manually"),
+            "by_status": _count_by(queue_items, "status"),
+            "by_channel": _count_by(queue_items, "channel"),
+        },
+        "client_preferences": {
+            "total": len(prefs),
+            "opt_out_all": sum(1 for item in prefs if item.opt_out_all),
+            "allow_sms": sum(1 for item in prefs if item.allow_sms),
+            "allow_wechat": sum(1 for item in prefs if item.allow_wechat),
+            "allow_email": sum(1 for item in prefs if item.allow_email),
+        },
+        "events": {
+            "recent_30d_total": len(recent),
+            "recent_30d_by_type": _count_by(recent, "event_type"),
+        },
+        "attention_count": len(overdue) + len(due_today) + len(needs_review) + len(blocked),
+        "latest": {
+            "overdue_reminder_ids": [item.reminder_id for item in overdue[:5]],
+            "queue_needs_review_ids": [item.notification_id for item in needs_review[:5]],
+            "queue_blocked_opt_out_ids": [item.notification_id for item in blocked[:5]],
+        },
+    }
+
+
+def _seed(db, models, owner_id: int, other_id: int, now: datetime) -> None:
+    Reminder, Queue, Pref, Event = models
+    today = datetime(now.year, now.month, now.day, 12, 0, 0)
+    # Inserted out of due_date order so storage order and sample order differ.
+    reminder_rows = [
+        ("r08", "vaccine", "active", today - timedelta(days=2)),
+        ("r01", "vaccine", "due_soon", today + timedelta(days=5)),
+        ("r03", "parasite", "overdue", today - timedelta(days=40)),
+        ("r05", "dental", "active", today - timedelta(days=9)),
+        ("r02", "parasite", "completed", today - timedelta(days=60)),
+        ("r04", "vaccine", "draft", today - timedelta(days=20)),
+        ("r06", "wellness", "review_required", today - timedelta(days=5)),
+        ("r07", "dental", "dismissed", today - timedelta(days=3)),
+        ("r09", "vaccine", "active", today - timedelta(days=1)),
+        ("r10", "wellness", "active", today),
+        ("r11", "wellness", "due_soon", today),
+        ("r12", "vaccine", "disabled", None),
+        ("r13", "parasite", "active", None),
+        ("r00", "vaccine", "overdue", today - timedelta(days=20)),
+    ]
+    for reminder_id, category, status, due in reminder_rows:
+        db.add(Reminder(reminder_id=f"pcr_{reminder_id}", owner_id=owner_id, pet_name="Mochi", species="dog", category=category, status=status, due_date=due))
+    db.add(Reminder(reminder_id="pcr_foreign", owner_id=other_id, pet_name="Bean", species="cat", category="vaccine", status="overdue", due_date=today - timedelta(days=30)))
+
+    queue_rows = [
+        ("q07", "sms", "approved", True, False, 7),
+        ("q02", "in_app", "draft", True, False, 2),
+        ("q05", "email", "review_required", False, False, 5),
+        ("q01", "wechat", "blocked_opt_out", False, True, 1),
+        ("q03", "sms", "contacted_manually", False, False, 3),
+        ("q06", "sms", "approved", False, True, 6),
+        ("q04", "in_app", "draft", False, False, 4),
+        ("q08", "email", "review_required", True, True, 8),
+        ("q09", "in_app", "draft", True, False, 9),
+        ("q10", "wechat", "blocked_opt_out", False, False, 10),
+        ("q00", "in_app", "draft", True, False, 9),
+    ]
+    for notification_id, channel, status, manual, opt_out, hours in queue_rows:
+        db.add(Queue(
+            notification_id=f"pcn_{notification_id}",
+            owner_id=owner_id,
+            channel=channel,
+            status=status,
+            manual_review_required=manual,
+            client_opt_out_snapshot=opt_out,
+            created_at=now - timedelta(days=2) + timedelta(hours=hours),
+        ))
+    db.add(Queue(notification_id="pcn_foreign", owner_id=other_id, status="draft", created_at=now - timedelta(days=3)))
+
+    # One preference row per owner (unique owner_id).
+    db.add(Pref(owner_id=owner_id, opt_out_all=True, allow_sms=True, allow_wechat=False, allow_email=True))
+    db.add(Pref(owner_id=other_id, opt_out_all=False, allow_sms=True, allow_wechat=True))
+
+    for index, (event_type, days) in enumerate((("reminder_created", 1), ("reminder_created", 29), ("queue_reviewed", 3), ("reminder_created", 31), ("queue_sent", 90))):
+        db.add(Event(event_id=f"pce_{index}", owner_id=owner_id, event_type=event_type, created_at=now - timedelta(days=days)))
+    db.add(Event(event_id="pce_foreign", owner_id=other_id, event_type="reminder_created", created_at=now))
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SECRET_KEY", "validator")
+    sys.path.insert(0, str(BACKEND))
+    from fastapi import FastAPI  # noqa: WPS433
+    from fastapi.testclient import TestClient  # noqa: WPS433
+    from sqlalchemy import create_engine, event  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    import preventive_care_ops_api as ops  # noqa: WPS433
+    from auth_jwt import get_current_user  # noqa: WPS433
+    from db import Base, get_db  # noqa: WPS433
+    from models import (  # noqa: WPS433
+        PreventiveCareClientPreference,
+        PreventiveCareEvent,
+        PreventiveCareNotificationQueue,
+        PreventiveCareReminder,
+        User,
+    )
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with session_factory() as db:
+        owner, other = User(email="ops-owner@example.com", hashed_password="x"), User(email="ops-other@example.com", hashed_password="x")
+        db.add_all([owner, other])
+        db.flush()
+        owner_id, other_id = owner.id, other.id
+        _seed(db, (PreventiveCareReminder, PreventiveCareNotificationQueue, PreventiveCareClientPreference, PreventiveCareEvent), owner_id, other_id, now)
+        db.commit()
+
+    with session_factory() as db:
+        Reminder, Queue = PreventiveCareReminder, PreventiveCareNotificationQueue
+        expected = reference_summary(
+            db.query(Reminder).filter(Reminder.owner_id == owner_id).order_by(Reminder.due_date.is_(None), Reminder.due_date, Reminder.reminder_id).all(),
+            db.query(Queue).filter(Queue.owner_id == owner_id).order_by(Queue.created_at, Queue.notification_id).all(),
+            db.query(PreventiveCareClientPreference).filter(PreventiveCareClientPreference.owner_id == owner_id).all(),
+            db.query(PreventiveCareEvent).filter(PreventiveCareEvent.owner_id == owner_id).all(),
+            now,
+        )
+
+    app = FastAPI()
+    app.include_router(ops.router)
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_user():
+        with session_factory() as db:
+            return db.get(User, owner_id)
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = override_user
+    client = TestClient(app)
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "preventive_care_" in statement:
+            statements.append(statement)
+
+    saved_ttl = ops.OPS_SUMMARY_CACHE_TTL_SECONDS
+    ops.OPS_SUMMARY_CACHE_TTL_SECONDS = 0.0
+    ops.clear_ops_summary_cache()
+    try:
+        response = client.get("/api/preventive-care/ops/summary")
+        if response.status_code != 200:
+            return fail(f"summary returned {response.status_code}: {response.text[:200]}")
+        body = response.json()
+        for section in ("reminders", "notification_queue", "client_preferences", "events", "latest"):
+            if body[section] != expected[section]:
+                return fail(f"{section} differs from the Python-loop semantics:\n  sql={body[section]}\n  ref={expected[section]}")
+        if body["attention"]["count"] != expected["attention_count"] or body["attention"]["needs_attention"] is not True:
+            return fail(f"attention {body['attention']} != {expected['attention_count']}")
+        # Spot-check the fixture so a broken seed cannot make both sides agree trivially.
+        if body["reminders"]["overdue"] != 7 or body["latest"]["overdue_reminder_ids"] != ["pcr_r03", "pcr_r00", "pcr_r04", "pcr_r05", "pcr_r06"]:
+            return fail(f"overdue samples must be the five oldest open reminders by due_date: {body['latest']}")
+        if body["latest"]["queue_needs_review_ids"] != ["pcn_q02", "pcn_q04", "pcn_q05", "pcn_q07", "pcn_q08"]:
+            return fail(f"needs-review samples must follow created_at: {body['latest']}")
+        if body["notification_queue"]["blocked_opt_out"] != 4 or body["events"]["recent_30d_total"] != 3:
+            return fail(f"blocked/event counts wrong: {body['notification_queue']} {body['events']}")
+        if body["cache"] != {"hit": False, "ttl_seconds": 0.0}:
+            return fail(f"cache must be off by default: {body['cache']}")
+        if len(statements) > MAX_STATEMENTS:
+            return fail(f"summary ran {len(statements)} statements; expected at most {MAX_STATEMENTS} grouped queries")
+        if any("LIMIT" not in statement and "GROUP BY" not in statement and "count(" not in statement.lower() and "sum(" not in statement.lower() for statement in statements):
+            return fail("summary must not load whole tables into Python")
+
+        ops.OPS_SUMMARY_CACHE_TTL_SECONDS = 60.0
+        first = client.get("/api/preventive-care/ops/summary").json()
+        statements.clear()
+        second = client.get("/api/preventive-care/ops/summary").json()
+        if first["cache"]["hit"] is not False or second["cache"]["hit"] is not True or statements:
+            return fail(f"a cached summary must skip the database: {first['cache']} {second['cache']} {len(statements)}")
+        if second["generated_at"] != first["generated_at"]:
+            return fail("a cached summary keeps its original generated_at")
+    finally:
+        ops.OPS_SUMMARY_CACHE_TTL_SECONDS = saved_ttl
+        ops.clear_ops_summary_cache()
+    return 0
+
+
+def main() -> int:
+    for path in (API, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(API, ("def _reminder_summary", "def _queue_summary", ".group_by("), "backend/preventive_care_ops_api.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("grouped queries", "overdue\nordered by due_date, queue items by created_at"), "docs/preventive_care/PREVENTIVE_CARE_OPS_DASHBOARD_V1.md")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS preventive care ops summary grouped SQL matches the Python-loop counts and samples")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
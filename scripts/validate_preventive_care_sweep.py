@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import py_compile
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+ENGINE = BACKEND / "preventive_care_sweep.py"
+API = BACKEND / "preventive_care_api.py"
+FLAGS = BACKEND / "feature_flags.py"
+CLI = ROOT / "scripts" / "preventive_care_reminder_sweep.py"
+DOC = ROOT / "docs" / "preventive_care" / "PREVENTIVE_CARE_REMINDER_API_V1.md"
+
+FLAG = "ENABLE_PREVENTIVE_CARE_SWEEP_WRITE"
+AS_OF = "2026-06-11"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def validate_rule_categories() -> int:
+    """(case_id, category) must resolve to one rule for every species/life stage."""
+    from preventive_care_rules import DEFAULT_RULES_PATH, PreventiveCareRuleIndex, load_preventive_care_rules  # noqa: WPS433
+
+    index = PreventiveCareRuleIndex(load_preventive_care_rules(DEFAULT_RULES_PATH))
+    for species in ("dog", "cat", "other"):
+        for life_stage in ("juvenile", "adult", "senior"):
+            categories = [rule.category for rule in index.rules_for(species, life_stage)]
+            if len(categories) != len(set(categories)):
+                return fail(f"{species}/{life_stage}: two rules share a category; last-event lookup would be ambiguous")
+    return 0
+
+
+def validate_runtime() -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.setdefault("SECRET_KEY", "validator")
+    os.environ.pop(FLAG, None)
+    sys.path.insert(0, str(BACKEND))
+    from fastapi import FastAPI  # noqa: WPS433
+    from fastapi.testclient import TestClient  # noqa: WPS433
+    from sqlalchemy import create_engine, func, select  # noqa: WPS433
+    from sqlalchemy.orm import sessionmaker  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    import preventive_care_api  # noqa: WPS433
+    from auth_jwt import get_current_user  # noqa: WPS433
+    from db import Base, get_db  # noqa: WPS433
+    from models import Case, PreventiveCareEvent, PreventiveCareReminder, User  # noqa: WPS433
+    from preventive_care_sweep import run_preventive_care_sweep  # noqa: WPS433
+
+    rc = validate_rule_categories()
+    if rc:
+        return rc
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        user = User(email="sweep-owner@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dog = Case(owner_id=user.id, patient_name="Mochi", species="dog", chief_complaint="wellness")
+        cat = Case(owner_id=user.id, patient_name="Bean", species="cat", chief_complaint="wellness")
+        gone = Case(owner_id=user.id, patient_name="Gone", species="dog", chief_complaint="x", deleted_at=datetime(2026, 1, 1))
+        db.add_all([dog, cat, gone])
+        db.commit()
+        owner_id, dog_id, cat_id, gone_id = user.id, dog.id, cat.id, gone.id
+
+    def reminder_count(db) -> int:
+        return int(db.execute(select(func.count()).select_from(PreventiveCareReminder)).scalar_one())
+
+    with session_factory() as db:
+        try:
+            run_preventive_care_sweep(db, as_of=AS_OF, dry_run=False)
+            return fail(f"dry_run=False must be refused while {FLAG} is off")
+        except PermissionError:
+            pass
+        dry = run_preventive_care_sweep(db, as_of=AS_OF, dry_run=True)
+        if reminder_count(db) != 0 or dry["writes_database"] is not False:
+            return fail("dry-run sweep must not write reminders")
+        expected = dry["summary"]["by_action"].get("create", 0)
+        if expected == 0 or dry["summary"]["cases_scanned"] != 2:
+            return fail(f"dry-run should scan 2 live cases and plan creates: {dry['summary']}")
+
+    os.environ[FLAG] = "true"
+    try:
+        with session_factory() as db:
+            first = run_preventive_care_sweep(db, as_of=AS_OF, dry_run=False, chunk_size=1)
+            if first["summary"]["by_action"].get("create") != expected or reminder_count(db) != expected:
+                return fail(f"first sweep should create the {expected} planned reminders: {first['summary']}")
+            if db.query(PreventiveCareReminder).filter(PreventiveCareReminder.case_id == gone_id).count():
+                return fail("deleted cases must not get reminders")
+
+            second = run_preventive_care_sweep(db, as_of=AS_OF, dry_run=False)
+            if set(second["summary"]["by_action"]) != {"unchanged"} or reminder_count(db) != expected:
+                return fail(f"re-running the sweep must not create duplicates: {second['summary']}")
+
+            # A recorded rabies vaccine moves that rule's window; the category key finds it.
+            db.add(PreventiveCareEvent(
+                owner_id=owner_id, case_id=dog_id, event_type="completed",
+                category="canine_rabies", event_date=datetime(2026, 5, 1),
+            ))
+            # Staff snoozed the cat's core vaccine: never touched again.
+            snoozed = db.query(PreventiveCareReminder).filter(
+                PreventiveCareReminder.case_id == cat_id,
+                PreventiveCareReminder.category == "feline_core_vaccine",
+            ).one()
+            snoozed.status = "snoozed"
+            db.commit()
+
+            third = run_preventive_care_sweep(db, as_of=AS_OF, dry_run=False, include_active=True)
+            by_rule = {(item["case_id"], item["rule_id"]): item for item in third["items"]}
+            rabies = by_rule.get((dog_id, "canine_rabies_local_law_review"))
+            if not rabies or rabies["action"] != "update" or rabies["due_date"] != "2027-05-01":
+                return fail(f"rabies event should update the dog's rabies reminder to 2027-05-01: {rabies}")
+            cat_core = [item for key, item in by_rule.items() if key[0] == cat_id and item["category"] == "feline_core_vaccine"]
+            if not cat_core or cat_core[0]["action"] != "skip_existing_staff_decision":
+                return fail(f"snoozed reminder must be skipped: {cat_core}")
+            if reminder_count(db) != expected:
+                return fail("update and skip paths must not insert rows")
+            stored = db.query(PreventiveCareReminder).filter(
+                PreventiveCareReminder.case_id == dog_id,
+                PreventiveCareReminder.source_rule_id == "canine_rabies_local_law_review",
+            ).one()
+            if stored.due_date != datetime(2027, 5, 1) or stored.status != "active":
+                return fail(f"rabies reminder not updated in place: {stored.due_date} {stored.status}")
+    finally:
+        os.environ.pop(FLAG, None)
+
+    app = FastAPI()
+    app.include_router(preventive_care_api.router)
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_user():
+        with session_factory() as db:
+            return db.get(User, owner_id)
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = override_user
+    client = TestClient(app)
+    response = client.post("/api/preventive-care/sweep", json={"as_of_date": AS_OF, "dry_run": False})
+    if response.status_code != 403 or (response.json().get("detail") or {}).get("feature_flag") != FLAG:
+        return fail(f"API sweep with dry_run=false must return 403 while {FLAG} is off: {response.status_code} {response.text[:200]}")
+    response = client.post("/api/preventive-care/sweep", json={"as_of_date": AS_OF, "dry_run": True})
+    if response.status_code != 200 or response.json().get("writes_database") is not False:
+        return fail(f"API dry-run sweep should work without the flag: {response.status_code}")
+    return 0
+
+
+def main() -> int:
+    for path in (ENGINE, API, FLAGS, CLI, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(ENGINE, ("SWEEP_WRITE_FEATURE_FLAG", "is_feature_enabled(SWEEP_WRITE_FEATURE_FLAG)"), "backend/preventive_care_sweep.py")
+    if rc:
+        return rc
+    rc = require_text(API, ("assert_feature_enabled(SWEEP_WRITE_FEATURE_FLAG)",), "backend/preventive_care_api.py")
+    if rc:
+        return rc
+    rc = require_text(FLAGS, (f'"{FLAG}"', '"default": False'), "backend/feature_flags.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, (FLAG, "(case_id, category)"), "docs/preventive_care/PREVENTIVE_CARE_REMINDER_API_V1.md")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS preventive care sweep gate and dedup")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
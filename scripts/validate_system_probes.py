@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import os
+import py_compile
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+MODULE = BACKEND / "system_info.py"
+DOC = ROOT / "docs" / "ops" / "SYSTEM_VERSION_BUILD_INFO_V1.md"
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def validate_runtime(tmp_path: Path) -> int:
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(BACKEND))
+    from fastapi import FastAPI  # noqa: WPS433
+    from fastapi.testclient import TestClient  # noqa: WPS433
+    from sqlalchemy import create_engine, text  # noqa: WPS433
+    from sqlalchemy.pool import StaticPool  # noqa: WPS433
+
+    import system_info  # noqa: WPS433
+
+    head = system_info._migration_graph()["head"]
+    if not head:
+        return fail("the migration graph must have a single head")
+
+    def stamp(engine, revision) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+            conn.execute(text("DELETE FROM alembic_version"))
+            if revision:
+                conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"), {"revision": revision})
+
+    database = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    # A parent directory that does not exist: every connect() fails.
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'app.db'}")
+
+    app = FastAPI()
+    app.include_router(system_info.router)
+    saved_engine, saved_ttl = system_info.engine, system_info.DB_REVISION_TTL_SECONDS
+    system_info.engine = database
+    system_info.DB_REVISION_TTL_SECONDS = 3600.0
+    system_info.reload_system_info()
+    try:
+        with TestClient(app) as client:
+            live = client.get("/api/system/live")
+            if live.status_code != 200 or live.json()["ok"] is not True:
+                return fail(f"/live must return 200: {live.status_code} {live.text[:200]}")
+
+            ready = client.get("/api/system/ready")
+            body = ready.json()
+            if ready.status_code != 503 or body["ok"] is not False or body["database_reachable"] is not True or body["database_revision"] is not None:
+                return fail(f"/ready on an unstamped database must return 503: {ready.status_code} {body}")
+            if client.get("/api/system/version").json()["upgrade_ready"] is not False:
+                return fail("/version must not report upgrade_ready on an unstamped database")
+
+            stamp(database, "0001_not_head")
+            ready = client.get("/api/system/ready")
+            if ready.status_code != 503 or ready.json()["database_revision"] != "0001_not_head":
+                return fail(f"/ready below head must return 503: {ready.status_code} {ready.json()}")
+            # /version reads through the TTL cache, so it still sees the pre-stamp value.
+            if client.get("/api/system/version").json()["database_revision"] is not None:
+                return fail("/version should serve the cached revision within the TTL")
+
+            stamp(database, head)
+            ready = client.get("/api/system/ready")
+            body = ready.json()
+            if ready.status_code != 200 or body["ok"] is not True or body["schema_ok"] is not True or body["alembic_head"] != head:
+                return fail(f"/ready at head must return 200 without waiting for the TTL: {ready.status_code} {body}")
+            system_info.reload_system_info()
+            if client.get("/api/system/health").json()["ok"] is not True:
+                return fail("/health must report ok after reload_system_info() at head")
+            if system_info._cached_migration_graph.cache_info().misses != 1:
+                return fail("the migration graph must be parsed once per reload, not per request")
+
+            system_info.engine = unreachable
+            live = client.get("/api/system/live")
+            ready = client.get("/api/system/ready")
+            if live.status_code != 200:
+                return fail("/live must not depend on the database")
+            if ready.status_code != 503 or ready.json()["database_reachable"] is not False:
+                return fail(f"/ready must return 503 when the database is unreachable: {ready.status_code} {ready.json()}")
+    finally:
+        system_info.engine, system_info.DB_REVISION_TTL_SECONDS = saved_engine, saved_ttl
+        system_info.reload_system_info()
+    return 0
+
+
+def main() -> int:
+    for path in (MODULE, DOC):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(MODULE, ('@router.get("/live"', '@router.get("/ready"', "status_code=503", "def reload_system_info"), "backend/system_info.py")
+    if rc:
+        return rc
+    rc = require_text(DOC, ("GET /api/system/live", "GET /api/system/ready"), "docs/ops/SYSTEM_VERSION_BUILD_INFO_V1.md")
+    if rc:
+        return rc
+
+    with tempfile.TemporaryDirectory(prefix="pmai_system_probes_") as tmp:
+        rc = validate_runtime(Path(tmp))
+    if rc:
+        return rc
+
+    print("PASS system live/ready probes (200 live, 503 until the database is reachable and at head)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import py_compile
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+
+RUNNER = SCRIPTS / "run_validators.py"
+CACHE = SCRIPTS / "validator_cache.py"
+
+HELPER = "validator_cache_fixture_helper"
+FIXTURE_VALIDATOR = f"""\
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+import {HELPER}
+
+raise SystemExit(0 if {HELPER}.VALUE else 1)
+"""
+
+
+def fail(message: str) -> int:
+    print(f"FAIL: {message}", file=sys.stderr)
+    return 1
+
+
+def require_file(path: Path) -> int:
+    if not path.exists():
+        return fail(f"missing file: {path.relative_to(ROOT)}")
+    if path.suffix == ".py":
+        py_compile.compile(str(path), doraise=True)
+    return 0
+
+
+def require_text(path: Path, needles: tuple[str, ...], label: str) -> int:
+    rc = require_file(path)
+    if rc:
+        return rc
+    text = path.read_text(encoding="utf-8")
+    for needle in needles:
+        if needle not in text:
+            return fail(f"{label} missing expected marker: {needle}")
+    return 0
+
+
+def validate_runtime() -> int:
+    """Two validators in one worker import the same module, the first from __pycache__."""
+    sys.path.insert(0, str(SCRIPTS))
+    import run_validators  # noqa: WPS433
+    import validator_cache  # noqa: WPS433
+
+    validator_cache.install()
+    with tempfile.TemporaryDirectory(prefix="pmai_validator_cache_") as tmp:
+        project = Path(tmp).resolve()
+        (project / "backend").mkdir()
+        (project / "scripts").mkdir()
+        helper = project / "backend" / f"{HELPER}.py"
+        helper.write_text("VALUE = True\n", encoding="utf-8")
+        # The first import is served from the bytecode cache, never from the source.
+        py_compile.compile(str(helper), doraise=True)
+        first = project / "scripts" / "validate_fixture_first.py"
+        second = project / "scripts" / "validate_fixture_second.py"
+        first.write_text(FIXTURE_VALIDATOR, encoding="utf-8")
+        second.write_text(FIXTURE_VALIDATOR, encoding="utf-8")
+
+        saved_root = run_validators.ROOT
+        run_validators.ROOT = project
+        try:
+            results = {path: run_validators._run_in_process(str(path)) for path in (first, second)}
+            for path, result in results.items():
+                if result["exit_code"] != 0:
+                    return fail(f"{path.name} failed in-process: {result['output'][-400:]}")
+                inputs = run_validators._relevant_inputs(result["inputs"], str(path))
+                if str(helper) not in inputs:
+                    return fail(f"{path.name}: imported module missing from cache inputs {inputs}")
+                if HELPER in sys.modules:
+                    return fail("project modules must be unloaded after each validator")
+
+            inputs = run_validators._relevant_inputs(results[second]["inputs"], str(second))
+            before = run_validators.fingerprint(str(second), inputs)
+            if run_validators.fingerprint(str(second), inputs) != before:
+                return fail("fingerprint must be stable for unchanged inputs")
+            helper.write_text("VALUE = False  # edited\n", encoding="utf-8")
+            if run_validators.fingerprint(str(second), inputs) == before:
+                return fail("editing an imported module must invalidate the cached result")
+            if run_validators._run_in_process(str(second))["exit_code"] != 1:
+                return fail("the re-run must see the edited module, not a stale sys.modules entry")
+        finally:
+            run_validators.ROOT = saved_root
+            sys.modules.pop(HELPER, None)
+    return 0
+
+
+def main() -> int:
+    for path in (RUNNER, CACHE):
+        rc = require_file(path)
+        if rc:
+            return rc
+
+    rc = require_text(CACHE, ("def release_modules", "def source_path"), "scripts/validator_cache.py")
+    if rc:
+        return rc
+    rc = require_text(RUNNER, ("validator_cache.release_modules(",), "scripts/run_validators.py")
+    if rc:
+        return rc
+
+    rc = validate_runtime()
+    if rc:
+        return rc
+
+    print("PASS validator result cache records every imported project module")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
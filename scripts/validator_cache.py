@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Memoized file access and input tracking for in-process validator runs.
+
+``install()`` wraps the stdlib calls the validate_*.py scripts use to read
+the tree, so that many validators running in one process share work:
+
+- ``Path.read_text`` / ``Path.read_bytes`` return cached contents;
+- ``py_compile.compile`` skips files it already compiled;
+- ``ast.parse`` returns the already-parsed tree for identical source.
+
+Cached entries are keyed by path plus ``st_mtime_ns`` and ``st_size``, so an
+edited file is read again. While ``recording()`` is active every file read,
+imported, compiled, listed or probed for existence is collected; the runner
+fingerprints those paths to decide whether a cached result is still valid.
+``release_modules()`` adds the source of every project module a validator
+left in ``sys.modules`` and unloads it, so a later validator in the same
+worker imports (and records) it again.
+
+Only scripts/run_validators.py installs this. The validators themselves are
+unchanged and still run standalone.
+"""
+from __future__ import annotations
+
+import ast
+import builtins
+import contextlib
+import glob as glob_module
+import hashlib
+import importlib.machinery
+import importlib.util
+import io
+import os
+import py_compile
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+_recording: Optional[Set[str]] = None
+_bytes_cache: Dict[Tuple[str, int, int], bytes] = {}
+_compiled: Dict[Tuple[str, int, int], Any] = {}
+_ast_cache: Dict[Tuple[Any, ...], ast.AST] = {}
+_installed = False
+stats = {"read_hits": 0, "read_misses": 0, "compile_hits": 0, "compile_misses": 0, "ast_hits": 0, "ast_misses": 0}
+
+
+def _record(path: Any) -> None:
+    if _recording is not None:
+        try:
+            _recording.add(os.path.abspath(os.fspath(path)))
+        except TypeError:
+            pass
+
+
+def _stat_key(path: Any) -> Optional[Tuple[str, int, int]]:
+    try:
+        resolved = os.path.abspath(os.fspath(path))
+        st = os.stat(resolved)
+    except (OSError, TypeError):
+        return None
+    return resolved, st.st_mtime_ns, st.st_size
+
+
+def source_path(path: Any) -> str:
+    """Source file for a ``__pycache__`` bytecode path; other paths unchanged."""
+    path = os.fspath(path)
+    if path.endswith(".pyc"):
+        try:
+            return importlib.util.source_from_cache(path)
+        except ValueError:
+            pass
+    return path
+
+
+def release_modules(root: str, keep: Set[str]) -> Set[str]:
+    """Drop modules loaded from under ``root`` (except ``keep``); return their source files.
+
+    The next validator in the same worker imports them afresh, so its own
+    reads are recorded instead of being served silently from ``sys.modules``.
+    """
+    prefix = os.path.abspath(root) + os.sep
+    files: Set[str] = set()
+    for name, module in list(sys.modules.items()):
+        origin = getattr(module, "__file__", None)
+        if name in keep or not origin:
+            continue
+        origin = os.path.abspath(source_path(origin))
+        if origin.startswith(prefix):
+            files.add(origin)
+            del sys.modules[name]
+    return files
+
+
+@contextlib.contextmanager
+def recording() -> Iterator[Set[str]]:
+    """Collect the paths touched inside the block."""
+    global _recording
+    previous, _recording = _recording, set()
+    try:
+        yield _recording
+    finally:
+        _recording = previous
+
+
+def install() -> None:
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    original_read_bytes = Path.read_bytes
+    original_open = builtins.open
+    original_compile = py_compile.compile
+    original_parse = ast.parse
+    original_get_data = importlib.machinery.SourceFileLoader.get_data
+
+    def read_bytes(self: Path) -> bytes:
+        _record(self)
+        key = _stat_key(self)
+        if key is not None and key in _bytes_cache:
+            stats["read_hits"] += 1
+            return _bytes_cache[key]
+        stats["read_misses"] += 1
+        data = original_read_bytes(self)
+        if key is not None:
+            _bytes_cache[key] = data
+        return data
+
+    def read_text(self: Path, encoding: Optional[str] = None, errors: Optional[str] = None, newline: Optional[str] = None) -> str:
+        data = read_bytes(self)
+        # Same newline translation as Path.read_text (universal newlines).
+        with io.TextIOWrapper(io.BytesIO(data), encoding=encoding or "locale", errors=errors, newline=newline) as handle:
+            return handle.read()
+
+    def open_(file, mode="r", *args, **kwargs):
+        if isinstance(file, (str, bytes, os.PathLike)) and not any(flag in mode for flag in "wax+"):
+            _record(file)
+        return original_open(file, mode, *args, **kwargs)
+
+    def compile_(file, cfile=None, dfile=None, doraise=False, *args, **kwargs):
+        _record(file)
+        key = _stat_key(file) if cfile is None else None
+        if key is not None and key in _compiled:
+            stats["compile_hits"] += 1
+            return _compiled[key]
+        stats["compile_misses"] += 1
+        result = original_compile(file, cfile, dfile, doraise, *args, **kwargs)
+        # Only successes are remembered; a failure is reported again on every call.
+        if key is not None and result is not None:
+            _compiled[key] = result
+        return result
+
+    def parse(source, filename="<unknown>", mode="exec", *args, **kwargs):
+        if isinstance(source, (str, bytes)):
+            key = (source, str(filename), mode, args, tuple(sorted(kwargs.items())))
+            tree = _ast_cache.get(key)
+            if tree is not None:
+                stats["ast_hits"] += 1
+                return tree
+            stats["ast_misses"] += 1
+            tree = original_parse(source, filename, mode, *args, **kwargs)
+            _ast_cache[key] = tree
+            return tree
+        return original_parse(source, filename, mode, *args, **kwargs)
+
+    def get_data(self, path):
+        # Imports served from __pycache__ depend on the source they were compiled from.
+        if str(path).endswith((".py", ".pyc")):
+            _record(source_path(path))
+        return original_get_data(self, path)
+
+    Path.read_bytes = read_bytes
+    Path.read_text = read_text
+    builtins.open = open_
+    io.open = open_
+    py_compile.compile = compile_
+    ast.parse = parse
+    importlib.machinery.SourceFileLoader.get_data = get_data
+
+    # Existence checks and directory listings are inputs too: a validator that
+    # asserts a file is absent must re-run once it appears.
+    def probe(original):
+        def wrapper(path, *args, **kwargs):
+            _record(path)
+            return original(path, *args, **kwargs)
+        wrapper.__wrapped__ = original
+        return wrapper
+
+    for name in ("exists", "is_file", "is_dir", "iterdir", "glob", "rglob"):
+        setattr(Path, name, probe(getattr(Path, name)))
+    for name in ("exists", "isfile", "isdir"):
+        setattr(os.path, name, probe(getattr(os.path, name)))
+    os.listdir = probe(os.listdir)
+    os.scandir = probe(os.scandir)
+
+    original_glob = glob_module.glob
+
+    def glob_(pathname, *args, **kwargs):
+        _record(os.path.dirname(os.fspath(pathname)) or ".")
+        return original_glob(pathname, *args, **kwargs)
+
+    glob_module.glob = glob_
+
+
+# --- Fingerprints: start ---
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+
+
+def path_digest(path: str) -> str:
+    """sha256 of a file, of a directory's entry names, or ``missing``."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    key = (path, st.st_mtime_ns, st.st_size)
+    cached = _digest_cache.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        digest.update("\0".join(sorted(os.listdir(path))).encode("utf-8", "surrogateescape"))
+        value = "dir:" + digest.hexdigest()
+    else:
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(chunk)
+        value = digest.hexdigest()
+    _digest_cache[key] = value
+    return value
+# --- Fingerprints: end ---